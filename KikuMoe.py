@@ -1,14 +1,29 @@
 import sys
-from PyQt5.QtWidgets import QApplication
-from ui.main_window import ListenMoePlayer
+import startup_trace
+import single_instance
 
 
 def main() -> None:
+    # Se l'app è già aperta le inoltra la richiesta ed esce senza caricare finestra e backend
+    command = single_instance.parse_command(sys.argv[1:])
+    if single_instance.forward(command):
+        sys.exit(0)
+    from PyQt5.QtWidgets import QApplication
+    from ui.main_window import ListenMoePlayer
+    startup_trace.mark('imports')
     app = QApplication(sys.argv)
+    instance = single_instance.InstanceServer()
+    if not instance.listen() and single_instance.forward(command):
+        # Un'altra istanza è partita nello stesso momento: ha ricevuto la richiesta
+        sys.exit(0)
     window = ListenMoePlayer()
+    startup_trace.mark('window_created')
+    instance.command_received.connect(window.handle_instance_command)
     window.show()
+    if command != 'show':
+        window.handle_instance_command(command)
     sys.exit(app.exec_())
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
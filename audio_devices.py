@@ -0,0 +1,232 @@
+from __future__ import annotations
+from typing import Callable, Dict, List, Optional, Tuple
+import threading
+from logger import get_logger
+
+# Registro dei dispositivi audio di uscita (PortAudio via PyAudio).
+# L'enumerazione (una re-inizializzazione completa di PortAudio, lenta) avviene
+# su un thread in background e il risultato resta in cache: la finestra delle
+# impostazioni legge la cache e si aggiorna tramite `subscribe`. Nessuna
+# dipendenza da Qt (usato anche dalla modalità headless).
+# Gli indici PortAudio cambiano tra riavvii e collegamenti/scollegamenti, quindi
+# ogni dispositivo ha un id stabile "host API/nome" (con suffisso #n per i
+# nomi duplicati) che viene salvato nelle impostazioni e risolto all'apertura.
+# Nota: PortAudio rilegge l'elenco solo quando non ci sono altre istanze attive,
+# quindi i cambi durante la riproduzione vengono visti alla prima scansione
+# successiva allo stop (il player FFmpeg rilascia PyAudio quando è fermo).
+# Per questo non si interroga di continuo: il polling è attivo solo finché
+# qualcuno mostra l'elenco (finestra delle impostazioni, vedi hold_polling);
+# altrimenti si scansiona su richiesta con refresh().
+
+POLL_INTERVAL_S = 10.0
+
+
+class AudioDevice:
+    __slots__ = ("id", "index", "name", "host_api", "max_output_channels", "default_sample_rate", "is_default")
+
+    def __init__(self, device_id: str, index: int, name: str, host_api: str,
+                 max_output_channels: int, default_sample_rate: float, is_default: bool = False) -> None:
+        self.id = device_id
+        self.index = index
+        self.name = name
+        self.host_api = host_api
+        self.max_output_channels = max_output_channels
+        self.default_sample_rate = default_sample_rate
+        self.is_default = is_default
+
+    def label(self) -> str:
+        return f"{self.name} ({self.host_api})"
+
+    def __repr__(self) -> str:
+        return f"AudioDevice({self.id!r}, index={self.index})"
+
+
+def make_device_id(name: str, host_api: str) -> str:
+    return f"{host_api}/{name}"
+
+
+def enumerate_output_devices() -> List[AudioDevice]:
+    """Elenca i dispositivi con canali di uscita di tutte le host API (sincrono, lento)."""
+    try:
+        import pyaudio
+    except Exception:
+        return []
+    pa = pyaudio.PyAudio()
+    try:
+        host_names: Dict[int, str] = {}
+        for h in range(pa.get_host_api_count()):
+            try:
+                host_names[h] = str(pa.get_host_api_info_by_index(h).get('name', f'API {h}'))
+            except Exception:
+                host_names[h] = f'API {h}'
+        try:
+            default_index = int(pa.get_default_output_device_info().get('index', -1))
+        except Exception:
+            default_index = -1
+        out: List[AudioDevice] = []
+        seen: Dict[str, int] = {}
+        for i in range(pa.get_device_count()):
+            try:
+                info = pa.get_device_info_by_index(i)
+            except Exception:
+                continue
+            if not isinstance(info, dict) or int(info.get('maxOutputChannels', 0)) <= 0:
+                continue
+            name = str(info.get('name', f'Device {i}')).strip()
+            host = host_names.get(int(info.get('hostApi', -1)), 'API ?')
+            base = make_device_id(name, host)
+            n = seen.get(base, 0) + 1
+            seen[base] = n
+            out.append(AudioDevice(base if n == 1 else f"{base}#{n}", i, name, host,
+                                   int(info.get('maxOutputChannels', 0)),
+                                   float(info.get('defaultSampleRate', 0.0) or 0.0),
+                                   i == default_index))
+        return out
+    finally:
+        try:
+            pa.terminate()
+        except Exception:
+            pass
+
+
+class DeviceRegistry:
+    """Cache dei dispositivi di uscita con scansione in background.
+
+    `devices()` non blocca mai; `refresh()` chiede una nuova scansione e gli
+    iscritti (`subscribe`) vengono chiamati, sul thread della scansione, solo
+    quando l'elenco (id o indici) cambia. `resolve(device_id)` ritorna
+    l'indice PortAudio attuale.
+    """
+
+    def __init__(self, poll_interval: float = POLL_INTERVAL_S) -> None:
+        self.log = get_logger('AudioDevices', subsystem='player')
+        self.poll_interval = max(1.0, float(poll_interval))
+        self._lock = threading.Lock()
+        self._scan_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._devices: List[AudioDevice] = []
+        self._signature: Optional[Tuple[Tuple[str, int], ...]] = None
+        self._worker: Optional[threading.Thread] = None
+        # Numero di chi ha chiesto il polling (hold_polling); 0 = solo scansioni su richiesta
+        self._poll_holders = 0
+        self._closed = False
+        self._subscribers: List[Callable[[List[AudioDevice]], None]] = []
+
+    def subscribe(self, callback: Callable[[List[AudioDevice]], None]) -> Callable[[], None]:
+        """Registra `callback(devices)`. Ritorna la funzione per annullare l'iscrizione."""
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def _unsubscribe() -> None:
+            with self._lock:
+                try:
+                    self._subscribers.remove(callback)
+                except ValueError:
+                    pass
+        return _unsubscribe
+
+    @property
+    def scanned(self) -> bool:
+        return self._signature is not None
+
+    def devices(self) -> List[AudioDevice]:
+        with self._lock:
+            return list(self._devices)
+
+    def get(self, device_id: str) -> Optional[AudioDevice]:
+        with self._lock:
+            return next((d for d in self._devices if d.id == device_id), None)
+
+    def find_by_index(self, index: int) -> Optional[AudioDevice]:
+        with self._lock:
+            return next((d for d in self._devices if d.index == index), None)
+
+    def resolve(self, device_id: str) -> Optional[int]:
+        """Indice PortAudio del dispositivo secondo la cache (None se non presente o non
+        ancora scansionato). Non blocca: senza cache avvia una scansione in background."""
+        if not self.scanned:
+            self.refresh()
+            return None
+        dev = self.get(device_id)
+        return dev.index if dev is not None else None
+
+    def refresh(self) -> None:
+        """Richiede una scansione sul thread in background (non blocca)."""
+        self._ensure_worker()
+        self._wake.set()
+
+    def hold_polling(self) -> Callable[[], None]:
+        """Rilegge l'elenco ogni `poll_interval` secondi finché non viene chiamata la
+        funzione restituita (una volta per chiamante: il polling è condiviso)."""
+        with self._lock:
+            self._poll_holders += 1
+        self._ensure_worker()
+        self._wake.set()
+        released = [False]
+
+        def _release() -> None:
+            with self._lock:
+                if released[0]:
+                    return
+                released[0] = True
+                self._poll_holders = max(0, self._poll_holders - 1)
+        return _release
+
+    @property
+    def polling(self) -> bool:
+        return self._poll_holders > 0
+
+    def close(self) -> None:
+        self._closed = True
+        self._wake.set()
+
+    def scan_now(self) -> List[AudioDevice]:
+        """Scansione sincrona (da thread non GUI); aggiorna la cache e notifica i cambi."""
+        with self._scan_lock:
+            try:
+                found = enumerate_output_devices()
+            except Exception as e:
+                self.log.debug("[DEBUG] audio device scan failed: %s", e)
+                return self.devices()
+            signature = tuple((d.id, d.index) for d in found)
+            with self._lock:
+                changed = signature != self._signature
+                self._devices = found
+                self._signature = signature
+                subscribers = list(self._subscribers) if changed else []
+        if changed:
+            self.log.debug("[DEBUG] audio devices: %d output devices", len(found))
+        for cb in subscribers:
+            try:
+                cb(list(found))
+            except Exception:
+                pass
+        return list(found)
+
+    def _ensure_worker(self) -> None:
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._closed = False
+            self._worker = threading.Thread(target=self._run, name="AudioDevices", daemon=True)
+            self._worker.start()
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wake.wait(self.poll_interval if self.polling else None)
+            self._wake.clear()
+            if self._closed:
+                return
+            self.scan_now()
+
+
+_registry: Optional[DeviceRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_device_registry() -> DeviceRegistry:
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = DeviceRegistry()
+        return _registry
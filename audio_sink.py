@@ -0,0 +1,210 @@
+from __future__ import annotations
+from typing import Any, Optional
+import time
+
+from logger import get_logger
+from constants import KEY_AUDIO_DEVICE_INDEX, KEY_AUDIO_DEVICE_ID
+from settings_store import get_settings
+from audio_devices import get_device_registry
+from perf_monitor import get_monitor
+from gain import GainStage
+
+# Uscita PCM s16le condivisa dai backend: PlayerFFmpeg (PCM letto da ffmpeg) e
+# PlayerVLC in modalità callback (PCM decodificato da libVLC). Comprende lo stadio
+# di guadagno (volume, muto, fade), il dispositivo scelto nelle Impostazioni e le
+# scritture PortAudio misurate da perf_monitor.
+
+
+def output_device_index(log: Optional[Any] = None) -> Optional[int]:
+    """Indice PortAudio del dispositivo scelto; None => predefinito di Windows.
+    L'id stabile viene risolto con la cache del registro dispositivi (gli indici cambiano tra
+    riavvii), senza enumerare sul percorso di avvio; l'indice salvato resta il fallback finché
+    la scansione in background non ha riempito la cache.
+    """
+    try:
+        dev_id = get_settings().value(KEY_AUDIO_DEVICE_ID, '')
+        if dev_id:
+            registry = get_device_registry()
+            idx = registry.resolve(str(dev_id))
+            if idx is not None:
+                return idx
+            if registry.devices():
+                if log is not None:
+                    log.debug("[DEBUG] audio device %s not present, using default output", dev_id)
+                return None
+    except Exception:
+        pass
+    try:
+        val = get_settings().value(KEY_AUDIO_DEVICE_INDEX, '')
+        if val in (None, ''):
+            return None
+        try:
+            return int(val)
+        except Exception:
+            return None
+    except Exception:
+        return None
+
+
+class AudioSink:
+    """Stream PortAudio s16le con stadio di guadagno, aperto per ogni riproduzione."""
+
+    def __init__(self, pyaudio_module: Optional[Any], rate: int = 44100, channels: int = 2,
+                 volume: float = 1.0, frames_per_buffer: int = 1024) -> None:
+        self._pyaudio = pyaudio_module
+        self.rate = int(rate)
+        self.channels = int(channels)
+        self.frames_per_buffer = int(frames_per_buffer)
+        # Volume, muto e fade applicati al PCM prima della scrittura
+        self.gain = GainStage(rate=self.rate, channels=self.channels, volume=volume)
+        self.stream: Optional[Any] = None
+        self._instance: Optional[Any] = None
+        # Fine dell'ultima scrittura (per la pausa tra scritture); None dopo pausa/stop
+        self._last_write_end: Optional[float] = None
+        self.log = get_logger('AudioSink', subsystem='player')
+
+    def set_format(self, rate: int, channels: int) -> None:
+        """Formato del PCM in ingresso (a stream chiuso); il guadagno corrente viene mantenuto."""
+        rate, channels = int(rate), int(channels)
+        if rate == self.rate and channels == self.channels:
+            return
+        old = self.gain
+        self.rate, self.channels = rate, channels
+        self.gain = GainStage(rate=rate, channels=channels, volume=old.volume)
+        self.gain.set_mute(old.muted)
+
+    def open(self, device_index: Optional[int] = None) -> bool:
+        """Apre e avvia lo stream; se il dispositivo scelto fallisce riprova con quello predefinito."""
+        if self._pyaudio is None:
+            return False
+        if self._instance is None:
+            try:
+                self._instance = self._pyaudio.PyAudio()
+            except Exception as pe:
+                self.log.debug("[DEBUG] AudioSink: PyAudio init failed: %s", pe)
+                return False
+        if not hasattr(self._instance, "open"):
+            self.log.debug("[DEBUG] AudioSink: PyAudio instance not ready")
+            return False
+        if device_index is None:
+            self.log.debug("[DEBUG] AudioSink: using Windows default output device")
+        else:
+            self.log.debug("[DEBUG] AudioSink: using output_device_index=%s", device_index)
+        open_kwargs = {
+            'format': getattr(self._pyaudio, "paInt16", None),
+            'channels': self.channels,
+            'rate': self.rate,
+            'output': True,
+            'frames_per_buffer': self.frames_per_buffer,
+        }
+        if device_index is not None:
+            open_kwargs['output_device_index'] = device_index
+        try:
+            try:
+                self.stream = self._instance.open(**open_kwargs)
+            except Exception as oe:
+                if device_index is None:
+                    raise
+                self.log.debug("[DEBUG] AudioSink: failed to open with device %s, retrying with Windows default: %s", device_index, oe)
+                # Indice forse superato (dispositivo scollegato): aggiorna la cache in background
+                get_device_registry().refresh()
+                open_kwargs.pop('output_device_index', None)
+                self.stream = self._instance.open(**open_kwargs)
+        except Exception as e:
+            self.log.debug("[DEBUG] AudioSink: failed to open PyAudio stream: %s", e)
+            self.stream = None
+            return False
+        self.log.debug("[DEBUG] AudioSink: PyAudio stream opened")
+        try:
+            if hasattr(self.stream, "start_stream"):
+                self.stream.start_stream()
+        except Exception as se:
+            self.log.debug("[DEBUG] AudioSink: could not start PyAudio stream: %s", se)
+        self._last_write_end = None
+        return True
+
+    def active(self) -> bool:
+        stream = self.stream
+        if stream is None:
+            return False
+        try:
+            return bool(getattr(stream, "is_active", lambda: False)())
+        except Exception:
+            return False
+
+    def write(self, data: Any) -> None:
+        """Guadagno e scrittura bloccante. `data` può essere una vista (memoryview) sul buffer
+        del decoder: viene copiato una sola volta, dallo stadio di guadagno o qui."""
+        out = self.gain.process(data)
+        if not out:
+            return
+        if not isinstance(out, bytes):
+            out = bytes(out)
+        self.write_raw(out)
+
+    def write_raw(self, data: bytes) -> None:
+        """Scrittura bloccante su PortAudio; con il monitor attivo misura durata e pausa dalla precedente."""
+        perf = get_monitor()
+        if not perf.enabled:
+            self.stream.write(data)
+            return
+        t0 = time.perf_counter()
+        if self._last_write_end is not None:
+            perf.record('audio_gap', (t0 - self._last_write_end) * 1000.0)
+        try:
+            self.stream.write(data)
+        finally:
+            t1 = time.perf_counter()
+            perf.record('audio_write', (t1 - t0) * 1000.0)
+            self._last_write_end = t1
+
+    def reset_timing(self) -> None:
+        """Dopo pausa o salti dell'ingresso la pausa tra scritture non va misurata."""
+        self._last_write_end = None
+
+    def pause(self) -> bool:
+        if not self.active():
+            return False
+        try:
+            self.stream.stop_stream()
+        except Exception:
+            return False
+        self._last_write_end = None
+        return True
+
+    def resume(self) -> bool:
+        if self.stream is None:
+            return False
+        try:
+            self.stream.start_stream()
+            return True
+        except Exception:
+            return False
+
+    def close(self) -> None:
+        stream = self.stream
+        self.stream = None
+        self._last_write_end = None
+        self.gain.drop_partial()
+        if stream is None:
+            return
+        try:
+            if getattr(stream, "is_active", lambda: False)():
+                try:
+                    stream.stop_stream()
+                except Exception as e:
+                    self.log.debug("[DEBUG] AudioSink: error stopping audio stream: %s", e)
+            stream.close()
+            self.log.debug("[DEBUG] AudioSink: audio stream closed")
+        except Exception as e:
+            self.log.debug("[DEBUG] AudioSink: error closing audio stream: %s", e)
+
+    def terminate(self) -> None:
+        """Rilascia PortAudio (solo a stream chiuso): alla prossima apertura rilegge i dispositivi."""
+        inst = self._instance
+        self._instance = None
+        if inst is not None:
+            try:
+                inst.terminate()
+            except Exception:
+                pass
@@ -0,0 +1,291 @@
+from __future__ import annotations
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+import time
+
+from logger import get_logger
+
+# Scelta del backend audio a runtime in base alla salute recente.
+# Ogni avvio dello stream è una "sessione" che termina con un esito:
+# - error: nessun audio (ffmpeg assente o rotto, codec mancante, connessione rifiutata)
+# - stall: audio partito ma interrotto entro SHORT_SESSION_S (stallo, uscita del decoder)
+# - drop:  interruzione dopo una riproduzione durata (la rete, non il backend)
+# - ok:    riproduzione fermata dall'utente o sostituita da un nuovo avvio
+# Dopo FAILOVER_AFTER errori/stalli consecutivi, o con punteggio sotto MIN_SCORE, si
+# passa al backend successivo; quello scartato resta in pausa per un cooldown che
+# raddoppia a ogni nuovo fallimento. Scaduto il cooldown si torna al preferito al
+# prossimo avvio (mai a stream in corso): in prova, basta un fallimento per riscartarlo.
+
+# Esiti recenti considerati nel punteggio
+WINDOW = 10
+# Peso di ciascun esito nel punteggio (0 = nessuna penalità)
+OUTCOME_WEIGHT = {'ok': 0.0, 'drop': 0.25, 'stall': 0.75, 'error': 1.0}
+# Sotto questa durata di audio un'interruzione conta come stallo del backend
+SHORT_SESSION_S = 30.0
+# Tempo al primo audio: nessuna penalità fino a TTFA_GOOD_MS, massima da TTFA_BAD_MS
+TTFA_GOOD_MS = 2000.0
+TTFA_BAD_MS = 10000.0
+TTFA_WEIGHT = 0.2
+FAILOVER_AFTER = 3
+MIN_SCORE = 0.5
+MIN_SAMPLES = 4
+COOLDOWN_S = 120.0
+COOLDOWN_MAX_S = 1800.0
+
+
+class BackendHealth:
+    """Esiti recenti di un backend e stato di cooldown."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.outcomes: Deque[str] = deque(maxlen=WINDOW)
+        self.ttfa_ms: Deque[float] = deque(maxlen=WINDOW)
+        self.consecutive_failures = 0
+        # Numero di scarti consecutivi: allunga il cooldown
+        self.strikes = 0
+        self.cooldown_until = 0.0
+        # Appena ripreso dopo il cooldown: un solo fallimento lo riscarta
+        self.probation = False
+        self.last_error: Optional[str] = None
+
+    def record(self, outcome: str, ttfa_ms: Optional[float] = None) -> None:
+        self.outcomes.append(outcome)
+        if ttfa_ms is not None:
+            self.ttfa_ms.append(float(ttfa_ms))
+        if outcome in ('error', 'stall'):
+            self.consecutive_failures += 1
+        else:
+            self.consecutive_failures = 0
+            if outcome == 'ok':
+                # Funziona di nuovo: fine della prova e del raddoppio dei cooldown
+                self.probation = False
+                self.strikes = 0
+
+    def score(self) -> float:
+        """1.0 = sano, 0.0 = sempre in errore."""
+        if not self.outcomes:
+            return 1.0
+        penalty = sum(OUTCOME_WEIGHT.get(o, 1.0) for o in self.outcomes) / len(self.outcomes)
+        if self.ttfa_ms:
+            vals = sorted(self.ttfa_ms)
+            p50 = vals[len(vals) // 2]
+            slow = (p50 - TTFA_GOOD_MS) / (TTFA_BAD_MS - TTFA_GOOD_MS)
+            penalty += TTFA_WEIGHT * max(0.0, min(1.0, slow))
+        return max(0.0, 1.0 - penalty)
+
+    def unhealthy(self) -> bool:
+        if self.probation and self.consecutive_failures >= 1:
+            return True
+        if self.consecutive_failures >= FAILOVER_AFTER:
+            return True
+        return len(self.outcomes) >= MIN_SAMPLES and self.score() < MIN_SCORE
+
+    def cooling(self, now: float) -> bool:
+        return now < self.cooldown_until
+
+    def bench(self, now: float, reason: str) -> None:
+        """Scarta il backend per un cooldown crescente."""
+        self.strikes += 1
+        self.cooldown_until = now + min(COOLDOWN_MAX_S, COOLDOWN_S * (2 ** (self.strikes - 1)))
+        self.last_error = reason
+
+    def snapshot(self, now: float) -> Dict[str, Any]:
+        return {
+            'score': round(self.score(), 3),
+            'outcomes': list(self.outcomes),
+            'consecutive_failures': self.consecutive_failures,
+            'cooldown_s': round(max(0.0, self.cooldown_until - now), 1),
+            'probation': self.probation,
+            'last_error': self.last_error,
+        }
+
+
+class BackendManager:
+    """Crea il backend audio migliore tra quelli configurati (in ordine di preferenza)
+    e decide quando cambiarlo. Non tocca thread né Qt: il chiamante installa il backend.
+
+    factories: coppie (nome, fabbrica senza argomenti); la fabbrica può sollevare
+    eccezioni o restituire un backend non pronto: in entrambi i casi il backend
+    viene scartato come per un errore.
+    """
+
+    def __init__(self, factories: Sequence[Tuple[str, Callable[[], Any]]],
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.log = get_logger('BackendManager', subsystem='player')
+        self._clock = clock
+        self._factories: List[Tuple[str, Callable[[], Any]]] = []
+        self._health: Dict[str, BackendHealth] = {}
+        self.current: Optional[str] = None
+        # Sessione in corso: inizio del tentativo e del primo audio
+        self._attempt_ts: Optional[float] = None
+        self._audio_ts: Optional[float] = None
+        self._ttfa_ms = 0.0
+        # Backend in uso prima di un cambio non ancora confermato (begin_switch/finish_switch)
+        self._switch_from: Optional[str] = None
+        self.set_factories(factories)
+
+    def set_factories(self, factories: Sequence[Tuple[str, Callable[[], Any]]]) -> None:
+        """Aggiorna le fabbriche (es. impostazioni di VLC cambiate) mantenendo la salute registrata."""
+        self._factories = [(str(n), f) for n, f in factories]
+        for name, _f in self._factories:
+            self._health.setdefault(name, BackendHealth(name))
+
+    def names(self) -> List[str]:
+        return [n for n, _f in self._factories]
+
+    def health(self, name: str) -> BackendHealth:
+        return self._health[name]
+
+    # ---- Creazione ----
+    def create(self) -> Tuple[Optional[str], Any]:
+        """Primo backend creabile e pronto, saltando quelli in cooldown. Se tutti sono
+        in cooldown si prova comunque in ordine di preferenza (meglio di nessun audio);
+        se nessuno è pronto si restituisce il primo creato, per i messaggi della UI."""
+        now = self._clock()
+        ready = [(n, f) for n, f in self._factories if not self._health[n].cooling(now)]
+        cooling = [(n, f) for n, f in self._factories if self._health[n].cooling(now)]
+        fallback: Tuple[Optional[str], Any] = (None, None)
+        for name, factory in ready + cooling:
+            try:
+                backend = factory()
+            except Exception as e:
+                self.log.info("Backend %s non disponibile: %s", name, e)
+                self._health[name].bench(now, f"create: {e}")
+                continue
+            try:
+                ok = bool(backend.is_ready())
+            except Exception:
+                ok = False
+            if not ok:
+                self.log.info("Backend %s non pronto", name)
+                self._health[name].bench(now, "not ready")
+                if fallback[0] is None:
+                    fallback = (name, backend)
+                continue
+            self._health[name].probation = self._health[name].strikes > 0
+            self._health[name].consecutive_failures = 0
+            self.current = name
+            self._attempt_ts = self._audio_ts = None
+            return name, backend
+        self.current = fallback[0]
+        self._attempt_ts = self._audio_ts = None
+        return fallback
+
+    # ---- Esiti della sessione corrente ----
+    def attempt(self) -> None:
+        """Nuovo avvio dello stream: chiude la sessione precedente se aveva prodotto audio."""
+        self._close_session('ok')
+        self._attempt_ts = self._clock()
+
+    def playing(self) -> None:
+        """Primo audio della sessione (le riprese dalla pausa non contano)."""
+        if self._attempt_ts is None or self._audio_ts is not None:
+            return
+        self._audio_ts = self._clock()
+        self._ttfa_ms = (self._audio_ts - self._attempt_ts) * 1000.0
+
+    def stopped(self) -> None:
+        """Stop dell'utente: la sessione con audio è riuscita, quella senza viene ignorata."""
+        self._close_session('ok')
+        self._attempt_ts = None
+
+    def failed(self, reason: str = 'error') -> None:
+        """Errore o fine inattesa dello stream durante la sessione corrente."""
+        if self._attempt_ts is None or self.current is None:
+            return
+        if self._audio_ts is None:
+            outcome = 'error'
+        elif self._clock() - self._audio_ts < SHORT_SESSION_S:
+            outcome = 'stall'
+        else:
+            outcome = 'drop'
+        health = self._health[self.current]
+        health.last_error = reason
+        health.record(outcome, self._ttfa_ms if self._audio_ts is not None else None)
+        self._attempt_ts = self._audio_ts = None
+
+    def _close_session(self, outcome: str) -> None:
+        if self._attempt_ts is not None and self._audio_ts is not None and self.current is not None:
+            self._health[self.current].record(outcome, self._ttfa_ms)
+        self._attempt_ts = self._audio_ts = None
+
+    # ---- Decisioni ----
+    def switch_target(self) -> Optional[Tuple[str, str]]:
+        """(nome, motivo) del backend verso cui passare ora, oppure None.
+        failover: il corrente non è sano e un altro non è in cooldown;
+        failback: un backend preferito ha finito il cooldown (solo tra una sessione e l'altra)."""
+        cur = self.current
+        if cur is None:
+            return None
+        now = self._clock()
+        names = self.names()
+        if self._health[cur].unhealthy():
+            for name in names:
+                if name != cur and not self._health[name].cooling(now):
+                    return name, 'failover'
+            return None
+        if self._attempt_ts is None and cur in names:
+            for name in names[:names.index(cur)]:
+                if not self._health[name].cooling(now):
+                    return name, 'failback'
+        return None
+
+    def begin_switch(self) -> Optional[Tuple[str, Callable[[], Any], str]]:
+        """Avvia il cambio indicato da switch_target: (nome, fabbrica, motivo) oppure None.
+        La fabbrica va eseguita dal chiamante (anche su un altro thread, può bloccare), poi
+        finish_switch conferma o annulla. Gli esiti registrati nel frattempo vanno già al nuovo backend."""
+        target = self.switch_target()
+        if target is None:
+            return None
+        name, reason = target
+        now = self._clock()
+        prev = self.current
+        if reason == 'failover' and prev is not None:
+            self._health[prev].bench(now, self._health[prev].last_error or 'unhealthy')
+        health = self._health[name]
+        # Di ritorno dal cooldown: riparte da zero, in prova
+        if health.strikes > 0:
+            health.outcomes.clear()
+            health.ttfa_ms.clear()
+            health.probation = True
+        health.consecutive_failures = 0
+        self.log.info("Backend audio: %s -> %s (%s, punteggio %.2f)", prev, name, reason,
+                      self._health[prev].score() if prev in self._health else 1.0)
+        self._switch_from = prev
+        self.current = name
+        self._attempt_ts = self._audio_ts = None
+        return name, dict(self._factories)[name], reason
+
+    def finish_switch(self, ok: bool, error: Optional[str] = None) -> None:
+        """Esito della fabbrica avviata da begin_switch: se il backend non è stato creato o non è
+        pronto va in cooldown e si resta su quello precedente."""
+        name, prev = self.current, self._switch_from
+        self._switch_from = None
+        if ok or name is None:
+            return
+        self.log.info("Backend %s non disponibile: %s", name, error or "not ready")
+        self._health[name].bench(self._clock(), error or "not ready")
+        # La sessione in corso (play accodato dopo il cambio) resta: gira sul precedente
+        self.current = prev
+
+    def switch(self) -> Tuple[Optional[str], Any, Optional[str]]:
+        """begin_switch + fabbrica + finish_switch sul thread chiamante:
+        (nome, backend, motivo) o (None, None, None)."""
+        plan = self.begin_switch()
+        if plan is None:
+            return None, None, None
+        name, factory, reason = plan
+        try:
+            backend = factory()
+            ok = bool(backend.is_ready())
+            error = None if ok else "not ready"
+        except Exception as e:
+            backend, ok, error = None, False, f"create: {e}"
+        self.finish_switch(ok, error)
+        return (name, backend, reason) if ok else (None, None, None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Stato per diagnostica e API locale."""
+        now = self._clock()
+        return {'current': self.current,
+                'backends': {n: self._health[n].snapshot(now) for n in self.names()}}
@@ -1,3 +1,7 @@
+import os
+from typing import Optional
+from constants import ENV_GATEWAY_URL, ENV_STREAM_URL
+
 STREAMS = {
     "J-POP": {
         "Vorbis": "https://listen.moe/stream",
@@ -7,4 +11,37 @@ STREAMS = {
         "Vorbis": "https://listen.moe/kpop/stream",
         "MP3": "https://listen.moe/kpop/mp3",
     },
-}
\ No newline at end of file
+}
+
+
+def stream_url_for(channel: Optional[str], fmt: Optional[str]) -> str:
+    """URL dello stream per canale e formato (fallback: Vorbis, poi J-POP; sovrascrivibile con KIKUMOE_STREAM_URL)."""
+    override = os.environ.get(ENV_STREAM_URL)
+    if override:
+        return override
+    try:
+        urls = STREAMS.get(channel or '')
+        if isinstance(urls, dict):
+            url = urls.get(fmt or '')
+            if url:
+                return url
+            # fallback: prova Vorbis, altrimenti il primo disponibile
+            url = urls.get('Vorbis') or (next(iter(urls.values())) if urls else None)
+            if url:
+                return url
+        # fallback globale noto
+        jpop = STREAMS.get('J-POP', {})
+        return jpop.get('Vorbis') or (next(iter(jpop.values())) if jpop else "https://listen.moe/stream")
+    except Exception:
+        return "https://listen.moe/stream"
+
+
+def gateway_url_for(channel: Optional[str]) -> str:
+    """URL del gateway WebSocket per il canale (sovrascrivibile con KIKUMOE_GATEWAY_URL)."""
+    override = os.environ.get(ENV_GATEWAY_URL)
+    if override:
+        return override
+    ch = (channel or '').strip().upper()
+    if 'K-POP' in ch:
+        return "wss://listen.moe/kpop/gateway_v2"
+    return "wss://listen.moe/gateway_v2"
@@ -74,9 +74,30 @@ def _read_version_from_files() -> str:
     return "1.8"
 
 
+def get_app_data_dir() -> str:
+    """Cartella dati utente dell'app (cronologia, cache, log). Non viene creata qui."""
+    try:
+        if sys.platform == "win32":
+            base = os.environ.get("LOCALAPPDATA") or os.environ.get("APPDATA") or os.path.expanduser("~")
+        elif sys.platform == "darwin":
+            base = os.path.join(os.path.expanduser("~"), "Library", "Application Support")
+        else:
+            base = os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+        return os.path.join(base, APP_NAME)
+    except Exception:
+        return os.path.join(os.getcwd(), APP_NAME)
+
+
 APP_VERSION = _read_version_from_files()
 APP_TITLE = f"{APP_NAME} {APP_VERSION}"
 
+# Override del gateway Now Playing (es. stand-in locale per test/benchmark)
+ENV_GATEWAY_URL = "KIKUMOE_GATEWAY_URL"
+# Override della base CDN per copertine/immagini artista (stessa finalità)
+ENV_ART_BASE_URL = "KIKUMOE_ART_BASE_URL"
+# Override dello stream audio per tutti i canali/formati (es. tools/fake_stream.py)
+ENV_STREAM_URL = "KIKUMOE_STREAM_URL"
+
 # QSettings scope
 ORG_NAME = "KikuMoe"
 APP_SETTINGS = "ListenMoePlayer"
@@ -94,6 +115,8 @@ KEY_TRAY_HIDE_ON_MINIMIZE = "tray_hide_on_minimize"
 KEY_LIBVLC_PATH = "libvlc_path"
 KEY_WINDOW_GEOMETRY = "window_geometry"
 KEY_NETWORK_CACHING = "network_caching"
+# VLC: PCM tramite callback nell'uscita audio condivisa con FFmpeg (volume, fade, dispositivo)
+KEY_VLC_PYTHON_AUDIO = "vlc_python_audio"
 # New settings keys
 KEY_DARK_MODE = "dark_mode"
 KEY_SLEEP_MINUTES = "sleep_minutes"
@@ -102,5 +125,24 @@ KEY_DEV_CONSOLE_ENABLED = "dev_console_enabled"
 KEY_SESSION_TIMER_ENABLED = "session_timer_enabled"
 # Audio output selection
 KEY_AUDIO_DEVICE_INDEX = "audio_device_index"
+# Id stabile del dispositivo ("host API/nome"); l'indice sopra segue il valore risolto
+KEY_AUDIO_DEVICE_ID = "audio_device_id"
 # New: Dev console option to show [DEV] tagged messages
-KEY_DEV_CONSOLE_SHOW_DEV = "dev_console_show_dev"
\ No newline at end of file
+KEY_DEV_CONSOLE_SHOW_DEV = "dev_console_show_dev"
+# Cronologia brani (SQLite)
+KEY_HISTORY_ENABLED = "history_enabled"
+KEY_HISTORY_MAX_ROWS = "history_max_rows"
+# Copertine album (cache in memoria + su disco)
+KEY_COVER_ART_ENABLED = "cover_art_enabled"
+KEY_ART_CACHE_MAX_MB = "art_cache_max_mb"
+# Titoli in-band dallo stream MP3 (metadati ICY) e WebSocket come fonte opzionale
+KEY_ICY_METADATA = "icy_metadata"
+KEY_WS_ENABLED = "ws_enabled"
+# Logging: file con rotazione e livelli per sottosistema (es. "player=DEBUG,ws=INFO")
+KEY_LOG_FILE_ENABLED = "log_file_enabled"
+KEY_LOG_LEVELS = "log_levels"
+# API locale di controllo/eventi (HTTP su 127.0.0.1, vedi control_server.py)
+KEY_CONTROL_SERVER_ENABLED = "control_server_enabled"
+KEY_CONTROL_SERVER_PORT = "control_server_port"
+KEY_CONTROL_SERVER_TOKEN = "control_server_token"
+DEFAULT_CONTROL_PORT = 47815
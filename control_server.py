@@ -0,0 +1,363 @@
+from __future__ import annotations
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+import hmac
+import json
+import queue
+import secrets
+import threading
+import time
+from logger import get_logger
+from constants import DEFAULT_CONTROL_PORT
+
+# API locale di controllo ed eventi (HTTP su 127.0.0.1, nessuna dipendenza da Qt).
+#   GET  /status               stato attuale (ultimo evento per tipo)
+#   GET  /events               eventi push: Server-Sent Events (predefinito) oppure
+#                              JSON per riga con ?format=ndjson / Accept: application/x-ndjson
+#   POST /command              {"cmd": "volume", "value": 40}
+#   POST /<cmd>[?value=...]    scorciatoia (play, stop, pause, toggle, volume, mute, channel, format)
+# Il primo evento di ogni stream è lo stato completo ("status"), poi arrivano
+# player/track/volume/channel man mano che cambiano: i client si iscrivono una
+# volta invece di interrogare. Ogni client ha una coda limitata: se non legge,
+# perde gli eventi più vecchi senza rallentare l'app.
+# Sicurezza: ascolta solo in locale, rifiuta Host diversi da localhost (DNS
+# rebinding), Origin/Referer di pagine non locali (richieste cross-site dal
+# browser) e POST senza Content-Type: application/json (i form HTML e le fetch
+# "semplici" non possono inviarlo senza preflight CORS, che non concediamo).
+# Con un token configurato lo richiede (header Authorization: Bearer oppure
+# ?token=); l'app ne genera uno alla prima attivazione (vedi new_token).
+
+DEFAULT_PORT = DEFAULT_CONTROL_PORT
+EVENT_QUEUE_SIZE = 256
+HEARTBEAT_S = 15.0
+MAX_BODY_BYTES = 16 * 1024
+
+COMMANDS = ('play', 'stop', 'pause', 'toggle', 'volume', 'mute', 'channel', 'format')
+CHANNELS = ('J-POP', 'K-POP')
+FORMATS = ('Vorbis', 'MP3')
+_LOCAL_HOSTS = ('127.0.0.1', 'localhost', '[::1]', '::1')
+
+
+class CommandError(ValueError):
+    pass
+
+
+def new_token() -> str:
+    """Token casuale per l'API (URL-safe, 192 bit)."""
+    return secrets.token_urlsafe(24)
+
+
+def _is_local_host(host: str) -> bool:
+    """Host[:porta] locale; gli indirizzi IPv6 sono tra parentesi quadre."""
+    host = (host or '').strip().lower()
+    hostname = host.rsplit(':', 1)[0] if not host.endswith(']') else host
+    return hostname in _LOCAL_HOSTS
+
+
+def _is_local_origin(value: str) -> bool:
+    """Origin o Referer di una pagina servita da localhost ("null" e file:// non lo sono)."""
+    try:
+        parts = urlsplit((value or '').strip())
+    except ValueError:
+        return False
+    return parts.scheme in ('http', 'https') and _is_local_host(parts.netloc.rsplit('@', 1)[-1])
+
+
+def _to_bool(val: Any) -> Optional[bool]:
+    if val is None or val == '':
+        return None
+    if isinstance(val, bool):
+        return val
+    v = str(val).strip().lower()
+    if v in ('1', 'true', 'yes', 'on'):
+        return True
+    if v in ('0', 'false', 'no', 'off'):
+        return False
+    raise CommandError(f"invalid boolean: {val!r}")
+
+
+def validate_command(cmd: str, value: Any = None) -> Tuple[str, Any]:
+    """Normalizza e valida un comando; ritorna (nome, valore). Solleva CommandError."""
+    name = str(cmd or '').strip().lower()
+    if name not in COMMANDS:
+        raise CommandError(f"unknown command: {cmd!r}")
+    if name == 'volume':
+        try:
+            vol = int(float(value))
+        except Exception:
+            raise CommandError("volume requires a value 0-100")
+        return name, max(0, min(100, vol))
+    if name == 'mute':
+        # Senza valore: inverte lo stato attuale
+        return name, _to_bool(value)
+    if name == 'channel':
+        match = next((c for c in CHANNELS if c.lower() == str(value or '').strip().lower()), None)
+        if match is None:
+            raise CommandError(f"channel must be one of {', '.join(CHANNELS)}")
+        return name, match
+    if name == 'format':
+        match = next((f for f in FORMATS if f.lower() == str(value or '').strip().lower()), None)
+        if match is None:
+            raise CommandError(f"format must be one of {', '.join(FORMATS)}")
+        return name, match
+    return name, None
+
+
+class _Subscriber:
+    __slots__ = ("queue", "dropped")
+
+    def __init__(self, size: int) -> None:
+        self.queue: "queue.Queue[Optional[Tuple[int, str, Dict[str, Any]]]]" = queue.Queue(maxsize=size)
+        self.dropped = 0
+
+    def offer(self, item: Optional[Tuple[int, str, Dict[str, Any]]]) -> None:
+        while True:
+            try:
+                self.queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+
+class ControlServer:
+    """Server HTTP locale. `on_command(name, value)` viene chiamato sul thread della
+    richiesta (il chiamante lo riporta sul proprio thread); `publish` è sicuro da
+    qualsiasi thread."""
+
+    def __init__(self, on_command: Callable[[str, Any], None], host: str = '127.0.0.1',
+                 port: int = DEFAULT_PORT, token: Optional[str] = None,
+                 queue_size: int = EVENT_QUEUE_SIZE, heartbeat: float = HEARTBEAT_S) -> None:
+        self.on_command = on_command
+        self.host = host
+        self.port = int(port)
+        self.token = token or None
+        self.queue_size = max(1, int(queue_size))
+        self.heartbeat = max(0.5, float(heartbeat))
+        self.log = get_logger('ControlServer')
+        self._lock = threading.Lock()
+        self._status: Dict[str, Dict[str, Any]] = {}
+        self._subscribers: List[_Subscriber] = []
+        self._seq = 0
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self.started_at: Optional[float] = None
+
+    # ---- Ciclo di vita ----
+    def start(self) -> bool:
+        if self._httpd is not None:
+            return True
+        try:
+            httpd = ThreadingHTTPServer((self.host, self.port), _make_handler(self))
+        except OSError as e:
+            self.log.warning("Control server: cannot listen on %s:%s (%s)", self.host, self.port, e)
+            return False
+        httpd.daemon_threads = True
+        self._httpd = httpd
+        self.port = httpd.server_address[1]
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=httpd.serve_forever, kwargs={"poll_interval": 0.5},
+                                        name="ControlServer", daemon=True)
+        self._thread.start()
+        self.log.info("Control server listening on %s", self.url)
+        return True
+
+    def stop(self) -> None:
+        httpd = self._httpd
+        self._httpd = None
+        if httpd is None:
+            return
+        with self._lock:
+            subs = list(self._subscribers)
+            self._subscribers.clear()
+        for sub in subs:
+            sub.offer(None)
+        try:
+            httpd.shutdown()
+            httpd.server_close()
+        except Exception:
+            pass
+
+    @property
+    def running(self) -> bool:
+        return self._httpd is not None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    # ---- Stato ed eventi ----
+    def publish(self, event: str, data: Dict[str, Any]) -> None:
+        """Aggiorna lo stato per il tipo di evento e lo inoltra ai client iscritti."""
+        payload = dict(data or {})
+        payload.setdefault('ts', time.time())
+        with self._lock:
+            self._status[event] = payload
+            self._seq += 1
+            item = (self._seq, event, payload)
+            subs = list(self._subscribers)
+        for sub in subs:
+            sub.offer(item)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            snap = {k: dict(v) for k, v in self._status.items()}
+        snap['server'] = {'url': self.url, 'started_at': self.started_at, 'clients': self.client_count()}
+        return snap
+
+    def client_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def _subscribe(self) -> _Subscriber:
+        sub = _Subscriber(self.queue_size)
+        with self._lock:
+            self._subscribers.append(sub)
+        return sub
+
+    def _unsubscribe(self, sub: _Subscriber) -> None:
+        with self._lock:
+            try:
+                self._subscribers.remove(sub)
+            except ValueError:
+                pass
+
+
+def _make_handler(server: ControlServer):
+    class _Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        server_version = "KikuMoeControl/1"
+
+        def log_message(self, fmt: str, *args: Any) -> None:
+            server.log.debug("[DEBUG] control %s - %s", self.address_string(), fmt % args)
+
+        # ---- Utilità ----
+        def _send_json(self, code: int, obj: Dict[str, Any]) -> None:
+            body = json.dumps(obj, ensure_ascii=False).encode('utf-8')
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", "no-store")
+            if code >= 400:
+                # Il corpo della richiesta rifiutata potrebbe non essere stato letto
+                self.send_header("Connection", "close")
+                self.close_connection = True
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _authorized(self, query: Dict[str, List[str]]) -> bool:
+            if not _is_local_host(self.headers.get("Host") or ''):
+                self._send_json(403, {"ok": False, "error": "forbidden host"})
+                return False
+            # I browser inviano Origin (e di solito Referer) con le richieste cross-site:
+            # i client locali (curl, script) non li inviano o li inviano locali
+            for header in ("Origin", "Referer"):
+                value = self.headers.get(header)
+                if value is not None and not _is_local_origin(value):
+                    self._send_json(403, {"ok": False, "error": "forbidden origin"})
+                    return False
+            if server.token:
+                auth = self.headers.get("Authorization") or ''
+                supplied = auth[7:].strip() if auth.lower().startswith("bearer ") else (query.get('token') or [''])[0]
+                if not hmac.compare_digest(supplied.encode('utf-8'), server.token.encode('utf-8')):
+                    self._send_json(401, {"ok": False, "error": "invalid token"})
+                    return False
+            return True
+
+        # ---- GET ----
+        def do_GET(self) -> None:
+            parts = urlsplit(self.path)
+            query = parse_qs(parts.query)
+            if not self._authorized(query):
+                return
+            if parts.path == '/status':
+                self._send_json(200, server.status())
+            elif parts.path == '/events':
+                fmt = (query.get('format') or [''])[0].lower()
+                ndjson = fmt == 'ndjson' or 'application/x-ndjson' in (self.headers.get('Accept') or '')
+                self._stream_events(ndjson)
+            else:
+                self._send_json(404, {"ok": False, "error": "not found"})
+
+        def _stream_events(self, ndjson: bool) -> None:
+            sub = server._subscribe()
+            try:
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson" if ndjson else "text/event-stream")
+                self.send_header("Cache-Control", "no-store")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+                self._write_event(ndjson, 0, 'status', server.status())
+                while True:
+                    try:
+                        item = sub.queue.get(timeout=server.heartbeat)
+                    except queue.Empty:
+                        self.wfile.write(b'{"event": "ping"}\n' if ndjson else b": ping\n\n")
+                        self.wfile.flush()
+                        continue
+                    if item is None:
+                        return
+                    seq, event, data = item
+                    if sub.dropped:
+                        data = dict(data, dropped=sub.dropped)
+                        sub.dropped = 0
+                    self._write_event(ndjson, seq, event, data)
+            except (BrokenPipeError, ConnectionResetError, ConnectionAbortedError, OSError):
+                pass
+            finally:
+                server._unsubscribe(sub)
+
+        def _write_event(self, ndjson: bool, seq: int, event: str, data: Dict[str, Any]) -> None:
+            if ndjson:
+                line = json.dumps({"id": seq, "event": event, "data": data}, ensure_ascii=False) + "\n"
+            else:
+                line = f"id: {seq}\nevent: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+            self.wfile.write(line.encode('utf-8'))
+            self.wfile.flush()
+
+        # ---- POST ----
+        def do_POST(self) -> None:
+            parts = urlsplit(self.path)
+            query = parse_qs(parts.query)
+            if not self._authorized(query):
+                return
+            ctype = (self.headers.get("Content-Type") or '').split(';', 1)[0].strip().lower()
+            if ctype != 'application/json':
+                self._send_json(415, {"ok": False, "error": "Content-Type must be application/json"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+            except ValueError:
+                length = 0
+            if length > MAX_BODY_BYTES:
+                self._send_json(413, {"ok": False, "error": "body too large"})
+                return
+            body: Dict[str, Any] = {}
+            if length:
+                try:
+                    parsed = json.loads(self.rfile.read(length).decode('utf-8'))
+                    body = parsed if isinstance(parsed, dict) else {}
+                except Exception:
+                    self._send_json(400, {"ok": False, "error": "invalid JSON body"})
+                    return
+            path = parts.path.strip('/')
+            cmd = body.get('cmd') if path == 'command' else path
+            value = body.get('value', (query.get('value') or [None])[0])
+            try:
+                name, val = validate_command(cmd, value)
+            except CommandError as e:
+                self._send_json(404 if str(e).startswith('unknown') else 400, {"ok": False, "error": str(e)})
+                return
+            try:
+                server.on_command(name, val)
+            except Exception as e:
+                self._send_json(500, {"ok": False, "error": str(e)})
+                return
+            self._send_json(202, {"ok": True, "command": name, "value": val})
+
+    return _Handler
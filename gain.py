@@ -0,0 +1,188 @@
+from __future__ import annotations
+from array import array
+from typing import List, Optional
+import math
+import sys
+import threading
+
+# Stadio di guadagno per PCM s16le interleaved (backend FFmpeg).
+# Il guadagno finale è volume utente x guadagno di fade: un fade (es. lo sleep
+# timer) non tocca mai il volume scelto dall'utente. Le rampe sono calcolate per
+# frame, quindi senza i gradini udibili di un volume cambiato a intervalli.
+# Usato anche da PlayerVLC per la curva del fade a passi (fade_gain_at).
+
+CURVES = ('linear', 'exponential', 'cosine')
+# Pavimento della curva esponenziale (-60 dB): sotto si considera silenzio
+_EXP_FLOOR = 0.001
+# Passo (in frame) con cui la curva viene calcolata esattamente (32 frame = 0.7 ms a 44.1 kHz)
+_KNOT_FRAMES = 32
+_SWAP = sys.byteorder != 'little'
+
+
+def fade_gain_at(start: float, end: float, t: float, curve: str = 'linear') -> float:
+    """Guadagno a frazione t (0..1) di una rampa da start a end."""
+    t = 0.0 if t <= 0.0 else (1.0 if t >= 1.0 else t)
+    if curve == 'cosine':
+        return start + (end - start) * (1.0 - math.cos(math.pi * t)) * 0.5
+    if curve == 'exponential':
+        # Lineare in dB: uniforme all'orecchio, arriva esattamente a end in t=1
+        if t >= 1.0:
+            return end
+        a = max(start, _EXP_FLOOR)
+        b = max(end, _EXP_FLOOR)
+        return a * (b / a) ** t
+    return start + (end - start) * t
+
+
+class GainStage:
+    """Volume, muto e fade applicati ai blocchi PCM dal thread del worker."""
+
+    def __init__(self, rate: int = 44100, channels: int = 2, volume: float = 1.0) -> None:
+        self.rate = int(rate)
+        self.channels = max(1, int(channels))
+        self._lock = threading.Lock()
+        self._volume = max(0.0, min(1.0, float(volume)))
+        self._muted = False
+        # Fade in corso: da _fade_start a _fade_target in _fade_frames frame
+        self._fade_gain = 1.0
+        self._fade_start = 1.0
+        self._fade_target = 1.0
+        self._fade_frames = 0
+        self._fade_done = 0
+        self._fade_curve = 'linear'
+        # Byte finale di un blocco dispari (lettura corta dalla pipe), anteposto al successivo
+        self._carry = b''
+
+    # ---- controlli (qualsiasi thread) ----
+    @property
+    def volume(self) -> float:
+        return self._volume
+
+    def set_volume(self, volume: float) -> None:
+        self._volume = max(0.0, min(1.0, float(volume)))
+
+    @property
+    def muted(self) -> bool:
+        return self._muted
+
+    def set_mute(self, mute: bool) -> None:
+        self._muted = bool(mute)
+
+    def fade_to(self, target: float, duration_s: float, curve: str = 'linear') -> None:
+        """Porta il guadagno di fade a `target` (0..1) in `duration_s`, partendo dal valore attuale."""
+        target = max(0.0, min(1.0, float(target)))
+        frames = int(max(0.0, float(duration_s)) * self.rate)
+        with self._lock:
+            self._fade_start = self._fade_gain
+            self._fade_target = target
+            self._fade_curve = curve if curve in CURVES else 'linear'
+            self._fade_done = 0
+            self._fade_frames = frames
+            if frames <= 0:
+                self._fade_gain = target
+
+    def cancel_fade(self) -> None:
+        """Annulla il fade e torna al solo volume utente."""
+        with self._lock:
+            self._fade_frames = self._fade_done = 0
+            self._fade_gain = self._fade_start = self._fade_target = 1.0
+
+    def discard(self, data: bytes) -> None:
+        """Blocco non riprodotto (pausa): aggiorna solo il byte trattenuto, per l'allineamento."""
+        if len(data):
+            odd = (len(self._carry) + len(data)) & 1
+            self._carry = bytes(data[-1:]) if odd else b''
+
+    def drop_partial(self) -> None:
+        """Scarta il byte trattenuto (fine dello stream: non va anteposto al successivo)."""
+        self._carry = b''
+
+    @property
+    def fade_gain(self) -> float:
+        return self._fade_gain
+
+    def fading(self) -> bool:
+        with self._lock:
+            return self._fade_done < self._fade_frames
+
+    def fade_remaining(self) -> float:
+        """Secondi di audio mancanti alla fine del fade in corso."""
+        with self._lock:
+            return max(0, self._fade_frames - self._fade_done) / float(self.rate)
+
+    # ---- elaborazione (thread del worker) ----
+    def process(self, data: bytes) -> bytes:
+        """Applica il guadagno a un blocco s16le. Con un numero dispari di byte l'ultimo viene
+        trattenuto e anteposto al blocco successivo, così i campioni restano allineati."""
+        if self._carry:
+            data = self._carry + bytes(data)
+            self._carry = b''
+        if len(data) & 1:
+            self._carry = bytes(data[-1:])
+            data = data[:-1]
+        # Blocchi letti dalla pipe: l'ultimo frame può essere incompleto
+        frames = (len(data) // 2 + self.channels - 1) // self.channels
+        gains = self._advance(frames)
+        if self._muted:
+            return bytes(len(data))
+        volume = self._volume
+        if gains is None:
+            gain = volume * self._fade_gain
+            if gain >= 0.9999:
+                return data
+            if gain <= 0.0:
+                return bytes(len(data))
+            samples = _to_array(data)
+            # gain < 1: nessun clipping possibile
+            out = array('h', [int(s * gain) for s in samples])
+            return _to_bytes(out)
+        if volume <= 0.0:
+            return bytes(len(data))
+        samples = _to_array(data)
+        ch = self.channels
+        if volume != 1.0:
+            gains = [g * volume for g in gains]
+        for c in range(ch):
+            samples[c::ch] = array('h', [int(s * g) for s, g in zip(samples[c::ch], gains)])
+        return _to_bytes(samples)
+
+    def _advance(self, frames: int) -> Optional[List[float]]:
+        """Guadagni di fade per frame del blocco (None se costante) e avanzamento della rampa."""
+        with self._lock:
+            total = self._fade_frames
+            done = self._fade_done
+            if done >= total or frames <= 0:
+                return None
+            start, target, curve = self._fade_start, self._fade_target, self._fade_curve
+            n = min(frames, total - done)
+            inv = 1.0 / total
+            # Curva valutata ogni _KNOT_FRAMES frame e interpolata linearmente in mezzo
+            gains: List[float] = []
+            pos = done
+            g0 = fade_gain_at(start, target, pos * inv, curve)
+            while pos < done + n:
+                seg = min(_KNOT_FRAMES, done + n - pos)
+                g1 = fade_gain_at(start, target, (pos + seg) * inv, curve)
+                step = (g1 - g0) / seg
+                gains.extend([g0 + step * k for k in range(1, seg + 1)])
+                pos += seg
+                g0 = g1
+            if n < frames:
+                gains.extend([target] * (frames - n))
+            self._fade_done = done + n
+            self._fade_gain = target if self._fade_done >= total else gains[n - 1]
+            return gains
+
+
+def _to_array(data: bytes) -> array:
+    samples = array('h')
+    samples.frombytes(data)
+    if _SWAP:
+        samples.byteswap()
+    return samples
+
+
+def _to_bytes(samples: array) -> bytes:
+    if _SWAP:
+        samples.byteswap()
+    return samples.tobytes()
@@ -0,0 +1,353 @@
+from __future__ import annotations
+from typing import Optional, List, Dict, Any, Sequence
+import os
+import queue
+import sqlite3
+import threading
+import time
+from logger import get_logger
+from constants import get_app_data_dir
+
+# Persistent track history stored in SQLite (WAL mode).
+# Writes are queued and committed in batches by a dedicated writer thread, so
+# callers on the GUI/WS threads never wait on disk I/O.
+
+DEFAULT_DB_NAME = "history.sqlite3"
+DEFAULT_MAX_ROWS = 500_000
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS plays (
+        id INTEGER PRIMARY KEY,
+        song_id INTEGER,
+        title TEXT NOT NULL,
+        artists TEXT NOT NULL DEFAULT '',
+        channel TEXT NOT NULL DEFAULT '',
+        started_at REAL NOT NULL,
+        duration INTEGER,
+        was_playing INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS plays_dedupe ON plays(channel, song_id, started_at)",
+    # NULL è sempre distinto in un indice UNIQUE: senza song_id (titoli ICY, WS senza id)
+    # i duplicati si riconoscono da titolo, artisti e inizio
+    "CREATE UNIQUE INDEX IF NOT EXISTS plays_dedupe_title ON plays(channel, title, artists, started_at) "
+    "WHERE song_id IS NULL",
+    "CREATE INDEX IF NOT EXISTS plays_started ON plays(started_at)",
+    "CREATE INDEX IF NOT EXISTS plays_song ON plays(song_id)",
+    "CREATE INDEX IF NOT EXISTS plays_artists ON plays(artists COLLATE NOCASE)",
+)
+
+_FTS_SCHEMA = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS plays_fts USING fts5(title, artists, content='plays', content_rowid='id')",
+    """
+    CREATE TRIGGER IF NOT EXISTS plays_ai AFTER INSERT ON plays BEGIN
+        INSERT INTO plays_fts(rowid, title, artists) VALUES (new.id, new.title, new.artists);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS plays_ad AFTER DELETE ON plays BEGIN
+        INSERT INTO plays_fts(plays_fts, rowid, title, artists) VALUES ('delete', old.id, old.title, old.artists);
+    END
+    """,
+)
+
+_COLUMNS = ("id", "song_id", "title", "artists", "channel", "started_at", "duration", "was_playing")
+_STOP = object()
+
+
+def default_db_path() -> str:
+    return os.path.join(get_app_data_dir(), DEFAULT_DB_NAME)
+
+
+def _fts_query(text: str) -> str:
+    """Converte testo libero in una query FTS5 sicura (prefisso su ogni parola)."""
+    tokens = [t.replace('"', '""') for t in (text or "").split() if t.strip()]
+    return " ".join(f'"{t}"*' for t in tokens)
+
+
+class TrackHistory:
+    def __init__(self, db_path: Optional[str] = None, max_rows: int = DEFAULT_MAX_ROWS,
+                 batch_size: int = 64, flush_interval: float = 2.0) -> None:
+        self.db_path = db_path or default_db_path()
+        self.max_rows = max(1000, int(max_rows))
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = max(0.05, float(flush_interval))
+        self.log = get_logger('TrackHistory')
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._local = threading.local()
+        self._fts = False
+        # Evita di accodare più volte lo stesso brano (il gateway lo reinvia su op 2/riconnessione)
+        self._last_key: Optional[tuple] = None
+        self._last_key_lock = threading.Lock()
+
+    # ------------------- lifecycle -------------------
+    def start(self) -> "TrackHistory":
+        if self._writer is not None and self._writer.is_alive():
+            return self
+        self._writer = threading.Thread(target=self._writer_loop, name="TrackHistory-writer", daemon=True)
+        self._writer.start()
+        return self
+
+    def close(self, timeout: float = 3.0) -> None:
+        """Scrive gli elementi in coda e chiude il database."""
+        try:
+            if self._writer is not None and self._writer.is_alive():
+                self._queue.put(_STOP)
+                self._writer.join(timeout=timeout)
+        except Exception:
+            pass
+        self._writer = None
+        try:
+            conn = getattr(self._local, 'conn', None)
+            if conn is not None:
+                conn.close()
+                self._local.conn = None
+        except Exception:
+            pass
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Forza il commit di quanto in coda; ritorna True se completato entro il timeout."""
+        if self._writer is None or not self._writer.is_alive():
+            return False
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    # ------------------- write API -------------------
+    def record(self, title: str, artists: Sequence[str] = (), song_id: Optional[int] = None,
+               channel: str = '', start_ts: Optional[float] = None, duration: Optional[int] = None,
+               was_playing: bool = False) -> bool:
+        """Accoda un brano; non blocca. Ritorna False se è un duplicato dell'ultimo registrato."""
+        started_at = float(start_ts) if start_ts is not None else time.time()
+        key = (channel or '', song_id, title, round(started_at, 3))
+        with self._last_key_lock:
+            if key == self._last_key:
+                return False
+            self._last_key = key
+        row = (
+            int(song_id) if song_id is not None else None,
+            str(title or ''),
+            ", ".join(str(a) for a in (artists or ()) if a),
+            str(channel or ''),
+            started_at,
+            int(duration) if duration is not None else None,
+            1 if was_playing else 0,
+        )
+        self._queue.put(row)
+        return True
+
+    # ------------------- query API -------------------
+    def query(self, text: Optional[str] = None, artist: Optional[str] = None, title: Optional[str] = None,
+              channel: Optional[str] = None, since: Optional[float] = None, until: Optional[float] = None,
+              limit: int = 50, before_id: Optional[int] = None) -> Dict[str, Any]:
+        """Ricerca paginata (dal più recente). Usa `next_before_id` del risultato per la pagina successiva.
+
+        `text` cerca in titolo e artisti, `artist`/`title` solo nel rispettivo campo.
+        """
+        limit = max(1, min(1000, int(limit)))
+        where: List[str] = []
+        params: List[Any] = []
+        use_fts = self._fts and any(v for v in (text, artist, title))
+        if use_fts:
+            match_parts = []
+            if text:
+                match_parts.append(_fts_query(text))
+            if artist:
+                match_parts.append("artists : (" + _fts_query(artist) + ")")
+            if title:
+                match_parts.append("title : (" + _fts_query(title) + ")")
+            match = " AND ".join(p for p in match_parts if p)
+            if match:
+                where.append("p.id IN (SELECT rowid FROM plays_fts WHERE plays_fts MATCH ?)")
+                params.append(match)
+        else:
+            if text:
+                where.append("(p.title LIKE ? OR p.artists LIKE ?)")
+                params.extend([f"%{text}%", f"%{text}%"])
+            if artist:
+                where.append("p.artists LIKE ?")
+                params.append(f"%{artist}%")
+            if title:
+                where.append("p.title LIKE ?")
+                params.append(f"%{title}%")
+        if channel:
+            where.append("p.channel = ?")
+            params.append(channel)
+        if since is not None:
+            where.append("p.started_at >= ?")
+            params.append(float(since))
+        if until is not None:
+            where.append("p.started_at < ?")
+            params.append(float(until))
+        if before_id is not None:
+            where.append("p.id < ?")
+            params.append(int(before_id))
+        sql = "SELECT " + ", ".join(f"p.{c}" for c in _COLUMNS) + " FROM plays p"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY p.id DESC LIMIT ?"
+        params.append(limit + 1)
+        items: List[Dict[str, Any]] = []
+        try:
+            rows = self._reader().execute(sql, params).fetchall()
+        except Exception as e:
+            self.log.debug("[HISTORY] query failed: %s", e)
+            rows = []
+        for r in rows[:limit]:
+            item = dict(zip(_COLUMNS, r))
+            item["artists"] = [a for a in (item["artists"] or '').split(", ") if a]
+            item["was_playing"] = bool(item["was_playing"])
+            items.append(item)
+        next_before = items[-1]["id"] if len(rows) > limit and items else None
+        return {"items": items, "next_before_id": next_before}
+
+    def count(self) -> int:
+        try:
+            row = self._reader().execute("SELECT count(*) FROM plays").fetchone()
+            return int(row[0]) if row else 0
+        except Exception:
+            return 0
+
+    # ------------------- internals -------------------
+    def _connect(self) -> sqlite3.Connection:
+        d = os.path.dirname(self.db_path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=5.0, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        # Una connessione di sola lettura per thread: in WAL i lettori non bloccano il writer.
+        # Attende lo schema solo se il writer è avviato; altrimenti legge subito il file esistente
+        w = self._writer
+        if w is not None and w.is_alive():
+            self._ready.wait(5.0)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            conn.execute("PRAGMA query_only=ON")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self, conn: sqlite3.Connection) -> None:
+        for stmt in _SCHEMA:
+            try:
+                conn.execute(stmt)
+            except sqlite3.IntegrityError:
+                # Database precedente all'indice plays_dedupe_title: rimuove i doppioni e riprova
+                conn.execute(
+                    "DELETE FROM plays WHERE song_id IS NULL AND id NOT IN ("
+                    "SELECT min(id) FROM plays WHERE song_id IS NULL GROUP BY channel, title, artists, started_at)"
+                )
+                conn.execute(stmt)
+        try:
+            for stmt in _FTS_SCHEMA:
+                conn.execute(stmt)
+            self._fts = True
+        except sqlite3.OperationalError as e:
+            # SQLite senza FTS5: la ricerca ripiega su LIKE
+            self.log.debug("[HISTORY] FTS5 not available, falling back to LIKE: %s", e)
+            self._fts = False
+
+    def _row_span(self, conn: sqlite3.Connection) -> int:
+        # Stima O(log n) tramite la primary key: le righe vengono eliminate solo dalle più vecchie
+        row = conn.execute("SELECT min(id), max(id) FROM plays").fetchone()
+        if not row or row[0] is None:
+            return 0
+        return int(row[1]) - int(row[0]) + 1
+
+    def _prune(self, conn: sqlite3.Connection) -> None:
+        try:
+            conn.execute("DELETE FROM plays WHERE id <= (SELECT max(id) FROM plays) - ?", (self.max_rows,))
+        except Exception as e:
+            self.log.debug("[HISTORY] prune failed: %s", e)
+
+    def _write_batch(self, conn: sqlite3.Connection, batch: List[tuple]) -> None:
+        try:
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT OR IGNORE INTO plays (song_id, title, artists, channel, started_at, duration, was_playing) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                batch,
+            )
+            conn.execute("COMMIT")
+        except Exception as e:
+            self.log.debug("[HISTORY] batch insert failed (%d rows): %s", len(batch), e)
+            try:
+                conn.execute("ROLLBACK")
+            except Exception:
+                pass
+
+    def _writer_loop(self) -> None:
+        conn: Optional[sqlite3.Connection] = None
+        try:
+            conn = self._connect()
+            self._init_schema(conn)
+            span = self._row_span(conn)
+        except Exception as e:
+            self.log.debug("[HISTORY] cannot open %s: %s", self.db_path, e)
+            conn = None
+            span = 0
+        finally:
+            self._ready.set()
+        # Potatura con isteresi (10%) per non eseguire DELETE a ogni batch
+        prune_at = self.max_rows + max(1, self.max_rows // 10)
+        stopping = False
+        while not stopping:
+            batch: List[tuple] = []
+            waiters: List[threading.Event] = []
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is _STOP:
+                    stopping = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                if stopping or waiters or len(batch) >= self.batch_size:
+                    break
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=left)
+                except queue.Empty:
+                    break
+            if stopping:
+                # Svuota quanto resta in coda prima di chiudere
+                while True:
+                    try:
+                        rest = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if isinstance(rest, threading.Event):
+                        waiters.append(rest)
+                    elif rest is not _STOP:
+                        batch.append(rest)
+            if batch and conn is not None:
+                self._write_batch(conn, batch)
+                span += len(batch)
+                if span > prune_at:
+                    self._prune(conn)
+                    span = self._row_span(conn)
+            for w in waiters:
+                w.set()
+        if conn is not None:
+            try:
+                conn.execute("PRAGMA optimize")
+            except Exception:
+                pass
+            try:
+                conn.close()
+            except Exception:
+                pass
@@ -30,6 +30,21 @@ I18N: Dict[str, Dict[str, str]] = {
         'session_timer': 'Sessione: {time}',
         'settings_session_timer_enable': 'Mostra timer di sessione',
         'settings_session_timer_tip': 'Mostra il tempo trascorso dall’avvio dell’app (si azzera alla chiusura).',
+        'settings_history_enable': 'Salva cronologia dei brani ascoltati',
+        'settings_history_tip': 'Registra ogni brano ricevuto (titolo, artisti, canale, orario) in un database locale.',
+        'settings_cover_art_enable': 'Mostra copertina del brano',
+        'settings_cover_art_tip': 'Scarica in background la copertina dell’album e la mostra nella finestra e nelle notifiche (con cache locale).',
+        'settings_log_file': 'Salva i log su file',
+        'settings_log_file_tip': 'Scrive i log in un file con rotazione automatica:\n{path}',
+        'settings_control_server': 'API di controllo locale',
+        'settings_control_server_tip': 'Comandi (play, stop, volume, canale…), stato ed eventi in tempo reale per script e automazioni, solo da questo computer:\n{url}',
+        'settings_control_token': 'Token API',
+        'settings_control_token_tip': 'Da inviare con ogni richiesta come header Authorization: Bearer <token>',
+        'settings_control_token_new': 'Nuovo',
+        'settings_icy_enable': 'Titoli dallo stream MP3 (metadati ICY)',
+        'settings_icy_tip': 'Con il formato MP3 legge titolo e artista direttamente dallo stream audio: una sola connessione e titoli sincronizzati con l’audio (backend FFmpeg).',
+        'settings_ws_enable': 'Usa il WebSocket di LISTEN.moe per i metadati',
+        'settings_ws_tip': 'Durata, copertina e cronologia completa. Se disattivato, i titoli arrivano solo dai metadati ICY.',
         'libvlc_not_ready': 'Backend non inizializzato. Installa FFmpeg (consigliato) o imposta il percorso di libVLC dalle Impostazioni.',
         'libvlc_init_failed': 'Impossibile inizializzare il backend. Verifica FFmpeg/libVLC e la compatibilità (x64/x86).',
         'libvlc_button': 'Imposta percorso VLC…',
@@ -71,6 +86,8 @@ I18N: Dict[str, Dict[str, str]] = {
         'settings_tray_notifications': 'Notifiche brano in tray',
         'settings_tray_hide_on_minimize': 'Nascondi in tray quando minimizzata',
         'settings_network_caching': 'Caching di rete (ms)',
+        'settings_vlc_python_audio': 'VLC: uscita audio dell’app',
+        'settings_vlc_python_audio_tip': 'Con il backend VLC il suono passa dall’uscita audio dell’app invece che da VLC: dispositivo scelto sopra, fade per campione dello sleep timer e misure di diagnostica come con FFmpeg. Richiede PyAudio.',
         'settings_ok': 'OK',
         'settings_cancel': 'Annulla',
         'settings_apply': 'Applica',
@@ -100,7 +117,23 @@ I18N: Dict[str, Dict[str, str]] = {
         'dev_console_autoscroll': 'Autoscroll',
         'dev_console_wrap': 'A capo automatico',
         'dev_console_level': 'Filtro livello',
-        'dev_console_placeholder': 'I log appariranno qui...'
+        'dev_console_logger': 'Filtro logger',
+        'dev_console_all_loggers': 'Tutti i logger',
+        'dev_console_filter': 'Filtra testo...',
+        'dev_console_placeholder': 'I log appariranno qui...',
+        'dev_console_profile_start': 'Avvia profiler',
+        'dev_console_profile_stop': 'Ferma profiler ({seconds} s)',
+        'dev_console_profile_tip': 'Campiona tutti i thread per capire dove va la CPU',
+        'dev_console_profile_title': 'Profilo CPU',
+        'dev_console_profile_export_collapsed': 'Esporta flamegraph...',
+        'dev_console_profile_export_pstats': 'Esporta pstats...',
+        'dev_console_perf': 'Prestazioni',
+        'dev_console_perf_tip': 'Ritardo del loop eventi, scritture audio e attese sui lock (p50/p99/max, ultimi 60 s, in ms)',
+        'dev_console_memory': 'Memoria...',
+        'dev_console_memory_tip': 'Istantanee tracemalloc, thread, file descriptor e oggetti vivi',
+        'dev_console_memory_title': 'Diagnostica memoria',
+        'dev_console_memory_snapshot': 'Istantanea',
+        'dev_console_memory_auto': 'Automatica (ogni 60 s)'
         ,
         # Volume zero safeguard
         'volume_zero_title': 'Volume a zero',
@@ -141,6 +174,21 @@ I18N: Dict[str, Dict[str, str]] = {
         'session_timer': 'Session: {time}',
         'settings_session_timer_enable': 'Show session timer',
         'settings_session_timer_tip': 'Display elapsed time since app start (resets on close).',
+        'settings_history_enable': 'Keep history of played tracks',
+        'settings_history_tip': 'Record every received track (title, artists, channel, time) in a local database.',
+        'settings_cover_art_enable': 'Show track cover art',
+        'settings_cover_art_tip': 'Download the album cover in the background and show it in the window and notifications (cached locally).',
+        'settings_log_file': 'Save logs to file',
+        'settings_log_file_tip': 'Write logs to a size-rotated file:\n{path}',
+        'settings_control_server': 'Local control API',
+        'settings_control_server_tip': 'Commands (play, stop, volume, channel…), status and live events for scripts and automation, from this computer only:\n{url}',
+        'settings_control_token': 'API token',
+        'settings_control_token_tip': 'Send it with every request as the header Authorization: Bearer <token>',
+        'settings_control_token_new': 'New',
+        'settings_icy_enable': 'Titles from the MP3 stream (ICY metadata)',
+        'settings_icy_tip': 'With the MP3 format, read title and artist from the audio stream itself: a single connection and titles in sync with the audio (FFmpeg backend).',
+        'settings_ws_enable': 'Use the LISTEN.moe WebSocket for metadata',
+        'settings_ws_tip': 'Duration, cover art and full history. When off, titles only come from ICY metadata.',
         'libvlc_not_ready': 'Backend not initialized. Install FFmpeg (recommended) or set libVLC path in Settings.',
         'libvlc_init_failed': 'Failed to initialize backend. Check FFmpeg/libVLC and architecture (x64/x86).',
         'libvlc_button': 'Set VLC Path…',
@@ -182,6 +230,8 @@ I18N: Dict[str, Dict[str, str]] = {
         'settings_tray_notifications': 'Song notifications in tray',
         'settings_tray_hide_on_minimize': 'Hide to tray when minimized',
         'settings_network_caching': 'Network caching (ms)',
+        'settings_vlc_python_audio': 'VLC: use the app audio output',
+        'settings_vlc_python_audio_tip': 'With the VLC backend, sound goes through the app audio output instead of VLC: the device selected above, per-sample sleep timer fade and diagnostics as with FFmpeg. Requires PyAudio.',
         'settings_ok': 'OK',
         'settings_cancel': 'Cancel',
         'settings_apply': 'Apply',
@@ -211,7 +261,23 @@ I18N: Dict[str, Dict[str, str]] = {
         'dev_console_autoscroll': 'Autoscroll',
         'dev_console_wrap': 'Wrap',
         'dev_console_level': 'Level filter',
-        'dev_console_placeholder': 'Logs will appear here...'
+        'dev_console_logger': 'Logger filter',
+        'dev_console_all_loggers': 'All loggers',
+        'dev_console_filter': 'Filter text...',
+        'dev_console_placeholder': 'Logs will appear here...',
+        'dev_console_profile_start': 'Start profiler',
+        'dev_console_profile_stop': 'Stop profiler ({seconds} s)',
+        'dev_console_profile_tip': 'Sample all threads to see where the CPU time goes',
+        'dev_console_profile_title': 'CPU profile',
+        'dev_console_profile_export_collapsed': 'Export flamegraph...',
+        'dev_console_profile_export_pstats': 'Export pstats...',
+        'dev_console_perf': 'Performance',
+        'dev_console_perf_tip': 'Event-loop lag, audio writes and lock waits (p50/p99/max, last 60 s, in ms)',
+        'dev_console_memory': 'Memory...',
+        'dev_console_memory_tip': 'tracemalloc snapshots, threads, file descriptors and live objects',
+        'dev_console_memory_title': 'Memory diagnostics',
+        'dev_console_memory_snapshot': 'Snapshot',
+        'dev_console_memory_auto': 'Automatic (every 60 s)'
         ,
         # Volume zero safeguard
         'volume_zero_title': 'Volume is zero',
@@ -0,0 +1,176 @@
+from __future__ import annotations
+from typing import Callable, Optional, Tuple, Dict
+from urllib.parse import urlsplit, urljoin
+import http.client
+import re
+
+# Metadati ICY (SHOUTcast/Icecast) in-band sullo stream audio.
+# Con l'header "Icy-MetaData: 1" il server inserisce ogni `icy-metaint` byte
+# di audio un blocco: 1 byte di lunghezza (x16) seguito dal testo
+# "StreamTitle='Artista - Titolo';" (riempito con \0). Un blocco di lunghezza
+# zero significa "nessun cambiamento".
+
+_STREAM_TITLE_RE = re.compile(rb"StreamTitle='(.*?)';", re.DOTALL)
+
+
+def parse_stream_title(meta: bytes) -> Optional[str]:
+    """Estrae StreamTitle da un blocco di metadati ICY (None se assente)."""
+    try:
+        m = _STREAM_TITLE_RE.search(meta or b"")
+        if not m:
+            return None
+        raw = m.group(1)
+        try:
+            return raw.decode("utf-8").strip()
+        except UnicodeDecodeError:
+            return raw.decode("latin-1", errors="replace").strip()
+    except Exception:
+        return None
+
+
+def split_stream_title(stream_title: str) -> Tuple[str, str]:
+    """'Artista - Titolo' -> (titolo, artista). Senza separatore: (testo, '')."""
+    text = (stream_title or "").strip()
+    if " - " in text:
+        artist, title = text.split(" - ", 1)
+        return title.strip(), artist.strip()
+    return text, ""
+
+
+class IcyDemuxer:
+    """Separa audio e metadati in un flusso ICY, un chunk alla volta.
+
+    `feed(data)` ritorna solo i byte audio; a ogni nuovo StreamTitle chiama
+    `on_title(stream_title, audio_offset)` dove audio_offset è il numero di byte
+    audio (compressi) che precedono il cambio di titolo.
+    """
+
+    def __init__(self, metaint: int, on_title: Callable[[str, int], None]) -> None:
+        if metaint <= 0:
+            raise ValueError("metaint must be > 0")
+        self.metaint = int(metaint)
+        self.on_title = on_title
+        self.audio_bytes = 0
+        self.last_title: Optional[str] = None
+        self._until_meta = self.metaint
+        self._meta_len: Optional[int] = None
+        self._meta = bytearray()
+
+    def feed(self, data: bytes) -> bytes:
+        out = bytearray()
+        view = memoryview(data)
+        pos = 0
+        n = len(view)
+        while pos < n:
+            if self._until_meta > 0:
+                take = min(self._until_meta, n - pos)
+                out += view[pos:pos + take]
+                pos += take
+                self._until_meta -= take
+                self.audio_bytes += take
+                continue
+            if self._meta_len is None:
+                self._meta_len = view[pos] * 16
+                pos += 1
+                if self._meta_len == 0:
+                    self._end_block()
+                continue
+            take = min(self._meta_len - len(self._meta), n - pos)
+            self._meta += view[pos:pos + take]
+            pos += take
+            if len(self._meta) >= self._meta_len:
+                title = parse_stream_title(bytes(self._meta))
+                self._end_block()
+                if title and title != self.last_title:
+                    self.last_title = title
+                    try:
+                        self.on_title(title, self.audio_bytes)
+                    except Exception:
+                        pass
+        return bytes(out)
+
+    def _end_block(self) -> None:
+        self._meta_len = None
+        self._meta = bytearray()
+        self._until_meta = self.metaint
+
+
+class IcyStream:
+    """Connessione HTTP allo stream con metadati ICY richiesti.
+
+    Dopo `open()`: `metaint` (0 se il server non li supporta), `bitrate_kbps`
+    (da icy-br, se presente) e `read(n)` per i byte grezzi della risposta.
+    """
+
+    def __init__(self, url: str, user_agent: str = "KikuMoe", timeout: float = 15.0,
+                 extra_headers: Optional[Dict[str, str]] = None) -> None:
+        self.url = url
+        self.user_agent = user_agent
+        self.timeout = float(timeout)
+        self.extra_headers = dict(extra_headers or {})
+        self.metaint = 0
+        self.bitrate_kbps: Optional[int] = None
+        self.content_type = ""
+        self._conn: Optional[http.client.HTTPConnection] = None
+        self._resp: Optional[http.client.HTTPResponse] = None
+
+    def open(self, redirects: int = 3) -> "IcyStream":
+        url = self.url
+        for _ in range(redirects + 1):
+            parts = urlsplit(url)
+            scheme = (parts.scheme or "http").lower()
+            if scheme == "https":
+                conn = http.client.HTTPSConnection(parts.netloc, timeout=self.timeout)
+            elif scheme == "http":
+                conn = http.client.HTTPConnection(parts.netloc, timeout=self.timeout)
+            else:
+                raise ValueError(f"unsupported scheme: {scheme}")
+            target = parts.path or "/"
+            if parts.query:
+                target += "?" + parts.query
+            headers = {"User-Agent": self.user_agent, "Icy-MetaData": "1"}
+            headers.update(self.extra_headers)
+            conn.request("GET", target, headers=headers)
+            resp = conn.getresponse()
+            if resp.status in (301, 302, 303, 307, 308):
+                loc = resp.getheader("Location")
+                conn.close()
+                if not loc:
+                    break
+                url = urljoin(url, loc)
+                continue
+            if resp.status != 200:
+                conn.close()
+                raise OSError(f"HTTP {resp.status} for {url}")
+            self._conn, self._resp = conn, resp
+            try:
+                self.metaint = int(resp.getheader("icy-metaint") or 0)
+            except ValueError:
+                self.metaint = 0
+            try:
+                br = (resp.getheader("icy-br") or "").split(",")[0].strip()
+                self.bitrate_kbps = int(br) if br else None
+            except ValueError:
+                self.bitrate_kbps = None
+            self.content_type = resp.getheader("Content-Type") or ""
+            return self
+        raise OSError(f"too many redirects for {self.url}")
+
+    def read(self, n: int) -> bytes:
+        if self._resp is None:
+            return b""
+        return self._resp.read1(n) if hasattr(self._resp, "read1") else self._resp.read(n)
+
+    def close(self) -> None:
+        try:
+            if self._resp is not None:
+                self._resp.close()
+        except Exception:
+            pass
+        try:
+            if self._conn is not None:
+                self._conn.close()
+        except Exception:
+            pass
+        self._resp = None
+        self._conn = None
@@ -0,0 +1,314 @@
+"""KikuMoe senza interfaccia: backend audio + Now Playing (WebSocket o ICY), nessun import di Qt.
+
+Pensato per piccoli box Linux senza display. La configurazione è un file INI
+(sezione [KikuMoe], stesse chiavi delle impostazioni dell'app: channel, format,
+volume, mute, icy_metadata, ws_enabled, audio_device_id, libvlc_path, ...);
+se manca viene creato con i valori predefiniti.
+
+Uso:
+    python kikumoe_headless.py
+    python kikumoe_headless.py --config ~/kikumoe.ini --channel K-POP --format MP3
+    python kikumoe_headless.py --no-play --duration 60     # solo titoli
+    python kikumoe_headless.py --control-port 47815       # API locale (vedi control_server.py)
+"""
+from __future__ import annotations
+import startup_trace
+from typing import Any, Optional
+import argparse
+import os
+import signal
+import sys
+import threading
+from constants import (
+    APP_NAME,
+    KEY_CHANNEL,
+    KEY_FORMAT,
+    KEY_VOLUME,
+    KEY_MUTE,
+    KEY_ICY_METADATA,
+    KEY_WS_ENABLED,
+    KEY_LIBVLC_PATH,
+    KEY_NETWORK_CACHING,
+    KEY_CONTROL_SERVER_TOKEN,
+    get_app_data_dir,
+)
+from config import stream_url_for, gateway_url_for
+from logger import get_logger, configure_levels, enable_file_logging
+import settings_store
+
+CONFIG_FILE_NAME = "kikumoe.ini"
+
+
+def default_config_path() -> str:
+    return os.path.join(get_app_data_dir(), CONFIG_FILE_NAME)
+
+
+class HeadlessPlayer:
+    """Riproduzione e titoli senza GUI; i callback dei backend arrivano sui loro thread."""
+
+    def __init__(self, settings: settings_store.SettingsStore, play: bool = True, ws: Optional[bool] = None,
+                 channel: Optional[str] = None, fmt: Optional[str] = None) -> None:
+        self.settings = settings
+        # Override da riga di comando (non salvati nel file)
+        self.channel = channel or settings.value(KEY_CHANNEL, 'J-POP')
+        self.fmt = fmt or settings.value(KEY_FORMAT, 'Vorbis')
+        self.log = get_logger('KikuMoe', subsystem='app')
+        self.play_enabled = play
+        self.ws_enabled = settings.get_bool(KEY_WS_ENABLED, True) if ws is None else bool(ws)
+        self.player: Optional[Any] = None
+        self.ws: Optional[Any] = None
+        self._last_title: Optional[tuple] = None
+        self._lock = threading.Lock()
+        # API locale opzionale: i comandi arrivano sul thread HTTP e sono serializzati qui
+        self.control: Optional[Any] = None
+        self._command_lock = threading.Lock()
+
+    # ---- Avvio/arresto ----
+    def start(self) -> None:
+        if self.ws_enabled:
+            self._start_ws(self.channel)
+        if self.play_enabled:
+            self._start_player(self.channel, self.fmt)
+
+    def stop(self) -> None:
+        try:
+            if self.control is not None:
+                self.control.stop()
+        except Exception:
+            pass
+        try:
+            if self.ws is not None:
+                self.ws.shutdown()
+        except Exception:
+            pass
+        try:
+            if self.player is not None:
+                self.player.stop()
+        except Exception:
+            pass
+
+    def _start_ws(self, channel: str) -> None:
+        try:
+            from ws_client import NowPlayingWS
+            self.ws = NowPlayingWS(
+                on_now_playing=self._on_ws_now_playing,
+                on_error_text=lambda text: self.log.debug("[DEBUG] ws error: %s", text),
+                on_closed_text=lambda _text: self.log.debug("[DEBUG] ws closed"),
+                ws_url=gateway_url_for(channel),
+            )
+            self.ws.start()
+        except Exception as e:
+            self.log.warning("WebSocket non disponibile: %s", e)
+            self.ws = None
+
+    def _create_player(self) -> Any:
+        try:
+            from player_ffmpeg import PlayerFFmpeg
+            player = PlayerFFmpeg(on_event=self._on_player_event, on_metadata=self._on_icy_metadata)
+            if player.is_ready():
+                return player
+        except Exception:
+            pass
+        from player_vlc import PlayerVLC
+        try:
+            nc = self.settings.get_int(KEY_NETWORK_CACHING, 1000)
+        except Exception:
+            nc = 1000
+        return PlayerVLC(on_event=self._on_player_event,
+                         libvlc_path=self.settings.value(KEY_LIBVLC_PATH, '') or None,
+                         network_caching_ms=nc)
+
+    def _start_player(self, channel: str, fmt: str) -> None:
+        if self.player is None:
+            try:
+                self.player = self._create_player()
+            except Exception as e:
+                self.log.error("Nessun backend audio disponibile: %s", e)
+                return
+        try:
+            if hasattr(self.player, 'icy_metadata'):
+                self.player.icy_metadata = self.settings.get_bool(KEY_ICY_METADATA, False)
+            self.player.set_volume(self.settings.get_int(KEY_VOLUME, 80))
+            self.player.set_mute(self.settings.get_bool(KEY_MUTE, False))
+        except Exception:
+            pass
+        url = stream_url_for(channel, fmt)
+        self.log.info("Riproduzione %s (%s): %s", channel, type(self.player).__name__, url)
+        if not self.player.play_url(url):
+            alt = stream_url_for(channel, 'MP3' if fmt == 'Vorbis' else 'Vorbis')
+            if alt != url:
+                self.log.info("Apertura fallita, provo il formato alternativo: %s", alt)
+                if self.player.play_url(alt):
+                    return
+            self.log.error("Impossibile avviare lo stream")
+
+    # ---- API locale ----
+    def start_control(self, port: int) -> bool:
+        from control_server import ControlServer, new_token
+        token = self.settings.get_str(KEY_CONTROL_SERVER_TOKEN, '').strip()
+        if not token:
+            # Prima attivazione: il token viene salvato nel file di configurazione
+            token = new_token()
+            self.settings.setValue(KEY_CONTROL_SERVER_TOKEN, token)
+            # Il valore non finisce nei log (stdout, --log-file): si legge dal file di configurazione
+            self.log.info("Token API generato e salvato nella chiave %s del file di configurazione", KEY_CONTROL_SERVER_TOKEN)
+        server = ControlServer(self.handle_command, port=port, token=token)
+        if not server.start():
+            return False
+        self.control = server
+        self._publish('player', {'state': 'playing' if self._is_playing() else 'stopped'})
+        self._publish('channel', {'channel': self.channel, 'format': self.fmt})
+        self._publish('volume', {'volume': self.settings.get_int(KEY_VOLUME, 80), 'muted': self.settings.get_bool(KEY_MUTE, False)})
+        return True
+
+    def _publish(self, event: str, data: dict) -> None:
+        if self.control is not None:
+            self.control.publish(event, data)
+
+    def _is_playing(self) -> bool:
+        try:
+            return bool(self.player is not None and self.player.is_playing())
+        except Exception:
+            return False
+
+    def handle_command(self, name: str, value: Any) -> None:
+        """Comandi già validati da control_server (play, stop, pause, toggle, volume, mute, channel, format)."""
+        with self._command_lock:
+            self.log.info("Comando: %s %s", name, '' if value is None else value)
+            if name == 'play':
+                self._start_player(self.channel, self.fmt)
+            elif name == 'stop':
+                if self.player is not None:
+                    self.player.stop()
+            elif name in ('pause', 'toggle'):
+                paused = bool(self.player is not None and getattr(self.player, 'is_paused', lambda: False)())
+                if name == 'pause':
+                    # Idempotente: solo se sta suonando e non è già in pausa
+                    if self._is_playing() and not paused:
+                        self.player.pause_toggle()
+                elif self.player is not None and (self._is_playing() or paused):
+                    self.player.pause_toggle()
+                else:
+                    self._start_player(self.channel, self.fmt)
+            elif name == 'volume':
+                self.settings.setValue(KEY_VOLUME, int(value))
+                if self.player is not None:
+                    self.player.set_volume(int(value))
+                self._publish('volume', {'volume': int(value), 'muted': self.settings.get_bool(KEY_MUTE, False)})
+            elif name == 'mute':
+                muted = (not self.settings.get_bool(KEY_MUTE, False)) if value is None else bool(value)
+                self.settings.setValue(KEY_MUTE, 'true' if muted else 'false')
+                if self.player is not None:
+                    self.player.set_mute(muted)
+                self._publish('volume', {'volume': self.settings.get_int(KEY_VOLUME, 80), 'muted': muted})
+            elif name in ('channel', 'format'):
+                if name == 'channel':
+                    self.channel = value
+                else:
+                    self.fmt = value
+                self._publish('channel', {'channel': self.channel, 'format': self.fmt})
+                if name == 'channel' and self.ws is not None:
+                    self.ws.shutdown()
+                    self._start_ws(self.channel)
+                if self._is_playing():
+                    self._start_player(self.channel, self.fmt)
+
+    # ---- Callback ----
+    def _icy_active(self) -> bool:
+        try:
+            return bool(self.player is not None and getattr(self.player, 'icy_active', None) and self.player.icy_active())
+        except Exception:
+            return False
+
+    def _on_player_event(self, code: str, value: Optional[int] = None) -> None:
+        c = str(code or '').lower()
+        if c == 'playing':
+            startup_trace.mark('first_audio')
+        if c:
+            self._publish('player', {'state': c, 'value': value})
+        if c in ('playing', 'paused', 'stopped', 'ended', 'error'):
+            self.log.info("Stato: %s", c)
+
+    def _on_ws_now_playing(self, title: str, artist: str, duration: Optional[int] = None, start_ts: Optional[float] = None) -> None:
+        # Con i metadati ICY attivi i titoli arrivano dallo stream audio
+        if not self._icy_active():
+            self._announce(title, artist)
+
+    def _on_icy_metadata(self, title: str, artist: str) -> None:
+        self._announce(title, artist)
+
+    def _announce(self, title: str, artist: str) -> None:
+        key = (title or '', artist or '')
+        with self._lock:
+            if key == self._last_title:
+                return
+            self._last_title = key
+        startup_trace.mark('first_title')
+        self._publish('track', {'title': title, 'artist': artist, 'source': 'icy' if self._icy_active() else 'ws'})
+        self.log.info("♪ %s", f"{artist} - {title}" if artist else (title or '?'))
+
+
+def main(argv: Optional[list] = None) -> int:
+    startup_trace.mark('imports')
+    ap = argparse.ArgumentParser(prog="kikumoe_headless", description=f"{APP_NAME} senza interfaccia grafica")
+    ap.add_argument("--config", default=None, help=f"file INI (predefinito: {default_config_path()})")
+    ap.add_argument("--channel", choices=("J-POP", "K-POP"), help="sovrascrive il canale della configurazione")
+    ap.add_argument("--format", choices=("Vorbis", "MP3"), help="sovrascrive il formato della configurazione")
+    ap.add_argument("--no-play", action="store_true", help="non avvia l'audio (solo titoli)")
+    ap.add_argument("--no-ws", action="store_true", help="non usa il WebSocket per i titoli")
+    ap.add_argument("--duration", type=float, default=0.0, help="esce dopo N secondi (0 = fino a Ctrl+C/SIGTERM)")
+    ap.add_argument("--control-port", type=int, default=0, help="avvia l'API locale di controllo/eventi su 127.0.0.1:PORT")
+    ap.add_argument("--log-level", default=None, help='es. "INFO" oppure "player=DEBUG,ws=INFO"')
+    ap.add_argument("--log-file", action="store_true", help="scrive anche il file di log con rotazione")
+    ap.add_argument("--perf", action="store_true", help="segnala nel log scritture audio e attese sui lock oltre soglia")
+    args = ap.parse_args(argv)
+
+    if args.log_level:
+        configure_levels(args.log_level)
+    if args.log_file:
+        enable_file_logging(True)
+    if args.perf:
+        from perf_monitor import get_monitor
+        get_monitor().set_enabled(True)
+
+    path = os.path.expanduser(args.config) if args.config else default_config_path()
+    created = not os.path.exists(path)
+    settings = settings_store.configure(settings_store.IniFileBackend(path))
+    if created:
+        # Scrive un file di esempio con le chiavi principali
+        for key, default in ((KEY_CHANNEL, 'J-POP'), (KEY_FORMAT, 'Vorbis'), (KEY_VOLUME, 80),
+                             (KEY_MUTE, 'false'), (KEY_ICY_METADATA, 'false'), (KEY_WS_ENABLED, 'true')):
+            settings.setValue(key, default)
+        settings.flush()
+
+    stop = threading.Event()
+    startup_trace.set_exit_handler(stop.set)
+
+    def _on_signal(_signum, _frame):
+        stop.set()
+    for sig in (getattr(signal, 'SIGINT', None), getattr(signal, 'SIGTERM', None)):
+        if sig is not None:
+            try:
+                signal.signal(sig, _on_signal)
+            except Exception:
+                pass
+
+    app = HeadlessPlayer(settings, play=not args.no_play, ws=False if args.no_ws else None,
+                         channel=args.channel, fmt=args.format)
+    if args.control_port:
+        app.start_control(args.control_port)
+    app.start()
+    startup_trace.mark('subsystems_ready')
+    deadline_wait = args.duration if args.duration > 0 else None
+    waited = 0.0
+    # Attese brevi: i segnali vengono gestiti anche dove wait() non è interrompibile
+    while not stop.wait(0.5):
+        waited += 0.5
+        if deadline_wait is not None and waited >= deadline_wait:
+            break
+    app.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
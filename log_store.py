@@ -0,0 +1,156 @@
+from __future__ import annotations
+from collections import deque
+from heapq import merge
+from typing import Deque, Dict, Iterator, List, Optional
+import logging
+import threading
+import time
+
+# Archivio in memoria dei log come record strutturati.
+# Buffer circolare a capienza fissa (le voci più vecchie vengono scartate) con
+# indici per livello e per logger: ogni indice è una coda di numeri di sequenza
+# crescenti, quindi filtrare non richiede di scorrere tutto il buffer e
+# l'eviction rimuove sempre la testa delle code (O(1)).
+
+DEV_TAG = '[DEV]'
+
+
+class LogEntry:
+    __slots__ = ("seq", "created", "levelno", "levelname", "logger", "thread", "message", "dev")
+
+    def __init__(self, seq: int, created: float, levelno: int, levelname: str,
+                 logger: str, thread: str, message: str) -> None:
+        self.seq = seq
+        self.created = created
+        self.levelno = levelno
+        self.levelname = levelname
+        self.logger = logger
+        self.thread = thread
+        self.message = message
+        self.dev = DEV_TAG in message
+
+    def format(self) -> str:
+        t = time.localtime(self.created)
+        ms = int((self.created % 1) * 1000)
+        return f"{time.strftime('%H:%M:%S', t)}.{ms:03d} [{self.levelname}] [{self.logger}] ({self.thread}) {self.message}"
+
+    def matches(self, min_level: int = 0, logger: Optional[str] = None,
+                text: Optional[str] = None, include_dev: bool = True) -> bool:
+        if self.levelno < min_level:
+            return False
+        if logger is not None and self.logger != logger:
+            return False
+        if not include_dev and self.dev:
+            return False
+        if text:
+            needle = text.casefold()
+            return needle in self.message.casefold() or needle in self.logger.casefold()
+        return True
+
+
+class LogStore:
+    def __init__(self, capacity: int = 10000) -> None:
+        self.capacity = max(1, int(capacity))
+        self._lock = threading.Lock()
+        self._buf: List[Optional[LogEntry]] = [None] * self.capacity
+        self._next = 0
+        self._by_level: Dict[int, Deque[int]] = {}
+        self._by_logger: Dict[str, Deque[int]] = {}
+        # Nomi interni condivisi tra le voci (logger e thread si ripetono)
+        self._names: Dict[str, str] = {}
+        self.dropped = 0
+
+    def _intern(self, s: str) -> str:
+        return self._names.setdefault(s, s)
+
+    def append(self, record: logging.LogRecord) -> LogEntry:
+        try:
+            message = record.getMessage()
+        except Exception:
+            message = str(record.msg)
+        if record.exc_text:
+            message = f"{message}\n{record.exc_text}"
+        with self._lock:
+            seq = self._next
+            slot = seq % self.capacity
+            old = self._buf[slot]
+            if old is not None:
+                # La voce scartata è la più vecchia: è in testa ai suoi indici
+                self._by_level[old.levelno].popleft()
+                self._by_logger[old.logger].popleft()
+                self.dropped += 1
+            entry = LogEntry(seq, record.created, record.levelno, self._intern(record.levelname),
+                             self._intern(record.name), self._intern(record.threadName or ''), message)
+            self._buf[slot] = entry
+            self._next = seq + 1
+            self._by_level.setdefault(entry.levelno, deque()).append(seq)
+            self._by_logger.setdefault(entry.logger, deque()).append(seq)
+        return entry
+
+    def __len__(self) -> int:
+        with self._lock:
+            return min(self._next, self.capacity)
+
+    def loggers(self) -> List[str]:
+        with self._lock:
+            return sorted(k for k, v in self._by_logger.items() if v)
+
+    def logger_count(self) -> int:
+        return len(self._by_logger)
+
+    def last_seq(self) -> int:
+        """Numero di sequenza dell'ultima voce aggiunta (-1 se vuoto)."""
+        with self._lock:
+            return self._next - 1
+
+    def counts_by_level(self) -> Dict[int, int]:
+        with self._lock:
+            return {lvl: len(q) for lvl, q in self._by_level.items() if q}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buf = [None] * self.capacity
+            self._by_level.clear()
+            self._by_logger.clear()
+            self.dropped = 0
+
+    def _candidates(self, min_level: int, logger: Optional[str], min_seq: int = 0) -> List[LogEntry]:
+        # Sceglie l'indice più selettivo; da chiamare con il lock acquisito
+        first = max(0, self._next - self.capacity, min_seq)
+        if logger is not None:
+            seqs = self._by_logger.get(logger, ())
+        elif any(lvl < min_level for lvl in self._by_level):
+            seqs = merge(*(q for lvl, q in self._by_level.items() if lvl >= min_level))
+        else:
+            seqs = range(first, self._next)
+        buf, cap = self._buf, self.capacity
+        out = []
+        for s in seqs:
+            if s < min_seq:
+                continue
+            e = buf[s % cap]
+            if e is not None and e.seq == s:
+                out.append(e)
+        return out
+
+    def query(self, min_level: int = 0, logger: Optional[str] = None, text: Optional[str] = None,
+              include_dev: bool = True, limit: Optional[int] = None, min_seq: int = 0) -> List[LogEntry]:
+        """Voci che soddisfano i filtri, dalla più vecchia; con `limit` solo le ultime `limit`.
+        `min_seq` esclude le voci precedenti (es. quelle nascoste da "Pulisci" nella console)."""
+        with self._lock:
+            entries = self._candidates(min_level, logger, min_seq)
+        if not text and include_dev and (logger is None or min_level <= 0):
+            return entries[-limit:] if limit else entries
+        out: List[LogEntry] = []
+        for e in reversed(entries):
+            if e.matches(min_level, logger, text, include_dev):
+                out.append(e)
+                if limit and len(out) >= limit:
+                    break
+        out.reverse()
+        return out
+
+    def iter_lines(self, **filters) -> Iterator[str]:
+        """Righe formattate per l'esportazione (stessi filtri di `query`)."""
+        for e in self.query(**filters):
+            yield e.format() + "\n"
@@ -1,21 +1,323 @@
+import atexit
 import logging
+import logging.handlers
+import os
+import queue
 import sys
-from typing import Optional
+import threading
+from typing import Callable, Dict, List, Optional
+from log_store import LogEntry, LogStore
+
+# Pipeline di logging asincrona.
+# I logger dell'app hanno un solo handler (QueueHandler) che mette i record in
+# coda senza formattarli né fare I/O; un QueueListener su un thread dedicato li
+# distribuisce a stdout, a un archivio strutturato in memoria (per la Dev Console)
+# e, se abilitato, a un file di log con rotazione per dimensione.
+# Il livello è configurabile a runtime per sottosistema (player, ws, ui, app):
+# i messaggi sotto soglia vengono scartati dal produttore prima di costruirli.
+# La Dev Console può chiedere un livello di cattura più basso (set_capture_level):
+# i record in più arrivano solo all'archivio in memoria, mentre stdout e file
+# continuano a rispettare i livelli configurati.
 
 _DEFAULT_FORMAT = '[%(levelname)s] %(message)s'
+_FILE_FORMAT = '%(asctime)s [%(levelname)s] [%(name)s] %(message)s'
+
+SUBSYSTEMS = ('player', 'ws', 'ui', 'app')
+DEFAULT_LEVEL = logging.INFO
+RING_CAPACITY = 10000
+LOG_FILE_MAX_BYTES = 1024 * 1024
+LOG_FILE_BACKUPS = 3
+# Es. "DEBUG" oppure "player=DEBUG,ws=INFO"
+ENV_LOG_LEVELS = "KIKUMOE_LOG"
+
+# Nome logger -> sottosistema (i nomi non elencati ricadono in 'app')
+_SUBSYSTEM_OF = {
+    'PlayerFFmpeg': 'player',
+    'PlayerVLC': 'player',
+    'WebSocket': 'ws',
+    'KikuMoe': 'ui',
+    'ArtService': 'ui',
+    'TrayManager': 'ui',
+}
+
+_lock = threading.RLock()
+_levels: Dict[str, int] = {s: DEFAULT_LEVEL for s in SUBSYSTEMS}
+_loggers: Dict[str, logging.Logger] = {}
+_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_listener: Optional[logging.handlers.QueueListener] = None
+_fanout: Optional["_FanOutHandler"] = None
+_ring: Optional["RingHandler"] = None
+_file_handler: Optional[logging.Handler] = None
+_root_handler: Optional[logging.Handler] = None
+# Livello minimo per l'archivio in memoria (None = livelli configurati)
+_capture_level: Optional[int] = None
+
+
+class _AsyncQueueHandler(logging.handlers.QueueHandler):
+    """Mette in coda il record risolvendo solo msg % args (gli argomenti potrebbero
+    cambiare dopo la chiamata); la formattazione completa avviene sul listener."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        try:
+            record.msg = record.getMessage()
+            record.args = None
+            if record.exc_info:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+                record.exc_info = None
+        except Exception:
+            pass
+        return record
+
+
+class RingHandler(logging.Handler):
+    """Salva i record nel LogStore in memoria e notifica i sink con la voce strutturata."""
+
+    def __init__(self, capacity: int = RING_CAPACITY) -> None:
+        super().__init__(logging.DEBUG)
+        self.store = LogStore(capacity)
+        self._sinks: List[Callable[[LogEntry], None]] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        entry = self.store.append(record)
+        with _lock:
+            sinks = list(self._sinks)
+        for sink in sinks:
+            try:
+                sink(entry)
+            except Exception:
+                pass
+
+    def add_sink(self, sink: Callable[[LogEntry], None]) -> Callable[[], None]:
+        with _lock:
+            self._sinks.append(sink)
+
+        def _remove() -> None:
+            with _lock:
+                try:
+                    self._sinks.remove(sink)
+                except ValueError:
+                    pass
+        return _remove
+
+
+class _FanOutHandler(logging.Handler):
+    """Unico handler del listener: inoltra ai destinatari attuali (modificabili a caldo)."""
+
+    def __init__(self) -> None:
+        super().__init__(logging.DEBUG)
+        self.targets: List[logging.Handler] = []
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        with _lock:
+            targets = list(self.targets)
+        for h in targets:
+            try:
+                if record.levelno >= h.level:
+                    h.handle(record)
+            except Exception:
+                pass
+        return True
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.handle(record)
+
+
+class _ConfiguredLevelFilter(logging.Filter):
+    """Per stdout e file: scarta i record dei logger dell'app sotto il livello configurato
+    del loro sottosistema (arrivati solo per la cattura della Dev Console)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        lg = _loggers.get(record.name)
+        if lg is None:
+            return True
+        return record.levelno >= _levels.get(getattr(lg, '_kikumoe_subsystem', 'app'), DEFAULT_LEVEL)
+
+
+def _effective_level(subsystem: str) -> int:
+    lvl = _levels.get(subsystem, DEFAULT_LEVEL)
+    return lvl if _capture_level is None else min(lvl, _capture_level)
+
+
+def _ensure_pipeline() -> None:
+    global _listener, _fanout, _ring
+    with _lock:
+        if _fanout is not None:
+            return
+        _fanout = _FanOutHandler()
+        _ring = RingHandler()
+        _fanout.targets.append(_ring)
+        # In un eseguibile senza console (PyInstaller windowed) sys.stdout può essere None
+        if sys.stdout is not None:
+            out = logging.StreamHandler(sys.stdout)
+            out.setFormatter(logging.Formatter(_DEFAULT_FORMAT))
+            out.addFilter(_ConfiguredLevelFilter())
+            _fanout.targets.append(out)
+        _apply_env_levels()
+        _listener = logging.handlers.QueueListener(_queue, _fanout, respect_handler_level=False)
+        _listener.start()
+        atexit.register(shutdown)
+
 
+def _apply_env_levels() -> None:
+    spec = os.environ.get(ENV_LOG_LEVELS)
+    if spec:
+        configure_levels(spec)
 
-def get_logger(name: Optional[str] = None) -> logging.Logger:
-    """Return a configured logger that logs to stdout at DEBUG level by default.
-    It avoids adding duplicate handlers on repeated calls.
+
+def get_logger(name: Optional[str] = None, subsystem: Optional[str] = None) -> logging.Logger:
+    """Return an app logger that enqueues records to the background listener.
+    Its level follows the configured level of its subsystem; repeated calls
+    return the same logger without adding handlers.
     """
     lname = name or 'KikuMoe'
+    _ensure_pipeline()
     logger = logging.getLogger(lname)
-    if not logger.handlers:
-        handler = logging.StreamHandler(sys.stdout)
-        formatter = logging.Formatter(_DEFAULT_FORMAT)
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
-        logger.setLevel(logging.DEBUG)
-        logger.propagate = False
-    return logger
\ No newline at end of file
+    with _lock:
+        if lname not in _loggers:
+            sub = subsystem or _SUBSYSTEM_OF.get(lname, 'app')
+            if sub not in _levels:
+                _levels[sub] = DEFAULT_LEVEL
+            logger.handlers = [_AsyncQueueHandler(_queue)]
+            logger.propagate = False
+            logger.setLevel(_effective_level(sub))
+            setattr(logger, '_kikumoe_subsystem', sub)
+            _loggers[lname] = logger
+    return logger
+
+
+def _to_level(level) -> int:
+    if isinstance(level, int):
+        return level
+    val = logging.getLevelName(str(level).strip().upper())
+    return val if isinstance(val, int) else DEFAULT_LEVEL
+
+
+def set_level(subsystem: Optional[str], level) -> None:
+    """Imposta il livello di un sottosistema (None = tutti) sui logger già creati e futuri."""
+    lvl = _to_level(level)
+    with _lock:
+        subs = list(_levels.keys()) if subsystem is None else [subsystem]
+        for s in subs:
+            _levels[s] = lvl
+        for lg in _loggers.values():
+            sub = getattr(lg, '_kikumoe_subsystem', 'app')
+            if sub in subs:
+                lg.setLevel(_effective_level(sub))
+
+
+def set_capture_level(level) -> None:
+    """Livello minimo raccolto nell'archivio in memoria (None = quelli configurati).
+    Non modifica i livelli configurati né cosa viene scritto su stdout e file."""
+    global _capture_level
+    with _lock:
+        _capture_level = None if level is None else _to_level(level)
+        for lg in _loggers.values():
+            lg.setLevel(_effective_level(getattr(lg, '_kikumoe_subsystem', 'app')))
+
+
+def get_levels() -> Dict[str, int]:
+    with _lock:
+        return dict(_levels)
+
+
+def set_levels(levels: Dict[str, int]) -> None:
+    for sub, lvl in dict(levels).items():
+        set_level(sub, lvl)
+
+
+def configure_levels(spec: str) -> None:
+    """Applica una specifica tipo "INFO" o "player=DEBUG,ws=WARNING"."""
+    for part in (spec or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '=' in part:
+            sub, lvl = part.split('=', 1)
+            set_level(sub.strip(), lvl)
+        else:
+            set_level(None, part)
+
+
+def add_sink(sink: Callable[[LogEntry], None]) -> Callable[[], None]:
+    """Registra `sink(entry)` (chiamato sul thread del listener). Ritorna la funzione di rimozione."""
+    _ensure_pipeline()
+    return _ring.add_sink(sink)
+
+
+def get_log_store() -> LogStore:
+    """Archivio dei record più recenti (al massimo RING_CAPACITY)."""
+    _ensure_pipeline()
+    return _ring.store
+
+
+def capture_root_logger(enabled: bool) -> None:
+    """Inoltra alla pipeline anche i log di librerie esterne che arrivano al root logger."""
+    global _root_handler
+    _ensure_pipeline()
+    root = logging.getLogger()
+    with _lock:
+        if enabled and _root_handler is None:
+            _root_handler = _AsyncQueueHandler(_queue)
+            root.addHandler(_root_handler)
+        elif not enabled and _root_handler is not None:
+            root.removeHandler(_root_handler)
+            _root_handler = None
+
+
+def default_log_path() -> str:
+    from constants import get_app_data_dir
+    return os.path.join(get_app_data_dir(), 'logs', 'kikumoe.log')
+
+
+def enable_file_logging(enabled: bool, path: Optional[str] = None,
+                        max_bytes: int = LOG_FILE_MAX_BYTES, backups: int = LOG_FILE_BACKUPS) -> Optional[str]:
+    """Attiva/disattiva il file di log con rotazione. Ritorna il percorso in uso (None se disattivo)."""
+    global _file_handler
+    _ensure_pipeline()
+    with _lock:
+        old = _file_handler
+        if old is not None:
+            _fanout.targets.remove(old)
+            _file_handler = None
+    if old is not None:
+        try:
+            old.close()
+        except Exception:
+            pass
+    if not enabled:
+        return None
+    target = path or default_log_path()
+    try:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        fh = logging.handlers.RotatingFileHandler(target, maxBytes=int(max_bytes),
+                                                  backupCount=int(backups), encoding='utf-8', delay=True)
+        fh.setFormatter(logging.Formatter(_FILE_FORMAT))
+        fh.addFilter(_ConfiguredLevelFilter())
+    except Exception:
+        return None
+    with _lock:
+        _file_handler = fh
+        _fanout.targets.append(fh)
+    return target
+
+
+def shutdown() -> None:
+    """Svuota la coda e chiude gli handler (chiamato anche all'uscita)."""
+    global _listener
+    with _lock:
+        listener = _listener
+        _listener = None
+    if listener is None:
+        return
+    try:
+        # Elabora i record rimasti in coda e ferma il thread
+        listener.stop()
+    except Exception:
+        pass
+    with _lock:
+        targets = list(_fanout.targets) if _fanout is not None else []
+    for h in targets:
+        try:
+            h.flush()
+        except Exception:
+            pass
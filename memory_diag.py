@@ -0,0 +1,195 @@
+from __future__ import annotations
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+import gc
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+# Diagnostica della memoria per sessioni lunghe (nessuna dipendenza da Qt).
+# - istantanee tracemalloc a richiesta, confrontate con la precedente e con la
+#   prima (base) raggruppando per file e riga;
+# - numero di thread e di file descriptor/handle aperti, RSS del processo;
+# - istanze vive dei tipi che sospettiamo crescere (player, thread, processi
+#   ffmpeg, PyAudio, record di log, ...).
+# tracemalloc rallenta le allocazioni: si attiva solo mentre serve (stop()).
+
+DEFAULT_NFRAMES = 1
+TOP_LINES = 15
+# Tipi di cui contare le istanze vive (per nome della classe)
+KEY_TYPES: Tuple[str, ...] = (
+    'PlayerFFmpeg', 'PlayerVLC', 'PlayerActor', 'Thread', 'Popen', 'PyAudio', 'Stream',
+    'IcyStream', 'NowPlayingWS', 'WebSocketApp', 'LogEntry', 'Future', 'socket',
+)
+# Allocazioni dello stesso tracemalloc e dell'import system: rumore nei confronti
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def rss_kb() -> Optional[int]:
+    """RSS attuale del processo in KiB (None se non disponibile)."""
+    try:
+        with open("/proc/self/status", "r", encoding="ascii", errors="replace") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except Exception:
+        pass
+    try:
+        import psutil  # type: ignore
+        return int(psutil.Process().memory_info().rss // 1024)
+    except Exception:
+        return None
+
+
+def fd_count() -> Optional[int]:
+    """File descriptor (Unix) o handle (Windows, con psutil) aperti; None se non disponibile."""
+    for path in ("/proc/self/fd", "/dev/fd"):
+        try:
+            return len(os.listdir(path))
+        except Exception:
+            pass
+    try:
+        import psutil  # type: ignore
+        proc = psutil.Process()
+        return int(proc.num_handles() if sys.platform == 'win32' else proc.num_fds())
+    except Exception:
+        return None
+
+
+def thread_names() -> List[str]:
+    return sorted(t.name for t in threading.enumerate())
+
+
+def object_counts(types: Iterable[str] = KEY_TYPES) -> Dict[str, int]:
+    """Istanze vive (tracciate dal GC) dei tipi indicati per nome."""
+    wanted = set(types)
+    counts: Counter = Counter()
+    for obj in gc.get_objects():
+        name = type(obj).__name__
+        if name in wanted:
+            counts[name] += 1
+    return {name: counts.get(name, 0) for name in sorted(wanted)}
+
+
+def process_stats() -> Dict[str, object]:
+    traced, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (None, None)
+    return {
+        'rss_kb': rss_kb(),
+        'threads': threading.active_count(),
+        'fds': fd_count(),
+        'gc_objects': len(gc.get_objects()),
+        'traced_kb': traced // 1024 if traced is not None else None,
+        'traced_peak_kb': peak // 1024 if peak is not None else None,
+    }
+
+
+class MemoryDiagnostics:
+    """Istantanee tracemalloc con confronto rispetto alla precedente e alla base."""
+
+    def __init__(self, nframes: int = DEFAULT_NFRAMES) -> None:
+        self.nframes = max(1, int(nframes))
+        self._lock = threading.Lock()
+        self._started_tracing = False
+        self.baseline: Optional[tracemalloc.Snapshot] = None
+        self.previous: Optional[tracemalloc.Snapshot] = None
+        self.last: Optional[tracemalloc.Snapshot] = None
+        self.last_at: Optional[float] = None
+        self.count = 0
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self) -> None:
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.nframes)
+                self._started_tracing = True
+
+    def stop(self) -> None:
+        """Ferma tracemalloc (se avviato da qui) e libera le istantanee."""
+        with self._lock:
+            if self._started_tracing and tracemalloc.is_tracing():
+                tracemalloc.stop()
+            self._started_tracing = False
+            self.baseline = self.previous = self.last = None
+            self.count = 0
+
+    def take_snapshot(self) -> tracemalloc.Snapshot:
+        self.start()
+        gc.collect()
+        snap = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+        with self._lock:
+            if self.baseline is None:
+                self.baseline = snap
+            self.previous = self.last
+            self.last = snap
+            self.last_at = time.time()
+            self.count += 1
+        return snap
+
+    def diff(self, against: str = 'previous', group_by: str = 'lineno', limit: int = TOP_LINES) -> List[tracemalloc.StatisticDiff]:
+        """Differenze (ordinate per crescita) tra l'ultima istantanea e la precedente o la base."""
+        with self._lock:
+            last = self.last
+            ref = self.baseline if against == 'baseline' else self.previous
+            # Con due sole istantanee la base coincide con la precedente
+            if against == 'baseline' and ref is self.previous:
+                ref = None
+        if last is None or ref is None or ref is last:
+            return []
+        stats = last.compare_to(ref, group_by)
+        return stats[:max(0, int(limit))]
+
+    def report(self, limit: int = TOP_LINES) -> str:
+        """Riepilogo testuale: processo, istanze dei tipi chiave, crescita per file:riga."""
+        ps = process_stats()
+        lines = [
+            "Processo: RSS {} KiB, thread {}, fd/handle {}, oggetti GC {}".format(
+                ps['rss_kb'] if ps['rss_kb'] is not None else 'n/d', ps['threads'],
+                ps['fds'] if ps['fds'] is not None else 'n/d', ps['gc_objects']),
+        ]
+        if ps['traced_kb'] is not None:
+            lines.append(f"tracemalloc: {ps['traced_kb']} KiB (picco {ps['traced_peak_kb']} KiB), istantanee {self.count}")
+        lines.append("Thread: " + ", ".join(thread_names()))
+        counts = object_counts()
+        lines.append("Istanze: " + ", ".join(f"{k} {v}" for k, v in counts.items() if v))
+        for against, title in (('previous', "rispetto all'istantanea precedente"), ('baseline', "rispetto alla prima istantanea")):
+            stats = self.diff(against, limit=limit)
+            if not stats:
+                continue
+            lines.append("")
+            lines.append(f"== Crescita {title} ==")
+            for st in stats:
+                frame = st.traceback[0]
+                lines.append(f"{st.size_diff / 1024.0:+9.1f} KiB {st.count_diff:+7d} blocchi  "
+                             f"{_short_path(frame.filename)}:{frame.lineno}  ({st.size / 1024.0:.1f} KiB)")
+        return "\n".join(lines)
+
+
+def _short_path(path: str) -> str:
+    # Percorsi relativi al progetto o alla libreria standard, più leggibili
+    for base in (os.path.dirname(os.path.abspath(__file__)), os.path.dirname(os.__file__)):
+        try:
+            if path.startswith(base + os.sep):
+                return os.path.relpath(path, base)
+        except Exception:
+            pass
+    return path
+
+
+_diag: Optional[MemoryDiagnostics] = None
+
+
+def get_memory_diagnostics() -> MemoryDiagnostics:
+    global _diag
+    if _diag is None:
+        _diag = MemoryDiagnostics()
+    return _diag
@@ -0,0 +1,178 @@
+from __future__ import annotations
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+import threading
+import time
+from logger import get_logger
+
+# Misure di latenza per capire da dove arrivano i glitch audio:
+#   loop_lag            ritardo del loop eventi Qt (sonda a timer, vedi ui/loop_probe.py)
+#   audio_write         durata di ogni scrittura PortAudio in PlayerFFmpeg
+#   audio_gap           pausa tra la fine di una scrittura e l'inizio della successiva
+#                       (lettura da ffmpeg + volume: se supera il buffer del dispositivo
+#                       l'audio si interrompe)
+#   lock_wait.<nome>    attese su lock condivisi (TimedLock)
+# Ogni metrica tiene una finestra scorrevole (ultimi WINDOW_S secondi) da cui si
+# calcolano p50/p99/max. Oltre la soglia viene scritta una riga di log (al più
+# una ogni WARN_INTERVAL_S per metrica). Da disattivato record() esce subito.
+
+WINDOW_S = 60.0
+MAX_SAMPLES = 8192
+WARN_INTERVAL_S = 5.0
+
+# Soglie (ms) oltre le quali una misura viene segnalata nel log
+THRESHOLDS_MS: Dict[str, float] = {
+    'loop_lag': 100.0,
+    'audio_write': 150.0,
+    'audio_gap': 60.0,
+    'lock_wait': 50.0,
+}
+
+
+class RollingHistogram:
+    """Misure (ms) degli ultimi `window_s` secondi, al più `max_samples`."""
+
+    def __init__(self, window_s: float = WINDOW_S, max_samples: int = MAX_SAMPLES) -> None:
+        self.window_s = float(window_s)
+        self._samples: Deque[Tuple[float, float]] = deque(maxlen=max(1, int(max_samples)))
+        self.total = 0
+
+    def add(self, value_ms: float, now: Optional[float] = None) -> None:
+        self._samples.append((time.monotonic() if now is None else now, float(value_ms)))
+        self.total += 1
+
+    def clear(self) -> None:
+        self._samples.clear()
+        self.total = 0
+
+    def values(self, now: Optional[float] = None) -> List[float]:
+        cutoff = (time.monotonic() if now is None else now) - self.window_s
+        samples = self._samples
+        while samples and samples[0][0] < cutoff:
+            samples.popleft()
+        return [v for _ts, v in samples]
+
+    def stats(self, now: Optional[float] = None) -> Dict[str, float]:
+        vals = sorted(self.values(now))
+        if not vals:
+            return {'count': 0, 'p50': 0.0, 'p99': 0.0, 'max': 0.0}
+        n = len(vals)
+        return {
+            'count': n,
+            'p50': vals[(n - 1) // 2],
+            'p99': vals[min(n - 1, int(round(0.99 * (n - 1))))],
+            'max': vals[-1],
+        }
+
+
+class PerfMonitor:
+    """Registro delle metriche; `record` è sicuro da qualsiasi thread."""
+
+    def __init__(self, thresholds: Optional[Dict[str, float]] = None) -> None:
+        self.enabled = False
+        self.thresholds = dict(THRESHOLDS_MS if thresholds is None else thresholds)
+        self.log = get_logger('PerfMonitor')
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, RollingHistogram] = {}
+        # metrica -> (ultimo avviso, misure oltre soglia non segnalate)
+        self._warned: Dict[str, Tuple[float, int]] = {}
+
+    def set_enabled(self, enabled: bool) -> None:
+        enabled = bool(enabled)
+        if enabled and not self.enabled:
+            self.reset()
+        self.enabled = enabled
+
+    def reset(self) -> None:
+        with self._lock:
+            self._metrics.clear()
+            self._warned.clear()
+
+    def threshold(self, name: str) -> Optional[float]:
+        # 'lock_wait.state' ricade sulla soglia di 'lock_wait'
+        return self.thresholds.get(name, self.thresholds.get(name.split('.', 1)[0]))
+
+    def record(self, name: str, value_ms: float) -> None:
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        with self._lock:
+            hist = self._metrics.get(name)
+            if hist is None:
+                hist = self._metrics[name] = RollingHistogram()
+            hist.add(value_ms, now)
+            limit = self.threshold(name)
+            if limit is None or value_ms < limit:
+                return
+            last, pending = self._warned.get(name, (0.0, 0))
+            if now - last < WARN_INTERVAL_S:
+                self._warned[name] = (last, pending + 1)
+                return
+            self._warned[name] = (now, 0)
+        if pending:
+            self.log.warning("%s: %.1f ms (soglia %.0f ms, altre %d oltre soglia)", name, value_ms, limit, pending)
+        else:
+            self.log.warning("%s: %.1f ms (soglia %.0f ms)", name, value_ms, limit)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """metrica -> {count, p50, p99, max} sulla finestra corrente."""
+        now = time.monotonic()
+        with self._lock:
+            return {name: hist.stats(now) for name, hist in sorted(self._metrics.items())}
+
+    def format_table(self) -> str:
+        rows = self.snapshot()
+        if not rows:
+            return "(nessuna misura)"
+        width = max(12, max(len(n) for n in rows))
+        lines = [f"{'metrica':<{width}} {'n':>6} {'p50':>8} {'p99':>8} {'max':>8} {'soglia':>7}"]
+        for name, st in rows.items():
+            limit = self.threshold(name)
+            lines.append(f"{name:<{width}} {st['count']:>6} {st['p50']:>8.1f} {st['p99']:>8.1f} {st['max']:>8.1f} "
+                         f"{(f'{limit:.0f}' if limit is not None else '-'):>7}")
+        return "\n".join(lines)
+
+
+class TimedLock:
+    """threading.Lock che misura le attese in 'lock_wait.<nome>'. Se il lock è
+    libero (caso normale) costa un solo acquire non bloccante in più."""
+
+    def __init__(self, name: str, monitor: Optional[PerfMonitor] = None) -> None:
+        self.name = f"lock_wait.{name}"
+        self._lock = threading.Lock()
+        self._monitor = monitor
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        if self._lock.acquire(False):
+            return True
+        if not blocking:
+            return False
+        t0 = time.perf_counter()
+        ok = self._lock.acquire(True, timeout)
+        (self._monitor or get_monitor()).record(self.name, (time.perf_counter() - t0) * 1000.0)
+        return ok
+
+    def release(self) -> None:
+        self._lock.release()
+
+    def locked(self) -> bool:
+        return self._lock.locked()
+
+    def __enter__(self) -> bool:
+        return self.acquire()
+
+    def __exit__(self, *exc) -> None:
+        self._lock.release()
+
+
+_monitor: Optional[PerfMonitor] = None
+_monitor_lock = threading.Lock()
+
+
+def get_monitor() -> PerfMonitor:
+    global _monitor
+    if _monitor is None:
+        with _monitor_lock:
+            if _monitor is None:
+                _monitor = PerfMonitor()
+    return _monitor
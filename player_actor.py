@@ -0,0 +1,205 @@
+from __future__ import annotations
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Optional, Tuple
+import itertools
+import threading
+from PyQt5.QtCore import QObject, pyqtSignal
+from logger import get_logger
+
+# Comandi al backend audio (FFmpeg/VLC) eseguiti su un thread dedicato.
+# play/stop/pausa possono bloccare per secondi (attese su ffmpeg, join dei
+# thread, sleep di VLC): il thread GUI si limita ad accodarli e riceve l'esito
+# tramite Future o il segnale `command_finished`.
+# Coalescenza dei comandi ancora in coda:
+# - play/stop annullano play/stop/pausa in attesa: conta solo l'ultimo cambio
+#   di stato (un play dopo uno stop basta da solo, play_url ferma lo stream corrente)
+# - due pause consecutive si annullano a vicenda
+# - force_cleanup annulla tutto ciò che è in coda e resta come primo comando
+# set_backend/replace_backend non vengono mai annullati: i comandi accodati
+# dopo vanno al nuovo backend.
+
+_TRANSPORT = ('play', 'stop', 'pause_toggle')
+
+
+class _Command:
+    __slots__ = ("id", "name", "args", "future")
+
+    def __init__(self, cid: int, name: str, args: Tuple[Any, ...], future: Future) -> None:
+        self.id = cid
+        self.name = name
+        self.args = args
+        self.future = future
+
+
+class PlayerActor(QObject):
+    """Coda di comandi verso un backend audio con un thread esecutore.
+
+    Ogni metodo ritorna subito un Future (con attributo `command_id`); quelli
+    annullati per coalescenza risultano cancellati. A fine esecuzione viene
+    emesso `command_finished(command_id, nome, risultato)` (risultato può essere
+    un'eccezione). Le letture di stato (is_playing, get_mute, ...) restano
+    dirette sul backend.
+    """
+    command_finished = pyqtSignal(int, str, object)
+
+    def __init__(self, backend: Any = None, parent=None) -> None:
+        super().__init__(parent)
+        self.log = get_logger('PlayerActor', subsystem='player')
+        self._backend = backend
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._pending: Deque[_Command] = deque()
+        self._ids = itertools.count(1)
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._running: Optional[str] = None
+        # Statistiche
+        self.executed = 0
+        self.coalesced = 0
+
+    @property
+    def backend(self) -> Any:
+        return self._backend
+
+    def busy(self) -> bool:
+        """True se un comando è in esecuzione o in coda."""
+        with self._lock:
+            return self._running is not None or bool(self._pending)
+
+    # ---- Comandi ----
+    def play(self, url: str) -> Future:
+        return self._submit('play', url)
+
+    def stop(self) -> Future:
+        return self._submit('stop')
+
+    def pause_toggle(self) -> Future:
+        return self._submit('pause_toggle')
+
+    def force_cleanup(self) -> Future:
+        return self._submit('force_cleanup')
+
+    def set_backend(self, backend: Any) -> Future:
+        """Sostituisce il backend: quello vecchio viene fermato sul thread dei comandi."""
+        return self._submit('set_backend', backend)
+
+    def replace_backend(self, factory: Callable[[], Any]) -> Future:
+        """Crea il nuovo backend sul thread dei comandi (import, libVLC, ffmpeg -version possono
+        bloccare) e lo installa come set_backend. Risultato: il backend; eccezione se la
+        creazione fallisce o non è pronto (il backend corrente resta in uso)."""
+        return self._submit('replace_backend', factory)
+
+    def shutdown(self, stop_backend: bool = True, timeout: float = 3.0) -> None:
+        """Ferma il backend (se richiesto) dopo i comandi in coda e chiude il thread."""
+        if stop_backend:
+            self._submit('stop')
+        with self._lock:
+            self._closed = True
+            self._cond.notify_all()
+            t = self._thread
+        if t is not None and t is not threading.current_thread():
+            t.join(timeout=timeout)
+
+    # ---- Interni ----
+    def _submit(self, name: str, *args: Any) -> Future:
+        fut: Future = Future()
+        with self._lock:
+            cmd = _Command(next(self._ids), name, args, fut)
+            fut.command_id = cmd.id  # type: ignore[attr-defined]
+            if self._closed:
+                fut.set_exception(RuntimeError("player actor closed"))
+                return fut
+            if not self._coalesce_locked(cmd):
+                return fut
+            self._pending.append(cmd)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="PlayerActor", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+        return fut
+
+    def _drop_locked(self, cmd: _Command) -> None:
+        cmd.future.cancel()
+        self.coalesced += 1
+
+    def _coalesce_locked(self, cmd: _Command) -> bool:
+        """Applica le regole di coalescenza; False se il nuovo comando non va accodato."""
+        if cmd.name == 'pause_toggle':
+            last = self._pending[-1] if self._pending else None
+            if last is not None and last.name == 'pause_toggle':
+                self._pending.pop()
+                self._drop_locked(last)
+                cmd.future.set_result(None)
+                return False
+            return True
+        if cmd.name in ('play', 'stop', 'force_cleanup'):
+            keep: Deque[_Command] = deque()
+            for c in self._pending:
+                if c.name in _TRANSPORT or (cmd.name == 'force_cleanup' and c.name == 'force_cleanup'):
+                    self._drop_locked(c)
+                else:
+                    keep.append(c)
+            self._pending = keep
+        return True
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                cmd = self._pending.popleft()
+                if not cmd.future.set_running_or_notify_cancel():
+                    continue
+                self._running = cmd.name
+                backend = self._backend
+            try:
+                result = self._execute(backend, cmd)
+                cmd.future.set_result(result)
+            except Exception as e:
+                self.log.debug("[DEBUG] PlayerActor: %s failed: %s", cmd.name, e)
+                result = e
+                cmd.future.set_exception(e)
+            finally:
+                with self._lock:
+                    self._running = None
+                    self.executed += 1
+            try:
+                self.command_finished.emit(cmd.id, cmd.name, result)
+            except Exception:
+                pass
+
+    def _swap(self, old: Any, new: Any) -> None:
+        # Prima il cambio, poi lo stop: gli eventi del vecchio backend (stopped, ...)
+        # arrivano quando `backend` è già il nuovo e possono essere riconosciuti e ignorati
+        with self._lock:
+            self._backend = new
+        if old is not None and old is not new:
+            try:
+                old.stop()
+            except Exception:
+                pass
+
+    def _execute(self, backend: Any, cmd: _Command) -> Any:
+        if cmd.name == 'set_backend':
+            self._swap(backend, cmd.args[0])
+            return True
+        if cmd.name == 'replace_backend':
+            new = cmd.args[0]()
+            if new is None or not new.is_ready():
+                raise RuntimeError("audio backend not ready")
+            self._swap(backend, new)
+            return new
+        if backend is None:
+            raise RuntimeError("no audio backend")
+        if cmd.name == 'play':
+            return bool(backend.play_url(cmd.args[0]))
+        if cmd.name == 'stop':
+            return backend.stop()
+        if cmd.name == 'pause_toggle':
+            return backend.pause_toggle()
+        if cmd.name == 'force_cleanup':
+            return backend.force_cleanup()
+        raise ValueError(f"unknown command: {cmd.name}")
@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import Optional, Callable, Any
+from typing import Optional, Callable, Any, Sequence
 import os
 import threading
 import time
@@ -7,9 +7,12 @@ import subprocess
 import sys
 import struct
 import re
+from collections import deque
 from logger import get_logger
-from PyQt5.QtCore import QSettings
-from constants import APP_NAME, APP_VERSION, ORG_NAME, APP_SETTINGS, KEY_AUDIO_DEVICE_INDEX
+from icy import IcyStream, IcyDemuxer, split_stream_title
+from constants import APP_NAME, APP_VERSION
+from perf_monitor import TimedLock
+from audio_sink import AudioSink, output_device_index
 
 try:
     import pyaudio
@@ -17,22 +20,41 @@ except Exception:
     pyaudio = None  # type: ignore
 
 
+# Byte di PCM s16le stereo 44.1 kHz per secondo (formato d'uscita di ffmpeg)
+PCM_BYTES_PER_SEC = 44100 * 2 * 2
+
+
 class PlayerFFmpeg:
-    def __init__(self, on_event: Optional[Callable[[str, Optional[int]], None]] = None) -> None:
+    def __init__(self, on_event: Optional[Callable[[str, Optional[int]], None]] = None,
+                 on_metadata: Optional[Callable[[str, str], None]] = None,
+                 ffmpeg_cmd: Optional[Sequence[str]] = None,
+                 pyaudio_module: Optional[Any] = None) -> None:
         self._on_event = on_event
+        # Dipendenze sostituibili (es. tools/fake_ffmpeg.py e tools/fake_backends.FakePyAudio):
+        # comando che avvia ffmpeg e modulo con PyAudio/paInt16
+        self._ffmpeg_cmd = list(ffmpeg_cmd) if ffmpeg_cmd else ['ffmpeg']
+        self._pyaudio = pyaudio_module if pyaudio_module is not None else pyaudio
+        # Metadati ICY in-band (solo MP3): titolo e artista letti dallo stream audio
+        self._on_metadata = on_metadata
+        self.icy_metadata: bool = False
+        self._icy_active: bool = False
+        self._icy_source: Optional[IcyStream] = None
+        self._icy_pending: deque = deque()
+        self._icy_byterate: Optional[float] = None
+        self._icy_pcm_bytes: int = 0
         self._muted: bool = False
         self._volume: float = 1.0
+        # Uscita condivisa: volume, muto e fade applicati al PCM dal worker, poi PortAudio
+        self._sink = AudioSink(self._pyaudio, rate=44100, channels=2, volume=self._volume)
         self._ready: bool = False
         self._playing: bool = False
         self._current_stream: Optional[str] = None
         # stop event replaces boolean flag to safely notify worker thread
         self._stop_requested = False
         self._stop_event = threading.Event()
-        # lock protecting _ffmpeg_process and _audio_stream
-        self._state_lock = threading.Lock()
+        # lock protecting _ffmpeg_process (attese misurate da perf_monitor)
+        self._state_lock = TimedLock('state')
         self._stream_thread: Optional[threading.Thread] = None
-        self._audio_stream: Optional[Any] = None
-        self._pyaudio_instance: Optional[Any] = None  # type: ignore
         self._ffmpeg_process: Optional[subprocess.Popen] = None
         # Track pause state explicitly
         self._paused: bool = False
@@ -46,16 +68,83 @@ class PlayerFFmpeg:
 
     def _init_audio(self) -> None:
         self._ready = False
-        if pyaudio is None:
+        if self._pyaudio is None:
             return
+        # Verifica soltanto che PortAudio si inizializzi: l'istanza viene creata all'apertura
+        # dello stream e rilasciata allo stop, così da fermo PortAudio può rileggere i dispositivi
         try:
-            self._pyaudio_instance = pyaudio.PyAudio()
+            self._pyaudio.PyAudio().terminate()
             self._ready = True
         except Exception:
             self._ready = False
 
     def is_ready(self) -> bool:
-        return bool(self._ready and pyaudio is not None)
+        return bool(self._ready and self._pyaudio is not None)
+
+    def icy_active(self) -> bool:
+        """True se i titoli arrivano dallo stream audio (metadati ICY) invece che dal WS."""
+        return bool(self._icy_active)
+
+    def _open_icy_source(self, url: str) -> Optional[IcyStream]:
+        """Apre lo stream chiedendo i metadati ICY; None se non supportati o in errore."""
+        src = IcyStream(url, user_agent=self._user_agent, extra_headers={'Accept': 'audio/mpeg'})
+        try:
+            src.open()
+        except Exception as e:
+            self.log.debug("[DEBUG] _open_icy_source: cannot open %s: %s", url, e)
+            src.close()
+            return None
+        if src.metaint <= 0:
+            self.log.debug("[DEBUG] _open_icy_source: server did not send icy-metaint, using direct input")
+            src.close()
+            return None
+        self.log.debug("[DEBUG] _open_icy_source: metaint=%s bitrate=%s kbps", src.metaint, src.bitrate_kbps)
+        return src
+
+    def _icy_pump(self, src: IcyStream, proc: subprocess.Popen) -> None:
+        """Legge lo stream ICY, toglie i blocchi di metadati e passa l'audio a ffmpeg (stdin)."""
+        def on_title(stream_title: str, offset: int) -> None:
+            title, artist = split_stream_title(stream_title)
+            self._icy_pending.append((offset, title, artist))
+        demux = IcyDemuxer(src.metaint, on_title)
+        try:
+            while not self._stop_event.is_set():
+                data = src.read(8192)
+                if not data:
+                    self.log.debug("[DEBUG] _icy_pump: upstream EOF")
+                    break
+                audio = demux.feed(data)
+                if audio and proc.stdin is not None:
+                    proc.stdin.write(audio)
+        except Exception as e:
+            if not self._stop_event.is_set():
+                self.log.debug("[DEBUG] _icy_pump: %s", e)
+        finally:
+            try:
+                if proc.stdin is not None:
+                    proc.stdin.close()
+            except Exception:
+                pass
+            src.close()
+
+    def _icy_advance(self, pcm_bytes: int) -> None:
+        """Emette i titoli ICY quando l'audio riprodotto raggiunge la loro posizione nello stream."""
+        self._icy_pcm_bytes += pcm_bytes
+        pending = self._icy_pending
+        if not pending:
+            return
+        if self._icy_byterate:
+            played = (self._icy_pcm_bytes / PCM_BYTES_PER_SEC) * self._icy_byterate
+        else:
+            played = float('inf')
+        while pending and pending[0][0] <= played:
+            _offset, title, artist = pending.popleft()
+            try:
+                self.log.debug("[DEBUG] ICY title: %r - %r", artist, title)
+                if self._on_metadata is not None:
+                    self._on_metadata(title, artist)
+            except Exception:
+                pass
 
     def reinitialize(self, libvlc_path: Optional[str] = None, network_caching_ms: Optional[int] = None) -> bool:
         return self.is_ready()
@@ -70,25 +159,15 @@ class PlayerFFmpeg:
     def _check_ffmpeg(self) -> bool:
         """Check if ffmpeg is available."""
         try:
-            result = subprocess.run(['ffmpeg', '-version'],
+            result = subprocess.run(self._ffmpeg_cmd + ['-version'],
                                     capture_output=True, check=False, timeout=5, **({"creationflags": subprocess.CREATE_NO_WINDOW} if sys.platform == "win32" else {}))
             return result.returncode == 0
         except Exception:
             return False
 
     def _get_output_device_index(self) -> Optional[int]:
-        """Legge l'indice del dispositivo di output da QSettings; None => predefinito di Windows."""
-        try:
-            settings = QSettings(ORG_NAME, APP_SETTINGS)
-            val = settings.value(KEY_AUDIO_DEVICE_INDEX, '')
-            if val in (None, ''):
-                return None
-            try:
-                return int(val)
-            except Exception:
-                return None
-        except Exception:
-            return None
+        """Indice PortAudio del dispositivo scelto; None => predefinito di Windows."""
+        return output_device_index(self.log)
 
     def _sanitize_stream_url(self, raw: str) -> str:
         """Estrae e sanifica un URL di streaming, rimuovendo in modo aggressivo apici/backtick e punteggiatura finale.
@@ -156,6 +235,8 @@ class PlayerFFmpeg:
                 self.log.debug("[DEBUG] Already playing this stream, skipping.")
                 return True
 
+            # Nuova riproduzione: nessun fade residuo (lo sleep timer lo riapplica se serve)
+            self._sink.gain.cancel_fade()
             # Reset state safely (azzera PRIMA di creare il thread)
             with self._state_lock:
                 self._current_stream = safe_url
@@ -166,7 +247,7 @@ class PlayerFFmpeg:
             self.log.debug("[DEBUG] play_url: starting stream thread")
             # Start streaming thread with error handling
             try:
-                self._stream_thread = threading.Thread(target=self._stream_worker, args=(safe_url,))
+                self._stream_thread = threading.Thread(target=self._stream_worker, args=(safe_url,), name="FFmpegStream")
                 self._stream_thread.daemon = True
                 self._stream_thread.start()
             except Exception:
@@ -200,6 +281,11 @@ class PlayerFFmpeg:
             # Capture whether there was an active worker thread
             had_worker_running = bool(self._stream_thread and self._stream_thread.is_alive())
 
+            # Chiude la connessione ICY (sblocca il thread che alimenta ffmpeg)
+            src = self._icy_source
+            if src is not None:
+                src.close()
+
             # Terminate ffmpeg process safely
             with self._state_lock:
                 proc = self._ffmpeg_process
@@ -238,17 +324,7 @@ class PlayerFFmpeg:
                 self._stream_thread = None
 
             # Ora che il thread è terminato, è sicuro rilasciare/ricreare PyAudio (se necessario)
-            if self._pyaudio_instance:
-                try:
-                    self._pyaudio_instance.terminate()
-                except Exception:
-                    pass
-                self._pyaudio_instance = None
-                try:
-                    import pyaudio
-                    self._pyaudio_instance = pyaudio.PyAudio()
-                except Exception:
-                    self._ready = False
+            self._sink.terminate()
 
             self._current_stream = None
             # Evita doppio emit: se c'era un worker attivo, sarà il worker ad emettere 'stopped'
@@ -266,20 +342,17 @@ class PlayerFFmpeg:
 
         try:
             if self._playing:
-                if self._audio_stream and getattr(self._audio_stream, "is_active", lambda: False)():
-                    try:
-                        self._audio_stream.stop_stream()
+                if self._sink.active():
+                    if self._sink.pause():
                         self._paused = True
                         try:
                             self.log.debug("[DEBUG] pause_toggle: paused")
                         except Exception:
                             pass
-                    except Exception:
-                        pass
                     self._emit('paused', None)
-                elif self._audio_stream:
+                elif self._sink.stream is not None:
                     try:
-                        self._audio_stream.start_stream()
+                        self._sink.resume()
                         self._paused = False
                         try:
                             self.log.debug("[DEBUG] pause_toggle: resumed -> playing")
@@ -293,9 +366,21 @@ class PlayerFFmpeg:
 
     def set_volume(self, vol: int) -> None:
         self._volume = max(0.0, min(1.0, float(vol) / 100.0))
+        self._sink.gain.set_volume(self._volume)
 
     def set_mute(self, mute: bool) -> None:
         self._muted = bool(mute)
+        self._sink.gain.set_mute(self._muted)
+
+    def fade_to(self, target: float, duration_s: float, curve: str = 'linear') -> None:
+        """Fade per campione verso `target` (0..1, relativo al volume) in `duration_s` secondi di audio."""
+        self._sink.gain.fade_to(target, duration_s, curve)
+
+    def cancel_fade(self) -> None:
+        self._sink.gain.cancel_fade()
+
+    def fade_gain(self) -> float:
+        return self._sink.gain.fade_gain
 
     def get_volume(self) -> int:
         return int(self._volume * 100)
@@ -312,7 +397,7 @@ class PlayerFFmpeg:
     def get_version(self) -> Optional[str]:
         """Return ffmpeg version string if available."""
         try:
-            result = subprocess.run(['ffmpeg', '-version'],
+            result = subprocess.run(self._ffmpeg_cmd + ['-version'],
                                     capture_output=True, text=True, timeout=5, **({"creationflags": subprocess.CREATE_NO_WINDOW} if sys.platform == "win32" else {}))
             if result.returncode == 0:
                 return result.stdout.split('\n')[0]
@@ -348,21 +433,7 @@ class PlayerFFmpeg:
                     pass
 
             # Force stop audio stream
-            if self._audio_stream:
-                try:
-                    if getattr(self._audio_stream, "is_active", lambda: False)():
-                        try:
-                            self._audio_stream.stop_stream()
-                        except Exception:
-                            pass
-                    try:
-                        self._audio_stream.close()
-                    except Exception:
-                        pass
-                except Exception:
-                    pass
-                finally:
-                    self._audio_stream = None
+            self._sink.close()
 
             # Wait for thread to finish with timeout
             if self._stream_thread and self._stream_thread.is_alive():
@@ -395,6 +466,7 @@ class PlayerFFmpeg:
 
     def _stream_worker(self, url: str) -> None:
         self.log.debug("[DEBUG] _stream_worker: started for url: %s", url)
+        self._sink.reset_timing()
         try:
             self._emit('opening', None)
 
@@ -407,53 +479,7 @@ class PlayerFFmpeg:
 
             # Open audio stream
             self.log.debug("[DEBUG] _stream_worker: opening PyAudio stream")
-            if self._pyaudio_instance is not None and hasattr(self._pyaudio_instance, "open"):
-                pa_format = getattr(pyaudio, "paInt16", None)
-                try:
-                    device_idx = self._get_output_device_index()
-                    if device_idx is None:
-                        self.log.debug("[DEBUG] _stream_worker: using Windows default output device")
-                    else:
-                        self.log.debug("[DEBUG] _stream_worker: using output_device_index=%s", device_idx)
-                    open_kwargs = {
-                        'format': pa_format,
-                        'channels': 2,
-                        'rate': 44100,
-                        'output': True,
-                        'frames_per_buffer': 1024,
-                    }
-                    if device_idx is not None:
-                        open_kwargs['output_device_index'] = device_idx
-                    # Try open; if fails with a specific device, retry with default system device
-                    try:
-                        self._audio_stream = self._pyaudio_instance.open(**open_kwargs)
-                    except Exception as oe:
-                        if device_idx is not None:
-                            try:
-                                self.log.debug("[DEBUG] _stream_worker: failed to open with device %s, retrying with Windows default: %s", device_idx, oe)
-                            except Exception:
-                                pass
-                            try:
-                                open_kwargs.pop('output_device_index', None)
-                                self._audio_stream = self._pyaudio_instance.open(**open_kwargs)
-                            except Exception as oe2:
-                                self.log.debug("[DEBUG] _stream_worker: also failed to open default device: %s", oe2)
-                                raise
-                        else:
-                            raise
-                    self.log.debug("[DEBUG] _stream_worker: PyAudio stream opened")
-                    try:
-                        if hasattr(self._audio_stream, "start_stream"):
-                            self._audio_stream.start_stream()
-                            self.log.debug("[DEBUG] _stream_worker: PyAudio stream started")
-                    except Exception as se:
-                        self.log.debug("[DEBUG] _stream_worker: could not start PyAudio stream: %s", se)
-                except Exception as e:
-                    self.log.debug("[DEBUG] _stream_worker: failed to open PyAudio stream: %s", e)
-                    self._emit('error', None)
-                    return
-            else:
-                self.log.debug("[DEBUG] _stream_worker: PyAudio instance not ready")
+            if not self._sink.open(self._get_output_device_index()):
                 self._emit('error', None)
                 return
 
@@ -466,7 +492,10 @@ class PlayerFFmpeg:
             candidates: List[str] = [safe_url]
             try:
                 u = safe_url.lower()
-                if '/kpop/' in u:
+                if 'listen.moe' not in u:
+                    # Stream non LISTEN.moe (es. stand-in locale): nessun fallback verso la rete
+                    pass
+                elif '/kpop/' in u:
                     # Preferisci HTTPS Vorbis prima di M3U/HTTP
                     candidates.append('https://listen.moe/kpop/stream')
                     candidates.append('https://listen.moe/kpop/stream.m3u')
@@ -497,28 +526,40 @@ class PlayerFFmpeg:
                 except Exception:
                     is_mp3 = False
 
-                ffmpeg_cmd = [
-                    'ffmpeg',
+                # Modalità ICY: una sola connessione per audio e titoli, ffmpeg legge da stdin
+                icy_src: Optional[IcyStream] = None
+                if is_mp3 and self.icy_metadata and self._on_metadata is not None:
+                    icy_src = self._open_icy_source(cur_url)
+                self._icy_pending.clear()
+                self._icy_pcm_bytes = 0
+                self._icy_byterate = (icy_src.bitrate_kbps * 1000.0 / 8.0) if (icy_src and icy_src.bitrate_kbps) else None
+                self._icy_source = icy_src
+
+                ffmpeg_cmd = self._ffmpeg_cmd + [
                     '-hide_banner',
                     '-nostdin',
-                    # Network/HTTP options for robust streaming
-                    '-rw_timeout', '15000000',
-                    '-user_agent', self._user_agent,
                 ]
-                # Add reconnect options to handle stream switches gracefully
-                try:
+                if icy_src is None:
+                    # Network/HTTP options for robust streaming
                     ffmpeg_cmd.extend([
-                        '-reconnect', '1',
-                        '-reconnect_streamed', '1',
-                        '-reconnect_at_eof', '1',
-                        '-reconnect_delay_max', '2',
-                        '-reconnect_on_network_error', '1',
+                        '-rw_timeout', '15000000',
+                        '-user_agent', self._user_agent,
                     ])
+                # Add reconnect options to handle stream switches gracefully
+                try:
+                    if icy_src is None:
+                        ffmpeg_cmd.extend([
+                            '-reconnect', '1',
+                            '-reconnect_streamed', '1',
+                            '-reconnect_at_eof', '1',
+                            '-reconnect_delay_max', '2',
+                            '-reconnect_on_network_error', '1',
+                        ])
                 except Exception:
                     pass
 
                 # Apply MP3-specific headers (some servers expect audio/mpeg Accept)
-                if is_mp3:
+                if is_mp3 and icy_src is None:
                     try:
                         ffmpeg_cmd.extend([
                             '-headers', 'Accept: audio/mpeg\r\nIcy-MetaData: 0\r\n',
@@ -527,8 +568,11 @@ class PlayerFFmpeg:
                     except Exception:
                         pass
 
-                # Input URL
-                ffmpeg_cmd.extend(['-i', cur_url])
+                # Input URL (o stdin con l'audio già separato dai metadati ICY)
+                if icy_src is not None:
+                    ffmpeg_cmd.extend(['-f', 'mp3', '-i', 'pipe:0'])
+                else:
+                    ffmpeg_cmd.extend(['-i', cur_url])
 
                 # Output format: raw PCM s16le to stdout
                 ffmpeg_cmd.extend([
@@ -538,7 +582,6 @@ class PlayerFFmpeg:
                     '-ar', '44100',
                     '-ac', '2',
                     '-acodec', 'pcm_s16le',
-                    '-af', f'volume={self._volume:.2f}',
                     '-loglevel', 'error',
                     '-',
                 ])
@@ -552,7 +595,7 @@ class PlayerFFmpeg:
                         ffmpeg_cmd,
                         stdout=subprocess.PIPE,
                         stderr=subprocess.PIPE,
-                        stdin=subprocess.DEVNULL,
+                        stdin=subprocess.PIPE if icy_src is not None else subprocess.DEVNULL,
                         bufsize=0,
                         **({"creationflags": subprocess.CREATE_NO_WINDOW} if sys.platform == "win32" else {})
                     )
@@ -560,8 +603,15 @@ class PlayerFFmpeg:
                 except Exception as e:
                     self.log.debug("[DEBUG] _stream_worker: failed to start ffmpeg: %s", e)
                     self._ffmpeg_process = None
+                    if icy_src is not None:
+                        icy_src.close()
+                        self._icy_source = None
                     # Prova prossimo candidato
                     continue
+                if icy_src is not None:
+                    self._icy_active = True
+                    threading.Thread(target=self._icy_pump, args=(icy_src, self._ffmpeg_process),
+                                     name="IcyPump", daemon=True).start()
 
                 # Loop di lettura dei dati
                 chunk_size = 4096
@@ -603,9 +653,10 @@ class PlayerFFmpeg:
                                 except Exception:
                                     pass
                             break
-                        time.sleep(0.5)
+                        # Attesa interrompibile: alla fine del tentativo il join è immediato
+                        watchdog_stop.wait(0.5)
 
-                watchdog_thread = threading.Thread(target=_stall_watchdog_local, daemon=True)
+                watchdog_thread = threading.Thread(target=_stall_watchdog_local, name="FFmpegWatchdog", daemon=True)
                 try:
                     watchdog_thread.start()
                 except Exception:
@@ -675,6 +726,12 @@ class PlayerFFmpeg:
                             continue
                         else:
                             self.log.debug("[DEBUG] _stream_worker: ffmpeg stdout EOF or empty chunk after process ended")
+                            # EOF letto prima del controllo in cima al ciclo: stesso criterio sul codice di uscita
+                            try:
+                                if proc.returncode not in (0, None):
+                                    forced_error = True
+                            except Exception:
+                                pass
                             break
 
                     # got data
@@ -684,58 +741,27 @@ class PlayerFFmpeg:
                         started_streaming = True
                         self._emit('playing', None)
 
+                    # Un byte dispari finale resta nello stadio di guadagno fino al blocco successivo
                     n_bytes = (len(chunk) // 2) * 2
-                    if n_bytes == 0:
-                        time.sleep(0.01)
-                        continue
-                    data = chunk[:n_bytes]
+                    if icy_src is not None:
+                        self._icy_advance(len(chunk))
 
                     # Avoid writing to PyAudio when paused/stream inactive to prevent [Errno -9988] spam
-                    stream_active = False
-                    if self._audio_stream is not None:
-                        try:
-                            stream_active = getattr(self._audio_stream, "is_active", lambda: False)()
-                        except Exception:
-                            stream_active = False
-
-                    if not self._muted:
-                        try:
-                            samples = struct.unpack(f'<{n_bytes // 2}h', data)
-                            volume_samples = [int(sample * self._volume) for sample in samples]
-                            volume_samples = [max(-32768, min(32767, s)) for s in volume_samples]
-                            volume_chunk = struct.pack(f'<{len(volume_samples)}h', *volume_samples)
-                            if self._audio_stream is not None and stream_active:
-                                self._audio_stream.write(volume_chunk)
-                            else:
-                                # Paused or no audio stream: skip writing to avoid errors
-                                time.sleep(0.02)
-                                continue
-                        except Exception as e:
-                            # Log errors only if stream is active; otherwise likely paused/closed
-                            if stream_active:
-                                self.log.debug("[DEBUG] _stream_worker: error in audio processing: %s", e)
-                                try:
-                                    if self._audio_stream is not None and stream_active:
-                                        self._audio_stream.write(b'\x00' * n_bytes)
-                                except Exception as e2:
-                                    self.log.debug("[DEBUG] _stream_worker: error writing silence: %s", e2)
-                            else:
-                                time.sleep(0.02)
-                                continue
-                    else:
+                    if not self._sink.active():
+                        # Paused or no audio stream: skip writing to avoid errors
+                        self._sink.gain.discard(chunk)
+                        self._sink.reset_timing()
+                        time.sleep(0.02)
+                        continue
+                    try:
+                        # Volume, muto e fade (rampa per campione) nello stadio di guadagno
+                        self._sink.write(chunk)
+                    except Exception as e:
+                        self.log.debug("[DEBUG] _stream_worker: error in audio processing: %s", e)
                         try:
-                            if self._audio_stream is not None and stream_active:
-                                self._audio_stream.write(b'\x00' * n_bytes)
-                            else:
-                                # Paused or no audio stream: skip writing to avoid errors
-                                time.sleep(0.02)
-                                continue
-                        except Exception as e:
-                            if stream_active:
-                                self.log.debug("[DEBUG] _stream_worker: error writing silence (muted): %s", e)
-                            else:
-                                # Suppress spam when paused/closed
-                                pass
+                            self._sink.write_raw(b'\x00' * n_bytes)
+                        except Exception as e2:
+                            self.log.debug("[DEBUG] _stream_worker: error writing silence: %s", e2)
 
                 # prova a spegnere il watchdog
                 try:
@@ -790,12 +816,7 @@ class PlayerFFmpeg:
                     data = chunk[:n_bytes]
 
                     # Avoid writing to PyAudio when paused/stream inactive to prevent [Errno -9988] spam
-                    stream_active = False
-                    if self._audio_stream is not None:
-                        try:
-                            stream_active = getattr(self._audio_stream, "is_active", lambda: False)()
-                        except Exception:
-                            stream_active = False
+                    stream_active = self._sink.active()
 
                     if not self._muted:
                         try:
@@ -803,10 +824,11 @@ class PlayerFFmpeg:
                             volume_samples = [int(sample * self._volume) for sample in samples]
                             volume_samples = [max(-32768, min(32767, s)) for s in volume_samples]
                             volume_chunk = struct.pack(f'<{len(volume_samples)}h', *volume_samples)
-                            if self._audio_stream is not None and stream_active:
-                                self._audio_stream.write(volume_chunk)
+                            if stream_active:
+                                self._sink.write_raw(volume_chunk)
                             else:
                                 # Paused or no audio stream: skip writing to avoid errors
+                                self._sink.reset_timing()
                                 time.sleep(0.02)
                                 continue
                         except Exception as e:
@@ -814,8 +836,8 @@ class PlayerFFmpeg:
                             if stream_active:
                                 self.log.debug("[DEBUG] _stream_worker: error in audio processing: %s", e)
                                 try:
-                                    if self._audio_stream is not None and stream_active:
-                                        self._audio_stream.write(b'\x00' * n_bytes)
+                                    if stream_active:
+                                        self._sink.write_raw(b'\x00' * n_bytes)
                                 except Exception as e2:
                                     self.log.debug("[DEBUG] _stream_worker: error writing silence: %s", e2)
                             else:
@@ -823,10 +845,11 @@ class PlayerFFmpeg:
                                 continue
                     else:
                         try:
-                            if self._audio_stream is not None and stream_active:
-                                self._audio_stream.write(b'\x00' * n_bytes)
+                            if stream_active:
+                                self._sink.write_raw(b'\x00' * n_bytes)
                             else:
                                 # Paused or no audio stream: skip writing to avoid errors
+                                self._sink.reset_timing()
                                 time.sleep(0.02)
                                 continue
                         except Exception as e:
@@ -898,23 +921,13 @@ class PlayerFFmpeg:
         finally:
             self.log.debug("[DEBUG] _stream_worker: final cleanup")
             self._playing = False
+            self._icy_active = False
+            src = self._icy_source
+            self._icy_source = None
+            if src is not None:
+                src.close()
             self._current_stream = None
-            if self._audio_stream:
-                try:
-                    if getattr(self._audio_stream, "is_active", lambda: False)():
-                        try:
-                            self._audio_stream.stop_stream()
-                            self.log.debug("[DEBUG] _stream_worker: audio stream stopped")
-                        except Exception as e:
-                            self.log.debug("[DEBUG] _stream_worker: error stopping audio stream: %s", e)
-                    try:
-                        self._audio_stream.close()
-                        self.log.debug("[DEBUG] _stream_worker: audio stream closed")
-                    except Exception as e:
-                        self.log.debug("[DEBUG] _stream_worker: error closing audio stream: %s", e)
-                except Exception as e:
-                    self.log.debug("[DEBUG] _stream_worker: error in audio stream cleanup: %s", e)
-                self._audio_stream = None
+            self._sink.close()
             with self._state_lock:
                 # Clear thread reference if we're the worker thread
                 try:
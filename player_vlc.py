@@ -1,17 +1,59 @@
 from __future__ import annotations
-from typing import Optional, Callable
+from typing import Any, Callable, Dict, Optional
+import ctypes
 import os
+import threading
+import time
 
-from constants import APP_NAME, APP_VERSION
+from logger import get_logger
+from constants import APP_NAME, APP_VERSION, KEY_VLC_PYTHON_AUDIO
+from config import STREAMS, stream_url_for
+from settings_store import get_settings
+from gain import fade_gain_at
+from audio_sink import AudioSink, output_device_index
 
 try:
     import vlc
 except Exception:
     vlc = None  # type: ignore
 
+try:
+    import pyaudio
+except Exception:
+    pyaudio = None  # type: ignore
+
+# VLC non espone il PCM: il fade procede a passi di volume, 20 al secondo
+FADE_STEP_S = 0.05
+# Attesa massima dell'evento MediaPlayerStopped dopo stop()
+STOP_TIMEOUT_S = 2.0
+# Media tenuti pronti: i canali/formati noti più qualche URL diverso (fallback, stand-in)
+MEDIA_CACHE_MAX = 12
+# Formato PCM chiesto a libVLC con le callback audio (lo stesso dell'uscita di ffmpeg)
+SINK_FORMAT = "S16N"
+SINK_RATE = 44100
+SINK_CHANNELS = 2
+
 
 class PlayerVLC:
-    def __init__(self, libvlc_path: Optional[str] = None, on_event: Optional[Callable[[str, Optional[int]], None]] = None, network_caching_ms: Optional[int] = None) -> None:
+    def __init__(self, libvlc_path: Optional[str] = None, on_event: Optional[Callable[[str, Optional[int]], None]] = None, network_caching_ms: Optional[int] = None,
+                 vlc_module: Optional[Any] = None, pyaudio_module: Optional[Any] = None,
+                 python_audio: Optional[bool] = None) -> None:
+        # Moduli python-vlc e pyaudio sostituibili (es. tools/fake_backends.FakeVlc/FakePyAudio)
+        self._vlc = vlc_module if vlc_module is not None else vlc
+        self._pyaudio = pyaudio_module if pyaudio_module is not None else pyaudio
+        self.log = get_logger('PlayerVLC')
+        # Uscita audio: libVLC (predefinita) oppure PCM via callback nell'uscita condivisa con
+        # FFmpeg (guadagno, dispositivo scelto, misure). None => impostazione KEY_VLC_PYTHON_AUDIO
+        if python_audio is None:
+            try:
+                python_audio = get_settings().get_bool(KEY_VLC_PYTHON_AUDIO, False)
+            except Exception:
+                python_audio = False
+        self._python_audio_requested = bool(python_audio)
+        self._sink: Optional[AudioSink] = None
+        self._sink_lock = threading.Lock()
+        self._sink_device: Optional[int] = None
+        self._audio_cbs: Optional[tuple] = None
         self._vlc_path = libvlc_path
         self._on_event = on_event
         self._network_caching_ms: Optional[int] = int(network_caching_ms) if network_caching_ms is not None else None
@@ -19,7 +61,13 @@ class PlayerVLC:
         self.player: Optional['vlc.MediaPlayer'] = None
         self._muted: bool = False
         self._volume: int = 100
+        # Guadagno di fade (sleep timer) moltiplicato al volume utente, che resta invariato
+        self._fade_gain: float = 1.0
+        self._fade_stop: Optional[threading.Event] = None
         self._ready: bool = False
+        # Media riusati per URL (creati una volta per istanza libVLC) e segnale di stop completato
+        self._media_cache: Dict[str, Any] = {}
+        self._stopped = threading.Event()
         # Build dynamic User-Agent similar to ffmpeg backend
         try:
             self._user_agent = f"{APP_NAME}/{APP_VERSION}"
@@ -29,6 +77,9 @@ class PlayerVLC:
 
     def _init_vlc(self) -> None:
         self._ready = False
+        # I media appartengono all'istanza precedente
+        self._release_media_cache()
+        vlc = self._vlc
         if vlc is None:
             return
         # Setup plugin path if provided
@@ -77,10 +128,12 @@ class PlayerVLC:
                 em.event_attach(vlc.EventType.MediaPlayerEncounteredError, self._handle_event)
             except Exception:
                 pass
+            self._setup_python_audio()
             # Apply last known audio state
-            self.player.audio_set_volume(self._volume)
+            self.player.audio_set_volume(self._effective_volume())
             self.player.audio_set_mute(self._muted)
             self._ready = True
+            self._prepare_media()
         except Exception:
             self.instance = None
             self.player = None
@@ -89,6 +142,97 @@ class PlayerVLC:
     def is_ready(self) -> bool:
         return bool(self._ready and self.instance is not None and self.player is not None)
 
+    def python_audio(self) -> bool:
+        """True se il PCM di libVLC passa dall'uscita condivisa (AudioSink) invece che da VLC."""
+        return self._sink is not None
+
+    # -------- Uscita audio via callback (libvlc_audio_set_callbacks) --------
+    def _setup_python_audio(self) -> None:
+        """Registra le callback audio sul nuovo media player; se non disponibili resta l'uscita di VLC."""
+        self._audio_cbs = None
+        if not self._python_audio_requested:
+            self._sink = None
+            return
+        if self._pyaudio is None:
+            self.log.info("Uscita audio Python richiesta ma PyAudio non è disponibile: uso l'uscita di VLC")
+            self._sink = None
+            return
+        try:
+            cb = self._vlc.CallbackDecorators
+            # Riferimenti tenuti in vita finché il player esiste (ctypes non li trattiene)
+            self._audio_cbs = (cb.AudioPlayCb(self._on_audio_play), cb.AudioPauseCb(self._on_audio_pause),
+                               cb.AudioResumeCb(self._on_audio_resume), cb.AudioFlushCb(self._on_audio_flush),
+                               cb.AudioDrainCb(self._on_audio_drain))
+            self.player.audio_set_callbacks(*self._audio_cbs, None)
+            self.player.audio_set_format(SINK_FORMAT, SINK_RATE, SINK_CHANNELS)
+        except Exception as e:
+            self.log.warning("Callback audio di libVLC non disponibili, uso l'uscita di VLC: %s", e)
+            self._audio_cbs = None
+            self._sink = None
+            return
+        if self._sink is None:
+            self._sink = AudioSink(self._pyaudio, rate=SINK_RATE, channels=SINK_CHANNELS,
+                                   volume=self._volume / 100.0)
+            self._sink.gain.set_mute(self._muted)
+
+    def _open_sink(self) -> bool:
+        """Stream d'uscita per il prossimo play: riusato tra un cambio e l'altro se il dispositivo non cambia."""
+        sink = self._sink
+        device = output_device_index(self.log)
+        with self._sink_lock:
+            if sink.stream is not None and device == self._sink_device:
+                if not sink.active():
+                    sink.resume()
+                return True
+            sink.close()
+            self._sink_device = device
+            return sink.open(device)
+
+    def _close_sink(self, terminate: bool = False) -> None:
+        sink = self._sink
+        if sink is None:
+            return
+        with self._sink_lock:
+            sink.close()
+            if terminate:
+                sink.terminate()
+
+    def _on_audio_play(self, _opaque, samples, count, _pts) -> None:
+        # Thread audio di libVLC: il buffer del decoder è letto senza copie intermedie,
+        # l'unica copia la fa lo stadio di guadagno (o write() a guadagno unitario)
+        sink = self._sink
+        if sink is None or not samples:
+            return
+        try:
+            with self._sink_lock:
+                if not sink.active():
+                    return
+                n = int(count) * sink.channels * 2
+                sink.write(memoryview((ctypes.c_char * n).from_address(samples)))
+        except Exception as e:
+            self.log.debug("[DEBUG] audio callback: write failed: %s", e)
+
+    def _on_audio_pause(self, _opaque, _pts) -> None:
+        sink = self._sink
+        if sink is not None:
+            with self._sink_lock:
+                sink.pause()
+
+    def _on_audio_resume(self, _opaque, _pts) -> None:
+        sink = self._sink
+        if sink is not None:
+            with self._sink_lock:
+                sink.resume()
+
+    def _on_audio_flush(self, _opaque, _pts) -> None:
+        # Le scritture sono bloccanti: in PortAudio non resta nulla da scartare oltre il suo buffer
+        sink = self._sink
+        if sink is not None:
+            sink.reset_timing()
+
+    def _on_audio_drain(self, _opaque) -> None:
+        pass
+
     def reinitialize(self, libvlc_path: Optional[str], network_caching_ms: Optional[int] = None) -> bool:
         self._vlc_path = libvlc_path
         if network_caching_ms is not None:
@@ -113,25 +257,19 @@ class PlayerVLC:
             # Also emit as generic error with code for older handlers, if any
             self._emit('error', None)
             return False
+        # Nuova riproduzione: nessun fade residuo (lo sleep timer lo riapplica se serve)
+        self.cancel_fade()
         try:
             assert self.instance is not None and self.player is not None
-            # Force stop current stream
-            self.player.stop()
-            # Clear media to force connection close
-            self.player.set_media(None)
-            # Wait for cleanup
-            import time
-            time.sleep(0.3)
-            # Create and set new media
-            media = self.instance.media_new(url)
-            # Also set per-media user agent to be extra sure
-            try:
-                if getattr(self, "_user_agent", None):
-                    media.add_option(f":http-user-agent={self._user_agent}")
-            except Exception:
-                pass
-            self.player.set_media(media)
-            self.player.play()
+            # Stop dello stream corrente: si attende l'evento Stopped, non un tempo fisso
+            self._stop_and_wait()
+            if self._sink is not None and not self._open_sink():
+                self._emit('error', None)
+                return False
+            self.player.set_media(self._media_for(url))
+            if self.player.play() == -1:
+                self._emit('error', None)
+                return False
             return True
         except Exception:
             self._emit('error', None)
@@ -143,15 +281,77 @@ class PlayerVLC:
             return
         try:
             assert self.player is not None
-            # Stop and clear media
-            self.player.stop()
-            self.player.set_media(None)
-            # Force cleanup of any remaining connections
-            self.force_kill_all_vlc()
-            self._emit('stopped', None)
+            # Con uno stream attivo lo stato 'stopped' arriva dall'evento MediaPlayerStopped
+            stopped_now = self._stop_and_wait()
+            # Fermo: si rilascia il dispositivo (e PortAudio, che rilegge i dispositivi al prossimo play)
+            self._close_sink(terminate=True)
+            if not stopped_now:
+                self._emit('stopped', None)
         except Exception:
             self._emit('error', None)
 
+    def _stop_and_wait(self, timeout: float = STOP_TIMEOUT_S) -> bool:
+        """Ferma il player e attende MediaPlayerStopped. False se non c'era nulla da fermare."""
+        player = self.player
+        if player is None:
+            return False
+        states = self._vlc.State
+        try:
+            state = player.get_state()
+        except Exception:
+            state = None
+        if state in (states.NothingSpecial, states.Stopped):
+            return False
+        if state in (states.Ended, states.Error):
+            # Input già chiuso: lo stop è immediato e non sempre produce l'evento
+            player.stop()
+            return False
+        self._stopped.clear()
+        player.stop()
+        self._stopped.wait(timeout)
+        return True
+
+    def _media_for(self, url: str) -> Any:
+        """Media per l'URL, creato una sola volta e riusato a ogni play."""
+        media = self._media_cache.get(url)
+        if media is not None:
+            return media
+        assert self.instance is not None
+        media = self.instance.media_new(url)
+        # Also set per-media user agent to be extra sure
+        try:
+            if getattr(self, "_user_agent", None):
+                media.add_option(f":http-user-agent={self._user_agent}")
+        except Exception:
+            pass
+        if len(self._media_cache) >= MEDIA_CACHE_MAX:
+            # Scarta il più vecchio (non è quello in uso: il player è fermo qui)
+            old_url = next(iter(self._media_cache))
+            old = self._media_cache.pop(old_url)
+            try:
+                old.release()
+            except Exception:
+                pass
+        self._media_cache[url] = media
+        return media
+
+    def _prepare_media(self) -> None:
+        """Crea in anticipo i media di tutti i canali/formati: il cambio non li alloca più."""
+        for channel, formats in STREAMS.items():
+            for fmt in formats:
+                try:
+                    self._media_for(stream_url_for(channel, fmt))
+                except Exception:
+                    pass
+
+    def _release_media_cache(self) -> None:
+        cache, self._media_cache = self._media_cache, {}
+        for media in cache.values():
+            try:
+                media.release()
+            except Exception:
+                pass
+
     def pause_toggle(self) -> None:
         if not self.is_ready():
             self._emit('libvlc_init_failed', None)
@@ -164,16 +364,84 @@ class PlayerVLC:
 
     def set_volume(self, vol: int) -> None:
         self._volume = max(0, min(100, int(vol)))
+        if self._sink is not None:
+            # Volume applicato al PCM; quello di VLC resta al 100%
+            self._sink.gain.set_volume(self._volume / 100.0)
+            return
         if not self.is_ready():
             return
         try:
             assert self.player is not None
-            self.player.audio_set_volume(self._volume)
+            self.player.audio_set_volume(self._effective_volume())
         except Exception:
             self._emit('error', None)
 
+    def _effective_volume(self) -> int:
+        if self._sink is not None:
+            return 100
+        return int(round(self._volume * self._fade_gain))
+
+    def fade_to(self, target: float, duration_s: float, curve: str = 'linear') -> None:
+        """Fade verso `target` (0..1, relativo al volume) in `duration_s`: passi di volume ogni FADE_STEP_S."""
+        if self._sink is not None:
+            # Uscita condivisa: rampa per campione come con FFmpeg
+            self._sink.gain.fade_to(target, duration_s, curve)
+            return
+        target = max(0.0, min(1.0, float(target)))
+        duration_s = max(0.0, float(duration_s))
+        self._stop_fade()
+        start = self._fade_gain
+        if duration_s <= 0.0:
+            self._fade_gain = target
+            self._apply_fade_volume()
+            return
+        stop = threading.Event()
+        self._fade_stop = stop
+
+        def _run() -> None:
+            t0 = time.monotonic()
+            while not stop.is_set():
+                t = (time.monotonic() - t0) / duration_s
+                self._fade_gain = fade_gain_at(start, target, t, curve)
+                self._apply_fade_volume()
+                if t >= 1.0:
+                    break
+                stop.wait(FADE_STEP_S)
+
+        threading.Thread(target=_run, name="VLCFade", daemon=True).start()
+
+    def cancel_fade(self) -> None:
+        if self._sink is not None:
+            self._sink.gain.cancel_fade()
+        self._stop_fade()
+        if self._fade_gain != 1.0:
+            self._fade_gain = 1.0
+            self._apply_fade_volume()
+
+    def fade_gain(self) -> float:
+        if self._sink is not None:
+            return self._sink.gain.fade_gain
+        return self._fade_gain
+
+    def _stop_fade(self) -> None:
+        stop = self._fade_stop
+        self._fade_stop = None
+        if stop is not None:
+            stop.set()
+
+    def _apply_fade_volume(self) -> None:
+        if not self.is_ready():
+            return
+        try:
+            self.player.audio_set_volume(self._effective_volume())
+        except Exception:
+            pass
+
     def set_mute(self, mute: bool) -> None:
         self._muted = bool(mute)
+        if self._sink is not None:
+            self._sink.gain.set_mute(self._muted)
+            return
         if not self.is_ready():
             return
         try:
@@ -193,12 +461,14 @@ class PlayerVLC:
             return False
         try:
             st = self.player.get_state()
-            return st in (vlc.State.Playing, vlc.State.Buffering, vlc.State.Opening)
+            states = self._vlc.State
+            return st in (states.Playing, states.Buffering, states.Opening)
         except Exception:
             return False
 
     # VLC event handler
     def _handle_event(self, event):
+        vlc = self._vlc
         if vlc is None:
             return
         et = event.type
@@ -217,19 +487,22 @@ class PlayerVLC:
         elif et == vlc.EventType.MediaPlayerPaused:
             self._emit('paused', None)
         elif et == vlc.EventType.MediaPlayerStopped:
+            self._stopped.set()
             self._emit('stopped', None)
         elif et == vlc.EventType.MediaPlayerEndReached:
+            self._close_sink()
             self._emit('ended', None)
         elif et == vlc.EventType.MediaPlayerEncounteredError:
+            self._close_sink()
             self._emit('error', None)
 
     # -------- Dettagli/diagnostica VLC --------
     def get_version(self) -> Optional[str]:
         """Return libVLC version string if available, otherwise None."""
-        if vlc is None:
+        if self._vlc is None:
             return None
         try:
-            ver = vlc.libvlc_get_version()  # type: ignore[attr-defined]
+            ver = self._vlc.libvlc_get_version()  # type: ignore[attr-defined]
             if isinstance(ver, bytes):
                 ver = ver.decode(errors='ignore')
             return str(ver)
@@ -241,41 +514,23 @@ class PlayerVLC:
         return self._vlc_path
 
     def force_kill_all_vlc(self) -> None:
-        """Force kill all VLC processes as last resort."""
-        try:
-            import subprocess
-            import platform
-            
-            if platform.system() == "Windows":
-                # Kill VLC processes on Windows
-                subprocess.run(["taskkill", "/f", "/im", "vlc.exe"],
-                               capture_output=True, check=False,
-                               **({"creationflags": subprocess.CREATE_NO_WINDOW} if platform.system() == "Windows" else {}))
-                subprocess.run(["taskkill", "/f", "/im", "libvlc.dll"],
-                               capture_output=True, check=False,
-                               **({"creationflags": subprocess.CREATE_NO_WINDOW} if platform.system() == "Windows" else {}))
-            else:
-                # Kill VLC processes on Unix-like systems
-                subprocess.run(["pkill", "-f", "vlc"], 
-                             capture_output=True, check=False)
-                subprocess.run(["pkill", "-f", "libvlc"], 
-                             capture_output=True, check=False)
-        except Exception:
-            pass
+        """Ultima risorsa: ricrea l'istanza libVLC.
+        libVLC gira nel nostro processo, quindi non ci sono processi da terminare
+        (`pkill -f vlc` colpiva anche VLC dell'utente e qualunque comando contenente "vlc")."""
+        self._force_complete_cleanup()
 
     def force_cleanup(self) -> None:
         """Force cleanup of current media and connections."""
         if not self.is_ready():
             return
         try:
-            # Force cleanup
             assert self.player is not None
-            self.player.stop()
+            self._stop_and_wait()
             self.player.set_media(None)
-            import time
-            time.sleep(0.2)
-            # Force kill any remaining VLC processes
-            self.force_kill_all_vlc()
+            self._close_sink()
+            # Input ancora aperto dopo l'attesa: si ricrea l'istanza
+            if self.is_playing():
+                self._force_complete_cleanup()
         except Exception:
             pass
 
@@ -285,37 +540,36 @@ class PlayerVLC:
             # Save current volume and mute state
             current_volume = self._volume
             current_mute = self._muted
-            
+
             # Stop and release current player
             if self.player:
                 try:
                     self.player.stop()
                     self.player.set_media(None)
+                    self.player.release()
                 except Exception:
                     pass
-            
+            self._release_media_cache()
+            self._close_sink(terminate=True)
+
             # Release the instance completely
             if self.instance:
                 try:
                     self.instance.release()
                 except Exception:
                     pass
-            
+
             # Clear references
             self.player = None
             self.instance = None
             self._ready = False
-            
-            # Wait longer for complete cleanup
-            import time
-            time.sleep(0.5)
-            
+
             # Reinitialize VLC
             self._init_vlc()
-            
+
             # Restore volume and mute state
             if self.is_ready():
                 self.set_volume(current_volume)
                 self.set_mute(current_mute)
         except Exception:
-            pass
\ No newline at end of file
+            pass
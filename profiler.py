@@ -0,0 +1,246 @@
+from __future__ import annotations
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+import marshal
+import os
+import sys
+import threading
+import time
+
+# Profiler a campionamento per tutti i thread (GUI, FFmpegStream, FFmpegWatchdog,
+# NowPlayingWS, ...). Un thread dedicato legge gli stack con sys._current_frames()
+# a intervalli regolari: nessun hook di tracing, quindi il codice profilato non
+# rallenta. Da fermo non esiste né il thread né alcun hook (overhead zero).
+# Esportazione: formato "collapsed" (una riga per stack, per flamegraph.pl /
+# speedscope / inferno) e file pstats (snakeviz, python -m pstats).
+# I campioni misurano il tempo reale (un thread fermo in attesa compare comunque);
+# dove possibile (Linux, /proc) il riepilogo riporta anche la CPU usata da ogni thread.
+
+DEFAULT_INTERVAL_S = 0.005
+# Profondità massima di uno stack campionato (ricorsioni molto profonde)
+MAX_STACK_DEPTH = 128
+
+# (file, prima riga, funzione): la stessa chiave usata da cProfile/pstats
+FuncKey = Tuple[str, int, str]
+
+
+def _thread_cpu_times() -> Dict[int, float]:
+    """CPU (utente + sistema, in secondi) per native id dei thread del processo; {} se non disponibile."""
+    out: Dict[int, float] = {}
+    try:
+        tick = float(os.sysconf('SC_CLK_TCK'))
+        base = f"/proc/{os.getpid()}/task"
+        for tid in os.listdir(base):
+            try:
+                with open(f"{base}/{tid}/stat", 'r') as f:
+                    fields = f.read().rsplit(')', 1)[1].split()
+                # utime e stime sono i campi 14 e 15 (qui 11 e 12 dopo il nome)
+                out[int(tid)] = (int(fields[11]) + int(fields[12])) / tick
+            except Exception:
+                pass
+    except Exception:
+        pass
+    return out
+
+
+def _func_label(key: FuncKey) -> str:
+    filename, _line, func = key
+    base = os.path.basename(filename)
+    if base.endswith('.py'):
+        base = base[:-3]
+    return f"{base}:{func}" if base else func
+
+
+class SamplingProfiler:
+    """Campiona gli stack di tutti i thread ogni `interval` secondi tra start() e stop()."""
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL_S) -> None:
+        self.interval = max(0.001, float(interval))
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # (nome thread, stack dalla radice alla foglia) -> campioni
+        self._stacks: Counter = Counter()
+        self._thread_samples: Counter = Counter()
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self.duration = 0.0
+        # Tempo speso dal campionatore (per stimare il proprio costo)
+        self.sampler_time = 0.0
+        # CPU per thread all'avvio e nome -> CPU usata durante il profilo
+        self._cpu_start: Dict[int, float] = {}
+        self._thread_cpu: Dict[str, float] = {}
+
+    # ---- Ciclo di vita ----
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self.reset()
+        self._stop.clear()
+        self._cpu_start = _thread_cpu_times()
+        self.started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="SamplingProfiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        thread = self._thread
+        if thread is None:
+            return
+        self._stop.set()
+        thread.join(timeout=2.0)
+        self._thread = None
+        if self.started_at is not None:
+            self.duration = time.monotonic() - self.started_at
+        # I thread terminati durante il profilo non compaiono più in /proc
+        cpu_end = _thread_cpu_times()
+        if cpu_end:
+            names = {t.native_id: t.name for t in threading.enumerate() if getattr(t, 'native_id', None)}
+            self._thread_cpu = {names[tid]: max(0.0, cpu - self._cpu_start.get(tid, 0.0))
+                                for tid, cpu in cpu_end.items() if tid in names}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stacks.clear()
+            self._thread_samples.clear()
+            self.samples = 0
+            self.duration = 0.0
+            self.sampler_time = 0.0
+            self._thread_cpu = {}
+
+    def elapsed(self) -> float:
+        if self._thread is not None and self.started_at is not None:
+            return time.monotonic() - self.started_at
+        return self.duration
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        next_at = time.monotonic()
+        while not self._stop.is_set():
+            t0 = time.monotonic()
+            try:
+                self._sample(own)
+            except Exception:
+                pass
+            self.sampler_time += time.monotonic() - t0
+            # Cadenza fissa; se il campionatore è in ritardo non recupera a raffica
+            next_at = max(next_at + self.interval, time.monotonic())
+            self._stop.wait(max(0.0, next_at - time.monotonic()))
+
+    def _sample(self, own_ident: int) -> None:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        frames = sys._current_frames()
+        batch = []
+        for ident, frame in frames.items():
+            if ident == own_ident:
+                continue
+            stack = []
+            f = frame
+            while f is not None and len(stack) < MAX_STACK_DEPTH:
+                code = f.f_code
+                stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                f = f.f_back
+            stack.reverse()
+            batch.append((names.get(ident, f"thread-{ident}"), tuple(stack)))
+        del frames
+        with self._lock:
+            for key in batch:
+                self._stacks[key] += 1
+                self._thread_samples[key[0]] += 1
+            self.samples += 1
+
+    # ---- Risultati ----
+    def _snapshot(self) -> Dict[Tuple[str, Tuple[FuncKey, ...]], int]:
+        with self._lock:
+            return dict(self._stacks)
+
+    def threads(self) -> List[Tuple[str, int]]:
+        """(nome thread, campioni) in ordine decrescente."""
+        with self._lock:
+            return self._thread_samples.most_common()
+
+    def thread_cpu(self) -> Dict[str, float]:
+        """CPU (secondi) usata da ciascun thread tra start() e stop(); vuoto se non misurabile."""
+        return dict(self._thread_cpu)
+
+    def top_functions(self, thread: Optional[str] = None, limit: int = 15) -> List[Tuple[FuncKey, int, int]]:
+        """(funzione, campioni propri, campioni cumulativi) ordinati per campioni propri."""
+        own: Counter = Counter()
+        cumulative: Counter = Counter()
+        for (tname, stack), count in self._snapshot().items():
+            if (thread is not None and tname != thread) or not stack:
+                continue
+            own[stack[-1]] += count
+            for func in set(stack):
+                cumulative[func] += count
+        rows = [(func, own[func], cumulative[func]) for func in cumulative]
+        rows.sort(key=lambda r: (r[1], r[2]), reverse=True)
+        return rows[:max(0, int(limit))]
+
+    def report(self, limit: int = 10) -> str:
+        """Riepilogo testuale: funzioni più presenti per ciascun thread."""
+        elapsed = self.elapsed()
+        lines = [f"{self.samples} campioni in {elapsed:.1f} s (intervallo {self.interval * 1000:.0f} ms, "
+                 f"costo campionatore {self.sampler_time * 1000:.0f} ms)"]
+        # Prima i thread che hanno usato più CPU (i campioni contano anche le attese)
+        threads = sorted(self.threads(), key=lambda t: (self._thread_cpu.get(t[0], -1.0), t[1]), reverse=True)
+        for tname, tcount in threads:
+            lines.append("")
+            cpu = self._thread_cpu.get(tname)
+            cpu_txt = f", CPU {cpu:.2f} s ({cpu * 100.0 / elapsed:.0f}%)" if cpu is not None and elapsed > 0 else ""
+            lines.append(f"== {tname}: {tcount} campioni{cpu_txt} ==")
+            lines.append(f"{'proprio':>8} {'totale':>8}  funzione")
+            for func, own, cum in self.top_functions(tname, limit):
+                lines.append(f"{own * 100.0 / tcount:7.1f}% {cum * 100.0 / tcount:7.1f}%  "
+                             f"{_func_label(func)} ({os.path.basename(func[0])}:{func[1]})")
+        return "\n".join(lines)
+
+    def export_collapsed(self, path: str) -> int:
+        """Scrive una riga "thread;mod:funz;...;mod:funz campioni" per stack. Ritorna le righe scritte."""
+        rows = sorted(self._snapshot().items(), key=lambda kv: kv[0][0])
+        with open(path, 'w', encoding='utf-8') as f:
+            for (tname, stack), count in rows:
+                frames = [tname.replace(';', '_').replace(' ', '_')]
+                frames.extend(_func_label(func).replace(';', '_').replace(' ', '_') for func in stack)
+                f.write(f"{';'.join(frames)} {count}\n")
+        return len(rows)
+
+    def export_pstats(self, path: str) -> None:
+        """Scrive un file leggibile da pstats.Stats: ogni campione vale `interval` secondi
+        e conta come una chiamata (i conteggi di chiamate sono quindi stimati)."""
+        stats: Dict[FuncKey, list] = {}
+        callers: Dict[FuncKey, Counter] = {}
+        for (_tname, stack), count in self._snapshot().items():
+            if not stack:
+                continue
+            seen = set()
+            for i, func in enumerate(stack):
+                entry = stats.setdefault(func, [0, 0, 0.0, 0.0])
+                if func not in seen:
+                    # Tempo cumulativo: una sola volta per stack anche con ricorsione
+                    seen.add(func)
+                    entry[3] += count * self.interval
+                    entry[0] += count
+                    entry[1] += count
+                if i > 0:
+                    callers.setdefault(func, Counter())[stack[i - 1]] += count
+            stats[stack[-1]][2] += count * self.interval
+        out = {}
+        for func, (cc, nc, tt, ct) in stats.items():
+            caller_map = {c: (n, n, 0.0, n * self.interval) for c, n in callers.get(func, Counter()).items()}
+            out[func] = (cc, nc, tt, ct, caller_map)
+        with open(path, 'wb') as f:
+            marshal.dump(out, f)
+
+
+_profiler: Optional[SamplingProfiler] = None
+
+
+def get_profiler() -> SamplingProfiler:
+    global _profiler
+    if _profiler is None:
+        _profiler = SamplingProfiler()
+    return _profiler
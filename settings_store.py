@@ -0,0 +1,320 @@
+from __future__ import annotations
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import atexit
+import configparser
+import os
+import threading
+import time
+from logger import get_logger
+from constants import ORG_NAME, APP_SETTINGS
+
+# Cache in memoria delle impostazioni con scrittura differita.
+# Le letture non toccano mai il registro/file INI: tutto viene caricato una
+# volta all'avvio. Le scritture aggiornano subito la cache, notificano gli
+# iscritti e vengono salvate sul backend in un unico batch da un thread in
+# background, dopo `flush_delay` secondi senza nuove modifiche.
+# L'API `value`/`setValue`/`sync` è compatibile con QSettings.
+
+_REMOVED = object()
+
+
+class QSettingsBackend:
+    """Backend su QSettings. Ogni thread usa una propria istanza (QSettings è rientrante)."""
+
+    def __init__(self, org: str = ORG_NAME, app: str = APP_SETTINGS) -> None:
+        self.org = org
+        self.app = app
+        self._local = threading.local()
+
+    def _qs(self):
+        qs = getattr(self._local, 'qs', None)
+        if qs is None:
+            from PyQt5.QtCore import QSettings
+            qs = QSettings(self.org, self.app)
+            self._local.qs = qs
+        return qs
+
+    def load(self) -> Dict[str, Any]:
+        qs = self._qs()
+        return {k: qs.value(k) for k in qs.allKeys()}
+
+    def write(self, changes: Dict[str, Any]) -> None:
+        qs = self._qs()
+        for k, v in changes.items():
+            if v is _REMOVED:
+                qs.remove(k)
+            else:
+                qs.setValue(k, v)
+        qs.sync()
+
+
+class IniFileBackend:
+    """Backend su file INI (sezione [KikuMoe]), senza Qt: usato dalla modalità headless.
+    I valori vengono salvati come stringhe, come fa QSettings con il formato INI."""
+
+    SECTION = "KikuMoe"
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def _read(self) -> configparser.ConfigParser:
+        cp = configparser.ConfigParser(interpolation=None)
+        # Mantiene le chiavi così come sono (configparser le porta in minuscolo)
+        cp.optionxform = str  # type: ignore[assignment]
+        cp.read(self.path, encoding="utf-8")
+        if not cp.has_section(self.SECTION):
+            cp.add_section(self.SECTION)
+        return cp
+
+    def load(self) -> Dict[str, Any]:
+        return dict(self._read().items(self.SECTION))
+
+    def write(self, changes: Dict[str, Any]) -> None:
+        cp = self._read()
+        for k, v in changes.items():
+            if v is _REMOVED:
+                cp.remove_option(self.SECTION, k)
+            else:
+                cp.set(self.SECTION, k, str(v))
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            cp.write(f)
+        os.replace(tmp, self.path)
+
+
+class SettingsStore:
+    def __init__(self, backend: Optional[Any] = None, flush_delay: float = 0.5,
+                 max_flush_delay: float = 5.0) -> None:
+        self.backend = backend if backend is not None else QSettingsBackend()
+        self.flush_delay = max(0.0, float(flush_delay))
+        # Con modifiche continue (es. trascinamento del volume) scrive comunque entro questo limite
+        self.max_flush_delay = max(self.flush_delay, float(max_flush_delay))
+        self.log = get_logger('SettingsStore')
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._io_lock = threading.Lock()
+        self._values: Dict[str, Any] = {}
+        self._dirty: Dict[str, Any] = {}
+        self._generation = 0
+        self._flushed_generation = 0
+        self._subscribers: List[Tuple[Optional[frozenset], Callable[[str, Any], None]]] = []
+        self._writer: Optional[threading.Thread] = None
+        self._closed = False
+        self.flush_count = 0
+        try:
+            self._values = dict(self.backend.load())
+        except Exception as e:
+            self.log.debug("[DEBUG] SettingsStore: load failed: %s", e)
+            self._values = {}
+
+    # ---- API compatibile QSettings ----
+    def value(self, key: str, default: Any = None, type: Any = None) -> Any:
+        with self._lock:
+            val = self._values.get(key, default)
+        if type is not None and val is not None:
+            try:
+                if type is bool:
+                    return _to_bool(val, bool(default))
+                return type(val)
+            except Exception:
+                return default
+        return val
+
+    def setValue(self, key: str, value: Any) -> None:
+        with self._lock:
+            if key in self._values and self._values[key] == value and key not in self._dirty:
+                return
+            self._values[key] = value
+            self._mark_dirty_locked(key, value)
+        self._notify(key, value)
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            if key not in self._values:
+                return
+            self._values.pop(key, None)
+            self._mark_dirty_locked(key, _REMOVED)
+        self._notify(key, None)
+
+    def contains(self, key: str) -> bool:
+        with self._lock:
+            return key in self._values
+
+    def allKeys(self) -> List[str]:
+        with self._lock:
+            return list(self._values.keys())
+
+    def sync(self) -> None:
+        """Come QSettings.sync(): scrive subito le modifiche in sospeso."""
+        self.flush()
+
+    # ---- Accessori tipizzati ----
+    def get_bool(self, key: str, default: bool = False) -> bool:
+        with self._lock:
+            val = self._values.get(key, default)
+        return _to_bool(val, default)
+
+    def get_int(self, key: str, default: int = 0) -> int:
+        with self._lock:
+            val = self._values.get(key, default)
+        try:
+            return int(val)
+        except Exception:
+            return default
+
+    def get_str(self, key: str, default: str = '') -> str:
+        with self._lock:
+            val = self._values.get(key, default)
+        return default if val is None else str(val)
+
+    def set_bool(self, key: str, value: bool) -> None:
+        # Stesso formato usato finora ('true'/'false') per compatibilità con il registro esistente
+        self.setValue(key, 'true' if value else 'false')
+
+    # ---- Notifiche ----
+    def subscribe(self, callback: Callable[[str, Any], None], keys: Optional[Iterable[str]] = None) -> Callable[[], None]:
+        """Registra `callback(key, value)` per le modifiche (di tutte le chiavi o solo di `keys`).
+        Viene chiamato sul thread che ha scritto il valore. Ritorna la funzione per disiscriversi."""
+        entry = (frozenset(keys) if keys is not None else None, callback)
+        with self._lock:
+            self._subscribers.append(entry)
+
+        def _unsubscribe() -> None:
+            with self._lock:
+                try:
+                    self._subscribers.remove(entry)
+                except ValueError:
+                    pass
+        return _unsubscribe
+
+    def _notify(self, key: str, value: Any) -> None:
+        with self._lock:
+            subs = list(self._subscribers)
+        for keys, cb in subs:
+            if keys is not None and key not in keys:
+                continue
+            try:
+                cb(key, value)
+            except Exception as e:
+                self.log.debug("[DEBUG] SettingsStore: subscriber error for %s: %s", key, e)
+
+    # ---- Scrittura differita ----
+    def _mark_dirty_locked(self, key: str, value: Any) -> None:
+        self._dirty[key] = value
+        self._generation += 1
+        if self._closed:
+            return
+        if self._writer is None or not self._writer.is_alive():
+            self._writer = threading.Thread(target=self._run, name="SettingsStore", daemon=True)
+            self._writer.start()
+        self._cond.notify_all()
+
+    def _run(self) -> None:
+        with self._lock:
+            while True:
+                while not self._dirty and not self._closed:
+                    self._cond.wait()
+                if not self._dirty and self._closed:
+                    return
+                # Debounce: attende che le modifiche si fermino per flush_delay
+                deadline = time.monotonic() + self.max_flush_delay
+                while self._dirty and not self._closed:
+                    gen = self._generation
+                    self._cond.wait(min(self.flush_delay, max(0.0, deadline - time.monotonic())))
+                    if gen == self._generation or time.monotonic() >= deadline:
+                        break
+                self._write_dirty_locked()
+                if self._closed:
+                    return
+
+    def _write_dirty_locked(self) -> None:
+        # _io_lock serializza le scritture (thread di flush e sync() espliciti):
+        # un batch più vecchio non può mai sovrascrivere uno più recente.
+        self._lock.release()
+        self._io_lock.acquire()
+        self._lock.acquire()
+        try:
+            if not self._dirty:
+                return
+            batch = self._dirty
+            gen = self._generation
+            self._dirty = {}
+            self._lock.release()
+            try:
+                self.backend.write(batch)
+                ok = True
+            except Exception as e:
+                ok = False
+                self.log.debug("[DEBUG] SettingsStore: write failed: %s", e)
+            finally:
+                self._lock.acquire()
+            if ok:
+                self.flush_count += 1
+                self._flushed_generation = max(self._flushed_generation, gen)
+            else:
+                # Rimette in coda quanto non scritto (senza sovrascrivere modifiche più recenti)
+                for k, v in batch.items():
+                    self._dirty.setdefault(k, v)
+            self._cond.notify_all()
+        finally:
+            self._io_lock.release()
+
+    def flush(self) -> bool:
+        """Scrive subito le modifiche in sospeso (sul thread chiamante). True se tutto è stato salvato."""
+        with self._lock:
+            target = self._generation
+            self._write_dirty_locked()
+            return self._flushed_generation >= target or not self._dirty
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            self._cond.notify_all()
+            writer = self._writer
+        if writer is not None and writer is not threading.current_thread():
+            writer.join(timeout=2.0)
+        self.flush()
+
+
+def _to_bool(val: Any, default: bool) -> bool:
+    if isinstance(val, bool):
+        return val
+    if isinstance(val, int):
+        return bool(val)
+    if isinstance(val, str):
+        v = val.strip().lower()
+        if v in ("1", "true", "yes", "on"):
+            return True
+        if v in ("0", "false", "no", "off"):
+            return False
+        # fallback: any non-empty string is True
+        return len(v) > 0
+    return bool(val) if val is not None else default
+
+
+_store: Optional[SettingsStore] = None
+_store_lock = threading.Lock()
+
+
+def configure(backend: Any) -> SettingsStore:
+    """Crea l'istanza condivisa con un backend specifico (da chiamare prima di `get_settings`)."""
+    global _store
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+        _store = SettingsStore(backend=backend)
+        atexit.register(_store.close)
+        return _store
+
+
+def get_settings() -> SettingsStore:
+    """Istanza condivisa dell'applicazione (creata al primo uso, salvata all'uscita)."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SettingsStore()
+            atexit.register(_store.close)
+        return _store
@@ -0,0 +1,116 @@
+from __future__ import annotations
+from typing import List, Optional
+import getpass
+import os
+import re
+from PyQt5.QtCore import QObject, pyqtSignal
+from PyQt5.QtNetwork import QLocalServer, QLocalSocket
+from constants import APP_NAME
+
+# Istanza singola: la prima istanza ascolta su un QLocalServer (named pipe su
+# Windows, socket locale altrove); un secondo avvio si collega, inoltra la sua
+# richiesta (mostra, play, stop, toggle) ed esce subito, prima di importare la
+# finestra e i backend audio. Protocollo: una riga ASCII per comando, risposta "ok".
+
+COMMANDS = ('show', 'play', 'stop', 'toggle')
+CONNECT_TIMEOUT_MS = 300
+REPLY_TIMEOUT_MS = 1000
+# Nome alternativo del canale (istanze isolate, es. negli strumenti in tools/)
+ENV_INSTANCE_NAME = "KIKUMOE_INSTANCE"
+
+
+def server_name() -> str:
+    """Nome del canale locale, distinto per utente (le named pipe di Windows sono globali)."""
+    override = os.environ.get(ENV_INSTANCE_NAME)
+    if override:
+        return override
+    try:
+        user = getpass.getuser()
+    except Exception:
+        user = 'user'
+    return f"{APP_NAME}-{re.sub(r'[^A-Za-z0-9_.-]', '_', user)}"
+
+
+def parse_command(argv: List[str]) -> str:
+    """Comando dagli argomenti (--show, --play, --stop, --toggle); predefinito: show."""
+    for arg in argv:
+        name = arg.lstrip('-').lower()
+        if name in COMMANDS:
+            return name
+    return 'show'
+
+
+def is_running(name: Optional[str] = None, timeout_ms: int = CONNECT_TIMEOUT_MS) -> bool:
+    sock = QLocalSocket()
+    sock.connectToServer(name or server_name())
+    ok = sock.waitForConnected(timeout_ms)
+    sock.abort()
+    return ok
+
+
+def forward(command: str, name: Optional[str] = None, timeout_ms: int = CONNECT_TIMEOUT_MS) -> bool:
+    """Inoltra `command` all'istanza già avviata. False se non c'è un'istanza in ascolto."""
+    sock = QLocalSocket()
+    sock.connectToServer(name or server_name())
+    if not sock.waitForConnected(timeout_ms):
+        return False
+    try:
+        sock.write((command + "\n").encode('ascii'))
+        sock.flush()
+        sock.waitForBytesWritten(timeout_ms)
+        # Attende la conferma: l'istanza ha ricevuto il comando prima che questo processo esca
+        if sock.waitForReadyRead(REPLY_TIMEOUT_MS):
+            sock.readAll()
+        return True
+    finally:
+        sock.disconnectFromServer()
+
+
+class InstanceServer(QObject):
+    """Server della prima istanza: emette `command_received(nome)` sul thread GUI."""
+    command_received = pyqtSignal(str)
+
+    def __init__(self, name: Optional[str] = None, parent=None) -> None:
+        super().__init__(parent)
+        self.name = name or server_name()
+        self._server = QLocalServer(self)
+        self._server.newConnection.connect(self._on_new_connection)
+
+    def listen(self) -> bool:
+        try:
+            self._server.setSocketOptions(QLocalServer.UserAccessOption)
+        except Exception:
+            pass
+        if self._server.listen(self.name):
+            return True
+        # Un'altra istanza risponde: non rubarle il nome
+        if is_running(self.name):
+            return False
+        # Socket rimasto da un'istanza terminata in modo anomalo (Unix)
+        QLocalServer.removeServer(self.name)
+        return self._server.listen(self.name)
+
+    def close(self) -> None:
+        try:
+            self._server.close()
+        except Exception:
+            pass
+
+    def _on_new_connection(self) -> None:
+        while self._server.hasPendingConnections():
+            conn = self._server.nextPendingConnection()
+            if conn is None:
+                break
+            conn.readyRead.connect(lambda c=conn: self._on_ready_read(c))
+            conn.disconnected.connect(conn.deleteLater)
+
+    def _on_ready_read(self, conn: QLocalSocket) -> None:
+        while conn.canReadLine():
+            line = bytes(conn.readLine()).decode('ascii', 'replace').strip().lower()
+            if line in COMMANDS:
+                conn.write(b"ok\n")
+                conn.flush()
+                self.command_received.emit(line)
+            else:
+                conn.write(b"error\n")
+                conn.flush()
@@ -0,0 +1,62 @@
+from __future__ import annotations
+from typing import Callable, Dict, Optional
+import os
+import sys
+import threading
+import time
+
+# Tempi di avvio dell'app (import, primo paint, sottosistemi pronti, primo audio).
+# Ogni marker viene registrato una sola volta, in ms dall'import di questo
+# modulo (il primo import dell'entry point). Con KIKUMOE_STARTUP_TRACE=1 i
+# marker vengono scritti su stderr; con KIKUMOE_STARTUP_EXIT=<marker> l'app
+# esce appena lo raggiunge (usato da tools/startup_budget.py).
+
+ENV_STARTUP_TRACE = "KIKUMOE_STARTUP_TRACE"
+ENV_STARTUP_EXIT = "KIKUMOE_STARTUP_EXIT"
+
+_T0 = time.monotonic()
+_lock = threading.Lock()
+_marks: Dict[str, float] = {}
+# Azione al raggiungimento del marker di uscita (default: chiude la QApplication)
+_exit_handler: Optional[Callable[[], None]] = None
+
+
+def mark(name: str) -> None:
+    """Registra il marker `name` (solo la prima volta). Sicuro da qualsiasi thread."""
+    with _lock:
+        if name in _marks:
+            return
+        ms = (time.monotonic() - _T0) * 1000.0
+        _marks[name] = ms
+    if os.environ.get(ENV_STARTUP_TRACE):
+        try:
+            sys.stderr.write(f"[startup] {name} {ms:.1f}\n")
+            sys.stderr.flush()
+        except Exception:
+            pass
+    if os.environ.get(ENV_STARTUP_EXIT) == name:
+        if _exit_handler is not None:
+            try:
+                _exit_handler()
+            except Exception:
+                pass
+            return
+        try:
+            from PyQt5.QtCore import QMetaObject, Qt
+            from PyQt5.QtWidgets import QApplication
+            app = QApplication.instance()
+            if app is not None:
+                QMetaObject.invokeMethod(app, "quit", Qt.QueuedConnection)
+        except Exception:
+            pass
+
+
+def set_exit_handler(handler: Optional[Callable[[], None]]) -> None:
+    """Sostituisce l'uscita via Qt (es. modalità headless, senza QApplication)."""
+    global _exit_handler
+    _exit_handler = handler
+
+
+def marks() -> Dict[str, float]:
+    with _lock:
+        return dict(_marks)
@@ -0,0 +1,153 @@
+"""Confronto GUI vs headless: tempo di avvio e memoria residente (RSS).
+
+Avvia più volte l'app con interfaccia (Qt offscreen, impostazioni in memoria)
+e `kikumoe_headless.py` (configurazione INI temporanea) con
+KIKUMOE_STARTUP_TRACE=1. Per ciascun avvio misura il tempo dal lancio del
+processo al marker `subsystems_ready`, poi lascia girare il processo per
+`--settle` secondi e legge RSS attuale e picco (VmRSS/VmHWM da /proc, oppure
+psutil se installato).
+
+Per confrontare lo stesso lavoro l'audio è disattivato in entrambe le modalità
+(solo WebSocket); con --audio parte anche la riproduzione.
+
+Uso:
+    python tools/bench_headless.py --runs 3
+    python tools/bench_headless.py --runs 3 --audio --settle 10
+"""
+from __future__ import annotations
+from typing import Dict, List, Optional, Tuple
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from startup_budget import _BOOTSTRAP  # noqa: E402
+
+try:
+    import psutil  # type: ignore
+except Exception:
+    psutil = None
+
+
+def read_rss_kb(pid: int) -> Tuple[Optional[int], Optional[int]]:
+    """(RSS attuale, picco RSS) in KiB; None se non disponibili su questa piattaforma."""
+    try:
+        rss = hwm = None
+        with open(f"/proc/{pid}/status", "r", encoding="ascii", errors="replace") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    rss = int(line.split()[1])
+                elif line.startswith("VmHWM:"):
+                    hwm = int(line.split()[1])
+        return rss, hwm
+    except Exception:
+        pass
+    if psutil is not None:
+        try:
+            info = psutil.Process(pid).memory_info()
+            peak = getattr(info, "peak_wset", None)
+            return info.rss // 1024, (peak // 1024 if peak else None)
+        except Exception:
+            pass
+    return None, None
+
+
+def gui_command(audio: bool) -> List[str]:
+    values = {"tray_enabled": "false"}
+    return [sys.executable, "-c", _BOOTSTRAP.format(root=ROOT, values=values, argv=["--play"] if audio else [])]
+
+
+def headless_command(audio: bool, config: str) -> List[str]:
+    cmd = [sys.executable, os.path.join(ROOT, "kikumoe_headless.py"), "--config", config]
+    if not audio:
+        cmd.append("--no-play")
+    return cmd
+
+
+def run_once(cmd: List[str], settle: float, timeout: float) -> Dict[str, Optional[float]]:
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    env["KIKUMOE_STARTUP_TRACE"] = "1"
+    env.pop("KIKUMOE_STARTUP_EXIT", None)
+    env["KIKUMOE_INSTANCE"] = f"KikuMoe-bench-{os.getpid()}"
+    t0 = time.monotonic()
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE, text=True)
+    ready = threading.Event()
+    result: Dict[str, Optional[float]] = {"ready_ms": None, "rss_kb": None, "peak_kb": None}
+
+    def _reader() -> None:
+        for line in proc.stderr:
+            if line.startswith("[startup] subsystems_ready") and not ready.is_set():
+                result["ready_ms"] = (time.monotonic() - t0) * 1000.0
+                ready.set()
+        ready.set()
+
+    threading.Thread(target=_reader, daemon=True).start()
+    try:
+        ready.wait(timeout)
+        if result["ready_ms"] is not None and proc.poll() is None:
+            end = time.monotonic() + settle
+            peak = 0
+            while time.monotonic() < end and proc.poll() is None:
+                rss, hwm = read_rss_kb(proc.pid)
+                if rss is not None:
+                    result["rss_kb"] = float(rss)
+                    peak = max(peak, hwm or rss)
+                time.sleep(0.2)
+            result["peak_kb"] = float(peak) if peak else None
+    finally:
+        if proc.poll() is None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+    return result
+
+
+def summarize(label: str, runs: List[Dict[str, Optional[float]]]) -> Dict[str, Optional[float]]:
+    out: Dict[str, Optional[float]] = {}
+    for key in ("ready_ms", "rss_kb", "peak_kb"):
+        vals = [r[key] for r in runs if r[key] is not None]
+        out[key] = statistics.median(vals) if vals else None
+    ready = f"{out['ready_ms']:.0f} ms" if out["ready_ms"] is not None else "n/d"
+    rss = f"{out['rss_kb'] / 1024.0:.1f} MiB" if out["rss_kb"] is not None else "n/d"
+    peak = f"{out['peak_kb'] / 1024.0:.1f} MiB" if out["peak_kb"] is not None else "n/d"
+    print(f"  {label:9s} pronto in {ready:>8s}   RSS {rss:>10s}   picco {peak:>10s}")
+    return out
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Avvio e memoria: GUI vs headless")
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--settle", type=float, default=3.0, help="secondi di esecuzione dopo l'avvio prima della lettura RSS")
+    ap.add_argument("--audio", action="store_true", help="avvia anche la riproduzione (serve rete + ffmpeg/VLC)")
+    ap.add_argument("--timeout", type=float, default=30.0)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="kikumoe_bench_") as tmp:
+        config = os.path.join(tmp, "kikumoe.ini")
+        results = {"GUI": [], "headless": []}
+        for _ in range(max(1, args.runs)):
+            results["GUI"].append(run_once(gui_command(args.audio), args.settle, args.timeout))
+            results["headless"].append(run_once(headless_command(args.audio, config), args.settle, args.timeout))
+
+    print(f"== GUI vs headless ({args.runs} esecuzioni, mediana, audio {'sì' if args.audio else 'no'}) ==")
+    gui = summarize("GUI", results["GUI"])
+    head = summarize("headless", results["headless"])
+    for key, label in (("ready_ms", "avvio"), ("rss_kb", "RSS")):
+        if gui[key] and head[key]:
+            print(f"  {label}: headless = {head[key] / gui[key] * 100.0:.0f}% della GUI")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
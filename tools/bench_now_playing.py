@@ -0,0 +1,177 @@
+"""Benchmark del percorso metadati Now Playing.
+
+Avvia lo stand-in locale del gateway (tools/fake_gateway.py), costruisce il
+vero `ListenMoePlayer` su piattaforma Qt offscreen puntato al gateway locale
+e invia raffiche di TRACK_UPDATE. Riporta:
+- costo di parsing (json.loads + parse_track_update) per messaggio
+- latenza end-to-end dall'invio lato server all'aggiornamento della label
+- crescita di memoria (RSS e blocchi allocati da Python) durante le raffiche
+
+Uso:
+    python tools/bench_now_playing.py --bursts 20 --burst-size 50
+"""
+from __future__ import annotations
+from typing import Dict, List, Optional
+import argparse
+import gc
+import json
+import os
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from fake_gateway import FakeGateway, make_track  # noqa: E402
+from constants import ENV_GATEWAY_URL  # noqa: E402
+from ws_client import parse_track_update  # noqa: E402
+
+
+def rss_kib() -> Optional[int]:
+    """RSS corrente in KiB (Linux: /proc; altrove picco da resource se disponibile)."""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except Exception:
+        pass
+    try:
+        import resource
+        return int(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+    except Exception:
+        return None
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return float("nan")
+    vals = sorted(values)
+    k = min(len(vals) - 1, max(0, int(round((pct / 100.0) * (len(vals) - 1)))))
+    return vals[k]
+
+
+def bench_parse(n: int) -> List[float]:
+    payloads = [
+        json.dumps({"op": 1, "t": "TRACK_UPDATE", "d": make_track(i, f"Parse track #{i}", ["A", "B"], 200 + i % 60)})
+        for i in range(n)
+    ]
+    costs: List[float] = []
+    for raw in payloads:
+        t0 = time.perf_counter()
+        data = json.loads(raw)
+        parse_track_update(data["d"])
+        costs.append((time.perf_counter() - t0) * 1e6)
+    return costs
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Benchmark metadati Now Playing (gateway locale + Qt offscreen)")
+    ap.add_argument("--bursts", type=int, default=20)
+    ap.add_argument("--burst-size", type=int, default=50)
+    ap.add_argument("--gap", type=float, default=0.2, help="pausa (s) tra una raffica e la successiva")
+    ap.add_argument("--parse-samples", type=int, default=20000)
+    ap.add_argument("--timeout", type=float, default=30.0)
+    args = ap.parse_args()
+
+    parse_costs = bench_parse(args.parse_samples)
+
+    gw = FakeGateway().start()
+    os.environ[ENV_GATEWAY_URL] = gw.url
+
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication(sys.argv)
+    from ui.main_window import ListenMoePlayer
+
+    window = ListenMoePlayer()
+    window.show()
+
+    deadline = time.monotonic() + 10.0
+    while gw.client_count() == 0 and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+    if gw.client_count() == 0:
+        print("Il client WS non si è connesso al gateway locale", file=sys.stderr)
+        return 2
+
+    sent_at: Dict[int, float] = {}
+    latencies_ms: List[float] = []
+    coalesced = [0]
+    seq_re = re.compile(r"#(\d+)")
+
+    def on_label(text: str) -> None:
+        m = seq_re.search(text or "")
+        if not m:
+            return
+        seq = int(m.group(1))
+        now = time.perf_counter()
+        # La label mostra sempre l'ultimo stato: gli aggiornamenti precedenti ancora
+        # in attesa sono stati fusi in questo e la loro latenza termina qui.
+        for s in [k for k in sent_at if k <= seq]:
+            t_sent = sent_at.pop(s)
+            latencies_ms.append((now - t_sent) * 1000.0)
+            if s != seq:
+                coalesced[0] += 1
+
+    # Collegato dopo label.setText: misura fino all'aggiornamento effettivo della label
+    window.now_playing_changed.connect(on_label)
+
+    # Warm-up per stabilizzare allocazioni e cache
+    for i in range(10):
+        gw.push_track(f"Warmup #{-1 - i}", ["Warmup"], 120)
+    t_end = time.monotonic() + 1.0
+    while time.monotonic() < t_end:
+        app.processEvents()
+    gc.collect()
+    rss_before = rss_kib()
+    blocks_before = sys.getallocatedblocks()
+
+    total = args.bursts * args.burst_size
+    seq = 0
+    t_bench = time.perf_counter()
+    for _ in range(args.bursts):
+        for _ in range(args.burst_size):
+            seq += 1
+            sent_at[seq] = time.perf_counter()
+            gw.push_track(f"Bench track #{seq}", ["Bench Artist"], 180)
+        t_gap = time.monotonic() + args.gap
+        while time.monotonic() < t_gap:
+            app.processEvents()
+    deadline = time.monotonic() + args.timeout
+    while sent_at and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - t_bench
+
+    gc.collect()
+    rss_after = rss_kib()
+    blocks_after = sys.getallocatedblocks()
+
+    print("== Parsing TRACK_UPDATE (json.loads + parse_track_update) ==")
+    print(f"  campioni: {len(parse_costs)}  media: {sum(parse_costs) / len(parse_costs):.1f} us  "
+          f"p50: {percentile(parse_costs, 50):.1f} us  p99: {percentile(parse_costs, 99):.1f} us")
+    print("== Latenza end-to-end (invio server -> label aggiornata) ==")
+    print(f"  aggiornamenti: {total}  visualizzati: {len(latencies_ms) - coalesced[0]}  fusi: {coalesced[0]}  "
+          f"persi: {len(sent_at)}  durata: {elapsed:.2f} s")
+    if latencies_ms:
+        print(f"  p50: {percentile(latencies_ms, 50):.2f} ms  p99: {percentile(latencies_ms, 99):.2f} ms  "
+              f"max: {max(latencies_ms):.2f} ms")
+    print("== Memoria ==")
+    if rss_before is not None and rss_after is not None:
+        print(f"  RSS: {rss_before} KiB -> {rss_after} KiB (delta {rss_after - rss_before:+d} KiB)")
+    print(f"  blocchi Python allocati: {blocks_before} -> {blocks_after} (delta {blocks_after - blocks_before:+d})")
+
+    try:
+        window.ws.shutdown()
+    except Exception:
+        pass
+    gw.stop()
+    window.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""Latenza del cambio di canale/formato sui backend audio.
+
+Alterna gli stream J-POP/K-POP in Vorbis/MP3 sullo stesso backend e misura per
+ogni cambio:
+- durata della chiamata play_url (la parte bloccante: stop del precedente,
+  preparazione del media, avvio)
+- tempo da play_url all'evento 'playing'
+e alla fine la durata di stop().
+
+Con --fake non servono rete né librerie audio: VLC usa FakeVlc (latenze di
+apertura e stop configurabili), FFmpeg usa tools/fake_ffmpeg.py e FakePyAudio.
+Con --python-audio VLC consegna il PCM all'uscita condivisa (callback audio).
+
+Uso:
+    python tools/bench_switch.py --backend vlc --switches 20
+    python tools/bench_switch.py --backend vlc --fake --open-ms 50 --stop-ms 20
+    python tools/bench_switch.py --backend vlc --fake --python-audio
+"""
+from __future__ import annotations
+from typing import Dict, List, Optional
+import argparse
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+for _p in (ROOT, HERE):
+    if _p not in sys.path:
+        sys.path.insert(0, _p)
+
+from bench_worker import EventLog, percentile, use_memory_settings  # noqa: E402
+from fake_backends import FakePyAudio, FakeVlc  # noqa: E402
+from config import STREAMS, stream_url_for  # noqa: E402
+
+
+def stream_urls(fake: bool) -> List[str]:
+    urls = []
+    for channel, formats in STREAMS.items():
+        for fmt in formats:
+            urls.append(f"http://127.0.0.1:9/{channel}/{fmt}" if fake else stream_url_for(channel, fmt))
+    return urls
+
+
+def create_backend(name: str, events: EventLog, fake: bool, open_ms: float, stop_ms: float,
+                   python_audio: bool = False):
+    if name == "vlc":
+        from player_vlc import PlayerVLC
+        if fake:
+            return PlayerVLC(on_event=events, vlc_module=FakeVlc(open_ms / 1000.0, stop_ms / 1000.0),
+                             pyaudio_module=FakePyAudio(realtime=True), python_audio=python_audio)
+        return PlayerVLC(on_event=events, python_audio=python_audio)
+    from player_ffmpeg import PlayerFFmpeg
+    if fake:
+        os.environ.setdefault("FAKE_FFMPEG_SPEED", "1")
+        os.environ.setdefault("FAKE_FFMPEG_SCRIPT", f"delay:{open_ms / 1000.0}")
+        return PlayerFFmpeg(on_event=events, ffmpeg_cmd=[sys.executable, os.path.join(HERE, "fake_ffmpeg.py")],
+                            pyaudio_module=FakePyAudio(realtime=True))
+    return PlayerFFmpeg(on_event=events)
+
+
+def run(player, events: EventLog, urls: List[str], switches: int, timeout: float) -> Dict[str, float]:
+    calls: List[float] = []
+    to_playing: List[float] = []
+    failed = 0
+    for i in range(max(1, switches)):
+        url = urls[i % len(urls)]
+        events.clear()
+        t0 = time.perf_counter()
+        player.play_url(url)
+        calls.append((time.perf_counter() - t0) * 1000.0)
+        ts = events.wait_for("playing", timeout)
+        if ts is None:
+            failed += 1
+        else:
+            to_playing.append((ts - t0) * 1000.0)
+    t1 = time.perf_counter()
+    player.stop()
+    stop_ms = (time.perf_counter() - t1) * 1000.0
+    return {
+        "switches": switches, "failed": failed,
+        "call_p50_ms": percentile(calls, 50), "call_p95_ms": percentile(calls, 95),
+        "playing_p50_ms": percentile(to_playing, 50), "playing_p95_ms": percentile(to_playing, 95),
+        "playing_max_ms": max(to_playing) if to_playing else float("nan"),
+        "stop_ms": stop_ms,
+    }
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Latenza del cambio di stream sui backend audio")
+    ap.add_argument("--backend", choices=("vlc", "ffmpeg"), default="vlc")
+    ap.add_argument("--fake", action="store_true", help="backend finti (nessuna rete né libreria audio)")
+    ap.add_argument("--switches", type=int, default=20)
+    ap.add_argument("--timeout", type=float, default=15.0, help="attesa massima di 'playing' per cambio")
+    ap.add_argument("--open-ms", type=float, default=50.0, help="con --fake: apertura dello stream")
+    ap.add_argument("--stop-ms", type=float, default=20.0, help="con --fake: durata dello stop")
+    ap.add_argument("--python-audio", action="store_true", help="VLC: uscita audio dell'app tramite callback")
+    args = ap.parse_args()
+
+    use_memory_settings()
+    events = EventLog()
+    player = create_backend(args.backend, events, args.fake, args.open_ms, args.stop_ms, args.python_audio)
+    if not player.is_ready():
+        print(f"Backend {args.backend} non disponibile", file=sys.stderr)
+        return 2
+    r = run(player, events, stream_urls(args.fake), args.switches, args.timeout)
+    print(f"{args.backend}{' (finto)' if args.fake else ''}: "
+          + "  ".join(f"{k}={v:.1f}" if isinstance(v, float) else f"{k}={v}" for k, v in r.items()))
+    return 1 if r["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
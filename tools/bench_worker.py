@@ -0,0 +1,293 @@
+"""Benchmark deterministici del worker FFmpeg e della gestione eventi della UI.
+
+Non servono ffmpeg, PortAudio né rete: il worker di PlayerFFmpeg avvia
+tools/fake_ffmpeg.py al posto di ffmpeg e scrive su FakePyAudio; la finestra
+vera (Qt offscreen) usa FakePlayer come backend (tools/fake_backends.py).
+
+Scenari:
+- throughput: PCM alla massima velocità, misura secondi di audio elaborati
+  per secondo e CPU del processo per secondo di audio (volume al 50%)
+- startup:    play/stop ripetuti, latenza play_url -> 'playing' e stop
+- exit:       ffmpeg termina con errore dopo 1 s, latenza fino a 'error'
+- ui:         play/stop sulla finestra con FakePlayer, latenza fino allo stato
+              pubblicato e costo di _on_player_event sul thread GUI
+
+Esce con codice 1 se uno scenario non rispetta i limiti indicati
+(--min-speed, --max-cpu-ms, --max-ui-ms).
+
+Uso:
+    python tools/bench_worker.py
+    python tools/bench_worker.py --only throughput --seconds 5 --min-speed 20
+"""
+from __future__ import annotations
+from typing import Dict, List, Optional
+import argparse
+import os
+import sys
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+for _p in (ROOT, HERE):
+    if _p not in sys.path:
+        sys.path.insert(0, _p)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from fake_backends import FakePlayer, FakePyAudio  # noqa: E402
+
+FAKE_FFMPEG = [sys.executable, os.path.join(HERE, "fake_ffmpeg.py")]
+FAKE_URL = "http://127.0.0.1:9/fake.ogg"
+SCENARIOS = ("throughput", "startup", "exit", "ui")
+
+
+def use_memory_settings(values: Optional[Dict[str, str]] = None) -> None:
+    """Impostazioni in memoria: i benchmark non leggono né scrivono quelle dell'utente."""
+    import settings_store
+
+    class _MemoryBackend:
+        def __init__(self, initial):
+            self.values = dict(initial)
+
+        def load(self):
+            return dict(self.values)
+
+        def write(self, changes):
+            pass
+
+    settings_store._store = settings_store.SettingsStore(backend=_MemoryBackend(values or {}))
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return float("nan")
+    vals = sorted(values)
+    k = min(len(vals) - 1, max(0, int(round((pct / 100.0) * (len(vals) - 1)))))
+    return vals[k]
+
+
+class EventLog:
+    """Raccoglie gli eventi del backend e permette di attenderne uno."""
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self.events: List[tuple] = []
+
+    def __call__(self, code: str, value: Optional[int] = None) -> None:
+        with self._cond:
+            self.events.append((time.perf_counter(), str(code or "").lower()))
+            self._cond.notify_all()
+
+    def clear(self) -> None:
+        with self._cond:
+            self.events.clear()
+
+    def wait_for(self, code: str, timeout: float) -> Optional[float]:
+        end = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                for ts, c in self.events:
+                    if c == code:
+                        return ts
+                left = end - time.monotonic()
+                if left <= 0:
+                    return None
+                self._cond.wait(left)
+
+
+def make_player(events: EventLog, pa: FakePyAudio):
+    from player_ffmpeg import PlayerFFmpeg
+    player = PlayerFFmpeg(on_event=events, ffmpeg_cmd=FAKE_FFMPEG, pyaudio_module=pa)
+    if not player.is_ready():
+        raise RuntimeError("PlayerFFmpeg non pronto con i backend finti")
+    return player
+
+
+def bench_throughput(seconds: float) -> Dict[str, float]:
+    os.environ["FAKE_FFMPEG_SPEED"] = "0"
+    os.environ.pop("FAKE_FFMPEG_SCRIPT", None)
+    events, pa = EventLog(), FakePyAudio()
+    player = make_player(events, pa)
+    player.set_volume(50)
+    player.play_url(FAKE_URL)
+    if events.wait_for("playing", 10.0) is None:
+        player.stop()
+        raise RuntimeError("nessun 'playing' dal worker")
+    pa.reset_stats()
+    c0, t0 = time.process_time(), time.perf_counter()
+    time.sleep(seconds)
+    c1, t1 = time.process_time(), time.perf_counter()
+    stats = pa.stats()
+    player.stop()
+    audio_s = stats["audio_seconds"] or 1e-9
+    return {
+        "audio_s": audio_s,
+        "speed_x": audio_s / (t1 - t0),
+        "cpu_ms_per_audio_s": (c1 - c0) * 1000.0 / audio_s,
+        "writes": stats["writes"],
+    }
+
+
+def bench_startup(cycles: int) -> Dict[str, float]:
+    os.environ["FAKE_FFMPEG_SPEED"] = "1"
+    os.environ.pop("FAKE_FFMPEG_SCRIPT", None)
+    events, pa = EventLog(), FakePyAudio(realtime=True)
+    player = make_player(events, pa)
+    starts: List[float] = []
+    stops: List[float] = []
+    for _ in range(max(1, cycles)):
+        events.clear()
+        t0 = time.perf_counter()
+        player.play_url(FAKE_URL)
+        ts = events.wait_for("playing", 10.0)
+        if ts is not None:
+            starts.append((ts - t0) * 1000.0)
+        t1 = time.perf_counter()
+        player.stop()
+        stops.append((time.perf_counter() - t1) * 1000.0)
+    stats = pa.stats()
+    return {
+        "ok": len(starts), "cycles": cycles,
+        "play_p50_ms": percentile(starts, 50), "play_p95_ms": percentile(starts, 95),
+        "stop_p50_ms": percentile(stops, 50), "stop_p95_ms": percentile(stops, 95),
+        "streams_open": stats["opens"] - stats["closes"],
+    }
+
+
+def bench_exit() -> Dict[str, float]:
+    os.environ["FAKE_FFMPEG_SPEED"] = "1"
+    os.environ["FAKE_FFMPEG_SCRIPT"] = "exit:1:1"
+    try:
+        events, pa = EventLog(), FakePyAudio(realtime=True)
+        player = make_player(events, pa)
+        t0 = time.perf_counter()
+        player.play_url(FAKE_URL)
+        playing = events.wait_for("playing", 10.0)
+        error = events.wait_for("error", 10.0)
+        player.stop()
+    finally:
+        os.environ.pop("FAKE_FFMPEG_SCRIPT", None)
+    return {
+        "playing_ms": (playing - t0) * 1000.0 if playing else float("nan"),
+        "error_ms": (error - t0) * 1000.0 if error else float("nan"),
+    }
+
+
+def bench_ui(cycles: int) -> Dict[str, float]:
+    use_memory_settings({"autoplay": "false", "tray_enabled": "false", "ws_enabled": "false"})
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication(sys.argv)
+    from ui.main_window import ListenMoePlayer
+
+    window = ListenMoePlayer(player_factory=lambda **kw: FakePlayer(open_delay_s=0.0, **kw))
+    window.show()
+    # Backend creato qui invece che dopo il primo paint
+    window._deferred_startup()
+    state = {"player": ""}
+    orig_publish = window._publish
+
+    def _publish(event: str, data: dict) -> None:
+        if event == "player":
+            state["player"] = str(data.get("state") or "")
+        orig_publish(event, data)
+    window._publish = _publish
+
+    def spin_until(target: str, timeout: float = 5.0) -> Optional[float]:
+        t0 = time.perf_counter()
+        end = time.monotonic() + timeout
+        while time.monotonic() < end:
+            app.processEvents()
+            if state["player"] == target:
+                return (time.perf_counter() - t0) * 1000.0
+            time.sleep(0.0005)
+        return None
+
+    plays: List[float] = []
+    stops: List[float] = []
+    for _ in range(max(1, cycles)):
+        state["player"] = ""
+        t0 = time.perf_counter()
+        window.play_stream()
+        dt = spin_until("playing")
+        if dt is not None:
+            plays.append((time.perf_counter() - t0) * 1000.0)
+        t1 = time.perf_counter()
+        window.stop_stream()
+        if spin_until("stopped") is not None:
+            stops.append((time.perf_counter() - t1) * 1000.0)
+
+    # Costo del gestore eventi sul thread GUI (segnali e aggiornamenti inclusi)
+    handler: Dict[str, float] = {}
+    for code in ("opening", "buffering", "playing", "paused", "stopped"):
+        samples = []
+        for _ in range(200):
+            t0 = time.perf_counter()
+            window._on_player_event(code, 50 if code == "buffering" else None)
+            app.processEvents()
+            samples.append((time.perf_counter() - t0) * 1000.0)
+        handler[code] = percentile(samples, 95)
+    try:
+        window.stop_stream()
+        window.close()
+        app.processEvents()
+    except Exception:
+        pass
+    result = {
+        "ok": len(plays), "cycles": cycles,
+        "play_p50_ms": percentile(plays, 50), "play_p95_ms": percentile(plays, 95),
+        "stop_p50_ms": percentile(stops, 50), "stop_p95_ms": percentile(stops, 95),
+    }
+    result.update({f"event_{k}_p95_ms": v for k, v in handler.items()})
+    return result
+
+
+def fmt(result: Dict[str, float]) -> str:
+    return "  ".join(f"{k}={v:.2f}" if isinstance(v, float) else f"{k}={v}" for k, v in result.items())
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Benchmark del worker FFmpeg e della UI con backend finti")
+    ap.add_argument("--only", choices=SCENARIOS, action="append", help="scenario da eseguire (ripetibile)")
+    ap.add_argument("--seconds", type=float, default=3.0, help="durata dello scenario throughput")
+    ap.add_argument("--cycles", type=int, default=10, help="cicli play/stop per startup e ui")
+    ap.add_argument("--min-speed", type=float, default=0.0, help="throughput minimo (x tempo reale)")
+    ap.add_argument("--max-cpu-ms", type=float, default=0.0, help="CPU massima per secondo di audio (0 = nessun limite)")
+    ap.add_argument("--max-ui-ms", type=float, default=0.0, help="p95 massimo di play/stop nella UI (0 = nessun limite)")
+    args = ap.parse_args()
+
+    use_memory_settings()
+    failures: List[str] = []
+    for name in args.only or SCENARIOS:
+        try:
+            if name == "throughput":
+                r = bench_throughput(args.seconds)
+                if args.min_speed and r["speed_x"] < args.min_speed:
+                    failures.append(f"throughput {r['speed_x']:.1f}x < {args.min_speed}x")
+                if args.max_cpu_ms and r["cpu_ms_per_audio_s"] > args.max_cpu_ms:
+                    failures.append(f"CPU {r['cpu_ms_per_audio_s']:.1f} ms/s > {args.max_cpu_ms}")
+            elif name == "startup":
+                r = bench_startup(args.cycles)
+                if r["ok"] < r["cycles"]:
+                    failures.append(f"startup {r['ok']}/{r['cycles']} avvii")
+            elif name == "exit":
+                r = bench_exit()
+                if r["error_ms"] != r["error_ms"]:
+                    failures.append("exit: nessun 'error' dopo l'uscita di ffmpeg")
+            else:
+                r = bench_ui(args.cycles)
+                if r["ok"] < r["cycles"]:
+                    failures.append(f"ui {r['ok']}/{r['cycles']} avvii")
+                if args.max_ui_ms and max(r["play_p95_ms"], r["stop_p95_ms"]) > args.max_ui_ms:
+                    failures.append(f"ui p95 > {args.max_ui_ms} ms")
+        except Exception as e:
+            failures.append(f"{name}: {e}")
+            continue
+        print(f"{name:11s} {fmt(r)}")
+    if failures:
+        print("Limiti non rispettati: " + "; ".join(failures))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
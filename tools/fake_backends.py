@@ -0,0 +1,627 @@
+"""Backend finti e deterministici per test e benchmark senza audio, ffmpeg né rete.
+
+- FakePyAudio: sostituto del modulo `pyaudio` (PyAudio, paInt16) da passare a
+  PlayerFFmpeg(pyaudio_module=...). Gli stream accettano le scritture con una
+  latenza configurabile (fissa o a tempo reale) e possono fallire a comando.
+- FakeVlc: sostituto del modulo `vlc` (Instance, MediaPlayer, Media, eventi e
+  stati) da passare a PlayerVLC(vlc_module=...). Apertura e stop hanno latenze
+  configurabili; gli eventi arrivano da un thread come in libVLC. Con le callback
+  audio impostate un thread "decoder" consegna PCM s16 alla callback play.
+- FakePlayer: implementa l'interfaccia dei backend (PlayerFFmpeg/PlayerVLC)
+  usata da ListenMoePlayer; emette opening -> playing (o error) dopo un ritardo
+  e secondo uno scenario, da un thread come i backend veri.
+  Si passa come ListenMoePlayer(player_factory=FakePlayer) o con functools.partial
+  per configurarlo.
+
+Esempio:
+    from tools.fake_backends import FakePyAudio
+    pa = FakePyAudio(realtime=True)
+    player = PlayerFFmpeg(ffmpeg_cmd=[sys.executable, "tools/fake_ffmpeg.py"], pyaudio_module=pa)
+"""
+from __future__ import annotations
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import ctypes
+import threading
+import time
+
+BYTES_PER_FRAME = 4  # s16le stereo
+# Frame consegnati per ogni chiamata della callback audio di FakeVlc
+VLC_CALLBACK_FRAMES = 1024
+
+
+class FakeAudioStream:
+    """Stream di uscita finto: write() blocca per la latenza configurata e conta i byte."""
+
+    def __init__(self, owner: "FakePyAudio", **kwargs: Any) -> None:
+        self._owner = owner
+        self.kwargs = kwargs
+        self.rate = int(kwargs.get('rate') or 44100)
+        self._active = False
+        self._closed = False
+        self._t0: Optional[float] = None
+        self._played_s = 0.0
+
+    def start_stream(self) -> None:
+        if self._closed:
+            raise OSError(-9988, "Stream closed")
+        self._active = True
+        self._t0 = None
+
+    def stop_stream(self) -> None:
+        self._active = False
+
+    def is_active(self) -> bool:
+        return self._active and not self._closed
+
+    def is_stopped(self) -> bool:
+        return not self._active
+
+    def close(self) -> None:
+        self._active = False
+        if not self._closed:
+            self._closed = True
+            with self._owner._lock:
+                self._owner.closes += 1
+
+    def write(self, data: bytes, num_frames: Optional[int] = None, exception_on_underflow: bool = False) -> None:
+        owner = self._owner
+        if self._closed:
+            raise OSError(-9988, "Stream closed")
+        if not self._active:
+            raise OSError(-9983, "Stream is stopped")
+        with owner._lock:
+            owner.writes += 1
+            fail = owner.fail_writes_after is not None and owner.writes > owner.fail_writes_after
+        if fail:
+            with owner._lock:
+                owner.failed_writes += 1
+            raise OSError(-9999, "Unanticipated host error")
+        seconds = len(data) / float(BYTES_PER_FRAME * self.rate)
+        if owner.realtime:
+            # Come un dispositivo vero: la scrittura rientra quando il buffer ha spazio
+            now = time.monotonic()
+            if self._t0 is None:
+                self._t0 = now
+                self._played_s = 0.0
+            self._played_s += seconds
+            ahead = self._played_s - (now - self._t0) - owner.buffer_s
+            if ahead > 0:
+                time.sleep(ahead)
+            elif ahead < -owner.buffer_s:
+                # Underrun: il dispositivo riparte da capo
+                with owner._lock:
+                    owner.underruns += 1
+                self._t0 = now
+                self._played_s = seconds
+        if owner.write_latency_s > 0:
+            time.sleep(owner.write_latency_s)
+        with owner._lock:
+            owner.bytes_written += len(data)
+            owner.audio_seconds += seconds
+
+
+class FakePyAudioInstance:
+    def __init__(self, owner: "FakePyAudio") -> None:
+        self._owner = owner
+        self._terminated = False
+
+    def open(self, **kwargs: Any) -> FakeAudioStream:
+        owner = self._owner
+        with owner._lock:
+            owner.opens += 1
+            if owner.fail_open:
+                raise OSError(-9996, "Invalid output device")
+        stream = FakeAudioStream(owner, **kwargs)
+        with owner._lock:
+            owner.streams.append(stream)
+        return stream
+
+    def get_device_count(self) -> int:
+        return 1
+
+    def get_device_info_by_index(self, index: int) -> Dict[str, Any]:
+        if index != 0:
+            raise OSError(-9996, "Invalid device")
+        return {'index': 0, 'name': 'Fake Output', 'maxOutputChannels': 2, 'maxInputChannels': 0,
+                'defaultSampleRate': 44100.0, 'hostApi': 0}
+
+    def get_default_output_device_info(self) -> Dict[str, Any]:
+        return self.get_device_info_by_index(0)
+
+    def get_host_api_info_by_index(self, index: int) -> Dict[str, Any]:
+        return {'index': 0, 'name': 'Fake', 'deviceCount': 1}
+
+    def terminate(self) -> None:
+        if not self._terminated:
+            self._terminated = True
+            with self._owner._lock:
+                self._owner.terminates += 1
+
+
+class FakePyAudio:
+    """Oggetto con l'interfaccia del modulo pyaudio usata dal player (PyAudio, paInt16).
+
+    write_latency_s:   ritardo fisso aggiunto a ogni write()
+    realtime:          write() rientra al ritmo del tempo reale (come una scheda audio)
+    buffer_s:          anticipo ammesso in modalità realtime prima di bloccare
+    fail_writes_after: dopo N scritture ogni write() solleva OSError (dispositivo perso)
+    fail_open:         open() solleva OSError (dispositivo non valido)
+    """
+
+    paInt16 = 8
+
+    def __init__(self, write_latency_s: float = 0.0, realtime: bool = False, buffer_s: float = 0.1,
+                 fail_writes_after: Optional[int] = None, fail_open: bool = False) -> None:
+        self.write_latency_s = max(0.0, float(write_latency_s))
+        self.realtime = bool(realtime)
+        self.buffer_s = max(0.0, float(buffer_s))
+        self.fail_writes_after = fail_writes_after
+        self.fail_open = bool(fail_open)
+        self._lock = threading.Lock()
+        self.streams: List[FakeAudioStream] = []
+        self.reset_stats()
+
+    def PyAudio(self) -> FakePyAudioInstance:
+        return FakePyAudioInstance(self)
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.opens = 0
+            self.closes = 0
+            self.terminates = 0
+            self.writes = 0
+            self.failed_writes = 0
+            self.underruns = 0
+            self.bytes_written = 0
+            self.audio_seconds = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'opens': self.opens, 'closes': self.closes, 'terminates': self.terminates, 'writes': self.writes,
+                'failed_writes': self.failed_writes, 'underruns': self.underruns,
+                'bytes_written': self.bytes_written, 'audio_seconds': round(self.audio_seconds, 3),
+            }
+
+
+class _FakeVlcEnum:
+    """Valori confrontabili per identità, come vlc.EventType / vlc.State."""
+
+    def __init__(self, *names: str) -> None:
+        for name in names:
+            setattr(self, name, name)
+
+
+class _FakeVlcEvent:
+    def __init__(self, etype: str, new_cache: float = 0.0) -> None:
+        self.type = etype
+        self.u = type("u", (), {"new_cache": new_cache})()
+
+
+class _FakeVlcCallbacks:
+    """Tipi ctypes delle callback audio, come vlc.CallbackDecorators."""
+    AudioPlayCb = ctypes.CFUNCTYPE(None, ctypes.c_void_p, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int64)
+    AudioPauseCb = ctypes.CFUNCTYPE(None, ctypes.c_void_p, ctypes.c_int64)
+    AudioResumeCb = ctypes.CFUNCTYPE(None, ctypes.c_void_p, ctypes.c_int64)
+    AudioFlushCb = ctypes.CFUNCTYPE(None, ctypes.c_void_p, ctypes.c_int64)
+    AudioDrainCb = ctypes.CFUNCTYPE(None, ctypes.c_void_p)
+
+
+class FakeVlcMedia:
+    def __init__(self, owner: "FakeVlc", mrl: str) -> None:
+        self.mrl = mrl
+        self.options: List[str] = []
+        self.released = False
+        with owner._lock:
+            owner.media_created += 1
+
+    def add_option(self, option: str) -> None:
+        self.options.append(option)
+
+    def get_mrl(self) -> str:
+        return self.mrl
+
+    def release(self) -> None:
+        self.released = True
+
+
+class FakeVlcEventManager:
+    def __init__(self) -> None:
+        self._callbacks: Dict[str, List[Callable]] = {}
+
+    def event_attach(self, etype: str, callback: Callable, *args: Any) -> int:
+        self._callbacks.setdefault(etype, []).append(callback)
+        return 0
+
+    def event_detach(self, etype: str) -> None:
+        self._callbacks.pop(etype, None)
+
+    def _fire(self, etype: str, new_cache: float = 0.0) -> None:
+        for cb in list(self._callbacks.get(etype, ())):
+            try:
+                cb(_FakeVlcEvent(etype, new_cache))
+            except Exception:
+                pass
+
+
+class FakeVlcMediaPlayer:
+    """MediaPlayer con la semantica di libVLC 3: play() asincrono, stop() bloccante con evento Stopped."""
+
+    def __init__(self, owner: "FakeVlc") -> None:
+        self._owner = owner
+        self._em = FakeVlcEventManager()
+        self._media: Optional[FakeVlcMedia] = None
+        self._state = owner.State.NothingSpecial
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.volume = 100
+        self.muted = False
+        # Callback audio (play, pause, resume, flush, drain), formato e thread che le chiama
+        self._audio_cbs: Optional[tuple] = None
+        self._audio_opaque: Any = None
+        self.audio_format = ('S16N', 44100, 2)
+        self._decoder: Optional[threading.Thread] = None
+
+    def event_manager(self) -> FakeVlcEventManager:
+        return self._em
+
+    def set_media(self, media: Optional[FakeVlcMedia]) -> None:
+        self._media = media
+
+    def get_media(self) -> Optional[FakeVlcMedia]:
+        return self._media
+
+    def get_state(self) -> str:
+        return self._state
+
+    def play(self) -> int:
+        owner = self._owner
+        if self._media is None:
+            return -1
+        with owner._lock:
+            owner.plays += 1
+        with self._lock:
+            self._generation += 1
+            gen = self._generation
+        threading.Thread(target=self._open, args=(gen,), name="FakeVlcInput", daemon=True).start()
+        return 0
+
+    def _open(self, gen: int) -> None:
+        owner = self._owner
+        ET, ST = owner.EventType, owner.State
+        self._set_state(gen, ST.Opening, ET.MediaPlayerOpening)
+        time.sleep(owner.open_delay_s)
+        if self._set_state(gen, ST.Buffering, ET.MediaPlayerBuffering, 100.0):
+            if self._set_state(gen, ST.Playing, ET.MediaPlayerPlaying) and self._audio_cbs is not None:
+                self._decoder = threading.Thread(target=self._decode, args=(gen,), name="FakeVlcDecoder", daemon=True)
+                self._decoder.start()
+
+    def _decode(self, gen: int) -> None:
+        """Consegna blocchi di silenzio alla callback play, a `decode_speed` volte il tempo reale."""
+        owner = self._owner
+        play = self._audio_cbs[0]
+        _fmt, rate, channels = self.audio_format
+        frames = VLC_CALLBACK_FRAMES
+        buf = (ctypes.c_char * (frames * channels * 2))()
+        addr = ctypes.addressof(buf)
+        period = frames / float(rate)
+        t0 = time.perf_counter()
+        done = 0
+        while gen == self._generation:
+            if self._state == owner.State.Paused:
+                time.sleep(0.01)
+                t0, done = time.perf_counter(), 0
+                continue
+            play(self._audio_opaque, addr, frames, int(done * period * 1e6))
+            done += 1
+            with owner._lock:
+                owner.audio_frames += frames
+            if owner.decode_speed > 0:
+                delay = t0 + done * period / owner.decode_speed - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+    def _set_state(self, gen: int, state: str, etype: str, cache: float = 0.0) -> bool:
+        with self._lock:
+            if gen != self._generation:
+                return False
+            self._state = state
+        self._em._fire(etype, cache)
+        return True
+
+    def stop(self) -> None:
+        owner = self._owner
+        with owner._lock:
+            owner.stops += 1
+        with self._lock:
+            self._generation += 1
+            was_active = self._state in (owner.State.Opening, owner.State.Buffering,
+                                         owner.State.Playing, owner.State.Paused)
+        if not was_active:
+            return
+        # Chiusura dell'input (join del thread di decodifica in libVLC)
+        time.sleep(owner.stop_latency_s)
+        decoder = self._decoder
+        if decoder is not None and decoder is not threading.current_thread():
+            decoder.join(1.0)
+        self._decoder = None
+        with self._lock:
+            self._state = owner.State.Stopped
+        self._em._fire(owner.EventType.MediaPlayerStopped)
+
+    def pause(self) -> None:
+        ST = self._owner.State
+        with self._lock:
+            if self._state == ST.Playing:
+                self._state = ST.Paused
+                etype = self._owner.EventType.MediaPlayerPaused
+            elif self._state == ST.Paused:
+                self._state = ST.Playing
+                etype = self._owner.EventType.MediaPlayerPlaying
+            else:
+                return
+        if self._audio_cbs is not None:
+            # Come l'uscita audio di VLC: pause(pts) / resume(pts) sul dispositivo
+            cb = self._audio_cbs[1] if etype == self._owner.EventType.MediaPlayerPaused else self._audio_cbs[2]
+            cb(self._audio_opaque, 0)
+        self._em._fire(etype)
+
+    def audio_set_callbacks(self, play: Any, pause: Any, resume: Any, flush: Any, drain: Any, opaque: Any) -> None:
+        self._audio_cbs = (play, pause, resume, flush, drain)
+        self._audio_opaque = opaque
+
+    def audio_set_format(self, fmt: str, rate: int, channels: int) -> None:
+        self.audio_format = (str(fmt), int(rate), int(channels))
+
+    def audio_set_volume(self, volume: int) -> int:
+        self.volume = int(volume)
+        return 0
+
+    def audio_set_mute(self, mute: bool) -> None:
+        self.muted = bool(mute)
+
+    def release(self) -> None:
+        self.stop()
+
+
+class FakeVlcInstance:
+    def __init__(self, owner: "FakeVlc", options: Any = None) -> None:
+        self._owner = owner
+        self.options = list(options or [])
+        with owner._lock:
+            owner.instances += 1
+
+    def media_new(self, mrl: str, *options: str) -> FakeVlcMedia:
+        media = FakeVlcMedia(self._owner, mrl)
+        for opt in options:
+            media.add_option(opt)
+        return media
+
+    def media_player_new(self) -> FakeVlcMediaPlayer:
+        return FakeVlcMediaPlayer(self._owner)
+
+    def release(self) -> None:
+        with self._owner._lock:
+            self._owner.instances_released += 1
+
+
+class FakeVlc:
+    """Oggetto con l'interfaccia del modulo vlc usata da PlayerVLC.
+
+    open_delay_s:  tempo tra Opening e Playing (connessione + buffering)
+    stop_latency_s: durata di MediaPlayer.stop() prima dell'evento Stopped
+    decode_speed:   ritmo delle callback audio (1 = tempo reale, 0 = massima velocità)
+    """
+
+    EventType = _FakeVlcEnum(
+        'MediaPlayerOpening', 'MediaPlayerBuffering', 'MediaPlayerPlaying', 'MediaPlayerPaused',
+        'MediaPlayerStopped', 'MediaPlayerEndReached', 'MediaPlayerEncounteredError')
+    State = _FakeVlcEnum('NothingSpecial', 'Opening', 'Buffering', 'Playing', 'Paused',
+                         'Stopped', 'Ended', 'Error')
+    CallbackDecorators = _FakeVlcCallbacks
+
+    def __init__(self, open_delay_s: float = 0.05, stop_latency_s: float = 0.02,
+                 decode_speed: float = 1.0) -> None:
+        self.open_delay_s = max(0.0, float(open_delay_s))
+        self.stop_latency_s = max(0.0, float(stop_latency_s))
+        self.decode_speed = max(0.0, float(decode_speed))
+        self._lock = threading.Lock()
+        self.instances = 0
+        self.instances_released = 0
+        self.media_created = 0
+        self.plays = 0
+        self.stops = 0
+        self.audio_frames = 0
+
+    def Instance(self, options: Any = None) -> FakeVlcInstance:
+        return FakeVlcInstance(self, options)
+
+    def libvlc_get_version(self) -> bytes:
+        return b"3.0.0 FakeVlc"
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'instances': self.instances, 'instances_released': self.instances_released,
+                    'media_created': self.media_created, 'plays': self.plays, 'stops': self.stops,
+                    'audio_frames': self.audio_frames}
+
+
+class FakePlayer:
+    """Backend finto con l'interfaccia di PlayerFFmpeg/PlayerVLC.
+
+    open_delay_s: attesa tra 'opening' e 'playing' (connessione + buffering)
+    script:       esiti dei play_url successivi ('ok' o 'error'); finito lo scenario
+                  si usa `default`
+    titles:       (titolo, artista) inviati a on_metadata dopo 'playing' (metadati ICY)
+    Le chiamate ricevute sono registrate in `calls` per le verifiche.
+    """
+
+    def __init__(self, on_event: Optional[Callable[[str, Optional[int]], None]] = None,
+                 on_metadata: Optional[Callable[[str, str], None]] = None,
+                 open_delay_s: float = 0.05, script: Optional[Sequence[str]] = None,
+                 default: str = 'ok', ready: bool = True,
+                 titles: Optional[Sequence[Sequence[str]]] = None, **kwargs: Any) -> None:
+        self._on_event = on_event
+        self._on_metadata = on_metadata
+        self.open_delay_s = max(0.0, float(open_delay_s))
+        self._script: List[str] = [str(s).lower() for s in (script or [])]
+        self.default = str(default).lower()
+        self._ready = bool(ready)
+        self._titles = [tuple(t) for t in (titles or [])]
+        self.icy_metadata: bool = bool(self._titles)
+        self.options: Dict[str, Any] = dict(kwargs)
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._playing = False
+        self._paused = False
+        self._volume = 100
+        self._muted = False
+        self._url: Optional[str] = None
+        # Fade in corso: (guadagno iniziale, obiettivo, inizio monotono, durata)
+        self._fade: Optional[tuple] = None
+        self.calls: List[tuple] = []
+        self.events: List[str] = []
+
+    # ------------------- interfaccia backend -------------------
+    def is_ready(self) -> bool:
+        return self._ready
+
+    def reinitialize(self, libvlc_path: Optional[str] = None, network_caching_ms: Optional[int] = None) -> bool:
+        self._record('reinitialize', libvlc_path, network_caching_ms)
+        return self._ready
+
+    def play_url(self, url: str) -> bool:
+        self._record('play_url', url)
+        if not self._ready:
+            return False
+        with self._lock:
+            self._generation += 1
+            gen = self._generation
+            self._playing = False
+            self._paused = False
+            self._url = url
+            self._fade = None
+            outcome = self._script.pop(0) if self._script else self.default
+        threading.Thread(target=self._worker, args=(gen, outcome), name="FakePlayer", daemon=True).start()
+        return True
+
+    def stop(self) -> None:
+        self._record('stop')
+        with self._lock:
+            was_active = self._playing or self._url is not None
+            self._generation += 1
+            self._playing = False
+            self._paused = False
+            self._url = None
+        if was_active:
+            self._emit('stopped', None)
+
+    def pause_toggle(self) -> None:
+        self._record('pause_toggle')
+        with self._lock:
+            if not self._playing:
+                return
+            self._paused = not self._paused
+            paused = self._paused
+        self._emit('paused' if paused else 'playing', None)
+
+    def set_volume(self, vol: int) -> None:
+        self._volume = max(0, min(100, int(vol)))
+
+    def set_mute(self, mute: bool) -> None:
+        self._muted = bool(mute)
+
+    def get_volume(self) -> int:
+        return self._volume
+
+    def get_mute(self) -> bool:
+        return self._muted
+
+    def fade_to(self, target: float, duration_s: float, curve: str = 'linear') -> None:
+        self._record('fade_to', target, duration_s, curve)
+        target = max(0.0, min(1.0, float(target)))
+        self._fade = (self.fade_gain(), target, time.monotonic(), max(0.0, float(duration_s)))
+
+    def cancel_fade(self) -> None:
+        self._record('cancel_fade')
+        self._fade = None
+
+    def fade_gain(self) -> float:
+        """Guadagno di fade attuale (rampa lineare: qui conta solo l'andamento nel tempo)."""
+        fade = self._fade
+        if fade is None:
+            return 1.0
+        start, target, t0, duration = fade
+        t = 1.0 if duration <= 0 else min(1.0, (time.monotonic() - t0) / duration)
+        return start + (target - start) * t
+
+    def is_playing(self) -> bool:
+        return bool(self._playing and not self._paused)
+
+    def is_paused(self) -> bool:
+        return bool(self._paused)
+
+    def get_version(self) -> Optional[str]:
+        return "FakePlayer 1.0"
+
+    def get_configured_path(self) -> Optional[str]:
+        return None
+
+    def icy_active(self) -> bool:
+        return bool(self.icy_metadata and self._playing)
+
+    def force_cleanup(self) -> None:
+        self._record('force_cleanup')
+        with self._lock:
+            self._generation += 1
+            self._playing = False
+            self._paused = False
+            self._url = None
+
+    def force_kill_all_vlc(self) -> None:
+        self._record('force_kill_all_vlc')
+
+    # ------------------- internals -------------------
+    def _record(self, name: str, *args: Any) -> None:
+        with self._lock:
+            self.calls.append((name,) + args)
+
+    def _current(self, gen: int) -> bool:
+        with self._lock:
+            return gen == self._generation
+
+    def _emit(self, code: str, value: Optional[int] = None) -> None:
+        with self._lock:
+            self.events.append(code)
+        cb = self._on_event
+        if cb is not None:
+            try:
+                cb(code, value)
+            except Exception:
+                pass
+
+    def _worker(self, gen: int, outcome: str) -> None:
+        self._emit('opening', None)
+        end = time.monotonic() + self.open_delay_s
+        while time.monotonic() < end:
+            if not self._current(gen):
+                return
+            time.sleep(min(0.01, max(0.0, end - time.monotonic())))
+        if not self._current(gen):
+            return
+        if outcome == 'error':
+            with self._lock:
+                self._url = None
+            self._emit('error', None)
+            return
+        with self._lock:
+            self._playing = True
+        self._emit('playing', None)
+        cb = self._on_metadata
+        for title, artist in self._titles:
+            if not self._current(gen) or cb is None:
+                return
+            try:
+                cb(title, artist)
+            except Exception:
+                pass
@@ -0,0 +1,172 @@
+"""ffmpeg finto per test e benchmark del worker di PlayerFFmpeg senza ffmpeg, rete né audio.
+
+Accetta (e ignora) gli stessi argomenti che PlayerFFmpeg passa a ffmpeg e
+scrive su stdout PCM s16le stereo 44.1 kHz (un tono), come `ffmpeg ... -f s16le -`.
+Con `-version` stampa una versione fittizia ed esce con 0.
+
+Comportamento configurabile con variabili d'ambiente (ereditate dal player):
+    FAKE_FFMPEG_SPEED    fattore rispetto al tempo reale (1 = tempo reale, 0 = più veloce possibile)
+    FAKE_FFMPEG_CHUNK    byte per scrittura (predefinito 4096)
+    FAKE_FFMPEG_SCRIPT   eventi separati da virgola, tempi in secondi di audio emesso:
+                           delay:S          attesa prima del primo byte (apertura dello stream)
+                           stall:AT:S       nessun dato per S secondi dopo AT secondi di audio
+                           stderr:AT:TESTO  scrive TESTO su stderr a AT secondi
+                           exit:AT:CODICE   termina con CODICE dopo AT secondi di audio
+    FAKE_FFMPEG_LOG      file a cui aggiungere una riga per ogni avvio (pid e argomenti)
+    FAKE_FFMPEG_INPUT    "tone" (predefinito) oppure "url": legge l'ingresso `-i` via HTTP e
+                         copia il PCM di un WAV (es. tools/fake_stream.py) su stdout, così
+                         stalli, chiusure e 503 dello stream arrivano al player come con
+                         ffmpeg (lo script e la velocità valgono solo per il tono)
+
+Uso con il player:
+    PlayerFFmpeg(ffmpeg_cmd=[sys.executable, "tools/fake_ffmpeg.py"], pyaudio_module=FakePyAudio())
+"""
+from __future__ import annotations
+from typing import List, Tuple
+import math
+import os
+import struct
+import sys
+import time
+import urllib.error
+import urllib.request
+
+SAMPLE_RATE = 44100
+CHANNELS = 2
+BYTES_PER_S = SAMPLE_RATE * CHANNELS * 2
+VERSION = "ffmpeg version 0.0-fake Copyright (c) KikuMoe tools"
+
+
+def parse_script(text: str) -> List[Tuple[str, float, str]]:
+    """"stall:2:3,exit:10:1" -> [("stall", 2.0, "3"), ("exit", 10.0, "1")] ordinati per tempo."""
+    steps: List[Tuple[str, float, str]] = []
+    for item in (text or "").split(","):
+        parts = item.strip().split(":", 2)
+        if not parts or not parts[0]:
+            continue
+        kind = parts[0].lower()
+        if kind == "delay":
+            steps.append((kind, 0.0, parts[1] if len(parts) > 1 else "0"))
+        elif len(parts) >= 2:
+            steps.append((kind, float(parts[1]), parts[2] if len(parts) > 2 else ""))
+    steps.sort(key=lambda s: s[1])
+    return steps
+
+
+def tone(seconds: float = 1.0, freq: float = 440.0) -> bytes:
+    n = int(SAMPLE_RATE * seconds)
+    peak = 6000
+    step = 2.0 * math.pi * freq / SAMPLE_RATE
+    samples = []
+    for i in range(n):
+        v = int(peak * math.sin(step * i))
+        samples.extend((v, v))
+    return struct.pack(f"<{len(samples)}h", *samples)
+
+
+def copy_url(url: str, chunk: int) -> int:
+    """Copia il PCM del WAV servito a `url` su stdout; codici di uscita come ffmpeg."""
+    out = sys.stdout.buffer
+    try:
+        # Come -rw_timeout 15000000 del player
+        resp = urllib.request.urlopen(url, timeout=15.0)
+    except urllib.error.HTTPError as e:
+        sys.stderr.write(f"{url}: Server returned {e.code} {e.reason}\n")
+        return 1
+    except Exception as e:
+        sys.stderr.write(f"{url}: Connection refused ({e})\n")
+        return 1
+    try:
+        head = resp.read(44)
+        if not head.startswith(b"RIFF"):
+            out.write(head)
+        while True:
+            data = resp.read1(chunk) if hasattr(resp, "read1") else resp.read(chunk)
+            if not data:
+                # EOF dello stream: ffmpeg termina dopo aver scritto tutto
+                out.flush()
+                return 0
+            out.write(data)
+            out.flush()
+    except BrokenPipeError:
+        try:
+            sys.stdout = None
+        except Exception:
+            pass
+        return 0
+    except OSError as e:
+        sys.stderr.write(f"{url}: I/O error ({e})\n")
+        return 1
+    finally:
+        try:
+            resp.close()
+        except Exception:
+            pass
+
+
+def main(argv: List[str]) -> int:
+    if "-version" in argv:
+        print(VERSION)
+        return 0
+    log_path = os.environ.get("FAKE_FFMPEG_LOG")
+    if log_path:
+        try:
+            with open(log_path, "a", encoding="utf-8") as f:
+                f.write(f"{os.getpid()} {' '.join(argv)}\n")
+        except Exception:
+            pass
+    speed = float(os.environ.get("FAKE_FFMPEG_SPEED", "1") or 0)
+    chunk = max(4, int(os.environ.get("FAKE_FFMPEG_CHUNK", "4096")) // 4 * 4)
+    if (os.environ.get("FAKE_FFMPEG_INPUT") or "tone").lower() == "url" and "-i" in argv[:-1]:
+        url = argv[argv.index("-i") + 1]
+        if url.startswith(("http://", "https://")):
+            return copy_url(url, chunk)
+    steps = parse_script(os.environ.get("FAKE_FFMPEG_SCRIPT", ""))
+    out = sys.stdout.buffer
+    loop = tone()
+
+    for kind, _at, arg in [s for s in steps if s[0] == "delay"]:
+        time.sleep(float(arg))
+    steps = [s for s in steps if s[0] != "delay"]
+
+    emitted = 0
+    t0 = time.monotonic()
+    pause_total = 0.0
+    try:
+        while True:
+            audio_s = emitted / BYTES_PER_S
+            while steps and steps[0][1] <= audio_s:
+                kind, _at, arg = steps.pop(0)
+                if kind == "stall":
+                    time.sleep(float(arg))
+                    pause_total += float(arg)
+                elif kind == "stderr":
+                    sys.stderr.write(arg + "\n")
+                    sys.stderr.flush()
+                elif kind == "exit":
+                    out.flush()
+                    return int(arg or 0)
+            pos = emitted % len(loop)
+            data = loop[pos:pos + chunk]
+            if len(data) < chunk:
+                data += loop[:chunk - len(data)]
+            out.write(data)
+            out.flush()
+            emitted += len(data)
+            if speed > 0:
+                ahead = (emitted / BYTES_PER_S) / speed + pause_total - (time.monotonic() - t0)
+                if ahead > 0:
+                    time.sleep(ahead)
+    except (BrokenPipeError, OSError):
+        # Il player ha chiuso la pipe (stop)
+        try:
+            sys.stdout = None  # evita l'errore di flush all'uscita
+        except Exception:
+            pass
+        return 0
+    except KeyboardInterrupt:
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
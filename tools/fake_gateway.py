@@ -0,0 +1,380 @@
+"""Stand-in locale del gateway LISTEN.moe (protocollo gateway_v2).
+
+Server WebSocket minimale (RFC 6455, solo stdlib) che parla lo stesso
+protocollo usato da `NowPlayingWS`:
+- op 0: welcome con intervallo di heartbeat
+- op 1: TRACK_UPDATE / TRACK_UPDATE_REQUEST
+- op 2: richiesta del brano corrente dal client
+- op 9: heartbeat del client (risposta op 10)
+
+Permette inoltre di simulare disconnessioni (brusche o pulite) e payload
+malformati, per provare client e UI senza rete.
+
+Uso da riga di comando:
+    python tools/fake_gateway.py --port 8765 --interval 5 --drop-every 10 --malformed-every 4
+"""
+from __future__ import annotations
+from typing import Any, Dict, List, Optional
+import argparse
+import base64
+import hashlib
+import itertools
+import json
+import socket
+import struct
+import threading
+import time
+from datetime import datetime, timezone
+
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OP_TEXT = 0x1
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+
+def _iso_utc(epoch: float) -> str:
+    dt = datetime.fromtimestamp(epoch, tz=timezone.utc)
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.") + f"{dt.microsecond // 1000:03d}Z"
+
+
+def make_track(song_id: int, title: str, artists: Optional[List[str]] = None,
+               duration: Optional[int] = 240, start_ts: Optional[float] = None,
+               album: Optional[str] = None, album_image: Optional[str] = None,
+               artist_image: Optional[str] = None) -> Dict[str, Any]:
+    """Costruisce il campo `d` di un TRACK_UPDATE con la stessa forma del gateway reale."""
+    artists = artists if artists is not None else ["Fake Artist"]
+    song: Dict[str, Any] = {
+        "id": int(song_id),
+        "title": title,
+        "sources": [],
+        "artists": [
+            {"id": 1000 + i, "name": name, "nameRomaji": None, "image": artist_image if i == 0 else None}
+            for i, name in enumerate(artists)
+        ],
+        "characters": [],
+        "albums": [],
+        "duration": duration,
+    }
+    if album or album_image:
+        song["albums"].append({"id": 5000 + int(song_id), "name": album or title, "nameRomaji": None, "image": album_image})
+    return {
+        "song": song,
+        "requester": None,
+        "event": None,
+        "startTime": _iso_utc(start_ts if start_ts is not None else time.time()),
+        "lastPlayed": [],
+        "listeners": 42,
+    }
+
+
+class _Client:
+    def __init__(self, sock: socket.socket, addr) -> None:
+        self.sock = sock
+        self.addr = addr
+        self.send_lock = threading.Lock()
+        self.alive = True
+        self.heartbeats = 0
+        self.requests = 0
+
+    def send_frame(self, opcode: int, payload: bytes) -> bool:
+        header = bytearray([0x80 | (opcode & 0x0F)])
+        n = len(payload)
+        if n < 126:
+            header.append(n)
+        elif n < 65536:
+            header.append(126)
+            header += struct.pack("!H", n)
+        else:
+            header.append(127)
+            header += struct.pack("!Q", n)
+        try:
+            with self.send_lock:
+                self.sock.sendall(bytes(header) + payload)
+            return True
+        except Exception:
+            self.alive = False
+            return False
+
+    def send_text(self, text: str) -> bool:
+        return self.send_frame(OP_TEXT, text.encode("utf-8"))
+
+    def close(self, code: Optional[int] = 1000, abrupt: bool = False) -> None:
+        if not abrupt and code is not None:
+            self.send_frame(OP_CLOSE, struct.pack("!H", int(code)))
+        self.alive = False
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except Exception:
+            pass
+        try:
+            self.sock.close()
+        except Exception:
+            pass
+
+
+class FakeGateway:
+    """Server gateway_v2 locale, eseguito su thread daemon."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, heartbeat_ms: int = 45000,
+                 path: str = "/gateway_v2") -> None:
+        self.host = host
+        self.port = int(port)
+        self.heartbeat_ms = int(heartbeat_ms)
+        self.path = path
+        self._server: Optional[socket.socket] = None
+        self._accept_thread: Optional[threading.Thread] = None
+        self._clients: List[_Client] = []
+        self._clients_lock = threading.Lock()
+        self._running = threading.Event()
+        self._connected = threading.Condition()
+        self._current: Optional[Dict[str, Any]] = None
+        self._song_ids = itertools.count(1)
+        # Contatori per report/diagnostica
+        self.connections = 0
+        self.messages_sent = 0
+
+    # ------------------- lifecycle -------------------
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}{self.path}"
+
+    def start(self) -> "FakeGateway":
+        srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        srv.bind((self.host, self.port))
+        srv.listen(16)
+        self.port = srv.getsockname()[1]
+        self._server = srv
+        self._running.set()
+        self._accept_thread = threading.Thread(target=self._accept_loop, name="FakeGateway-accept", daemon=True)
+        self._accept_thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._running.clear()
+        try:
+            if self._server:
+                self._server.close()
+        except Exception:
+            pass
+        self.drop_clients()
+
+    def client_count(self) -> int:
+        with self._clients_lock:
+            return sum(1 for c in self._clients if c.alive)
+
+    def wait_for_client(self, timeout: float = 10.0) -> bool:
+        deadline = time.monotonic() + timeout
+        with self._connected:
+            while self.client_count() == 0:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    return False
+                self._connected.wait(left)
+        return True
+
+    # ------------------- scripting API -------------------
+    def push_track(self, title: str, artists: Optional[List[str]] = None, duration: Optional[int] = 240,
+                   song_id: Optional[int] = None, **kwargs) -> Dict[str, Any]:
+        """Imposta il brano corrente e lo invia come TRACK_UPDATE a tutti i client."""
+        d = make_track(song_id if song_id is not None else next(self._song_ids), title, artists, duration, **kwargs)
+        self._current = d
+        self.broadcast({"op": 1, "t": "TRACK_UPDATE", "d": d})
+        return d
+
+    def broadcast(self, obj: Any) -> int:
+        return self.send_raw(json.dumps(obj))
+
+    def send_raw(self, text: str) -> int:
+        """Invia testo arbitrario (anche JSON non valido) a tutti i client; ritorna quanti lo hanno ricevuto."""
+        sent = 0
+        for c in self._snapshot_clients():
+            if c.send_text(text):
+                sent += 1
+        self.messages_sent += sent
+        return sent
+
+    def send_malformed(self, kind: int = 0) -> int:
+        samples = [
+            "{not json",
+            json.dumps([1, 2, 3]),
+            json.dumps({"op": 1, "t": "TRACK_UPDATE", "d": None}),
+            json.dumps({"op": 1, "t": "TRACK_UPDATE", "d": {"song": "oops", "startTime": 12}}),
+            json.dumps({"op": 1, "t": "TRACK_UPDATE", "d": {"song": {"artists": [None], "duration": "x"}, "startTime": "not-a-date"}}),
+            json.dumps({"op": 0, "d": {"heartbeat": "soon"}}),
+        ]
+        return self.send_raw(samples[kind % len(samples)])
+
+    def drop_clients(self, abrupt: bool = True, code: int = 1001) -> int:
+        """Disconnette tutti i client: brusco (RST/EOF) o con frame di close."""
+        clients = self._snapshot_clients()
+        for c in clients:
+            c.close(code=code, abrupt=abrupt)
+        with self._clients_lock:
+            self._clients = [c for c in self._clients if c.alive]
+        return len(clients)
+
+    # ------------------- internals -------------------
+    def _snapshot_clients(self) -> List[_Client]:
+        with self._clients_lock:
+            return [c for c in self._clients if c.alive]
+
+    def _accept_loop(self) -> None:
+        while self._running.is_set():
+            try:
+                sock, addr = self._server.accept()  # type: ignore[union-attr]
+            except Exception:
+                break
+            threading.Thread(target=self._serve_client, args=(sock, addr), name="FakeGateway-client", daemon=True).start()
+
+    def _handshake(self, sock: socket.socket) -> bool:
+        data = b""
+        while b"\r\n\r\n" not in data:
+            chunk = sock.recv(4096)
+            if not chunk:
+                return False
+            data += chunk
+            if len(data) > 65536:
+                return False
+        headers = {}
+        for line in data.split(b"\r\n")[1:]:
+            if b":" in line:
+                k, v = line.split(b":", 1)
+                headers[k.strip().lower()] = v.strip()
+        key = headers.get(b"sec-websocket-key")
+        if not key:
+            return False
+        accept = base64.b64encode(hashlib.sha1(key + _WS_GUID.encode()).digest()).decode()
+        sock.sendall((
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+        ).encode())
+        return True
+
+    @staticmethod
+    def _recv_exact(sock: socket.socket, n: int) -> Optional[bytes]:
+        buf = b""
+        while len(buf) < n:
+            chunk = sock.recv(n - len(buf))
+            if not chunk:
+                return None
+            buf += chunk
+        return buf
+
+    def _read_frame(self, sock: socket.socket):
+        hdr = self._recv_exact(sock, 2)
+        if hdr is None:
+            return None, None
+        opcode = hdr[0] & 0x0F
+        masked = bool(hdr[1] & 0x80)
+        n = hdr[1] & 0x7F
+        if n == 126:
+            ext = self._recv_exact(sock, 2)
+            if ext is None:
+                return None, None
+            n = struct.unpack("!H", ext)[0]
+        elif n == 127:
+            ext = self._recv_exact(sock, 8)
+            if ext is None:
+                return None, None
+            n = struct.unpack("!Q", ext)[0]
+        mask = self._recv_exact(sock, 4) if masked else b""
+        payload = self._recv_exact(sock, n) if n else b""
+        if payload is None or mask is None:
+            return None, None
+        if masked:
+            payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        return opcode, payload
+
+    def _serve_client(self, sock: socket.socket, addr) -> None:
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except Exception:
+            pass
+        try:
+            if not self._handshake(sock):
+                sock.close()
+                return
+        except Exception:
+            try:
+                sock.close()
+            except Exception:
+                pass
+            return
+        client = _Client(sock, addr)
+        with self._clients_lock:
+            self._clients.append(client)
+        self.connections += 1
+        with self._connected:
+            self._connected.notify_all()
+        client.send_text(json.dumps({"op": 0, "d": {"message": "Welcome to the fake gateway", "heartbeat": self.heartbeat_ms}}))
+        try:
+            while client.alive and self._running.is_set():
+                opcode, payload = self._read_frame(sock)
+                if opcode is None:
+                    break
+                if opcode == OP_CLOSE:
+                    client.close(code=1000)
+                    break
+                if opcode == OP_PING:
+                    client.send_frame(OP_PONG, payload or b"")
+                    continue
+                if opcode != OP_TEXT:
+                    continue
+                try:
+                    msg = json.loads(payload.decode("utf-8"))
+                except Exception:
+                    continue
+                op = msg.get("op") if isinstance(msg, dict) else None
+                if op == 2:
+                    client.requests += 1
+                    if self._current is not None:
+                        client.send_text(json.dumps({"op": 1, "t": "TRACK_UPDATE_REQUEST", "d": self._current}))
+                elif op == 9:
+                    client.heartbeats += 1
+                    client.send_text(json.dumps({"op": 10}))
+        except Exception:
+            pass
+        finally:
+            client.alive = False
+            try:
+                sock.close()
+            except Exception:
+                pass
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Stand-in locale del gateway gateway_v2 di LISTEN.moe")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--heartbeat-ms", type=int, default=45000)
+    ap.add_argument("--interval", type=float, default=5.0, help="secondi tra un TRACK_UPDATE e il successivo")
+    ap.add_argument("--duration", type=int, default=30, help="durata (s) dichiarata per ogni brano")
+    ap.add_argument("--drop-every", type=int, default=0, help="disconnette i client ogni N brani (0 = mai)")
+    ap.add_argument("--malformed-every", type=int, default=0, help="invia un payload malformato ogni N brani (0 = mai)")
+    args = ap.parse_args()
+
+    gw = FakeGateway(args.host, args.port, heartbeat_ms=args.heartbeat_ms).start()
+    print(f"Fake gateway in ascolto su {gw.url} (imposta KIKUMOE_GATEWAY_URL={gw.url})")
+    try:
+        for n in itertools.count(1):
+            gw.push_track(f"Fake track #{n}", ["Fake Artist"], duration=args.duration)
+            print(f"[{n}] TRACK_UPDATE inviato a {gw.client_count()} client")
+            if args.malformed_every and n % args.malformed_every == 0:
+                gw.send_malformed(n)
+                print(f"[{n}] payload malformato inviato")
+            if args.drop_every and n % args.drop_every == 0:
+                print(f"[{n}] disconnessi {gw.drop_clients()} client")
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        gw.stop()
+
+
+if __name__ == "__main__":
+    main()
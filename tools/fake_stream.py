@@ -0,0 +1,228 @@
+"""Stand-in locale dello stream audio di LISTEN.moe.
+
+Server HTTP minimale (solo stdlib) che trasmette un WAV PCM s16le senza fine
+(tono sinusoidale) a velocità reale, come una radio: ffmpeg e VLC lo aprono
+come qualsiasi stream http. Con KIKUMOE_STREAM_URL l'app lo usa al posto dei
+canali reali.
+
+Guasti simulabili (anche mentre i client sono collegati):
+- stall(s):      connessioni aperte ma nessun dato per `s` secondi (watchdog di stallo)
+- drop_clients(): chiude le connessioni in corso (EOF per ffmpeg)
+- refuse(n):     le prossime `n` richieste ricevono 503 (riconnessioni fallite)
+
+Uso da riga di comando:
+    python tools/fake_stream.py --port 8766 --stall-every 60 --drop-every 90
+"""
+from __future__ import annotations
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+import argparse
+import math
+import socket
+import struct
+import threading
+import time
+
+SAMPLE_RATE = 44100
+CHANNELS = 2
+CHUNK_S = 0.1
+# Anticipo inviato subito alla connessione (riempie il buffer del lettore)
+PREBUFFER_S = 1.0
+
+
+def wav_header(sample_rate: int = SAMPLE_RATE, channels: int = CHANNELS) -> bytes:
+    """Header WAV con dimensione massima: i lettori lo trattano come stream senza fine."""
+    byte_rate = sample_rate * channels * 2
+    size = 0xFFFFFFFF - 36
+    return (b"RIFF" + struct.pack("<I", 0xFFFFFFFF) + b"WAVE"
+            + b"fmt " + struct.pack("<IHHIIHH", 16, 1, channels, sample_rate, byte_rate, channels * 2, 16)
+            + b"data" + struct.pack("<I", size))
+
+
+def tone_chunk(freq: float, seconds: float, phase: int, sample_rate: int = SAMPLE_RATE,
+               channels: int = CHANNELS, amplitude: float = 0.2) -> bytes:
+    n = int(sample_rate * seconds)
+    peak = int(32767 * amplitude)
+    step = 2.0 * math.pi * freq / sample_rate
+    frame = []
+    for i in range(phase, phase + n):
+        v = int(peak * math.sin(step * i))
+        frame.extend([v] * channels)
+    return struct.pack(f"<{len(frame)}h", *frame)
+
+
+class FakeStream:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, tone_hz: float = 440.0, path: str = "/stream.wav") -> None:
+        self.host = host
+        self.port = port
+        self.path = path
+        self.tone_hz = float(tone_hz)
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._lock = threading.Lock()
+        self._conns: List[socket.socket] = []
+        self._stall_until = 0.0
+        self._refuse = 0
+        self._generation = 0
+        # Un secondo di tono già pronto: i client lo ripetono a fette
+        self._loop = tone_chunk(self.tone_hz, 1.0, 0)
+        self.requests = 0
+        self.refused = 0
+        self.bytes_sent = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}{self.path}"
+
+    def start(self) -> "FakeStream":
+        self._httpd = ThreadingHTTPServer((self.host, self.port), _make_handler(self))
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        threading.Thread(target=self._httpd.serve_forever, kwargs={"poll_interval": 0.2},
+                         name="FakeStream", daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.drop_clients()
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def client_count(self) -> int:
+        with self._lock:
+            return len(self._conns)
+
+    # ------------------- guasti -------------------
+    def stall(self, seconds: float) -> None:
+        with self._lock:
+            self._stall_until = time.monotonic() + max(0.0, float(seconds))
+
+    def refuse(self, count: int = 1) -> None:
+        with self._lock:
+            self._refuse += max(0, int(count))
+
+    def drop_clients(self) -> int:
+        with self._lock:
+            conns = list(self._conns)
+            self._generation += 1
+        for sock in conns:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except Exception:
+                pass
+        return len(conns)
+
+    # ------------------- internals -------------------
+    def _take_refusal(self) -> bool:
+        with self._lock:
+            if self._refuse > 0:
+                self._refuse -= 1
+                self.refused += 1
+                return True
+            return False
+
+    def _stalled(self) -> bool:
+        with self._lock:
+            return time.monotonic() < self._stall_until
+
+    def _serve(self, handler: BaseHTTPRequestHandler) -> None:
+        with self._lock:
+            self.requests += 1
+            self._conns.append(handler.connection)
+            generation = self._generation
+        try:
+            handler.send_response(200)
+            handler.send_header("Content-Type", "audio/wav")
+            handler.send_header("Cache-Control", "no-cache")
+            handler.send_header("Connection", "close")
+            handler.end_headers()
+            handler.wfile.write(wav_header())
+            bytes_per_s = SAMPLE_RATE * CHANNELS * 2
+            chunk = int(bytes_per_s * CHUNK_S) // 4 * 4
+            pos = 0
+            # Prebuffer, poi a velocità reale
+            sent_audio_s = -PREBUFFER_S
+            t0 = time.monotonic()
+            while True:
+                with self._lock:
+                    if generation != self._generation:
+                        return
+                if self._stalled():
+                    time.sleep(CHUNK_S)
+                    t0 += CHUNK_S
+                    continue
+                ahead = sent_audio_s - (time.monotonic() - t0)
+                if ahead > 0:
+                    time.sleep(min(ahead, CHUNK_S))
+                    continue
+                data = self._loop[pos:pos + chunk]
+                if len(data) < chunk:
+                    data += self._loop[:chunk - len(data)]
+                pos = (pos + chunk) % len(self._loop)
+                handler.wfile.write(data)
+                sent_audio_s += CHUNK_S
+                with self._lock:
+                    self.bytes_sent += len(data)
+        except (BrokenPipeError, ConnectionResetError, ConnectionAbortedError, OSError):
+            pass
+        finally:
+            with self._lock:
+                try:
+                    self._conns.remove(handler.connection)
+                except ValueError:
+                    pass
+
+
+def _make_handler(stream: FakeStream):
+    class _Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.0"
+
+        def log_message(self, fmt, *args) -> None:
+            pass
+
+        def do_GET(self) -> None:
+            if self.path.split("?", 1)[0] != stream.path:
+                self.send_error(404)
+                return
+            if stream._take_refusal():
+                self.send_error(503, "Service Unavailable")
+                return
+            stream._serve(self)
+
+    return _Handler
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Stand-in locale dello stream audio (WAV infinito)")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8766)
+    ap.add_argument("--tone", type=float, default=440.0, help="frequenza del tono (Hz)")
+    ap.add_argument("--stall-every", type=float, default=0.0, help="blocca i dati ogni N secondi (0 = mai)")
+    ap.add_argument("--stall-s", type=float, default=12.0, help="durata di ogni blocco")
+    ap.add_argument("--drop-every", type=float, default=0.0, help="chiude le connessioni ogni N secondi (0 = mai)")
+    args = ap.parse_args()
+
+    fs = FakeStream(args.host, args.port, args.tone).start()
+    print(f"Fake stream su {fs.url} (imposta KIKUMOE_STREAM_URL={fs.url})")
+    start = time.monotonic()
+    next_stall = args.stall_every or None
+    next_drop = args.drop_every or None
+    try:
+        while True:
+            time.sleep(0.5)
+            now = time.monotonic() - start
+            if next_stall is not None and now >= next_stall:
+                fs.stall(args.stall_s)
+                print(f"[{now:.0f}s] stallo di {args.stall_s:.0f}s ({fs.client_count()} client)")
+                next_stall += args.stall_every
+            if next_drop is not None and now >= next_drop:
+                print(f"[{now:.0f}s] disconnessi {fs.drop_clients()} client")
+                next_drop += args.drop_every
+    except KeyboardInterrupt:
+        pass
+    finally:
+        fs.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""Controllo automatico della memoria su cicli ripetuti di play/stop.
+
+Crea un backend audio, fa alcuni cicli di riscaldamento, prende
+un'istantanea di riferimento (tracemalloc + RSS, thread, file descriptor,
+istanze dei tipi chiave) e poi ripete `--cycles` volte play → attesa → stop.
+Alla fine confronta con il riferimento e stampa le righe che crescono di più.
+
+Il backend predefinito ("fake") è il vero PlayerFFmpeg con tools/fake_ffmpeg.py
+e FakePyAudio, collegato a tools/fake_stream.py: gira senza rete, ffmpeg né
+dispositivo audio. Con --backend ffmpeg/vlc usa i backend veri e lo stream
+J-POP di LISTEN.moe (o --url).
+
+Esce con codice 1 se la crescita supera il budget (memoria tracciata, RSS,
+thread o fd rimasti aperti) o se nessun ciclo è andato in riproduzione, 2 se
+il backend non è disponibile.
+
+Uso:
+    python tools/memcheck.py --cycles 30
+    python tools/memcheck.py --backend ffmpeg --cycles 30
+    python tools/memcheck.py --backend vlc --cycles 50 --play-s 1 --budget-kb 1024
+    python tools/memcheck.py --url http://127.0.0.1:8000/stream.ogg
+"""
+from __future__ import annotations
+from typing import Dict, Optional
+import argparse
+import gc
+import os
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from config import stream_url_for  # noqa: E402
+from memory_diag import MemoryDiagnostics, object_counts, process_stats, thread_names  # noqa: E402
+
+FAKE_FFMPEG = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_ffmpeg.py")]
+
+
+def create_backend(name: str, on_event):
+    if name == "fake":
+        from fake_backends import FakePyAudio
+        from player_ffmpeg import PlayerFFmpeg
+        # fake_ffmpeg legge il WAV dello stream finto via HTTP
+        os.environ["FAKE_FFMPEG_INPUT"] = "url"
+        return PlayerFFmpeg(on_event=on_event, ffmpeg_cmd=FAKE_FFMPEG, pyaudio_module=FakePyAudio(realtime=True))
+    if name == "vlc":
+        from player_vlc import PlayerVLC
+        return PlayerVLC(on_event=on_event)
+    from player_ffmpeg import PlayerFFmpeg
+    return PlayerFFmpeg(on_event=on_event)
+
+
+def settle(base_threads: int, timeout: float = 3.0) -> None:
+    """Attende che i thread dei cicli precedenti terminino (watchdog, pump ICY, ...)."""
+    end = time.monotonic() + timeout
+    while time.monotonic() < end and threading.active_count() > base_threads:
+        time.sleep(0.05)
+    gc.collect()
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Budget di memoria su cicli play/stop")
+    ap.add_argument("--backend", choices=("fake", "ffmpeg", "vlc"), default="fake",
+                    help="fake: fake_ffmpeg e FakePyAudio su uno stream locale (nessuna rete né audio)")
+    ap.add_argument("--url", default=None,
+                    help="stream da aprire (predefinito: fake_stream locale con --backend fake, altrimenti J-POP Vorbis)")
+    ap.add_argument("--cycles", type=int, default=30)
+    ap.add_argument("--warmup", type=int, default=3, help="cicli esclusi dal confronto (cache, import pigri)")
+    ap.add_argument("--play-s", type=float, default=2.0, help="secondi di riproduzione per ciclo")
+    ap.add_argument("--budget-kb", type=int, default=2048, help="crescita massima della memoria tracciata da Python")
+    ap.add_argument("--rss-budget-kb", type=int, default=8192, help="crescita massima dell'RSS")
+    ap.add_argument("--top", type=int, default=10)
+    args = ap.parse_args()
+
+    stream = None
+    if args.url:
+        url = args.url
+    elif args.backend == "fake":
+        from fake_stream import FakeStream
+        stream = FakeStream().start()
+        url = stream.url
+    else:
+        url = stream_url_for("J-POP", "Vorbis")
+    started = threading.Event()
+    events: Dict[str, int] = {}
+
+    def on_event(code: str, _value: Optional[int] = None) -> None:
+        c = str(code or "").lower()
+        events[c] = events.get(c, 0) + 1
+        if c == "playing":
+            started.set()
+
+    try:
+        return run(args, url, create_backend(args.backend, on_event), started, events)
+    finally:
+        if stream is not None:
+            stream.stop()
+
+
+def run(args, url: str, player, started: threading.Event, events: Dict[str, int]) -> int:
+    if not player.is_ready():
+        print(f"Backend {args.backend} non disponibile", file=sys.stderr)
+        return 2
+
+    def cycle() -> None:
+        started.clear()
+        player.play_url(url)
+        started.wait(args.play_s)
+        time.sleep(max(0.0, args.play_s - 0.5) if started.is_set() else 0.0)
+        player.stop()
+
+    base_threads = threading.active_count()
+    for _ in range(max(0, args.warmup)):
+        cycle()
+    settle(base_threads)
+
+    diag = MemoryDiagnostics()
+    diag.take_snapshot()
+    before = process_stats()
+    objs_before = object_counts()
+    threads_before = thread_names()
+
+    t0 = time.monotonic()
+    for i in range(max(1, args.cycles)):
+        cycle()
+        if (i + 1) % 10 == 0:
+            print(f"  ciclo {i + 1}/{args.cycles}: RSS {process_stats()['rss_kb']} KiB, thread {threading.active_count()}")
+    settle(len(threads_before))
+    elapsed = time.monotonic() - t0
+
+    diag.take_snapshot()
+    after = process_stats()
+    objs_after = object_counts()
+
+    print(f"== {args.cycles} cicli play/stop ({args.backend}) in {elapsed:.1f} s, avvii riusciti {events.get('playing', 0)} ==")
+    failures = []
+    for key, label, budget in (("traced_kb", "memoria tracciata", args.budget_kb),
+                               ("rss_kb", "RSS", args.rss_budget_kb),
+                               ("threads", "thread", 0),
+                               ("fds", "fd/handle", 0)):
+        b, a = before.get(key), after.get(key)
+        if b is None or a is None:
+            print(f"  {label:18s} n/d")
+            continue
+        delta = a - b
+        unit = " KiB" if key.endswith("_kb") else ""
+        ok = delta <= budget
+        print(f"  {label:18s} {b}{unit} -> {a}{unit} ({delta:+d}{unit}, budget {budget:+d}{unit}) {'ok' if ok else 'SUPERATO'}")
+        if not ok:
+            failures.append(label)
+    grown = {k: (objs_before.get(k, 0), v) for k, v in objs_after.items() if v > objs_before.get(k, 0)}
+    if grown:
+        print("  istanze cresciute: " + ", ".join(f"{k} {b}->{a}" for k, (b, a) in grown.items()))
+    if "thread" in failures:
+        extra = sorted(set(thread_names()) - set(threads_before))
+        print("  thread rimasti: " + (", ".join(extra) or "(stessi nomi, più istanze)"))
+    stats = diag.diff("previous", limit=args.top)
+    if stats:
+        print("  crescita per file:riga:")
+        for st in stats:
+            frame = st.traceback[0]
+            print(f"    {st.size_diff / 1024.0:+8.1f} KiB {st.count_diff:+6d}  {frame.filename}:{frame.lineno}")
+    diag.stop()
+    if not events.get("playing"):
+        # Senza audio i cicli non esercitano il worker: il confronto non dimostra nulla
+        failures.append("nessun avvio riuscito")
+    if failures:
+        print("Budget superato: " + ", ".join(failures))
+        return 1
+    print("Budget rispettato")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,362 @@
+"""Soak test: l'app vera per ore contro stream e gateway locali, con guasti iniettati.
+
+Avvia tools/fake_stream.py e tools/fake_gateway.py, punta l'app a entrambi
+(KIKUMOE_STREAM_URL, KIKUMOE_GATEWAY_URL) e costruisce il vero
+`ListenMoePlayer` su Qt offscreen con impostazioni in memoria (quelle
+dell'utente non vengono lette né modificate), poi avvia la riproduzione.
+Il backend è il vero PlayerFFmpeg con tools/fake_ffmpeg.py (che legge lo
+stream finto via HTTP) e FakePyAudio al posto di ffmpeg e PortAudio, così il
+soak esercita il worker audio su qualsiasi macchina; con --real-backend usa
+ffmpeg/VLC e il dispositivo audio veri.
+
+A intervalli casuali (riproducibili con --seed) inietta un guasto tra:
+  stream-stall    lo stream smette di inviare dati (watchdog di stallo di ffmpeg)
+  stream-drop     lo stream chiude le connessioni (EOF, riavvio della riproduzione)
+  stream-refuse   le prossime richieste allo stream ricevono 503 (tentativi ripetuti)
+  ws-drop         il gateway chiude il WebSocket (timer di riconnessione)
+  ws-malformed    il gateway invia payload non validi
+  device-error    le scritture sul dispositivo audio falliscono per qualche secondo
+
+Ogni --sample-every secondi registra RSS, thread (Python e del sistema), fd
+aperti, processi figli e CPU. Dopo il riscaldamento verifica che nessuna serie
+cresca in modo monotono (terzo finale sempre sopra il terzo iniziale, oltre
+una tolleranza): in quel caso esce con codice 1. Esce con 1 anche se l'app
+non ha riprodotto (nessuna richiesta allo stream o mai in riproduzione dopo
+il riscaldamento): un soak senza audio non misura nulla.
+
+Uso:
+    python tools/soak.py --duration 14400 --csv soak.csv
+    python tools/soak.py --duration 600 --fault-every 20 --faults stream-drop,ws-drop
+    python tools/soak.py --duration 3600 --real-backend     # ffmpeg/VLC e PortAudio veri
+"""
+from __future__ import annotations
+from typing import Callable, Dict, List, Optional
+import argparse
+import csv
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from fake_backends import FakePyAudio  # noqa: E402
+from fake_gateway import FakeGateway  # noqa: E402
+from fake_stream import FakeStream  # noqa: E402
+from constants import ENV_GATEWAY_URL, ENV_STREAM_URL  # noqa: E402
+from memory_diag import rss_kb, fd_count  # noqa: E402
+
+FAKE_FFMPEG = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_ffmpeg.py")]
+FAULTS = ("stream-stall", "stream-drop", "stream-refuse", "ws-drop", "ws-malformed", "device-error")
+# Metrica -> tolleranza di crescita tra il terzo iniziale e quello finale
+GROWTH_TOLERANCE = {
+    "rss_kb": 8192,
+    "py_threads": 0,
+    "os_threads": 0,
+    "fds": 0,
+    "children": 0,
+    "cpu_pct": 5.0,
+}
+
+
+def os_thread_count() -> Optional[int]:
+    try:
+        return len(os.listdir(f"/proc/{os.getpid()}/task"))
+    except Exception:
+        return None
+
+
+def child_count() -> Optional[int]:
+    """Processi figli diretti (ffmpeg, ...)."""
+    pid = os.getpid()
+    try:
+        children = 0
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/stat", "r") as f:
+                    ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+                if ppid == pid:
+                    children += 1
+            except Exception:
+                pass
+        return children
+    except Exception:
+        pass
+    try:
+        import psutil  # type: ignore
+        return len(psutil.Process(pid).children())
+    except Exception:
+        return None
+
+
+class _FailingStream:
+    """Avvolge lo stream PortAudio: le scritture falliscono come con un dispositivo scollegato."""
+
+    def __init__(self, inner) -> None:
+        self._inner = inner
+
+    def write(self, *_args, **_kwargs):
+        raise OSError(-9999, "Unanticipated host error (soak)")
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
+
+
+class Sampler:
+    def __init__(self) -> None:
+        self.rows: List[Dict[str, float]] = []
+        self._t0 = time.monotonic()
+        self._cpu_prev = self._cpu()
+        self._wall_prev = time.monotonic()
+
+    @staticmethod
+    def _cpu() -> float:
+        t = os.times()
+        return t.user + t.system
+
+    def sample(self, player_state: str) -> Dict[str, float]:
+        now = time.monotonic()
+        cpu = self._cpu()
+        wall = max(1e-6, now - self._wall_prev)
+        row = {
+            "t_s": round(now - self._t0, 1),
+            "rss_kb": rss_kb(),
+            "py_threads": threading.active_count(),
+            "os_threads": os_thread_count(),
+            "fds": fd_count(),
+            "children": child_count(),
+            "cpu_pct": round((cpu - self._cpu_prev) * 100.0 / wall, 1),
+            "state": player_state,
+        }
+        self._cpu_prev, self._wall_prev = cpu, now
+        self.rows.append(row)
+        return row
+
+
+def monotonic_growth(values: List[float], tolerance: float) -> Optional[str]:
+    """Descrizione della crescita se il terzo finale è tutto sopra il terzo iniziale
+    e le mediane crescono oltre la tolleranza; None altrimenti."""
+    vals = [v for v in values if v is not None]
+    if len(vals) < 6:
+        return None
+    k = len(vals) // 3
+    first, middle, last = vals[:k], vals[k:-k], vals[-k:]
+    m1, m2, m3 = statistics.median(first), statistics.median(middle), statistics.median(last)
+    if min(last) > max(first) and m1 <= m2 <= m3 and (m3 - m1) > tolerance:
+        return f"mediana {m1:g} -> {m2:g} -> {m3:g}"
+    return None
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Soak test con guasti iniettati (app reale, Qt offscreen)")
+    ap.add_argument("--duration", type=float, default=3600.0, help="durata totale (s)")
+    ap.add_argument("--warmup", type=float, default=120.0, help="secondi esclusi dalla verifica di crescita")
+    ap.add_argument("--sample-every", type=float, default=30.0)
+    ap.add_argument("--fault-every", type=float, default=60.0, help="intervallo medio tra i guasti (s)")
+    ap.add_argument("--faults", default=",".join(FAULTS), help="guasti da iniettare, separati da virgola")
+    ap.add_argument("--track-every", type=float, default=20.0, help="secondi tra un TRACK_UPDATE e il successivo")
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--csv", default=None, help="scrive i campioni in un file CSV")
+    ap.add_argument("--real-backend", action="store_true",
+                    help="ffmpeg/VLC e dispositivo audio veri invece di fake_ffmpeg e FakePyAudio")
+    args = ap.parse_args()
+
+    faults = [f.strip() for f in args.faults.split(",") if f.strip()]
+    unknown = [f for f in faults if f not in FAULTS]
+    if unknown:
+        ap.error(f"guasti sconosciuti: {', '.join(unknown)}")
+    seed = args.seed if args.seed is not None else int(time.time())
+    rng = random.Random(seed)
+
+    stream = FakeStream().start()
+    gw = FakeGateway(heartbeat_ms=15000).start()
+    os.environ[ENV_STREAM_URL] = stream.url
+    os.environ[ENV_GATEWAY_URL] = gw.url
+    os.environ["KIKUMOE_INSTANCE"] = f"KikuMoe-soak-{os.getpid()}"
+
+    import settings_store
+
+    class _MemoryBackend:
+        def __init__(self, values):
+            self.values = dict(values)
+
+        def load(self):
+            return dict(self.values)
+
+        def write(self, changes):
+            pass
+
+    settings_store._store = settings_store.SettingsStore(
+        backend=_MemoryBackend({"tray_enabled": "false", "ws_enabled": "true"}))
+
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtCore import QTimer
+    app = QApplication.instance() or QApplication(sys.argv)
+    from ui.main_window import ListenMoePlayer
+
+    factory = None
+    if not args.real_backend:
+        from player_ffmpeg import PlayerFFmpeg
+        # fake_ffmpeg legge lo stream finto: stalli, chiusure e 503 arrivano al worker
+        os.environ["FAKE_FFMPEG_INPUT"] = "url"
+        pa = FakePyAudio(realtime=True)
+
+        def factory(**kwargs):
+            return PlayerFFmpeg(ffmpeg_cmd=FAKE_FFMPEG, pyaudio_module=pa, **kwargs)
+    window = ListenMoePlayer(player_factory=factory)
+    window.show()
+
+    # Stato del player dagli eventi pubblicati dalla finestra (stessi dell'API locale)
+    state = {"player": "n/d"}
+    counts: Dict[str, int] = {}
+    t_start = time.monotonic()
+    last_playing = [None]
+    orig_publish = window._publish
+
+    def _publish(event: str, data: dict) -> None:
+        if event == "player":
+            st = str(data.get("state") or "")
+            state["player"] = st
+            counts[st] = counts.get(st, 0) + 1
+            if st == "playing":
+                last_playing[0] = time.monotonic() - t_start
+        orig_publish(event, data)
+    window._publish = _publish
+
+    def start_playback() -> None:
+        # Il backend nasce dopo il primo paint (avvio differito della finestra)
+        if not getattr(window, "_startup_done", False) or window.player is None:
+            QTimer.singleShot(100, start_playback)
+            return
+        window.play_stream()
+
+    def device_error() -> None:
+        # Stream PortAudio dell'uscita condivisa (FFmpeg o VLC in modalità callback)
+        sink = getattr(getattr(window, "player", None), "_sink", None)
+        inner = getattr(sink, "stream", None)
+        if inner is None or isinstance(inner, _FailingStream):
+            return
+        sink.stream = _FailingStream(inner)
+
+        def _restore() -> None:
+            # Ripristina solo se il player non ha già ricreato lo stream
+            if isinstance(sink.stream, _FailingStream):
+                sink.stream = inner
+        QTimer.singleShot(3000, _restore)
+
+    actions: Dict[str, Callable[[], None]] = {
+        "stream-stall": lambda: stream.stall(rng.uniform(11.0, 15.0)),
+        "stream-drop": stream.drop_clients,
+        "stream-refuse": lambda: (stream.refuse(rng.randint(1, 3)), stream.drop_clients()),
+        "ws-drop": lambda: gw.drop_clients(abrupt=rng.random() < 0.5),
+        "ws-malformed": lambda: gw.send_malformed(rng.randint(0, 10)),
+        "device-error": device_error,
+    }
+    injected: Dict[str, int] = {}
+    sampler = Sampler()
+    track_no = [0]
+
+    def inject() -> None:
+        name = rng.choice(faults)
+        injected[name] = injected.get(name, 0) + 1
+        print(f"[{sampler.rows[-1]['t_s'] if sampler.rows else 0:>7.0f}s] guasto: {name}")
+        try:
+            actions[name]()
+        except Exception as e:
+            print(f"  errore nell'iniezione: {e}")
+        fault_timer.start(int(rng.uniform(0.5, 1.5) * args.fault_every * 1000))
+
+    def push_track() -> None:
+        track_no[0] += 1
+        gw.push_track(f"Soak track #{track_no[0]}", ["Soak Artist"], duration=int(args.track_every))
+
+    def sample() -> None:
+        row = sampler.sample(state["player"])
+        print(f"[{row['t_s']:>7.0f}s] RSS {row['rss_kb']} KiB  thread {row['py_threads']}/{row['os_threads']}  "
+              f"fd {row['fds']}  figli {row['children']}  CPU {row['cpu_pct']}%  stato {row['state']}")
+
+    fault_timer = QTimer()
+    fault_timer.setSingleShot(True)
+    fault_timer.timeout.connect(inject)
+    track_timer = QTimer()
+    track_timer.timeout.connect(push_track)
+    sample_timer = QTimer()
+    sample_timer.timeout.connect(sample)
+
+    print(f"Soak: {args.duration:.0f}s, guasti {', '.join(faults)} ogni ~{args.fault_every:.0f}s, seed {seed}")
+    print(f"  stream {stream.url}  gateway {gw.url}")
+    # I guasti iniziano dopo il riscaldamento: la base delle misure resta pulita
+    fault_timer.start(int(max(args.warmup, 1.0) * 1000))
+    track_timer.start(int(args.track_every * 1000))
+    sample_timer.start(int(args.sample_every * 1000))
+    QTimer.singleShot(1000, push_track)
+    QTimer.singleShot(0, start_playback)
+    QTimer.singleShot(int(args.duration * 1000), app.quit)
+    app.exec_()
+    for t in (fault_timer, track_timer, sample_timer):
+        t.stop()
+    sample()
+
+    if args.csv:
+        fields = ["t_s", "rss_kb", "py_threads", "os_threads", "fds", "children", "cpu_pct", "state"]
+        with open(args.csv, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(sampler.rows)
+
+    rows = [r for r in sampler.rows if r["t_s"] >= args.warmup]
+    print(f"== Soak terminato: {len(sampler.rows)} campioni, {len(rows)} dopo il riscaldamento ==")
+    print("  guasti iniettati: " + (", ".join(f"{k} {v}" for k, v in sorted(injected.items())) or "nessuno"))
+    print("  eventi player: " + (", ".join(f"{k} {v}" for k, v in sorted(counts.items())) or "nessuno"))
+    print(f"  stream: {stream.requests} richieste, {stream.refused} rifiutate; gateway: {gw.messages_sent} messaggi")
+    failures = []
+    # Senza audio le serie non dicono nulla: il soak non è superato
+    not_played = []
+    if stream.requests == 0:
+        not_played.append("nessuna richiesta allo stream")
+    if last_playing[0] is None:
+        not_played.append("nessun evento 'playing'")
+    elif last_playing[0] < args.warmup and not any(r["state"] == "playing" for r in rows):
+        not_played.append("mai in riproduzione dopo il riscaldamento")
+    for key, tol in GROWTH_TOLERANCE.items():
+        vals = [r[key] for r in rows]
+        present = [v for v in vals if v is not None]
+        if not present:
+            print(f"  {key:11s} n/d")
+            continue
+        growth = monotonic_growth(vals, tol)
+        print(f"  {key:11s} min {min(present):g}  max {max(present):g}  ultimo {present[-1]:g}"
+              + (f"  CRESCITA ({growth})" if growth else ""))
+        if growth:
+            failures.append(key)
+
+    try:
+        window.close()
+    except Exception:
+        pass
+    try:
+        if getattr(window, "ws", None) is not None:
+            window.ws.shutdown()
+    except Exception:
+        pass
+    gw.stop()
+    stream.stop()
+    if not_played:
+        print("L'app non ha riprodotto: " + "; ".join(not_played))
+        return 1
+    if failures:
+        print("Crescita monotona: " + ", ".join(failures))
+        return 1
+    print("Nessuna crescita monotona")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""Budget dei tempi di avvio.
+
+1) `python -X importtime -c "import ui.main_window"`: tempo di import della
+   finestra principale, moduli più costosi e verifica che i moduli pesanti
+   (vlc, pyaudio, websocket, backend audio, cronologia) non vengano importati
+   prima del primo paint.
+2) Avvia l'app vera (Qt offscreen, impostazioni in memoria: quelle dell'utente
+   non vengono lette né modificate) con KIKUMOE_STARTUP_TRACE=1 e misura,
+   dall'avvio del processo, i marker di startup_trace: import, window_created,
+   first_paint, subsystems_ready e (con --audio, avvio con --play) first_audio.
+
+Esce con codice 1 se un budget viene superato.
+
+Uso:
+    python tools/startup_budget.py --runs 3
+    python tools/startup_budget.py --audio --audio-budget-ms 6000
+"""
+from __future__ import annotations
+from typing import Dict, List, Optional, Tuple
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Moduli che non devono essere caricati dall'import della finestra principale
+LAZY_MODULES = ("vlc", "pyaudio", "websocket", "player_vlc", "player_ffmpeg", "ws_client", "history", "sqlite3")
+
+_BOOTSTRAP = """
+import sys
+sys.path.insert(0, {root!r})
+import startup_trace
+import settings_store
+
+class _MemoryBackend:
+    def __init__(self, values):
+        self.values = dict(values)
+    def load(self):
+        return dict(self.values)
+    def write(self, changes):
+        pass
+
+settings_store._store = settings_store.SettingsStore(backend=_MemoryBackend({values!r}))
+sys.argv[1:] = {argv!r}
+import KikuMoe
+KikuMoe.main()
+"""
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """Righe di -X importtime -> [(modulo, self_us, cumulative_us)]."""
+    out = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        try:
+            _prefix, rest = line.split(":", 1)
+            self_us, cum_us, name = rest.split("|", 2)
+            out.append((name.strip(), int(self_us), int(cum_us)))
+        except ValueError:
+            continue
+    return out
+
+
+def measure_imports(target: str) -> Tuple[Optional[int], List[Tuple[str, int, int]]]:
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {target}"],
+                          cwd=ROOT, capture_output=True, text=True, timeout=120)
+    rows = parse_importtime(proc.stderr)
+    total = next((cum for name, _s, cum in rows if name == target), None)
+    return total, rows
+
+
+def run_app(exit_marker: str, play: bool, timeout: float) -> Dict[str, Tuple[float, float]]:
+    """Avvia l'app e ritorna {marker: (ms_dal_lancio, ms_interni)}."""
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    env["KIKUMOE_STARTUP_TRACE"] = "1"
+    env["KIKUMOE_STARTUP_EXIT"] = exit_marker
+    # Canale d'istanza singola dedicato: non inoltra all'app eventualmente già aperta
+    env["KIKUMOE_INSTANCE"] = f"KikuMoe-budget-{os.getpid()}"
+    values = {"tray_enabled": "false"}
+    code = _BOOTSTRAP.format(root=ROOT, values=values, argv=["--play"] if play else [])
+    marks: Dict[str, Tuple[float, float]] = {}
+    t0 = time.monotonic()
+    proc = subprocess.Popen([sys.executable, "-c", code], cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    timer = threading.Timer(timeout, proc.kill)
+    timer.start()
+    try:
+        for line in proc.stderr:
+            if not line.startswith("[startup] "):
+                continue
+            wall = (time.monotonic() - t0) * 1000.0
+            try:
+                _tag, name, internal = line.split()
+                marks[name] = (wall, float(internal))
+            except ValueError:
+                continue
+        proc.wait()
+    finally:
+        timer.cancel()
+    return marks
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Budget dei tempi di avvio (import, primo paint, primo audio)")
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--import-budget-ms", type=float, default=400.0, help="import di ui.main_window")
+    ap.add_argument("--paint-budget-ms", type=float, default=1500.0, help="dal lancio al primo paint")
+    ap.add_argument("--audio", action="store_true", help="avvia con --play e misura fino al primo audio (serve rete + ffmpeg/VLC)")
+    ap.add_argument("--audio-budget-ms", type=float, default=6000.0, help="dal lancio al primo audio")
+    ap.add_argument("--timeout", type=float, default=30.0)
+    ap.add_argument("--top", type=int, default=10, help="moduli più costosi da mostrare")
+    args = ap.parse_args()
+
+    failures: List[str] = []
+
+    print("== Import (python -X importtime) ==")
+    total_us, rows = measure_imports("ui.main_window")
+    if total_us is None:
+        print("  import di ui.main_window fallito")
+        failures.append("import")
+    else:
+        print(f"  ui.main_window: {total_us / 1000.0:.1f} ms (budget {args.import_budget_ms:.0f} ms)")
+        if total_us / 1000.0 > args.import_budget_ms:
+            failures.append("import")
+        for name, self_us, cum_us in sorted(rows, key=lambda r: r[1], reverse=True)[:args.top]:
+            print(f"    {self_us / 1000.0:8.1f} ms self  {cum_us / 1000.0:8.1f} ms cum  {name}")
+        loaded = {name.split(".")[0] for name, _s, _c in rows}
+        eager = [m for m in LAZY_MODULES if m in loaded]
+        if eager:
+            print(f"  importati troppo presto: {', '.join(eager)}")
+            failures.append("lazy-imports")
+        else:
+            print("  backend audio, WebSocket e cronologia non importati all'avvio: OK")
+
+    exit_marker = "first_audio" if args.audio else "subsystems_ready"
+    print(f"== Avvio app ({args.runs} esecuzioni, fino a {exit_marker}) ==")
+    per_marker: Dict[str, List[Tuple[float, float]]] = {}
+    for _ in range(max(1, args.runs)):
+        for name, val in run_app(exit_marker, args.audio, args.timeout).items():
+            per_marker.setdefault(name, []).append(val)
+    order = ["imports", "window_created", "first_paint", "subsystems_ready", "first_audio"]
+    for name in order:
+        vals = per_marker.get(name)
+        if not vals:
+            if name != "first_audio" or args.audio:
+                print(f"  {name:17s} non raggiunto")
+            continue
+        wall = statistics.median(v[0] for v in vals)
+        internal = statistics.median(v[1] for v in vals)
+        print(f"  {name:17s} {wall:8.1f} ms dal lancio  ({internal:.1f} ms dall'entry point)")
+    paint = per_marker.get("first_paint")
+    if not paint or statistics.median(v[0] for v in paint) > args.paint_budget_ms:
+        failures.append("first_paint")
+    if args.audio:
+        audio = per_marker.get("first_audio")
+        if not audio or statistics.median(v[0] for v in audio) > args.audio_budget_ms:
+            failures.append("first_audio")
+
+    if failures:
+        print(f"BUDGET SUPERATO: {', '.join(failures)}")
+        return 1
+    print("Budget rispettati")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
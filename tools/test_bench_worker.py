@@ -0,0 +1,60 @@
+"""Benchmark del worker FFmpeg e della UI come test pytest (stessi scenari di bench_worker.py).
+
+PlayerFFmpeg gira con tools/fake_ffmpeg.py e FakePyAudio, la finestra vera
+(Qt offscreen) con FakePlayer: non servono ffmpeg, PortAudio né rete.
+I limiti sono larghi di proposito: i test segnalano regressioni grossolane
+(worker più lento del tempo reale, stop che attende il watchdog, eventi
+persi), le misure fini restano a bench_worker.py.
+
+Uso:
+    python -m pytest -q tools/test_bench_worker.py
+"""
+from __future__ import annotations
+import os
+import sys
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+if HERE not in sys.path:
+    sys.path.insert(0, HERE)
+
+import bench_worker  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def _fake_env(monkeypatch):
+    # Impostazioni in memoria e variabili di fake_ffmpeg ripristinate dopo ogni test
+    monkeypatch.delenv("FAKE_FFMPEG_SCRIPT", raising=False)
+    monkeypatch.delenv("FAKE_FFMPEG_INPUT", raising=False)
+    monkeypatch.setenv("FAKE_FFMPEG_SPEED", "1")
+    bench_worker.use_memory_settings()
+
+
+def test_worker_throughput():
+    r = bench_worker.bench_throughput(1.0)
+    assert r["writes"] > 0
+    # Senza attese di PortAudio il worker deve stare ben sopra il tempo reale
+    assert r["speed_x"] > 2.0, r
+
+
+def test_worker_play_stop_cycles():
+    r = bench_worker.bench_startup(3)
+    assert r["ok"] == r["cycles"], r
+    assert r["streams_open"] == 0, r
+    # Lo stop non aspetta il ciclo del watchdog di stallo (0,5 s)
+    assert r["stop_p95_ms"] < 400.0, r
+
+
+def test_worker_ffmpeg_error_exit():
+    r = bench_worker.bench_exit()
+    assert r["playing_ms"] == r["playing_ms"], r
+    assert r["error_ms"] == r["error_ms"], "nessun 'error' dopo l'uscita di ffmpeg con codice 1"
+
+
+def test_ui_event_handling():
+    r = bench_worker.bench_ui(3)
+    assert r["ok"] == r["cycles"], r
+    assert r["stop_p95_ms"] == r["stop_p95_ms"], r
+    for code in ("opening", "buffering", "playing", "paused", "stopped"):
+        assert r[f"event_{code}_p95_ms"] < 100.0, r
@@ -0,0 +1,331 @@
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Optional, Dict, Set, Tuple
+from urllib.parse import urlsplit, urljoin
+import hashlib
+import http.client
+import os
+import queue
+import threading
+import time
+from PyQt5.QtCore import QObject, pyqtSignal, Qt
+from PyQt5.QtGui import QImage, QPixmap
+from logger import get_logger
+from constants import get_app_data_dir, ENV_ART_BASE_URL
+
+# Copertine e immagini artista del CDN di LISTEN.moe.
+# Download, decodifica e ridimensionamento avvengono su un thread dedicato
+# (con connessioni HTTP keep-alive riusate); la GUI riceve un QImage già in
+# scala e lo converte in QPixmap tenendolo in una LRU in memoria. Le miniature
+# vengono salvate anche su disco (cache limitata in dimensione, eviction LRU).
+
+CDN_BASE_URL = "https://cdn.listen.moe/"
+COVERS_PATH = "covers/"
+ARTISTS_PATH = "artists/"
+DEFAULT_THUMB_SIZE = 64
+DEFAULT_MEMORY_ITEMS = 64
+DEFAULT_DISK_MAX_BYTES = 50 * 1024 * 1024
+_USER_AGENT = "KikuMoe"
+_STOP = None
+
+
+def art_url_for(info: dict) -> Optional[str]:
+    """URL dell'immagine da mostrare per un brano (copertina, altrimenti artista)."""
+    try:
+        base = os.environ.get(ENV_ART_BASE_URL) or CDN_BASE_URL
+        if not base.endswith("/"):
+            base += "/"
+        album_image = info.get("album_image")
+        if album_image:
+            return urljoin(base, COVERS_PATH + str(album_image))
+        artist_image = info.get("artist_image")
+        if artist_image:
+            return urljoin(base, ARTISTS_PATH + str(artist_image))
+    except Exception:
+        pass
+    return None
+
+
+class ArtService(QObject):
+    """Servizio copertine: `pixmap(url)` serve solo dalla cache (thread GUI),
+    `prefetch(url)` accoda il download ed è sicuro da qualsiasi thread.
+    Emette `art_ready(url)` quando una nuova immagine è disponibile in cache.
+    """
+    art_ready = pyqtSignal(str)
+    _image_loaded = pyqtSignal(str, QImage)
+
+    def __init__(self, parent=None, thumb_size: int = DEFAULT_THUMB_SIZE,
+                 memory_items: int = DEFAULT_MEMORY_ITEMS,
+                 disk_max_bytes: int = DEFAULT_DISK_MAX_BYTES,
+                 cache_dir: Optional[str] = None, timeout: float = 10.0) -> None:
+        super().__init__(parent)
+        self.log = get_logger('ArtService')
+        self.thumb_size = max(16, int(thumb_size))
+        self.memory_items = max(1, int(memory_items))
+        self.disk_max_bytes = max(0, int(disk_max_bytes))
+        self.cache_dir = cache_dir or os.path.join(get_app_data_dir(), "art_cache")
+        self.timeout = float(timeout)
+        # LRU in memoria (solo thread GUI)
+        self._pixmaps: "OrderedDict[str, QPixmap]" = OrderedDict()
+        # Stato condiviso con il worker
+        self._lock = threading.Lock()
+        self._cached: Set[str] = set()
+        self._pending: Set[str] = set()
+        self._failed: Dict[str, float] = {}
+        # LIFO: in caso di raffiche di TRACK_UPDATE conta l'ultimo brano
+        self._queue: "queue.LifoQueue[Optional[str]]" = queue.LifoQueue()
+        self._worker: Optional[threading.Thread] = None
+        self._conns: Dict[Tuple[str, str], http.client.HTTPConnection] = {}
+        self._disk_usage: Optional[int] = None
+        self.failure_ttl = 600.0
+        self._image_loaded.connect(self._on_image_loaded, Qt.QueuedConnection)
+
+    # ---- API (thread GUI) ----
+    def pixmap(self, url: Optional[str]) -> Optional[QPixmap]:
+        """Ritorna la miniatura se già in memoria; non blocca mai."""
+        if not url:
+            return None
+        pm = self._pixmaps.get(url)
+        if pm is not None:
+            self._pixmaps.move_to_end(url)
+        return pm
+
+    def is_pending(self, url: Optional[str]) -> bool:
+        if not url:
+            return False
+        with self._lock:
+            return url in self._pending
+
+    def clear_memory(self) -> None:
+        self._pixmaps.clear()
+        with self._lock:
+            self._cached.clear()
+
+    # ---- API (qualsiasi thread) ----
+    def prefetch(self, url: Optional[str]) -> bool:
+        """Accoda il caricamento di `url` (disco o rete). Ritorna True se accodato."""
+        if not url:
+            return False
+        with self._lock:
+            if url in self._cached or url in self._pending:
+                return False
+            failed_at = self._failed.get(url)
+            if failed_at is not None and (time.monotonic() - failed_at) < self.failure_ttl:
+                return False
+            self._pending.add(url)
+            self._ensure_worker_locked()
+        self._queue.put(url)
+        return True
+
+    def shutdown(self, timeout: float = 2.0) -> None:
+        w = self._worker
+        if w is None:
+            return
+        self._queue.put(_STOP)
+        try:
+            w.join(timeout=timeout)
+        except Exception:
+            pass
+        self._worker = None
+
+    # ---- Interni ----
+    def _ensure_worker_locked(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            return
+        self._worker = threading.Thread(target=self._run, name="ArtService", daemon=True)
+        self._worker.start()
+
+    def _on_image_loaded(self, url: str, image: QImage) -> None:
+        # Thread GUI: la conversione QImage -> QPixmap è economica (immagine già in scala)
+        try:
+            pm = QPixmap.fromImage(image)
+            if pm.isNull():
+                return
+            self._pixmaps[url] = pm
+            self._pixmaps.move_to_end(url)
+            while len(self._pixmaps) > self.memory_items:
+                old, _ = self._pixmaps.popitem(last=False)
+                with self._lock:
+                    self._cached.discard(old)
+        except Exception:
+            return
+        try:
+            self.art_ready.emit(url)
+        except Exception:
+            pass
+
+    def _run(self) -> None:
+        while True:
+            url = self._queue.get()
+            if url is _STOP:
+                break
+            image: Optional[QImage] = None
+            try:
+                image = self._load(url)
+            except Exception as e:
+                try:
+                    self.log.debug("[DEBUG] art load failed for %s: %s", url, e)
+                except Exception:
+                    pass
+                image = None
+            with self._lock:
+                self._pending.discard(url)
+                if image is None:
+                    self._failed[url] = time.monotonic()
+                else:
+                    self._failed.pop(url, None)
+                    self._cached.add(url)
+            if image is not None:
+                try:
+                    self._image_loaded.emit(url, image)
+                except Exception:
+                    pass
+        for conn in list(self._conns.values()):
+            try:
+                conn.close()
+            except Exception:
+                pass
+        self._conns.clear()
+
+    def _disk_path(self, url: str) -> str:
+        digest = hashlib.sha1(f"{url}|{self.thumb_size}".encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, digest + ".png")
+
+    def _load(self, url: str) -> Optional[QImage]:
+        path = self._disk_path(url)
+        # 1) cache su disco: la miniatura è già in scala
+        try:
+            if os.path.isfile(path):
+                img = QImage(path)
+                if not img.isNull():
+                    try:
+                        os.utime(path, None)
+                    except Exception:
+                        pass
+                    return img
+        except Exception:
+            pass
+        # 2) rete
+        data = self._fetch(url)
+        if not data:
+            return None
+        img = QImage()
+        if not img.loadFromData(data):
+            return None
+        if img.width() > self.thumb_size or img.height() > self.thumb_size:
+            img = img.scaled(self.thumb_size, self.thumb_size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        self._store(path, img)
+        return img
+
+    def _fetch(self, url: str, redirects: int = 3) -> Optional[bytes]:
+        parts = urlsplit(url)
+        scheme = (parts.scheme or "https").lower()
+        host = parts.netloc
+        if not host or scheme not in ("http", "https"):
+            return None
+        target = parts.path or "/"
+        if parts.query:
+            target += "?" + parts.query
+        headers = {"User-Agent": _USER_AGENT, "Connection": "keep-alive"}
+        # Un tentativo extra se la connessione riusata è stata chiusa dal server
+        for attempt in range(2):
+            conn = self._connection(scheme, host)
+            try:
+                conn.request("GET", target, headers=headers)
+                resp = conn.getresponse()
+                body = resp.read()
+            except (http.client.HTTPException, OSError):
+                self._drop_connection(scheme, host)
+                if attempt == 0:
+                    continue
+                raise
+            if resp.getheader("Connection", "").lower() == "close":
+                self._drop_connection(scheme, host)
+            if resp.status in (301, 302, 303, 307, 308) and redirects > 0:
+                loc = resp.getheader("Location")
+                if loc:
+                    return self._fetch(urljoin(url, loc), redirects - 1)
+                return None
+            if resp.status != 200:
+                return None
+            return body
+        return None
+
+    def _connection(self, scheme: str, host: str) -> http.client.HTTPConnection:
+        key = (scheme, host)
+        conn = self._conns.get(key)
+        if conn is None:
+            if scheme == "https":
+                conn = http.client.HTTPSConnection(host, timeout=self.timeout)
+            else:
+                conn = http.client.HTTPConnection(host, timeout=self.timeout)
+            self._conns[key] = conn
+        return conn
+
+    def _drop_connection(self, scheme: str, host: str) -> None:
+        conn = self._conns.pop((scheme, host), None)
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def _store(self, path: str, img: QImage) -> None:
+        if self.disk_max_bytes <= 0:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = path + ".tmp"
+            if not img.save(tmp, "PNG"):
+                return
+            os.replace(tmp, path)
+            size = os.path.getsize(path)
+        except Exception:
+            return
+        if self._disk_usage is None:
+            self._disk_usage = self._scan_disk_usage()
+        else:
+            self._disk_usage += size
+        if self._disk_usage > self.disk_max_bytes:
+            self._evict_disk()
+
+    def _scan_disk_usage(self) -> int:
+        total = 0
+        try:
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    try:
+                        if entry.is_file() and entry.name.endswith(".png"):
+                            total += entry.stat().st_size
+                    except Exception:
+                        pass
+        except Exception:
+            pass
+        return total
+
+    def _evict_disk(self) -> None:
+        """Rimuove i file usati meno di recente fino a scendere al 90% del limite."""
+        entries = []
+        try:
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    try:
+                        if entry.is_file() and entry.name.endswith(".png"):
+                            st = entry.stat()
+                            entries.append((st.st_mtime, st.st_size, entry.path))
+                    except Exception:
+                        pass
+        except Exception:
+            return
+        entries.sort()
+        total = sum(e[1] for e in entries)
+        target = int(self.disk_max_bytes * 0.9)
+        for _mtime, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except Exception:
+                pass
+        self._disk_usage = total
@@ -1,27 +1,82 @@
-from PyQt5.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QTextEdit, QCheckBox, QComboBox, QFileDialog, QSizePolicy
+from PyQt5.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QPlainTextEdit, QCheckBox, QComboBox, QFileDialog, QSizePolicy, QLineEdit, QLabel
 from PyQt5.QtGui import QTextCursor, QTextOption
 from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot, QTimer, Qt
-import builtins
+from collections import deque
 import logging
+import threading
+import logger as applog
+import profiler
+import perf_monitor
+import memory_diag
+from ui.loop_probe import EventLoopProbe
+
+# La console mostra una vista filtrata dell'archivio dei log (log_store.LogStore):
+# i filtri per livello, logger e testo si applicano a tutti i record in memoria.
+# Limiti: righe visibili nel documento e scritture in attesa del thread GUI.
+MAX_CONSOLE_LINES = 5000
+MAX_BUFFERED_LINES = 5000
+# Intervallo di raggruppamento delle righe in arrivo (~1 frame)
+FLUSH_INTERVAL_MS = 16
+# Attesa dopo l'ultima modifica del filtro di testo prima di rifiltrare
+FILTER_DELAY_MS = 120
+# Aggiornamento del pulsante del profiler (secondi trascorsi)
+PROFILE_TICK_MS = 1000
+# Funzioni mostrate per thread nel riepilogo del profiler
+PROFILE_TOP_FUNCTIONS = 12
+# Aggiornamento del pannello delle prestazioni (perf_monitor)
+PERF_REFRESH_MS = 1000
+# Istantanee automatiche della memoria (memory_diag)
+MEMORY_AUTO_SNAPSHOT_MS = 60000
 
 
 class _QtStream(QObject):
+    """Stream thread-safe: accumula il testo e sveglia il thread GUI una sola volta
+    per gruppo di scritture (invece di un evento Qt per riga)."""
     text_emitted = pyqtSignal(str)
+    lines_dropped = pyqtSignal(int)
+    _wake = pyqtSignal()
 
-    def __init__(self, append_fn):
+    def __init__(self, append_fn, dropped_fn=None):
         super().__init__()
+        self._lock = threading.Lock()
+        self._chunks = deque(maxlen=MAX_BUFFERED_LINES)
+        self.dropped = 0
         try:
             self.text_emitted.connect(append_fn, Qt.QueuedConnection)
+            if dropped_fn is not None:
+                self.lines_dropped.connect(dropped_fn, Qt.QueuedConnection)
+            self._wake.connect(self._drain, Qt.QueuedConnection)
         except Exception:
             pass
 
     def write(self, s):
         try:
             if s:
-                self.text_emitted.emit(str(s))
+                with self._lock:
+                    was_empty = not self._chunks
+                    if len(self._chunks) == self._chunks.maxlen:
+                        self.dropped += 1
+                    self._chunks.append(str(s))
+                if was_empty:
+                    self._wake.emit()
         except Exception:
             pass
 
+    def _drain(self):
+        with self._lock:
+            chunks = list(self._chunks)
+            self._chunks.clear()
+            dropped, self.dropped = self.dropped, 0
+        if dropped:
+            self.lines_dropped.emit(dropped)
+        if chunks:
+            self.text_emitted.emit(''.join(chunks))
+
+    def discard_pending(self):
+        with self._lock:
+            self._chunks.clear()
+            self.dropped = 0
+
     def flush(self):
         pass
 
@@ -29,19 +84,6 @@ class _QtStream(QObject):
         return False
 
 
-class _DevConsoleHandler(logging.Handler):
-    def __init__(self, write_fn):
-        super().__init__()
-        self._write = write_fn
-
-    def emit(self, record: logging.LogRecord):
-        try:
-            msg = self.format(record)
-            self._write(msg + "\n")
-        except Exception:
-            pass
-
-
 class DevConsole(QObject):
     def __init__(self, parent=None, translator=None, logger=None):
         super().__init__(parent)
@@ -50,8 +92,6 @@ class DevConsole(QObject):
         self._logger = logger
         self._console_dialog = None
         self._console_text = None
-        # monkeypatch print
-        self._old_print = None
         # Qt stream per append thread-safe
         self._qt_stream = None
         # pulsanti
@@ -63,20 +103,46 @@ class DevConsole(QObject):
         self._cb_autoscroll = None
         self._cb_wrap = None
         self._level_combo = None
+        self._logger_combo = None
+        self._filter_edit = None
+        self._filter_timer = None
         # stati
         self._autoscroll_enabled = True
         self._paused = False
-        self._pause_buffer = []
-        # logging handler dedicato
-        self._log_handler = None
-        # elenco dei logger a cui ho agganciato l'handler (oltre al root)
-        self._attached_loggers = []
+        # rimozione del sink registrato sulla pipeline di logging
+        self._remove_sink = None
+        # filtri della vista (applicati anche ai record già in archivio)
+        self._console_level = logging.DEBUG
+        self._logger_filter = None
+        self._text_filter = ''
+        self._known_loggers = 0
+        self._view_seq = -1
+        # "Pulisci": le voci fino a questo numero di sequenza non vengono più mostrate
+        self._clear_seq = -1
         # stato logging indipendente dalla UI
         self._logging_active = False
-        # buffer dei log ricevuti prima che la UI sia aperta
-        self._preopen_buffer = []
+        # Righe in attesa di essere inserite nel documento (svuotate una volta per frame)
+        self._pending_lines = []
+        self._flush_timer = None
+        # Stato dell'ultimo carattere del documento, senza rileggerlo
+        self._ends_with_newline = True
         # filtro per i messaggi [DEV]
         self._show_dev = False
+        # profiler a campionamento (vedi profiler.py): nessun thread finché non viene avviato
+        self._btn_profile = None
+        self._profile_timer = None
+        self._profile_dialog = None
+        self._profile_text = None
+        # monitor delle latenze (attivo insieme alla cattura dei log) e pannello live
+        self._loop_probe = None
+        self._cb_perf = None
+        self._perf_view = None
+        self._perf_timer = None
+        # diagnostica memoria (tracemalloc attivo solo con la finestra aperta)
+        self._btn_memory = None
+        self._memory_dialog = None
+        self._memory_text = None
+        self._memory_timer = None
 
     def _t(self, key: str, default: str = None):
         try:
@@ -95,7 +161,10 @@ class DevConsole(QObject):
 
     def set_show_dev(self, show: bool) -> None:
         try:
-            self._show_dev = bool(show)
+            show = bool(show)
+            if show != self._show_dev:
+                self._show_dev = show
+                self._rebuild_view()
         except Exception:
             pass
 
@@ -109,97 +178,63 @@ class DevConsole(QObject):
         # Prepara stream Qt che invia a _append_console (thread-safe)
         try:
             if self._qt_stream is None:
-                self._qt_stream = _QtStream(self._append_console)
+                self._qt_stream = _QtStream(self._append_console, self._on_lines_dropped)
         except Exception:
             self._qt_stream = None
-        # Monkeypatch di print per catturare stdout
+        # I record arrivano già strutturati dal listener della pipeline di logging
         try:
-            if self._old_print is None:
-                self._old_print = getattr(builtins, 'print', None)
-                def _console_print(*args, **kwargs):
-                    try:
-                        sep = kwargs.get('sep', ' ')
-                        end = kwargs.get('end', '\n')
-                        text = sep.join(str(a) for a in args) + end
-                        try:
-                            if self._qt_stream:
-                                self._qt_stream.write(text)
-                        except Exception:
-                            pass
-                        try:
-                            if self._old_print is not None:
-                                file_kw = kwargs.copy()
-                                self._old_print(*args, **file_kw)
-                        except Exception:
-                            pass
-                    except Exception:
-                        pass
-                try:
-                    builtins.print = _console_print
-                except Exception:
-                    pass
+            if self._remove_sink is None:
+                self._remove_sink = applog.add_sink(self._on_log_entry)
+            # Log di librerie esterne che arrivano al root logger
+            applog.capture_root_logger(True)
         except Exception:
             pass
-        # Aggiungi logging handler
+        # Con la console attiva l'archivio raccoglie anche DEBUG (il livello scelto è solo un
+        # filtro della vista); stdout, file e livelli configurati non cambiano
         try:
-            if self._qt_stream and self._log_handler is None:
-                self._log_handler = _DevConsoleHandler(self._qt_stream.write)
-                self._log_handler.setLevel(logging.DEBUG)
-                fmt = logging.Formatter('[%(levelname)s] [%(name)s] %(message)s')
-                self._log_handler.setFormatter(fmt)
-                root_logger = logging.getLogger()
-                if self._log_handler not in getattr(root_logger, 'handlers', []):
-                    root_logger.addHandler(self._log_handler)
-                try:
-                    for lname in list(logging.Logger.manager.loggerDict.keys()):
-                        try:
-                            lg = logging.getLogger(lname)
-                            if self._log_handler not in getattr(lg, 'handlers', []):
-                                lg.addHandler(self._log_handler)
-                                self._attached_loggers.append(lg)
-                        except Exception:
-                            pass
-                except Exception:
-                    pass
+            applog.set_capture_level(logging.DEBUG)
+        except Exception:
+            pass
+        # Latenze (loop eventi, scritture audio, lock): le soglie finiscono nel log
+        try:
+            perf_monitor.get_monitor().set_enabled(True)
+            if self._loop_probe is None:
+                self._loop_probe = EventLoopProbe(self)
+            self._loop_probe.start()
         except Exception:
             pass
         self._logging_active = True
 
-    # Nuovo: disattiva la cattura dei log e ripristina gli hook
+    # Nuovo: disattiva la cattura dei log e ripristina i livelli
     def deactivate_logging(self) -> None:
         try:
-            if not getattr(self, '_logging_active', False) and self._log_handler is None and self._old_print is None:
+            if not getattr(self, '_logging_active', False) and self._remove_sink is None:
                 return
         except Exception:
             pass
-        # Ripristina print originale
         try:
-            if self._old_print is not None:
-                builtins.print = self._old_print
+            if self._remove_sink is not None:
+                self._remove_sink()
         except Exception:
             pass
-        self._old_print = None
-        # Sgancia handler di logging
+        self._remove_sink = None
         try:
-            if self._log_handler is not None:
-                try:
-                    logging.getLogger().removeHandler(self._log_handler)
-                except Exception:
-                    pass
-                try:
-                    for lg in list(self._attached_loggers):
-                        try:
-                            lg.removeHandler(self._log_handler)
-                        except Exception:
-                            pass
-                except Exception:
-                    pass
+            applog.capture_root_logger(False)
+        except Exception:
+            pass
+        try:
+            applog.set_capture_level(None)
+        except Exception:
+            pass
+        try:
+            if self._loop_probe is not None:
+                self._loop_probe.stop()
+            perf_monitor.get_monitor().set_enabled(False)
         except Exception:
             pass
-        self._attached_loggers = []
-        self._log_handler = None
         self._qt_stream = None
         self._logging_active = False
+
     def raise_window(self):
         try:
             if self._console_dialog:
@@ -229,7 +264,7 @@ class DevConsole(QObject):
                 self._console_dialog.setStyleSheet(
                     """
                     QDialog { background-color: #121212; color: #e0e0e0; }
-                    QTextEdit { background-color: #1a1a1a; color: #e0e0e0; border: 1px solid #333; }
+                    QPlainTextEdit { background-color: #1a1a1a; color: #e0e0e0; border: 1px solid #333; }
                     QPushButton { background-color: #1e1e1e; color: #e0e0e0; border: 1px solid #333; padding: 6px 10px; border-radius: 4px; }
                     QPushButton:hover { background-color: #2a2a2a; }
                     QComboBox { background-color: #1a1a1a; color: #e0e0e0; border: 1px solid #333; border-radius: 4px; padding: 2px 6px; }
@@ -265,6 +300,17 @@ class DevConsole(QObject):
                 if self._level_combo:
                     # Placeholder text via accessible name (QComboBox non ha label interno)
                     self._level_combo.setToolTip(self._t('dev_console_level', 'Level filter'))
+                if self._logger_combo:
+                    self._logger_combo.setToolTip(self._t('dev_console_logger', 'Logger filter'))
+                    self._logger_combo.setItemText(0, self._t('dev_console_all_loggers', 'All loggers'))
+                if self._filter_edit:
+                    self._filter_edit.setPlaceholderText(self._t('dev_console_filter', 'Filter text...'))
+                self._update_profile_button()
+                if self._btn_memory:
+                    self._btn_memory.setText(self._t('dev_console_memory', 'Memory...'))
+                if self._cb_perf:
+                    self._cb_perf.setText(self._t('dev_console_perf', 'Performance'))
+                    self._cb_perf.setToolTip(self._t('dev_console_perf_tip', 'Event-loop lag, audio writes and lock waits'))
         except Exception:
             pass
 
@@ -298,9 +344,11 @@ class DevConsole(QObject):
         v = QVBoxLayout()
         v.setContentsMargins(16, 16, 16, 16)
         v.setSpacing(8)
-        self._console_text = QTextEdit()
+        self._console_text = QPlainTextEdit()
         self._console_text.setReadOnly(True)
-        self._console_text.setLineWrapMode(QTextEdit.WidgetWidth)
+        # Documento limitato: le righe più vecchie vengono eliminate automaticamente
+        self._console_text.setMaximumBlockCount(MAX_CONSOLE_LINES)
+        self._console_text.setLineWrapMode(QPlainTextEdit.WidgetWidth)
         try:
             self._console_text.setWordWrapMode(QTextOption.WrapAtWordBoundaryOrAnywhere)
         except Exception:
@@ -315,6 +363,15 @@ class DevConsole(QObject):
         except Exception:
             pass
         v.addWidget(self._console_text)
+        # Pannello prestazioni (nascosto finché non viene attivato)
+        self._perf_view = QLabel()
+        self._perf_view.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        try:
+            self._perf_view.setStyleSheet("font-family: Consolas, 'Courier New', monospace; font-size: 12px;")
+        except Exception:
+            pass
+        self._perf_view.setVisible(False)
+        v.addWidget(self._perf_view)
 
         # Row controlli principali
         hc = QHBoxLayout()
@@ -329,6 +386,25 @@ class DevConsole(QObject):
             self._level_combo.setMinimumWidth(120)
         except Exception:
             pass
+        # logger
+        self._logger_combo = QComboBox()
+        self._logger_combo.addItem(self._t('dev_console_all_loggers', 'All loggers'), None)
+        self._logger_combo.setToolTip(self._t('dev_console_logger', 'Logger filter'))
+        self._logger_combo.currentIndexChanged.connect(self._on_logger_changed)
+        try:
+            self._logger_combo.setMinimumWidth(140)
+        except Exception:
+            pass
+        self._known_loggers = 0
+        # testo
+        self._filter_edit = QLineEdit()
+        self._filter_edit.setPlaceholderText(self._t('dev_console_filter', 'Filter text...'))
+        self._filter_edit.setClearButtonEnabled(True)
+        self._filter_edit.textChanged.connect(self._on_filter_text_changed)
+        self._filter_timer = QTimer(self._console_dialog)
+        self._filter_timer.setSingleShot(True)
+        self._filter_timer.setInterval(FILTER_DELAY_MS)
+        self._filter_timer.timeout.connect(self._apply_text_filter)
         # pausa
         self._btn_pause = QPushButton(self._t('dev_console_pause', 'Pause'))
         try:
@@ -355,7 +431,8 @@ class DevConsole(QObject):
         self._btn_save.clicked.connect(self._on_save_clicked)
 
         hc.addWidget(self._level_combo)
-        hc.addStretch(1)
+        hc.addWidget(self._logger_combo)
+        hc.addWidget(self._filter_edit, 1)
         hc.addWidget(self._btn_pause)
         hc.addWidget(self._cb_autoscroll)
         hc.addWidget(self._cb_wrap)
@@ -374,8 +451,24 @@ class DevConsole(QObject):
             self._btn_copy.setIcon(self._console_dialog.style().standardIcon(self._console_dialog.style().SP_DialogYesButton))
         except Exception:
             pass
-        self._btn_clear.clicked.connect(lambda: self._console_text.clear())
+        self._btn_clear.clicked.connect(self._clear_console)
         self._btn_copy.clicked.connect(lambda: (self._console_text.selectAll(), self._console_text.copy()))
+        # profiler
+        self._btn_profile = QPushButton()
+        self._btn_profile.setToolTip(self._t('dev_console_profile_tip', 'Sample all threads to find CPU usage'))
+        self._btn_profile.clicked.connect(self._on_toggle_profiler)
+        self._update_profile_button()
+        h.addWidget(self._btn_profile)
+        # prestazioni
+        self._cb_perf = QCheckBox(self._t('dev_console_perf', 'Performance'))
+        self._cb_perf.setToolTip(self._t('dev_console_perf_tip', 'Event-loop lag, audio writes and lock waits'))
+        self._cb_perf.toggled.connect(self._on_toggle_perf)
+        # memoria
+        self._btn_memory = QPushButton(self._t('dev_console_memory', 'Memory...'))
+        self._btn_memory.setToolTip(self._t('dev_console_memory_tip', 'tracemalloc snapshots, threads, file descriptors and live objects'))
+        self._btn_memory.clicked.connect(self._open_memory_dialog)
+        h.addWidget(self._btn_memory)
+        h.addWidget(self._cb_perf)
         h.addStretch(1)
         h.addWidget(self._btn_clear)
         h.addWidget(self._btn_copy)
@@ -388,20 +481,8 @@ class DevConsole(QObject):
             self._console_text.setPlaceholderText(self._t('dev_console_placeholder', 'Logs will appear here...'))
         except Exception:
             pass
-        try:
-            self._console_text.append(">>> Console pronta. I log appariranno qui.")
-        except Exception:
-            pass
-
-        # Svuota eventuali log accumulati prima dell'apertura della UI
-        try:
-            if getattr(self, '_preopen_buffer', None):
-                buffered = ''.join(self._preopen_buffer)
-                self._preopen_buffer.clear()
-                if buffered:
-                    self._append_console(buffered)
-        except Exception:
-            pass
+        # Mostra i record già in archivio (anche quelli precedenti all'apertura)
+        self._rebuild_view()
 
         try:
             self._console_dialog.show()
@@ -427,6 +508,16 @@ class DevConsole(QObject):
         try:
             self._console_dialog = None
             self._console_text = None
+            self._logger_combo = None
+            self._filter_edit = None
+            self._filter_timer = None
+            self._pending_lines = []
+            self._btn_profile = None
+            self._btn_memory = None
+            self._cb_perf = None
+            self._perf_view = None
+            if self._perf_timer is not None:
+                self._perf_timer.stop()
         except Exception:
             pass
 
@@ -434,55 +525,156 @@ class DevConsole(QObject):
         try:
             self._console_dialog = None
             self._console_text = None
+            self._logger_combo = None
+            self._filter_edit = None
+            self._filter_timer = None
+            self._pending_lines = []
+            self._btn_profile = None
+            self._btn_memory = None
+            self._cb_perf = None
+            self._perf_view = None
+            if self._perf_timer is not None:
+                self._perf_timer.stop()
         except Exception:
             pass
 
-    @pyqtSlot(str)
-    def _append_console(self, s: str):
+    def _clear_console(self):
+        try:
+            # Solo la vista: l'archivio resta a disposizione (Salva, memoria, altre viste);
+            # le voci fino a qui restano nascoste anche ai cambi di filtro
+            self._clear_seq = applog.get_log_store().last_seq()
+            self._view_seq = max(self._view_seq, self._clear_seq)
+            if self._qt_stream is not None:
+                self._qt_stream.discard_pending()
+            if self._console_text:
+                self._console_text.clear()
+            self._pending_lines = []
+            self._ends_with_newline = True
+        except Exception:
+            pass
+
+    @pyqtSlot(int)
+    def _on_lines_dropped(self, count: int):
+        # Scritture perse nello stream (GUI bloccata): la vista viene ricostruita dall'archivio
+        try:
+            if self._console_text and not self._paused:
+                self._rebuild_view()
+        except Exception:
+            pass
+
+    def _view_filters(self, cleared: bool = True) -> dict:
+        filters = {
+            'min_level': self._console_level,
+            'logger': self._logger_filter,
+            'text': self._text_filter or None,
+            'include_dev': bool(self._show_dev),
+        }
+        if cleared:
+            filters['min_seq'] = self._clear_seq + 1
+        return filters
+
+    def _on_log_entry(self, entry):
+        # Thread del listener: inoltra solo le voci visibili con i filtri correnti
         try:
-            if s is None:
+            if not self._console_text or self._paused or self._qt_stream is None:
                 return
-            text = str(s)
-            if not text:
+            if entry.seq <= self._view_seq or entry.seq <= self._clear_seq:
                 return
-            # Se la UI non è pronta, bufferizza i log pre-apertura quando il logging è attivo
+            if entry.matches(self._console_level, self._logger_filter, self._text_filter or None, bool(self._show_dev)):
+                self._qt_stream.write(entry.format() + "\n")
+        except Exception:
+            pass
+
+    def _rebuild_view(self):
+        """Riempie la vista dall'archivio con i filtri correnti (ultime MAX_CONSOLE_LINES voci)."""
+        try:
             if not self._console_text:
-                if getattr(self, '_logging_active', False) and not self._paused:
-                    self._preopen_buffer.append(text)
                 return
-            if self._paused:
-                self._pause_buffer.append(text)
+            store = applog.get_log_store()
+            # Le righe ancora in viaggio verso la GUI sono già comprese nell'archivio
+            if self._qt_stream is not None:
+                self._qt_stream.discard_pending()
+            entries = store.query(limit=MAX_CONSOLE_LINES, **self._view_filters())
+            self._view_seq = entries[-1].seq if entries else self._clear_seq
+            text = "\n".join(e.format() for e in entries)
+            self._pending_lines = []
+            self._console_text.setPlainText(text)
+            self._ends_with_newline = not text
+            self._refresh_logger_items()
+            sb = self._console_text.verticalScrollBar()
+            if self._autoscroll_enabled and sb is not None:
+                sb.setValue(sb.maximum())
+        except Exception:
+            pass
+
+    def _refresh_logger_items(self):
+        try:
+            if not self._logger_combo:
                 return
-            # Applica filtro [DEV] per linea
-            try:
-                lines = text.splitlines(True)
-            except Exception:
-                lines = [text]
+            store = applog.get_log_store()
+            if store.logger_count() == self._known_loggers:
+                return
+            self._known_loggers = store.logger_count()
+            current = self._logger_filter
+            self._logger_combo.blockSignals(True)
             try:
-                if not getattr(self, '_show_dev', False):
-                    lines = [ln for ln in lines if '[DEV]' not in ln]
-            except Exception:
-                pass
-            filtered = ''.join(lines)
-            if not filtered:
+                while self._logger_combo.count() > 1:
+                    self._logger_combo.removeItem(1)
+                for name in store.loggers():
+                    self._logger_combo.addItem(name, name)
+                idx = self._logger_combo.findData(current) if current is not None else 0
+                self._logger_combo.setCurrentIndex(max(0, idx))
+            finally:
+                self._logger_combo.blockSignals(False)
+        except Exception:
+            pass
+
+    @pyqtSlot(str)
+    def _append_console(self, s: str):
+        try:
+            if s is None or not self._console_text or self._paused:
                 return
+            text = str(s)
+            if not text:
+                return
+            # Raggruppa fino al prossimo frame; oltre il limite del documento le righe non sarebbero comunque visibili
+            self._pending_lines.extend(text.splitlines(True))
+            if len(self._pending_lines) > MAX_CONSOLE_LINES:
+                del self._pending_lines[:len(self._pending_lines) - MAX_CONSOLE_LINES]
+            if self._flush_timer is None:
+                self._flush_timer = QTimer(self)
+                self._flush_timer.setSingleShot(True)
+                self._flush_timer.setInterval(FLUSH_INTERVAL_MS)
+                self._flush_timer.timeout.connect(self._flush_pending)
+            if not self._flush_timer.isActive():
+                self._flush_timer.start()
+        except Exception:
+            pass
+
+    def _flush_pending(self):
+        try:
+            if not self._console_text or not self._pending_lines:
+                self._pending_lines = []
+                return
+            filtered = ''.join(self._pending_lines)
+            self._pending_lines = []
             # Garantisce a capo tra blocchi: se l'ultimo carattere non è '\n' e il nuovo testo non inizia con '\n', premetti '\n'
-            try:
-                current = self._console_text.toPlainText()
-                if current and not current.endswith("\n") and not filtered.startswith("\n"):
-                    filtered = "\n" + filtered
-            except Exception:
-                pass
+            if not self._ends_with_newline and not filtered.startswith("\n"):
+                filtered = "\n" + filtered
+            self._ends_with_newline = filtered.endswith("\n")
             # Gestione autoscroll: se disabilitato, preservo posizione scrollbar
             sb = self._console_text.verticalScrollBar() if hasattr(self._console_text, 'verticalScrollBar') else None
             prev_val = sb.value() if sb is not None else None
-            self._console_text.moveCursor(QTextCursor.End)
-            self._console_text.insertPlainText(filtered)
-            if self._autoscroll_enabled:
-                self._console_text.moveCursor(QTextCursor.End)
-            else:
-                if sb is not None and prev_val is not None:
+            # Inserimento in coda al documento senza spostare cursore/selezione dell'utente
+            cursor = QTextCursor(self._console_text.document())
+            cursor.movePosition(QTextCursor.End)
+            cursor.insertText(filtered)
+            if sb is not None:
+                if self._autoscroll_enabled:
+                    sb.setValue(sb.maximum())
+                elif prev_val is not None:
                     sb.setValue(prev_val)
+            self._refresh_logger_items()
         except Exception:
             pass
 
@@ -498,11 +690,9 @@ class DevConsole(QObject):
                     # nessuna colorazione di sfondo, solo icona
                 except Exception:
                     pass
-            if not self._paused and self._pause_buffer:
-                # flush buffer
-                flushed = ''.join(self._pause_buffer)
-                self._pause_buffer = []
-                self._append_console(flushed)
+            if not self._paused:
+                # I record arrivati durante la pausa sono nell'archivio
+                self._rebuild_view()
         except Exception:
             pass
 
@@ -517,13 +707,13 @@ class DevConsole(QObject):
             if not self._console_text:
                 return
             if checked:
-                self._console_text.setLineWrapMode(QTextEdit.WidgetWidth)
+                self._console_text.setLineWrapMode(QPlainTextEdit.WidgetWidth)
                 try:
                     self._console_text.setWordWrapMode(QTextOption.WrapAtWordBoundaryOrAnywhere)
                 except Exception:
                     pass
             else:
-                self._console_text.setLineWrapMode(QTextEdit.NoWrap)
+                self._console_text.setLineWrapMode(QPlainTextEdit.NoWrap)
         except Exception:
             pass
 
@@ -535,12 +725,295 @@ class DevConsole(QObject):
                 'WARNING': logging.WARNING,
                 'ERROR': logging.ERROR,
             }
-            lvl = level_map.get(level_text, logging.DEBUG)
-            if self._log_handler is not None:
-                self._log_handler.setLevel(lvl)
+            self._console_level = level_map.get(level_text, logging.DEBUG)
+            self._rebuild_view()
+        except Exception:
+            pass
+
+    def _on_logger_changed(self, index: int):
+        try:
+            if not self._logger_combo:
+                return
+            self._logger_filter = self._logger_combo.itemData(index)
+            self._rebuild_view()
+        except Exception:
+            pass
+
+    def _on_filter_text_changed(self, text: str):
+        try:
+            if self._filter_timer is not None:
+                self._filter_timer.start()
+        except Exception:
+            pass
+
+    def _apply_text_filter(self):
+        try:
+            if self._filter_edit:
+                self._text_filter = self._filter_edit.text().strip()
+                self._rebuild_view()
         except Exception:
             pass
 
+    # ---- Prestazioni ----
+    def _on_toggle_perf(self, checked: bool):
+        try:
+            if self._perf_view:
+                self._perf_view.setVisible(bool(checked))
+            if checked:
+                if self._perf_timer is None:
+                    self._perf_timer = QTimer(self)
+                    self._perf_timer.setInterval(PERF_REFRESH_MS)
+                    self._perf_timer.timeout.connect(self._refresh_perf_view)
+                self._perf_timer.start()
+                self._refresh_perf_view()
+            elif self._perf_timer is not None:
+                self._perf_timer.stop()
+        except Exception:
+            pass
+
+    def _refresh_perf_view(self):
+        try:
+            if not self._perf_view:
+                return
+            self._perf_view.setText(perf_monitor.get_monitor().format_table())
+        except Exception:
+            pass
+
+    # ---- Memoria ----
+    def _open_memory_dialog(self):
+        try:
+            if self._memory_dialog is not None:
+                self._memory_dialog.show()
+                self._memory_dialog.raise_()
+                self._memory_dialog.activateWindow()
+                return
+            dlg = QDialog(self._console_dialog or self._parent)
+            dlg.setWindowTitle(self._t('dev_console_memory_title', 'Memory diagnostics'))
+            dlg.setModal(False)
+            try:
+                dlg.setMinimumSize(760, 460)
+                dlg.setStyleSheet(self._console_dialog.styleSheet() if self._console_dialog else "")
+            except Exception:
+                pass
+            v = QVBoxLayout()
+            v.setContentsMargins(16, 16, 16, 16)
+            v.setSpacing(8)
+            text = QPlainTextEdit()
+            text.setReadOnly(True)
+            text.setLineWrapMode(QPlainTextEdit.NoWrap)
+            try:
+                text.setStyleSheet("font-family: Consolas, 'Courier New', monospace; font-size: 12px;")
+            except Exception:
+                pass
+            v.addWidget(text)
+            h = QHBoxLayout()
+            h.setSpacing(8)
+            btn_snapshot = QPushButton(self._t('dev_console_memory_snapshot', 'Snapshot'))
+            btn_snapshot.clicked.connect(self._take_memory_snapshot)
+            cb_auto = QCheckBox(self._t('dev_console_memory_auto', 'Automatic (every 60 s)'))
+            cb_auto.toggled.connect(self._on_toggle_memory_auto)
+            btn_save = QPushButton(self._t('dev_console_save', 'Save...'))
+            btn_save.clicked.connect(self._save_memory_report)
+            h.addWidget(cb_auto)
+            h.addStretch(1)
+            h.addWidget(btn_snapshot)
+            h.addWidget(btn_save)
+            v.addLayout(h)
+            dlg.setLayout(v)
+            dlg.finished.connect(self._on_memory_dialog_closed)
+            self._memory_dialog = dlg
+            self._memory_text = text
+            dlg.show()
+            # Prima istantanea: fa da base per i confronti successivi
+            self._take_memory_snapshot()
+        except Exception:
+            pass
+
+    def _take_memory_snapshot(self):
+        try:
+            diag = memory_diag.get_memory_diagnostics()
+            diag.take_snapshot()
+            report = diag.report()
+            if self._memory_text is not None:
+                self._memory_text.setPlainText(report)
+            if self._logger is not None:
+                stats = memory_diag.process_stats()
+                self._logger.info("Memory snapshot #%d: RSS %s KiB, traced %s KiB, threads %s, fds %s",
+                                  diag.count, stats['rss_kb'], stats['traced_kb'], stats['threads'], stats['fds'])
+        except Exception:
+            pass
+
+    def _on_toggle_memory_auto(self, checked: bool):
+        try:
+            if checked:
+                if self._memory_timer is None:
+                    self._memory_timer = QTimer(self)
+                    self._memory_timer.setInterval(MEMORY_AUTO_SNAPSHOT_MS)
+                    self._memory_timer.timeout.connect(self._take_memory_snapshot)
+                self._memory_timer.start()
+            elif self._memory_timer is not None:
+                self._memory_timer.stop()
+        except Exception:
+            pass
+
+    def _save_memory_report(self):
+        try:
+            if self._memory_text is None:
+                return
+            import time
+            suggested = f"memory-{time.strftime('%Y%m%d-%H%M%S')}.txt"
+            filename, _sel = QFileDialog.getSaveFileName(self._memory_dialog, self._t('dev_console_save', 'Save...'), suggested,
+                                                         'Text Files (*.txt);;All Files (*)')
+            if filename:
+                with open(filename, 'w', encoding='utf-8') as f:
+                    f.write(self._memory_text.toPlainText() + "\n")
+        except Exception:
+            pass
+
+    def _on_memory_dialog_closed(self, *args):
+        try:
+            if self._memory_timer is not None:
+                self._memory_timer.stop()
+            # tracemalloc costa su ogni allocazione: si ferma con la finestra
+            memory_diag.get_memory_diagnostics().stop()
+            if self._memory_dialog is not None:
+                self._memory_dialog.deleteLater()
+        except Exception:
+            pass
+        self._memory_dialog = None
+        self._memory_text = None
+
+    # ---- Profiler ----
+    def _update_profile_button(self):
+        try:
+            if not self._btn_profile:
+                return
+            prof = profiler.get_profiler()
+            st = self._console_dialog.style() if self._console_dialog else None
+            if prof.running:
+                self._btn_profile.setText(self._t('dev_console_profile_stop', 'Stop profiler ({seconds} s)').format(seconds=int(prof.elapsed())))
+                if st is not None:
+                    self._btn_profile.setIcon(st.standardIcon(st.SP_MediaStop))
+            else:
+                self._btn_profile.setText(self._t('dev_console_profile_start', 'Start profiler'))
+                if st is not None:
+                    self._btn_profile.setIcon(st.standardIcon(st.SP_ComputerIcon))
+        except Exception:
+            pass
+
+    def _on_toggle_profiler(self):
+        try:
+            prof = profiler.get_profiler()
+            if prof.running:
+                prof.stop()
+                if self._profile_timer is not None:
+                    self._profile_timer.stop()
+                if self._logger is not None:
+                    self._logger.info("Profiler stopped: %d samples in %.1f s", prof.samples, prof.duration)
+                self._show_profile_report()
+            else:
+                prof.start()
+                if self._profile_timer is None:
+                    self._profile_timer = QTimer(self)
+                    self._profile_timer.setInterval(PROFILE_TICK_MS)
+                    self._profile_timer.timeout.connect(self._update_profile_button)
+                self._profile_timer.start()
+                if self._logger is not None:
+                    self._logger.info("Profiler started (interval %.0f ms)", prof.interval * 1000)
+            self._update_profile_button()
+        except Exception:
+            pass
+
+    def stop_profiler(self):
+        """Ferma il profiler se attivo (chiusura dell'app)."""
+        try:
+            profiler.get_profiler().stop()
+            if self._profile_timer is not None:
+                self._profile_timer.stop()
+        except Exception:
+            pass
+
+    def _show_profile_report(self):
+        try:
+            report = profiler.get_profiler().report(PROFILE_TOP_FUNCTIONS)
+            if self._profile_dialog is not None:
+                self._profile_text.setPlainText(report)
+                self._profile_dialog.show()
+                self._profile_dialog.raise_()
+                self._profile_dialog.activateWindow()
+                return
+            dlg = QDialog(self._console_dialog or self._parent)
+            dlg.setWindowTitle(self._t('dev_console_profile_title', 'CPU profile'))
+            dlg.setModal(False)
+            try:
+                dlg.setMinimumSize(760, 460)
+                dlg.setStyleSheet(self._console_dialog.styleSheet() if self._console_dialog else "")
+            except Exception:
+                pass
+            v = QVBoxLayout()
+            v.setContentsMargins(16, 16, 16, 16)
+            v.setSpacing(8)
+            text = QPlainTextEdit()
+            text.setReadOnly(True)
+            text.setLineWrapMode(QPlainTextEdit.NoWrap)
+            try:
+                text.setStyleSheet("font-family: Consolas, 'Courier New', monospace; font-size: 12px;")
+            except Exception:
+                pass
+            text.setPlainText(report)
+            v.addWidget(text)
+            h = QHBoxLayout()
+            h.setSpacing(8)
+            btn_collapsed = QPushButton(self._t('dev_console_profile_export_collapsed', 'Export flamegraph...'))
+            btn_collapsed.clicked.connect(lambda: self._export_profile('collapsed'))
+            btn_pstats = QPushButton(self._t('dev_console_profile_export_pstats', 'Export pstats...'))
+            btn_pstats.clicked.connect(lambda: self._export_profile('pstats'))
+            h.addStretch(1)
+            h.addWidget(btn_collapsed)
+            h.addWidget(btn_pstats)
+            v.addLayout(h)
+            dlg.setLayout(v)
+            dlg.finished.connect(self._on_profile_dialog_closed)
+            self._profile_dialog = dlg
+            self._profile_text = text
+            dlg.show()
+        except Exception:
+            pass
+
+    def _on_profile_dialog_closed(self, *args):
+        try:
+            if self._profile_dialog is not None:
+                self._profile_dialog.deleteLater()
+        except Exception:
+            pass
+        self._profile_dialog = None
+        self._profile_text = None
+
+    def _export_profile(self, kind: str):
+        try:
+            import time
+            ts = time.strftime('%Y%m%d-%H%M%S')
+            if kind == 'pstats':
+                suggested, filters = f"kikumoe-{ts}.pstats", 'pstats (*.pstats *.prof);;All Files (*)'
+            else:
+                suggested, filters = f"kikumoe-{ts}.collapsed", 'Collapsed stacks (*.collapsed *.txt);;All Files (*)'
+            filename, _sel = QFileDialog.getSaveFileName(self._profile_dialog or self._console_dialog, self._t('dev_console_save', 'Save...'), suggested, filters)
+            if not filename:
+                return
+            prof = profiler.get_profiler()
+            if kind == 'pstats':
+                prof.export_pstats(filename)
+            else:
+                prof.export_collapsed(filename)
+            if self._logger is not None:
+                self._logger.info("Profile exported: %s", filename)
+        except Exception as e:
+            try:
+                if self._logger is not None:
+                    self._logger.error("Profile export failed: %s", e)
+            except Exception:
+                pass
+
     @pyqtSlot()
     def _on_save_clicked(self):
         try:
@@ -556,16 +1029,17 @@ class DevConsole(QObject):
                 'Log Files (*.log);;Text Files (*.txt);;All Files (*)'
             )
             if filename:
-                # Scegli encoding: UTF-8 con BOM solo se necessario (Windows Notepad compatibility)
-                text = self._console_text.toPlainText()
+                # Esporta dall'archivio (tutti i record che passano i filtri, non solo quelli visibili,
+                # compresi quelli nascosti con "Pulisci")
+                store = applog.get_log_store()
                 try:
                     with open(filename, 'w', encoding='utf-8') as f:
-                        f.write(text)
+                        f.writelines(store.iter_lines(**self._view_filters(cleared=False)))
                 except Exception:
                     # Ritenta con UTF-8-SIG
                     try:
                         with open(filename, 'w', encoding='utf-8-sig') as f:
-                            f.write(text)
+                            f.writelines(store.iter_lines(**self._view_filters(cleared=False)))
                     except Exception:
                         pass
         except Exception:
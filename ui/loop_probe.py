@@ -0,0 +1,42 @@
+from __future__ import annotations
+from typing import Optional
+import time
+from PyQt5.QtCore import QObject, QTimer, Qt
+from perf_monitor import PerfMonitor, get_monitor
+
+# Sonda del loop eventi Qt: un timer preciso a intervallo fisso misura di quanto
+# arriva in ritardo ogni tick rispetto alla scadenza attesa. Un ritardo alto vuol
+# dire che il thread GUI è rimasto occupato (callback lenti, I/O, GC) per quel tempo.
+
+PROBE_INTERVAL_MS = 100
+
+
+class EventLoopProbe(QObject):
+    def __init__(self, parent=None, monitor: Optional[PerfMonitor] = None,
+                 interval_ms: int = PROBE_INTERVAL_MS) -> None:
+        super().__init__(parent)
+        self._monitor = monitor or get_monitor()
+        self._interval = max(10, int(interval_ms)) / 1000.0
+        self._expected: Optional[float] = None
+        self._timer = QTimer(self)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.setInterval(int(self._interval * 1000))
+        self._timer.timeout.connect(self._on_tick)
+
+    def start(self) -> None:
+        self._expected = time.monotonic() + self._interval
+        self._timer.start()
+
+    def stop(self) -> None:
+        self._timer.stop()
+        self._expected = None
+
+    def is_running(self) -> bool:
+        return self._timer.isActive()
+
+    def _on_tick(self) -> None:
+        now = time.monotonic()
+        if self._expected is not None:
+            self._monitor.record('loop_lag', max(0.0, (now - self._expected) * 1000.0))
+        # La prossima scadenza parte da adesso: un ritardo non si accumula sui tick successivi
+        self._expected = now + self._interval
@@ -3,23 +3,20 @@ from PyQt5.QtWidgets import (
     QSlider, QProgressBar, QShortcut, QSpinBox,
     QDialog, QMessageBox, QSizePolicy
 )
-from PyQt5.QtCore import pyqtSignal, Qt, QSettings, QTimer, QSize, QEvent
+from PyQt5.QtCore import pyqtSignal, Qt, QTimer, QSize, QEvent
 from PyQt5.QtGui import QKeySequence, QIcon, QPixmap, QPainter, QColor
-from typing import Optional
+from typing import Any, Callable, Optional, TYPE_CHECKING
 import sys
 import os
 import time
 import re
+import math
+from collections import deque
 from i18n import I18n
-from ws_client import NowPlayingWS
-from player_ffmpeg import PlayerFFmpeg
-from player_vlc import PlayerVLC
-from config import STREAMS
+from config import STREAMS, stream_url_for, gateway_url_for
 from ui.settings_dialog import SettingsDialog
 from constants import (
     APP_TITLE,
-    ORG_NAME,
-    APP_SETTINGS,
     KEY_LANG,
     KEY_VOLUME,
     KEY_MUTE,
@@ -31,19 +28,50 @@ from constants import (
     KEY_TRAY_HIDE_ON_MINIMIZE,
     KEY_LIBVLC_PATH,
     KEY_NETWORK_CACHING,
+    KEY_VLC_PYTHON_AUDIO,
     KEY_DARK_MODE,
     KEY_SLEEP_MINUTES,
     KEY_SLEEP_STOP_ON_END,
     KEY_DEV_CONSOLE_ENABLED,
     KEY_SESSION_TIMER_ENABLED,
     KEY_AUDIO_DEVICE_INDEX,
+    KEY_AUDIO_DEVICE_ID,
     KEY_DEV_CONSOLE_SHOW_DEV,
+    KEY_HISTORY_ENABLED,
+    KEY_HISTORY_MAX_ROWS,
+    KEY_COVER_ART_ENABLED,
+    KEY_LOG_FILE_ENABLED,
+    KEY_LOG_LEVELS,
+    KEY_CONTROL_SERVER_ENABLED,
+    KEY_CONTROL_SERVER_PORT,
+    KEY_CONTROL_SERVER_TOKEN,
+    DEFAULT_CONTROL_PORT,
+    KEY_ART_CACHE_MAX_MB,
+    KEY_ICY_METADATA,
+    KEY_WS_ENABLED,
 )
 import threading
-from logger import get_logger
+from logger import get_logger, configure_levels, enable_file_logging
 from now_playing import compute_display_mmss
+from settings_store import get_settings
 from ui.tray_manager import TrayManager
 from ui.dev_console import DevConsole
+from ui.refresh_scheduler import RefreshScheduler
+from ui.timers import StopwatchTimer, CountdownTimer
+from ui.art_service import ArtService, art_url_for, DEFAULT_THUMB_SIZE, DEFAULT_DISK_MAX_BYTES
+from player_actor import PlayerActor
+from backend_manager import BackendManager
+from audio_devices import get_device_registry
+from perf_monitor import TimedLock
+import startup_trace
+
+# Backend audio, WebSocket e cronologia vengono importati solo quando servono
+# (vlc carica libvlc, player_ffmpeg carica PyAudio): la finestra viene disegnata
+# prima e i sottosistemi non critici partono dopo l'avvio dell'event loop.
+if TYPE_CHECKING:
+    from ws_client import NowPlayingWS
+    from history import TrackHistory
+    from control_server import ControlServer
 
 class ListenMoePlayer(QWidget):
     status_changed = pyqtSignal(str)
@@ -55,23 +83,48 @@ class ListenMoePlayer(QWidget):
     tray_icon_refresh = pyqtSignal()
     backend_status_refresh = pyqtSignal()
     notify_tray = pyqtSignal(str, str)
+    # Notifica "in riproduzione" con URL della copertina (può essere vuoto)
+    notify_track = pyqtSignal(str, str, str)
+    cover_refresh = pyqtSignal()
     # Control QProgressBar range (determinate vs indeterminate)
     buffering_indeterminate = pyqtSignal(bool)
     # Delayed play signal to ensure timers are created from UI thread
     schedule_play = pyqtSignal(int)
-
-    def __init__(self):
+    # Elenco dispositivi audio dal registro (thread di scansione -> thread GUI)
+    audio_devices_changed = pyqtSignal(object)
+    # Comandi dall'API locale (thread HTTP -> thread GUI)
+    control_command = pyqtSignal(str, object)
+    # Eventi del backend audio (thread del player -> thread GUI)
+    player_event = pyqtSignal(str, object)
+
+    def __init__(self, player_factory: Optional[Callable[..., Any]] = None):
         super().__init__()
-        self._playback_lock = threading.Lock()
+        self._playback_lock = TimedLock('playback')
+        # Backend audio alternativo (es. tools/fake_backends.FakePlayer): chiamato con on_event/on_metadata
+        self._player_factory = player_factory
+        # Salute dei backend e failover/failback a runtime (vedi backend_manager.py)
+        self._backends: Optional[BackendManager] = None
+        # Cambio di backend in corso sul thread della coda comandi (id del comando replace_backend)
+        self._backend_switch_cmd_id: Optional[int] = None
 
         # Connect cross-thread delayed play to UI slot
         try:
             self.schedule_play.connect(self._schedule_play_stream)
+            self.player_event.connect(self._on_player_event)
         except Exception:
             pass
 
-        # settings
-        self.settings = QSettings(ORG_NAME, APP_SETTINGS)
+        # settings: cache in memoria, scritture raggruppate in background
+        self.settings = get_settings()
+
+        # Refresh UI coalescati: label, titolo finestra, sessione e tooltip tray
+        # vengono ricalcolati al più una volta per frame e applicati solo se cambiati
+        self.refresh = RefreshScheduler(self)
+        self.refresh.register('now_playing', self._compute_now_playing_text, self.now_playing_changed.emit)
+        self.refresh.register('window_title', self._compute_window_title, self.setWindowTitle)
+        self.refresh.register('session', self._compute_session_text, self._apply_session_text)
+        self.refresh.register('tray_tooltip', self._compute_tray_tooltip, self._apply_tray_tooltip,
+                              depends_on=('now_playing', 'session'))
 
         # i18n
         saved_lang = self.settings.value(KEY_LANG, 'it')
@@ -99,7 +152,16 @@ class ListenMoePlayer(QWidget):
         self._layout.addWidget(self.status_label)
         self.session_label = QLabel("")
         self._layout.addWidget(self.session_label)
-        self._layout.addWidget(self.now_playing_label)
+        # Copertina del brano corrente accanto al titolo
+        self.cover_label = QLabel()
+        self.cover_label.setObjectName('coverLabel')
+        self.cover_label.setFixedSize(DEFAULT_THUMB_SIZE, DEFAULT_THUMB_SIZE)
+        self.cover_label.setAlignment(Qt.AlignCenter)
+        self.cover_label.setVisible(self._get_bool(KEY_COVER_ART_ENABLED, True))
+        np_row = QHBoxLayout()
+        np_row.addWidget(self.cover_label)
+        np_row.addWidget(self.now_playing_label, 1)
+        self._layout.addLayout(np_row)
 
         # Stream info (Channel + Format) - non editable
         sel_row = QHBoxLayout()
@@ -292,16 +354,19 @@ class ListenMoePlayer(QWidget):
             self.tray_icon_refresh.connect(self.update_tray_icon)
             self.backend_status_refresh.connect(self.update_vlc_status_label)
             self.notify_tray.connect(self._notify_tray)
+            self.notify_track.connect(self._notify_track)
+            self.cover_refresh.connect(self._update_cover_label)
         except Exception:
             pass
 
         # Initialize logger
         self.log = get_logger('KikuMoe')
-        # Session timer runtime
-        self._session_seconds: int = 0
-        self._session_timer: Optional[QTimer] = QTimer(self)
+        self._apply_log_settings()
+        # Session timer runtime: tempo monotono, i tick servono solo a ridisegnare la label
+        self._low_power: bool = False
+        self._session_timer: Optional[StopwatchTimer] = StopwatchTimer(self, 1000)
+        self._session_seconds = 0
         try:
-            self._session_timer.setInterval(1000)
             self._session_timer.timeout.connect(self._on_session_tick)
             enabled = self._get_bool(KEY_SESSION_TIMER_ENABLED, True)
             # Do not auto-start timer here; it starts when playback begins
@@ -312,54 +377,30 @@ class ListenMoePlayer(QWidget):
         except Exception:
             pass
         self._update_session_label()
-        # Initialize Dev Console helper
-        try:
-            self.dev_console = DevConsole(self, translator=self.i18n, logger=self.log)
-            try:
-                self.dev_console.set_show_dev(self._get_bool(KEY_DEV_CONSOLE_SHOW_DEV, False))
-            except Exception:
-                pass
-        except Exception:
-            self.dev_console = None
-
-        # Ensure DevConsole logging is active if enabled in settings
-        try:
-            if self._get_bool(KEY_DEV_CONSOLE_ENABLED, False) and self.dev_console:
-                self.dev_console.activate_logging()
-        except Exception:
-            pass
-
-        # Sleep timer runtime
-        self._sleep_timer: Optional[QTimer] = QTimer(self)
+        # Sottosistemi creati dopo il primo paint (vedi _deferred_startup)
+        self.dev_console = None
+        self.player = None
+        # Coda comandi verso il backend (play/stop/pausa fuori dal thread GUI)
+        self.actor: Optional[PlayerActor] = None
+        self._play_cmd_id: Optional[int] = None
+        self._play_fallback_pending = False
+        self.tray_mgr = None
+        self._startup_done = False
+
+        # Sleep timer runtime: scadenza monotona, il timer è solo il risveglio successivo
+        self._sleep_timer: Optional[CountdownTimer] = CountdownTimer(self, 1000)
         try:
-            self._sleep_timer.setInterval(1000)
             self._sleep_timer.timeout.connect(self._sleep_tick)
         except Exception:
             pass
         self._sleep_remaining_sec: int = 0
         self._sleep_fadeout_sec: int = 15
-        self._sleep_saved_volume: Optional[int] = None
+        # Fade-out dello sleep timer affidato al backend (rampa nel percorso audio)
+        self._sleep_fading: bool = False
+
+        # Le modifiche a questa chiave arrivano al player tramite la cache delle impostazioni
+        self.settings.subscribe(lambda _k, _v: self._apply_icy_setting(), keys=(KEY_ICY_METADATA,))
 
-        # Initialize audio backend
-        libvlc_path = self.settings.value(KEY_LIBVLC_PATH, '') or None
-        try:
-            network_caching = int(self.settings.value(KEY_NETWORK_CACHING, 1000))
-        except Exception:
-            network_caching = 1000
-        try:
-            # PlayerFFmpeg non accetta network_caching_ms nel costruttore
-            self.player = PlayerFFmpeg(on_event=getattr(self, '_on_player_event', None))
-        except Exception:
-            self.player = PlayerVLC(on_event=getattr(self, '_on_player_event', None), libvlc_path=libvlc_path, network_caching_ms=network_caching)
-        
-        if not self.player.is_ready():
-            # Show a clear message explaining what to do
-            self.status_changed.emit(self.i18n.t('libvlc_not_ready'))
-        self.player.set_volume(self.volume_slider.value())
-        self.player.set_mute(self.mute_button.isChecked())
-        # Aggiorna indicatore stato VLC all'avvio
-        self.update_vlc_status_label()
-        
         # Track cache for i18n rerender
         self._current_title = None
         self._current_artist = None
@@ -376,16 +417,287 @@ class ListenMoePlayer(QWidget):
         # Stato UI di pausa per sincronizzare la tray in modo affidabile
         self._ui_paused: bool = False
 
-        # WebSocket wrapper
+        # Cronologia brani persistente (SQLite, scritture in background): avviata dopo il primo paint
+        self.history: Optional["TrackHistory"] = None
+        # Audio in riproduzione secondo gli eventi del backend (thread GUI): letto dal thread WS
+        # per `was_playing` della cronologia senza interrogare il backend
+        self._audio_playing: bool = False
+        # API locale di controllo/eventi (opzionale, avviata dopo il primo paint)
+        self.control: Optional["ControlServer"] = None
+        self.control_command.connect(self._on_control_command)
+        # Richiesta arrivata da un secondo avvio prima che i sottosistemi fossero pronti
+        self._pending_instance_command: Optional[str] = None
+        try:
+            app = QApplication.instance()
+            if app is not None:
+                app.aboutToQuit.connect(self._stop_history)
+                app.aboutToQuit.connect(self._stop_control_server)
+                app.aboutToQuit.connect(self._shutdown_player)
+                app.aboutToQuit.connect(self.settings.flush)
+        except Exception:
+            pass
+
+        # Copertine: download/decodifica in background, cache LRU in memoria + su disco
+        self._current_art_url: Optional[str] = None
+        self._pending_notice: Optional[tuple] = None
+        try:
+            try:
+                art_cache_bytes = int(self.settings.value(KEY_ART_CACHE_MAX_MB, DEFAULT_DISK_MAX_BYTES // (1024 * 1024))) * 1024 * 1024
+            except Exception:
+                art_cache_bytes = DEFAULT_DISK_MAX_BYTES
+            self.art: Optional[ArtService] = ArtService(self, disk_max_bytes=art_cache_bytes)
+            self.art.art_ready.connect(self._on_art_ready)
+        except Exception:
+            self.art = None
+
+        # WebSocket wrapper (opzionale: con i metadati ICY i titoli arrivano dallo stream)
         init_channel = self.settings.value(KEY_CHANNEL, 'J-POP')
-        self.ws = NowPlayingWS(
-            on_now_playing=self._on_now_playing,
-            on_error_text=self._on_ws_error_text,
-            on_closed_text=self._on_ws_closed_text,
-            ws_url=self._get_ws_url_for_channel(init_channel),
-        )
-        self.ws.start()
+        self._ws_channel = init_channel
+        # Ultimi brani annunciati dal WS, usati per arricchire i titoli ICY (durata, copertina)
+        self._ws_recent: deque = deque(maxlen=8)
+        self.ws: Optional["NowPlayingWS"] = None
+
+        # Tema applicato prima del primo paint
+        try:
+            self.apply_theme()
+        except Exception:
+            pass
+        # Se la finestra non viene mostrata (nessun paint) i sottosistemi partono comunque
+        QTimer.singleShot(500, self._deferred_startup)
+
+    def paintEvent(self, event) -> None:
+        super().paintEvent(event)
+        if not self._startup_done:
+            startup_trace.mark('first_paint')
+            QTimer.singleShot(0, self._deferred_startup)
 
+    def _deferred_startup(self) -> None:
+        """Avvio dei sottosistemi dopo il primo paint: backend audio, WS, tray, console, cronologia."""
+        if self._startup_done:
+            return
+        self._startup_done = True
+        self._init_player()
+        self._init_audio_devices()
+        try:
+            self._restart_ws_for_channel(self._ws_channel)
+        except Exception:
+            pass
+        self._init_tray()
+        try:
+            self.dev_console = DevConsole(self, translator=self.i18n, logger=self.log)
+            self.dev_console.set_show_dev(self._get_bool(KEY_DEV_CONSOLE_SHOW_DEV, False))
+            if self._get_bool(KEY_DEV_CONSOLE_ENABLED, False):
+                self.dev_console.activate_logging()
+        except Exception:
+            self.dev_console = None
+        self._start_history()
+        self._apply_control_server()
+        startup_trace.mark('subsystems_ready')
+        pending, self._pending_instance_command = self._pending_instance_command, None
+        if pending is not None:
+            self.handle_instance_command(pending)
+
+    def _create_player(self, libvlc_path: Optional[str], network_caching: int):
+        """Crea il backend audio: il primo pronto in ordine di preferenza (FFmpeg, poi VLC),
+        saltando quelli in cooldown dopo un failover. I moduli vengono importati solo ora."""
+        factories = self._backend_factories(libvlc_path, network_caching)
+        if self._backends is None:
+            self._backends = BackendManager(factories)
+        else:
+            self._backends.set_factories(factories)
+        _name, player = self._backends.create()
+        if player is None:
+            raise RuntimeError("no audio backend")
+        return player
+
+    def _backend_factories(self, libvlc_path: Optional[str], network_caching: int):
+        if self._player_factory is not None:
+            return [('custom', lambda: self._new_backend(self._player_factory, on_metadata=self._on_icy_metadata))]
+
+        def _ffmpeg():
+            from player_ffmpeg import PlayerFFmpeg
+            # PlayerFFmpeg non accetta network_caching_ms nel costruttore
+            return self._new_backend(PlayerFFmpeg, on_metadata=self._on_icy_metadata)
+
+        def _vlc():
+            from player_vlc import PlayerVLC
+            return self._new_backend(PlayerVLC, libvlc_path=libvlc_path, network_caching_ms=network_caching)
+        return [('ffmpeg', _ffmpeg), ('vlc', _vlc)]
+
+    def _new_backend(self, factory: Callable[..., Any], **kwargs: Any) -> Any:
+        """Backend i cui eventi arrivano al thread GUI solo finché è quello in uso dalla coda
+        comandi: lo stop di un backend sostituito non deve cambiare lo stato della UI."""
+        owner: list = []
+
+        def _on_event(code: str, value: Optional[int] = None) -> None:
+            actor = self.actor
+            current = actor.backend if actor is not None else self.player
+            if owner and owner[0] is not current:
+                return
+            self.player_event.emit(code, value)
+        backend = factory(on_event=_on_event, **kwargs)
+        owner.append(backend)
+        return backend
+
+    def _install_backend(self, player: Any) -> None:
+        """Sostituisce il backend in uso: il vecchio viene fermato dalla coda comandi."""
+        # Un cambio automatico ancora in corso verrebbe superato da questo: il suo esito va ignorato
+        self._backend_switch_cmd_id = None
+        self.player = player
+        if self.actor is not None:
+            self.actor.set_backend(player)
+        else:
+            self.actor = PlayerActor(player, self)
+            self.actor.command_finished.connect(self._on_player_command_finished)
+        try:
+            player.set_volume(self.volume_slider.value())
+            player.set_mute(self.mute_button.isChecked())
+        except Exception:
+            pass
+        self._apply_icy_setting()
+        self.update_vlc_status_label()
+
+    def _track_backend_health(self, code: str) -> None:
+        """Esiti delle sessioni per il BackendManager; dopo un errore può cambiare backend
+        prima del riavvio automatico."""
+        mgr = self._backends
+        if mgr is None:
+            return
+        if code == 'playing':
+            mgr.playing()
+        elif code in ('error', 'libvlc_init_failed', 'ended'):
+            if self._play_cmd_id is not None and self._play_fallback_pending:
+                # Errore del formato principale: il fallback sull'altro formato è la stessa
+                # sessione (l'esito si vede in _on_player_command_finished)
+                return
+            mgr.failed(code)
+            self._maybe_switch_backend()
+
+    def _maybe_switch_backend(self) -> bool:
+        """Avvia il failover/failback indicato dal BackendManager. Il nuovo backend viene creato
+        sul thread della coda comandi (import, libVLC, ffmpeg -version): i comandi accodati dopo,
+        come il play che segue, lo usano già; il thread GUI lo adotta in _on_player_command_finished.
+        True se il cambio è stato avviato."""
+        mgr = self._backends
+        if mgr is None or self.actor is None or self._backend_switch_cmd_id is not None:
+            return False
+        try:
+            plan = mgr.begin_switch()
+        except Exception as e:
+            self.log.debug("[UI] backend switch failed: %s", e)
+            return False
+        if plan is None:
+            return False
+        name, factory, reason = plan
+        self.log.info("[UI] audio backend %s -> %s", reason, name)
+        # Volume, muto e ICY applicati prima che il backend riceva il primo comando
+        volume, muted = int(self.volume_slider.value()), bool(self.mute_button.isChecked())
+        icy = self._get_bool(KEY_ICY_METADATA, False)
+
+        def _build():
+            player = factory()
+            try:
+                player.set_volume(volume)
+                player.set_mute(muted)
+                if hasattr(player, 'icy_metadata'):
+                    player.icy_metadata = icy
+            except Exception:
+                pass
+            return player
+        self._backend_switch_reason = reason
+        self._backend_switch_cmd_id = self.actor.replace_backend(_build).command_id
+        return True
+
+    def _on_backend_replaced(self, result) -> None:
+        """Esito di replace_backend (thread GUI): adotta il nuovo backend o resta sul precedente."""
+        mgr = self._backends
+        ok = result is not None and not isinstance(result, Exception)
+        if mgr is not None:
+            mgr.finish_switch(ok, None if ok else str(result))
+        if not ok:
+            self.log.info("[UI] audio backend switch failed: %s", result)
+            return
+        self.player = result
+        try:
+            # Cambi arrivati mentre il backend veniva creato
+            result.set_volume(self.volume_slider.value())
+            result.set_mute(self.mute_button.isChecked())
+        except Exception:
+            pass
+        self._apply_icy_setting()
+        self.update_vlc_status_label()
+        if mgr is not None:
+            self._publish('backend', dict(mgr.snapshot(), reason=getattr(self, '_backend_switch_reason', None)))
+
+    def _init_player(self) -> None:
+        libvlc_path = self.settings.value(KEY_LIBVLC_PATH, '') or None
+        try:
+            network_caching = int(self.settings.value(KEY_NETWORK_CACHING, 1000))
+        except Exception:
+            network_caching = 1000
+        try:
+            self.player = self._create_player(libvlc_path, network_caching)
+        except Exception:
+            self.player = None
+            return
+        self.actor = PlayerActor(self.player, self)
+        self.actor.command_finished.connect(self._on_player_command_finished)
+        self._apply_icy_setting()
+        try:
+            if not self.player.is_ready():
+                # Show a clear message explaining what to do
+                self.status_changed.emit(self.i18n.t('libvlc_not_ready'))
+            self.player.set_volume(self.volume_slider.value())
+            self.player.set_mute(self.mute_button.isChecked())
+        except Exception:
+            pass
+        # La versione del backend (ffmpeg -version) viene letta fuori dal thread GUI
+        def _probe():
+            try:
+                self.player.get_version()
+            except Exception:
+                pass
+            self.backend_status_refresh.emit()
+        threading.Thread(target=_probe, name="BackendProbe", daemon=True).start()
+
+    def _init_audio_devices(self) -> None:
+        """Avvia il registro dispositivi con una scansione in background; le successive sono
+        su richiesta (il polling periodico è attivo solo con le Impostazioni aperte)."""
+        try:
+            registry = get_device_registry()
+            self.audio_devices_changed.connect(self._on_audio_devices_changed)
+            registry.subscribe(self.audio_devices_changed.emit)
+            registry.refresh()
+        except Exception:
+            pass
+
+    def _audio_device_key(self) -> tuple:
+        """Dispositivo di uscita scelto (id stabile, indice) per rilevare i cambi dalle Impostazioni."""
+        return (self.settings.value(KEY_AUDIO_DEVICE_ID, ''), self.settings.value(KEY_AUDIO_DEVICE_INDEX, ''))
+
+    def _on_audio_devices_changed(self, devices) -> None:
+        """Mantiene l'indice salvato allineato all'id stabile (gli indici PortAudio cambiano)."""
+        try:
+            dev_id = self.settings.value(KEY_AUDIO_DEVICE_ID, '')
+            legacy = self.settings.value(KEY_AUDIO_DEVICE_INDEX, '')
+            if not dev_id:
+                if legacy in (None, ''):
+                    return
+                # Impostazioni precedenti con solo l'indice: ricava l'id una volta
+                dev = next((d for d in devices if d.index == int(legacy)), None)
+                if dev is not None:
+                    self.settings.setValue(KEY_AUDIO_DEVICE_ID, dev.id)
+                return
+            dev = next((d for d in devices if d.id == dev_id), None)
+            if dev is None:
+                self.log.info("[UI] audio device not connected: %s (using default output)", dev_id)
+            elif str(legacy) != str(dev.index):
+                self.log.debug("[UI] audio device %s moved to index %s", dev_id, dev.index)
+                self.settings.setValue(KEY_AUDIO_DEVICE_INDEX, int(dev.index))
+        except Exception:
+            pass
+
+    def _init_tray(self) -> None:
         # System Tray Icon e menu
         try:
             self._tray_enabled = self._get_bool(KEY_TRAY_ENABLED, True)
@@ -400,6 +712,7 @@ class ListenMoePlayer(QWidget):
                 on_toggle_play_pause=self._tray_toggle_play_pause,
                 on_stop_stream=self.stop_stream,
                 on_toggle_mute=self.toggle_mute_shortcut,
+                on_menu_about_to_show=self._refresh_visible_state,
             )
             # inizializza icona/tooltip coerenti
             tooltip = None
@@ -410,11 +723,6 @@ class ListenMoePlayer(QWidget):
             except Exception:
                 pass
             self.tray_mgr.ensure_tray_enabled(self._tray_enabled, window_icon=self.windowIcon(), tooltip=tooltip)
-            # Applica tema iniziale
-            try:
-                self.apply_theme()
-            except Exception:
-                pass
             # Aggiorna i testi delle azioni della tray in base allo stato corrente (con override UI pausa)
             try:
                 has_player = hasattr(self, 'player') and self.player is not None
@@ -453,10 +761,9 @@ class ListenMoePlayer(QWidget):
             pass
 
     def apply_translations(self):
-        # Mantieni o aggiorna titolo finestra in base al Now Playing
+        # Testi dipendenti dalla lingua (label, titolo finestra, sessione, tooltip): ricalcolo completo
         try:
-            title = getattr(self, '_current_title', '') or ''
-            self.setWindowTitle(f"{APP_TITLE} — {title}" if title else APP_TITLE)
+            self.refresh.invalidate()
         except Exception:
             pass
         self.channel_label.setText(self.i18n.t('channel_label'))
@@ -610,10 +917,10 @@ class ListenMoePlayer(QWidget):
                 self.channel_value.setText(channel)
             if hasattr(self, 'format_value'):
                 self.format_value.setText(fmt)
+            self._publish('channel', {'channel': channel, 'format': fmt})
             # Mantieni o aggiorna titolo finestra in base al Now Playing
             try:
-                title = getattr(self, '_current_title', '') or ''
-                self.setWindowTitle(f"{APP_TITLE} — {title}" if title else APP_TITLE)
+                self.refresh.invalidate('window_title', 'tray_tooltip')
             except Exception:
                 pass
         except Exception:
@@ -631,15 +938,17 @@ class ListenMoePlayer(QWidget):
                 prev_nc = int(self.settings.value(KEY_NETWORK_CACHING, 1000))
             except Exception:
                 prev_nc = 1000
+            prev_vlc_audio = self._get_bool(KEY_VLC_PYTHON_AUDIO, False)
             prev_dark = self._get_bool(KEY_DARK_MODE, False)
             prev_dev_console = self._get_bool(KEY_DEV_CONSOLE_ENABLED, False)
-            prev_audio_idx = self.settings.value(KEY_AUDIO_DEVICE_INDEX, '')
+            prev_ws_enabled = self._get_bool(KEY_WS_ENABLED, True)
+            prev_audio_idx = self._audio_device_key()
             dlg = SettingsDialog(self)
             try:
                 self._apply_prev_audio_idx = prev_audio_idx
                 def _on_apply_from_dialog():
                     try:
-                        new_audio_idx = self.settings.value(KEY_AUDIO_DEVICE_INDEX, '')
+                        new_audio_idx = self._audio_device_key()
                         if new_audio_idx != getattr(self, '_apply_prev_audio_idx', ''):
                             if was_playing:
                                 try:
@@ -650,10 +959,6 @@ class ListenMoePlayer(QWidget):
                                     self.stop_stream(reset_session=False)
                                 except Exception:
                                     pass
-                                try:
-                                    time.sleep(0.2)
-                                except Exception:
-                                    pass
                                 try:
                                     self.play_stream()
                                 except Exception:
@@ -717,7 +1022,7 @@ class ListenMoePlayer(QWidget):
                     pass
                 # Se il dispositivo audio è cambiato, riavvia il playback per applicarlo
                 try:
-                    new_audio_idx = self.settings.value(KEY_AUDIO_DEVICE_INDEX, '')
+                    new_audio_idx = self._audio_device_key()
                     if new_audio_idx != prev_audio_idx:
                         if was_playing:
                             try:
@@ -728,10 +1033,6 @@ class ListenMoePlayer(QWidget):
                                 self.stop_stream(reset_session=False)
                             except Exception:
                                 pass
-                            try:
-                                time.sleep(0.2)
-                            except Exception:
-                                pass
                             try:
                                 self.play_stream()
                             except Exception:
@@ -757,21 +1058,20 @@ class ListenMoePlayer(QWidget):
                     new_nc = int(self.settings.value(KEY_NETWORK_CACHING, 1000))
                 except Exception:
                     new_nc = 1000
-                if path_changed or new_nc != prev_nc:
+                # L'uscita audio di VLC si sceglie alla creazione del player
+                vlc_audio_changed = (self._get_bool(KEY_VLC_PYTHON_AUDIO, False) != prev_vlc_audio
+                                     and type(self.player).__name__ == 'PlayerVLC')
+                if path_changed or new_nc != prev_nc or vlc_audio_changed:
                     self.status_changed.emit(self.t('status_restarting'))
-                    time.sleep(0.5)
-                    # Recreate player with new settings
-                    try:
-                        self.player.stop()
-                    except Exception:
-                        pass
-                    try:
-                        self.player = PlayerFFmpeg(on_event=getattr(self, '_on_player_event', None))
-                    except Exception:
-                        self.player = PlayerVLC(on_event=getattr(self, '_on_player_event', None), libvlc_path=new_path, network_caching_ms=new_nc)
-                    self.player.set_volume(self.volume_slider.value())
-                    self.player.set_mute(self.mute_button.isChecked())
-                    self.update_vlc_status_label()
+                    # Recreate player with new settings: il vecchio backend viene fermato dalla coda comandi
+                    self._play_cmd_id = None
+                    self._install_backend(self._create_player(new_path, new_nc))
+                # WebSocket abilitato/disabilitato
+                try:
+                    if self._get_bool(KEY_WS_ENABLED, True) != prev_ws_enabled:
+                        self._restart_ws_for_channel(getattr(self, '_ws_channel', None) or self.settings.value(KEY_CHANNEL, 'J-POP'))
+                except Exception:
+                    pass
                 # Tray visibility may have changed
                 new_tray_enabled = self._get_bool(KEY_TRAY_ENABLED, True)
                 if new_tray_enabled != prev_tray_enabled:
@@ -801,6 +1101,24 @@ class ListenMoePlayer(QWidget):
                     self.update_tray_texts()
                 except Exception:
                     pass
+                # Cronologia brani abilitata/disabilitata
+                try:
+                    if self._get_bool(KEY_HISTORY_ENABLED, True):
+                        self._start_history()
+                    else:
+                        self._stop_history()
+                except Exception:
+                    pass
+                # Copertine abilitate/disabilitate
+                try:
+                    cover_on = self._get_bool(KEY_COVER_ART_ENABLED, True)
+                    self.cover_label.setVisible(cover_on)
+                    if cover_on:
+                        self._update_cover_label()
+                except Exception:
+                    pass
+                self._apply_log_settings()
+                self._apply_control_server()
                 # Dev console enable/disable may have changed
                 new_dev_console = self._get_bool(KEY_DEV_CONSOLE_ENABLED, False)
                 if new_dev_console != prev_dev_console:
@@ -843,6 +1161,24 @@ class ListenMoePlayer(QWidget):
         except Exception:
             return key
 
+    def _apply_log_settings(self):
+        """Livelli per sottosistema e file di log dalle impostazioni."""
+        try:
+            spec = self.settings.get_str(KEY_LOG_LEVELS, '')
+            if spec:
+                configure_levels(spec)
+        except Exception:
+            pass
+        try:
+            enabled = self._get_bool(KEY_LOG_FILE_ENABLED, False)
+            if enabled != getattr(self, '_log_file_enabled', False):
+                self._log_file_enabled = enabled
+                path = enable_file_logging(enabled)
+                if path:
+                    self.log.info("[UI] logging to file: %s", path)
+        except Exception:
+            pass
+
     def open_dev_console(self, parent_widget=None):
         try:
             # Ensure settings are synced, but always allow opening the console on user action
@@ -892,14 +1228,11 @@ class ListenMoePlayer(QWidget):
             self.settings.setValue(KEY_SLEEP_MINUTES, int(minutes))
             self._sleep_remaining_sec = int(minutes * 60)
             self._sleep_fadeout_sec = min(30, max(10, int(0.2 * self._sleep_remaining_sec))) if self._sleep_remaining_sec > 60 else min(15, self._sleep_remaining_sec)
-            self._sleep_saved_volume = int(self.volume_slider.value()) if hasattr(self, 'volume_slider') else 80
+            # Un eventuale fade del timer precedente non vale più
+            self._sleep_fading = False
+            self._cancel_player_fade()
             try:
-                if self._sleep_timer and not self._sleep_timer.isActive():
-                    self._sleep_timer.start()
-                elif self._sleep_timer:
-                    # restart
-                    self._sleep_timer.stop()
-                    self._sleep_timer.start()
+                self._schedule_sleep_tick()
             except Exception:
                 pass
             if hasattr(self, 'sleep_label'):
@@ -911,14 +1244,10 @@ class ListenMoePlayer(QWidget):
         try:
             if self._sleep_timer and self._sleep_timer.isActive():
                 self._sleep_timer.stop()
-            # restore volume if we had saved it
-            if self._sleep_saved_volume is not None and hasattr(self, 'volume_slider'):
-                try:
-                    self.volume_slider.setValue(int(self._sleep_saved_volume))
-                except Exception:
-                    pass
+            # Il volume utente non è mai stato toccato: basta annullare il fade
+            self._sleep_fading = False
+            self._cancel_player_fade()
             self._sleep_remaining_sec = 0
-            self._sleep_saved_volume = None
             if hasattr(self, 'sleep_label'):
                 self.sleep_label.setText("")
         except Exception:
@@ -932,7 +1261,8 @@ class ListenMoePlayer(QWidget):
                     self._sleep_timer.stop()
                 if hasattr(self, 'sleep_label'):
                     self.sleep_label.setText("")
-                self._sleep_saved_volume = None
+                # Il fade resta a zero fino al prossimo play o a un cambio di volume
+                self._sleep_fading = False
                 try:
                     # Stop opzionale a fine Sleep Timer
                     should_stop = self._get_bool(KEY_SLEEP_STOP_ON_END, True)
@@ -945,31 +1275,128 @@ class ListenMoePlayer(QWidget):
                 except Exception:
                     pass
                 return
-            # Decrement
-            self._sleep_remaining_sec -= 1
-            # Fade-out near the end
-            if self._sleep_saved_volume is not None and self._sleep_remaining_sec <= self._sleep_fadeout_sec:
+            remaining = self._sleep_remaining_sec
+            # Fade-out: un solo comando al backend, che lo esegue per campione fino alla scadenza
+            if not self._sleep_fading and self._sleep_timer.remaining() <= self._sleep_fadeout_sec + 0.05:
+                self._start_sleep_fade()
+            # Finestra nascosta: la label viene ricalcolata al prossimo show
+            if hasattr(self, 'sleep_label') and not self._low_power:
                 try:
-                    new_vol = max(0, int(self._sleep_saved_volume * self._sleep_remaining_sec / max(1, self._sleep_fadeout_sec)))
-                    if hasattr(self, 'volume_slider'):
-                        self.volume_slider.setValue(new_vol)
+                    self.sleep_label.setText(self.t('sleep_remaining', time=self._format_mmss(remaining)))
                 except Exception:
                     pass
+            self._schedule_sleep_tick()
+        except Exception:
+            pass
+
+    def _start_sleep_fade(self) -> None:
+        """Chiede al backend un fade a zero che termina alla scadenza dello sleep timer.
+        Richiamato anche a ogni 'playing' durante il fade (nuovo stream, ripresa dalla pausa)."""
+        self._sleep_fading = True
+        player = getattr(self, 'player', None)
+        fade_to = getattr(player, 'fade_to', None)
+        if fade_to is None:
+            return
+        try:
+            remaining = self._sleep_timer.remaining()
+            fade_to(0.0, remaining, 'exponential')
+            try:
+                self.log.info("[SLEEP] fade-out started (%.1fs)", remaining)
+            except Exception:
+                pass
+        except Exception:
+            pass
+
+    def _cancel_player_fade(self) -> None:
+        try:
+            cancel = getattr(getattr(self, 'player', None), 'cancel_fade', None)
+            if cancel is not None:
+                cancel()
+        except Exception:
+            pass
+
+    @property
+    def _sleep_remaining_sec(self) -> int:
+        return self._sleep_timer.remaining_seconds()
+
+    @_sleep_remaining_sec.setter
+    def _sleep_remaining_sec(self, seconds: int) -> None:
+        self._sleep_timer.set_remaining(seconds)
+
+    def _schedule_sleep_tick(self) -> None:
+        """Prossimo risveglio dello sleep timer: ogni secondo (allineato alla scadenza) mentre
+        la finestra è visibile; a finestra nascosta solo all'inizio del fade-out e alla scadenza
+        (il fade procede nel backend senza risvegli della UI)."""
+        if self._sleep_timer is None:
+            return
+        remaining = self._sleep_timer.remaining()
+        if self._low_power:
+            if not self._sleep_fading and remaining > self._sleep_fadeout_sec:
+                self._sleep_timer.wake_in(remaining - self._sleep_fadeout_sec)
+            else:
+                self._sleep_timer.wake_in(remaining)
+            return
+        frac = remaining - math.floor(remaining)
+        self._sleep_timer.wake_in(frac if frac > 0.05 else 1.0)
+
+    @property
+    def _session_seconds(self) -> int:
+        return int(self._session_timer.elapsed())
+
+    @_session_seconds.setter
+    def _session_seconds(self, seconds: int) -> None:
+        self._session_timer.reset(seconds)
+
+    def _set_low_power(self, enabled: bool) -> None:
+        """Finestra nascosta: sospende i timer solo-UI. Il tempo di sessione/sleep resta esatto
+        (scadenze monotone) e la UI viene ricalcolata quando torna visibile."""
+        enabled = bool(enabled)
+        if enabled == self._low_power:
+            return
+        self._low_power = enabled
+        try:
+            self.log.debug("[UI] low-power mode: %s", enabled)
+        except Exception:
+            pass
+        try:
+            if self._progress_timer is not None:
+                if enabled:
+                    self._progress_timer.stop()
+                else:
+                    self._progress_timer.start()
+        except Exception:
+            pass
+        try:
+            # Da nascosta il tooltip della tray si aggiorna una volta al minuto
+            self._session_timer.set_tick_interval(60000 if enabled else 1000)
+        except Exception:
+            pass
+        try:
+            if self._sleep_timer is not None and self._sleep_remaining_sec > 0:
+                self._schedule_sleep_tick()
+        except Exception:
+            pass
+        if not enabled:
+            self._refresh_visible_state()
+
+    def _refresh_visible_state(self) -> None:
+        """Ricalcola subito i testi visibili (show della finestra, apertura menu tray)."""
+        try:
             if hasattr(self, 'sleep_label'):
-                try:
-                    self.sleep_label.setText(self.t('sleep_remaining', time=self._format_mmss(self._sleep_remaining_sec)))
-                except Exception:
-                    pass
+                remaining = self._sleep_remaining_sec
+                self.sleep_label.setText(self.t('sleep_remaining', time=self._format_mmss(remaining)) if remaining > 0 else "")
+        except Exception:
+            pass
+        try:
+            self.refresh.mark('now_playing', 'window_title', 'session', 'tray_tooltip')
+            self.refresh.flush()
         except Exception:
             pass
 
     def _get_ws_url_for_channel(self, channel: str):
         """Restituisce l'URL del gateway WebSocket corretto in base al canale."""
         try:
-            ch = (channel or '').strip().upper()
-            if ch == 'K-POP' or 'K-POP' in ch:
-                return "wss://listen.moe/kpop/gateway_v2"
-            return "wss://listen.moe/gateway_v2"
+            return gateway_url_for(channel)
         except Exception:
             return "wss://listen.moe/gateway_v2"
 
@@ -984,11 +1411,17 @@ class ListenMoePlayer(QWidget):
                 pass
             # Crea e avvia un nuovo WS sul gateway del canale
             try:
+                self._ws_channel = channel
+                self.ws = None
+                if not self._get_bool(KEY_WS_ENABLED, True):
+                    return
+                from ws_client import NowPlayingWS
                 self.ws = NowPlayingWS(
-                    on_now_playing=self._on_now_playing,
+                    on_now_playing=self._on_ws_now_playing,
                     on_error_text=self._on_ws_error_text,
                     on_closed_text=self._on_ws_closed_text,
                     ws_url=self._get_ws_url_for_channel(channel),
+                    on_track=self._on_track_info,
                 )
                 self.ws.start()
             except Exception:
@@ -998,42 +1431,10 @@ class ListenMoePlayer(QWidget):
 
     def get_selected_stream_url(self) -> str:
         """Restituisce l'URL dello stream in base a canale e formato nelle impostazioni."""
-        try:
-            channel = self.settings.value(KEY_CHANNEL, 'J-POP')
-            fmt = self.settings.value(KEY_FORMAT, 'Vorbis')
-            urls = STREAMS.get(channel)
-            if isinstance(urls, dict):
-                url = urls.get(fmt)
-                if url:
-                    return url
-                # fallback: prova Vorbis, altrimenti il primo disponibile
-                url = urls.get('Vorbis') or (next(iter(urls.values())) if urls else None)
-                if url:
-                    return url
-            # fallback globale noto
-            jpop = STREAMS.get('J-POP', {})
-            return jpop.get('Vorbis') or (next(iter(jpop.values())) if jpop else "https://listen.moe/stream")
-        except Exception:
-            return "https://listen.moe/stream"
+        return stream_url_for(self.settings.value(KEY_CHANNEL, 'J-POP'), self.settings.value(KEY_FORMAT, 'Vorbis'))
 
     def _get_bool(self, key: str, default: bool) -> bool:
-        try:
-            val = self.settings.value(key, default)
-            if isinstance(val, bool):
-                return val
-            if isinstance(val, int):
-                return bool(val)
-            if isinstance(val, str):
-                v = val.strip().lower()
-                if v in ("1", "true", "yes", "on"):
-                    return True
-                if v in ("0", "false", "no", "off"):
-                    return False
-                # fallback: any non-empty string is True
-                return len(v) > 0
-            return bool(val) if val is not None else default
-        except Exception:
-            return default
+        return self.settings.get_bool(key, default)
 
     def _format_mmss(self, seconds: int) -> str:
         """Format seconds as M:SS, capped at 0 if negative."""
@@ -1058,21 +1459,21 @@ class ListenMoePlayer(QWidget):
             return "0:00"
 
     def _update_session_label(self) -> None:
-        try:
-            t = self._format_hhmmss(getattr(self, '_session_seconds', 0))
-            if hasattr(self, 'i18n') and hasattr(self, 'session_label'):
-                self.session_label.setText(self.i18n.t('session_timer', time=t))
-        except Exception:
-            pass
+        self.refresh.mark('session')
+
+    def _compute_session_text(self) -> str:
+        t = self._format_hhmmss(getattr(self, '_session_seconds', 0))
+        return self.i18n.t('session_timer', time=t)
+
+    def _apply_session_text(self, text: str) -> None:
+        if hasattr(self, 'session_label'):
+            self.session_label.setText(text)
 
     def _on_session_tick(self) -> None:
         try:
-            self._session_seconds = getattr(self, '_session_seconds', 0) + 1
-            self._update_session_label()
-            try:
-                self.update_tray_texts()
-            except Exception:
-                pass
+            # Il tempo viene dal cronometro monotono; il tick richiede solo il ridisegno.
+            # Il tooltip della tray dipende dalla sessione: viene aggiornato nello stesso passaggio
+            self.refresh.mark('session')
         except Exception:
             pass
 
@@ -1119,11 +1520,18 @@ class ListenMoePlayer(QWidget):
             pass
 
     def _on_player_event(self, code: str, value: Optional[int] = None) -> None:
-        """Gestisce gli eventi del backend (FFmpeg/VLC) aggiornando lo stato UI."""
+        """Gestisce gli eventi del backend (FFmpeg/VLC), ricevuti sul thread GUI, aggiornando lo stato UI."""
         try:
             c = (str(code).lower() if code is not None else '')
         except Exception:
             c = ''
+        if c:
+            self._publish('player', {'state': c, 'value': value})
+        if c == 'playing':
+            self._audio_playing = True
+        elif c in ('opening', 'paused', 'stopped', 'ended', 'error'):
+            self._audio_playing = False
+        self._track_backend_health(c)
         try:
             if c == 'opening':
                 # Mostra buffering indeterminato in fase di apertura
@@ -1160,6 +1568,10 @@ class ListenMoePlayer(QWidget):
                 return
 
             if c == 'playing':
+                startup_trace.mark('first_audio')
+                # Nuovo stream o ripresa durante il fade dello sleep timer: riallinea il fade alla scadenza
+                if self._sleep_fading and self._sleep_timer.remaining() > 0:
+                    self._start_sleep_fade()
                 try:
                     self.status_changed.emit(self.t('status_playing'))
                 except Exception:
@@ -1327,7 +1739,7 @@ class ListenMoePlayer(QWidget):
 
     def _on_now_playing(self, title: str, artist: str, duration: Optional[int] = None, start_ts: Optional[float] = None):
         try:
-            self.log.info(f"[WS] now_playing: title={title!r}, artist={artist!r}, duration={duration}, start_ts={start_ts}")
+            self.log.info("[WS] now_playing: title=%r, artist=%r, duration=%s, start_ts=%s", title, artist, duration, start_ts)
         except Exception:
             pass
         self._current_title = title or self.t('unknown')
@@ -1403,7 +1815,7 @@ class ListenMoePlayer(QWidget):
         except Exception:
             pass
 
-    def _notify_tray(self, title: str, body: str) -> None:
+    def _notify_tray(self, title: str, body: str, icon: Optional[QIcon] = None) -> None:
         try:
             # Rispetta impostazioni utente
             if not self._get_bool(KEY_TRAY_ENABLED, True) or not self._get_bool(KEY_TRAY_NOTIFICATIONS, True):
@@ -1418,7 +1830,7 @@ class ListenMoePlayer(QWidget):
         # Mostra la notifica tramite TrayManager
         try:
             if hasattr(self, 'tray_mgr') and self.tray_mgr is not None:
-                self.tray_mgr.show_message(title or '', body or '')
+                self.tray_mgr.show_message(title or '', body or '', icon)
         except Exception:
             pass
 
@@ -1590,9 +2002,20 @@ class ListenMoePlayer(QWidget):
 
     # ------------------- Backend status -------------------
     def _schedule_play_stream(self, delay_ms: int) -> None:
-        """UI-thread slot to (re)start the stream after a delay."""
+        """UI-thread slot to (re)start the stream after a delay.
+
+        Un solo avvio in attesa: le richieste ravvicinate (evento 'error' del backend
+        e fallimento del formato alternativo per lo stesso tentativo) spostano la
+        scadenza invece di accodare un nuovo avvio ciascuna.
+        """
         try:
-            QTimer.singleShot(int(delay_ms), self.play_stream)
+            timer = getattr(self, '_play_retry_timer', None)
+            if timer is None:
+                timer = QTimer(self)
+                timer.setSingleShot(True)
+                timer.timeout.connect(self.play_stream)
+                self._play_retry_timer = timer
+            timer.start(max(0, int(delay_ms)))
         except Exception:
             try:
                 self.play_stream()
@@ -1629,13 +2052,15 @@ class ListenMoePlayer(QWidget):
     def play_stream(self) -> None:
         try:
             with self._playback_lock:
+                # Tra una sessione e l'altra: failback al backend preferito se il cooldown è scaduto
+                self._maybe_switch_backend()
                 # Determine URL and check backend readiness
                 url = None
                 try:
                     url = self.get_selected_stream_url()
                 except Exception:
                     url = None
-                if not hasattr(self, 'player') or self.player is None or not url:
+                if self.player is None or self.actor is None or not url:
                     try:
                         self.log.info("[UI] play_stream aborted: no player backend or url")
                     except Exception:
@@ -1643,7 +2068,7 @@ class ListenMoePlayer(QWidget):
                     self.status_changed.emit(self.t('status_error'))
                     return
                 try:
-                    self.log.info(f"[UI] play_stream clicked; backend={type(self.player).__name__}")
+                    self.log.info("[UI] play_stream clicked; backend=%s", type(self.player).__name__)
                     # Sanitizza URL prima di log e play
                     try:
                         m = re.search(r"https?://[A-Za-z0-9\-._~:/?#\[\]@!$&()*+,;=%]+", url or "")
@@ -1652,62 +2077,100 @@ class ListenMoePlayer(QWidget):
                             safe_url = safe_url[:-1]
                     except Exception:
                         safe_url = url
-                    self.log.info(f"[UI] play_stream url={safe_url}")
+                    self.log.info("[UI] play_stream url=%s", safe_url)
                 except Exception:
                     safe_url = url
                 self.status_changed.emit(self.t('status_opening') if hasattr(self, 't') else 'Opening...')
-                ok = self.player.play_url(safe_url)
-                if not ok:
-                    # Fallback: prova formato alternativo per lo stesso canale
-                    try:
-                        channel = self.settings.value(KEY_CHANNEL, 'J-POP')
-                        cur_fmt = self.settings.value(KEY_FORMAT, 'Vorbis')
-                        alt_fmt = 'MP3' if cur_fmt == 'Vorbis' else 'Vorbis'
-                        alt_url = STREAMS.get(channel, {}).get(alt_fmt)
-                        if alt_url:
-                            try:
-                                m2 = re.search(r"https?://[A-Za-z0-9\-._~:/?#\[\]@!$&()*+,;=%]+", alt_url or "")
-                                alt_safe = (m2.group(0) if m2 else (alt_url or "").strip()).rstrip(".,;!?)]}'\" \t\r\n")
-                                if alt_safe.lower().endswith('/mp3.') or alt_safe.lower().endswith('.mp3.'):
-                                    alt_safe = alt_safe[:-1]
-                                self.log.info(f"[UI] primary play failed, trying fallback format {alt_fmt}: {alt_safe}")
-                            except Exception:
-                                alt_safe = alt_url
-                            ok = self.player.play_url(alt_safe)
-                    except Exception:
-                        pass
-                if not ok:
-                    self.status_changed.emit(self.t('status_error'))
-                    try:
-                        self.log.info("[UI] play_stream failed")
-                    except Exception:
-                        pass
-                else:
-                    try:
-                        if hasattr(self, '_icon_play') and not self._icon_play.isNull():
-                            self.setWindowIcon(self._icon_play)
-                    except Exception:
-                        pass
-                    self.tray_icon_refresh.emit()
-                    try:
-                        self.log.info("[UI] play_stream started")
-                    except Exception:
-                        pass
-                    # Start session timer on play if enabled
-                    try:
-                        if self._get_bool(KEY_SESSION_TIMER_ENABLED, True):
-                            # Do not reset automatically; keep cumulative during session unless stopped
-                            if self._session_timer and not self._session_timer.isActive():
-                                self._session_timer.start()
-                            if hasattr(self, 'session_label'):
-                                self.session_label.show()
-                            self._update_session_label()
-                            self.update_tray_texts()
-                    except Exception:
-                        pass
+                # L'apertura dello stream avviene sul thread della coda comandi:
+                # l'esito arriva in _on_player_command_finished
+                self._play_fallback_pending = True
+                if self._backends is not None:
+                    self._backends.attempt()
+                self._play_cmd_id = self.actor.play(safe_url).command_id
         except Exception as e:
             self.status_changed.emit(f"{self.t('status_error')} {e}")
 
+    def _fallback_stream_url(self) -> Optional[str]:
+        """URL del formato alternativo (Vorbis <-> MP3) per il canale corrente."""
+        try:
+            channel = self.settings.value(KEY_CHANNEL, 'J-POP')
+            cur_fmt = self.settings.value(KEY_FORMAT, 'Vorbis')
+            alt_fmt = 'MP3' if cur_fmt == 'Vorbis' else 'Vorbis'
+            if alt_fmt not in STREAMS.get(channel, {}):
+                return None
+            alt_url = stream_url_for(channel, alt_fmt)
+            try:
+                m2 = re.search(r"https?://[A-Za-z0-9\-._~:/?#\[\]@!$&()*+,;=%]+", alt_url or "")
+                alt_safe = (m2.group(0) if m2 else (alt_url or "").strip()).rstrip(".,;!?)]}'\" \t\r\n")
+                if alt_safe.lower().endswith('/mp3.') or alt_safe.lower().endswith('.mp3.'):
+                    alt_safe = alt_safe[:-1]
+                self.log.info("[UI] primary play failed, trying fallback format %s: %s", alt_fmt, alt_safe)
+            except Exception:
+                alt_safe = alt_url
+            return alt_safe
+        except Exception:
+            return None
+
+    def _on_player_command_finished(self, cmd_id: int, name: str, result) -> None:
+        """Esito dei comandi al backend (thread GUI). Conta solo l'ultimo play richiesto."""
+        if name == 'replace_backend' and cmd_id == self._backend_switch_cmd_id:
+            self._backend_switch_cmd_id = None
+            self._on_backend_replaced(result)
+            return
+        if name != 'play' or cmd_id != self._play_cmd_id:
+            return
+        ok = result is True
+        if not ok and self._play_fallback_pending:
+            # Fallback: prova formato alternativo per lo stesso canale
+            self._play_fallback_pending = False
+            alt_safe = self._fallback_stream_url()
+            if alt_safe and self.actor is not None:
+                # Stessa sessione per il BackendManager: l'errore del formato principale non conta
+                self._play_cmd_id = self.actor.play(alt_safe).command_id
+                return
+        self._play_cmd_id = None
+        if not ok:
+            self.status_changed.emit(self.t('status_error'))
+            try:
+                self.log.info("[UI] play_stream failed")
+            except Exception:
+                pass
+            # Fallimento della sessione (anche del fallback); failed() ignora una sessione già chiusa
+            if self._backends is not None:
+                self._backends.failed('play')
+                self._maybe_switch_backend()
+            return
+        try:
+            if hasattr(self, '_icon_play') and not self._icon_play.isNull():
+                self.setWindowIcon(self._icon_play)
+        except Exception:
+            pass
+        self.tray_icon_refresh.emit()
+        try:
+            self.log.info("[UI] play_stream started")
+        except Exception:
+            pass
+        # Start session timer on play if enabled
+        try:
+            if self._get_bool(KEY_SESSION_TIMER_ENABLED, True):
+                # Do not reset automatically; keep cumulative during session unless stopped
+                if self._session_timer and not self._session_timer.isActive():
+                    self._session_timer.start()
+                if hasattr(self, 'session_label'):
+                    self.session_label.show()
+                self._update_session_label()
+                self.update_tray_texts()
+        except Exception:
+            pass
+
+    def _shutdown_player(self) -> None:
+        """All'uscita: ferma il backend dopo i comandi in coda e chiude il thread della coda."""
+        try:
+            if self.actor is not None:
+                self.actor.shutdown(stop_backend=True, timeout=2.0)
+        except Exception:
+            pass
+
     def pause_resume(self) -> None:
         try:
             with self._playback_lock:
@@ -1721,12 +2184,13 @@ class ListenMoePlayer(QWidget):
                     self._ui_paused = new_paused
                     is_muted = bool(getattr(self.player, 'get_mute', lambda: False)())
                     if hasattr(self, 'tray_mgr') and self.tray_mgr:
-                        print(f"[MAIN] pause_resume(pre-toggle): new_paused={new_paused}, sending playing={not new_paused}, paused={new_paused}, is_muted={is_muted}")
+                        self.log.debug("[MAIN] pause_resume(pre-toggle): new_paused=%s, sending playing=%s, paused=%s, is_muted=%s", new_paused, not new_paused, new_paused, is_muted)
                         self.tray_mgr.update_controls_state(not new_paused, new_paused, is_muted)
                 except Exception:
                     pass
-                # Esegui il toggle del backend
-                self.player.pause_toggle()
+                # Esegui il toggle del backend (asincrono, la UI è già aggiornata)
+                if self.actor is not None:
+                    self.actor.pause_toggle()
                 # Gestisci il session timer e aggiorna solo il tooltip
                 try:
                     if self._get_bool(KEY_SESSION_TIMER_ENABLED, True):
@@ -1748,9 +2212,19 @@ class ListenMoePlayer(QWidget):
             except Exception:
                 pass
             with self._playback_lock:
-                # Stop backend playback
+                # Stop backend playback (asincrono): l'esito di un play ancora in corso viene ignorato
+                self._play_cmd_id = None
+                if self._backends is not None:
+                    self._backends.stopped()
+                # Annulla un riavvio automatico ancora in attesa
+                try:
+                    if getattr(self, '_play_retry_timer', None) is not None:
+                        self._play_retry_timer.stop()
+                except Exception:
+                    pass
                 try:
-                    self.player.stop()
+                    if self.actor is not None:
+                        self.actor.stop()
                 except Exception:
                     pass
                 # Update UI state
@@ -1800,20 +2274,8 @@ class ListenMoePlayer(QWidget):
                 except Exception:
                     pass
                 try:
-                    # Aggiorna titolo finestra: preserva il Now Playing durante riavvii interni
-                    if reset_session:
-                        base = APP_TITLE
-                        self.setWindowTitle(base)
-                    else:
-                        # Mantieni il titolo corrente se disponibile, altrimenti fallback a base
-                        try:
-                            title = getattr(self, '_current_title', '') or ''
-                        except Exception:
-                            title = ''
-                        if title:
-                            self.setWindowTitle(f"{APP_TITLE} — {title}")
-                        else:
-                            self.setWindowTitle(APP_TITLE)
+                    # Titolo finestra dal Now Playing corrente (preservato anche durante riavvii interni)
+                    self.refresh.invalidate('window_title')
                 except Exception:
                     pass
         except Exception as e:
@@ -1822,6 +2284,9 @@ class ListenMoePlayer(QWidget):
     def volume_changed(self, value: int) -> None:
         try:
             self.player.set_volume(int(value))
+            # Fade rimasto a zero dopo uno sleep timer senza stop: il volume torna udibile
+            if not getattr(self, '_sleep_fading', False):
+                self._cancel_player_fade()
             self.settings.setValue(KEY_VOLUME, int(value))
             # Aggiorna UI volume
             try:
@@ -1832,9 +2297,10 @@ class ListenMoePlayer(QWidget):
             except Exception:
                 pass
             try:
-                self.log.info(f"[UI] volume_changed -> {int(value)}")
+                self.log.info("[UI] volume_changed -> %d", int(value))
             except Exception:
                 pass
+            self._publish('volume', {'volume': int(value), 'muted': bool(self.mute_button.isChecked())})
         except Exception:
             pass
 
@@ -1861,6 +2327,7 @@ class ListenMoePlayer(QWidget):
                 self.player.set_mute(checked)
         except Exception:
             pass
+        self._publish('volume', {'volume': int(self.volume_slider.value()), 'muted': bool(checked)})
         # Aggiorna testi azioni tray (Muto/Unmute e Play/Pausa) rispettando lo stato UI di pausa
         try:
             has_player = hasattr(self, 'player') and self.player is not None
@@ -1937,8 +2404,9 @@ class ListenMoePlayer(QWidget):
         except Exception:
             pass
         try:
-            if hasattr(self, 'player') and self.player:
-                self.player.force_cleanup()
+            self._play_cmd_id = None
+            if self.actor is not None:
+                self.actor.force_cleanup()
         except Exception:
             pass
         # Stop and reset session timer when forcing stop
@@ -1962,6 +2430,10 @@ class ListenMoePlayer(QWidget):
                     self.dev_console.deactivate_logging()
                 except Exception:
                     pass
+                try:
+                    self.dev_console.stop_profiler()
+                except Exception:
+                    pass
                 try:
                     self.dev_console.close()
                 except Exception:
@@ -1975,6 +2447,18 @@ class ListenMoePlayer(QWidget):
             self._session_seconds = 0
         except Exception:
             pass
+        # Scrive su disco la cronologia ancora in coda
+        self._stop_history()
+        # Scrive subito le impostazioni ancora in sospeso
+        try:
+            self.settings.flush()
+        except Exception:
+            pass
+        try:
+            if self.art is not None:
+                self.art.shutdown()
+        except Exception:
+            pass
         # Accetta la chiusura della finestra
         try:
             event.accept()
@@ -1986,12 +2470,20 @@ class ListenMoePlayer(QWidget):
             super().showEvent(event)
         except Exception:
             pass
+        self._set_low_power(False)
         try:
             dark = self._get_bool(KEY_DARK_MODE, False)
             self._apply_windows_titlebar_dark_mode(dark)
         except Exception:
             pass
 
+    def hideEvent(self, event) -> None:
+        try:
+            super().hideEvent(event)
+        except Exception:
+            pass
+        self._set_low_power(True)
+
     def changeEvent(self, event) -> None:
         try:
             if event.type() == QEvent.WindowStateChange:
@@ -2024,6 +2516,10 @@ class ListenMoePlayer(QWidget):
             return ""
 
     def update_now_playing_label(self):
+        """Richiede l'aggiornamento di label e titolo finestra (coalescato per frame)."""
+        self.refresh.mark('now_playing', 'window_title')
+
+    def _compute_now_playing_text(self) -> str:
         title = self._current_title or self.t('unknown')
         artist = self._current_artist or ''
         prefix = self.t('now_playing_prefix')
@@ -2057,17 +2553,16 @@ class ListenMoePlayer(QWidget):
                     text += f" [{mmss}]"
         except Exception:
             pass
-        self.now_playing_changed.emit(text)
-        # Update window title too
-        try:
-            base = APP_TITLE
-            self.setWindowTitle(f"{base} — {title}")
-        except Exception:
-            pass
+        return text
+
+    def _compute_window_title(self) -> str:
+        if not self._current_title:
+            return APP_TITLE
+        return f"{APP_TITLE} — {self._current_title}"
 
     def _on_now_playing(self, title: str, artist: str, duration: Optional[int] = None, start_ts: Optional[float] = None):
         try:
-            self.log.info(f"[WS] now_playing: title={title!r}, artist={artist!r}, duration={duration}, start_ts={start_ts}")
+            self.log.info("[WS] now_playing: title=%r, artist=%r, duration=%s, start_ts=%s", title, artist, duration, start_ts)
         except Exception:
             pass
         self._current_title = title or self.t('unknown')
@@ -2083,6 +2578,9 @@ class ListenMoePlayer(QWidget):
             self._current_start_epoch = float(start_ts) if start_ts is not None else None
         except Exception:
             self._current_start_epoch = None
+        self._publish('track', {'title': title, 'artist': artist, 'duration': self._current_duration_seconds,
+                                'start_ts': self._current_start_epoch,
+                                'source': 'icy' if self._icy_titles_active() else 'ws'})
         # Ask UI to update label safely
         try:
             self.label_refresh.emit()
@@ -2100,7 +2598,7 @@ class ListenMoePlayer(QWidget):
                         body += f" [{mmss}]"
                 except Exception:
                     pass
-                self.notify_tray.emit(msg_title, body)
+                self.notify_track.emit(msg_title, body, self._current_art_url or '')
         except Exception:
             pass
         # Update backend status indicator opportunistically
@@ -2109,6 +2607,274 @@ class ListenMoePlayer(QWidget):
         except Exception:
             pass
 
+    def _on_track_info(self, info: dict) -> None:
+        """Riceve dal thread WS tutti i campi del brano: avvia il prefetch della copertina
+        e registra il brano nella cronologia."""
+        try:
+            self._ws_recent.append(info)
+        except Exception:
+            pass
+        try:
+            url = art_url_for(info) if (self.art is not None and self._get_bool(KEY_COVER_ART_ENABLED, True)) else None
+            if url:
+                self.art.prefetch(url)
+            # Con i titoli ICY la copertina cambia insieme all'audio (vedi _on_icy_metadata)
+            if not self._icy_titles_active():
+                self._current_art_url = url
+                self.cover_refresh.emit()
+        except Exception:
+            pass
+        try:
+            hist = getattr(self, 'history', None)
+            if hist is None or not isinstance(info, dict):
+                return
+            was_playing = self._audio_playing
+            hist.record(
+                info.get('title') or '',
+                info.get('artists') or ([info.get('artist')] if info.get('artist') else []),
+                song_id=info.get('id'),
+                channel=str(getattr(self, '_ws_channel', '') or ''),
+                start_ts=info.get('start_ts'),
+                duration=info.get('duration'),
+                was_playing=was_playing,
+            )
+        except Exception:
+            pass
+
+    def _icy_titles_active(self) -> bool:
+        try:
+            return bool(self.player and getattr(self.player, 'icy_active', None) and self.player.icy_active())
+        except Exception:
+            return False
+
+    def _apply_icy_setting(self) -> None:
+        try:
+            if hasattr(self.player, 'icy_metadata'):
+                self.player.icy_metadata = self._get_bool(KEY_ICY_METADATA, False)
+        except Exception:
+            pass
+
+    def _on_ws_now_playing(self, title: str, artist: str, duration: Optional[int] = None, start_ts: Optional[float] = None):
+        """Titolo dal WS: ignorato se i titoli arrivano già dallo stream audio (ICY)."""
+        if self._icy_titles_active():
+            return
+        self._on_now_playing(title, artist, duration, start_ts)
+
+    def _on_icy_metadata(self, title: str, artist: str) -> None:
+        """Titolo ICY dal thread del player, emesso quando l'audio raggiunge il cambio brano.
+        Se il WS ha annunciato lo stesso brano ne riusa durata, inizio e copertina."""
+        info = None
+        try:
+            key = (title or '').strip().casefold()
+            for cand in reversed(self._ws_recent):
+                if (cand.get('title') or '').strip().casefold() == key:
+                    info = cand
+                    break
+        except Exception:
+            info = None
+        duration = info.get('duration') if info else None
+        start_ts = info.get('start_ts') if info else None
+        try:
+            url = art_url_for(info) if (info and self.art is not None and self._get_bool(KEY_COVER_ART_ENABLED, True)) else None
+            self._current_art_url = url
+            if url:
+                self.art.prefetch(url)
+            self.cover_refresh.emit()
+        except Exception:
+            pass
+        # Senza WS la cronologia si basa sui soli titoli ICY
+        if info is None and self.ws is None:
+            try:
+                if self.history is not None:
+                    self.history.record(title or '', [artist] if artist else [],
+                                        channel=str(getattr(self, '_ws_channel', '') or ''),
+                                        start_ts=time.time(), was_playing=True)
+            except Exception:
+                pass
+        self._on_now_playing(title, artist, duration, start_ts)
+
+    def _start_history(self) -> None:
+        try:
+            if self.history is not None or not self._get_bool(KEY_HISTORY_ENABLED, True):
+                return
+            from history import TrackHistory, DEFAULT_MAX_ROWS
+            try:
+                max_rows = int(self.settings.value(KEY_HISTORY_MAX_ROWS, DEFAULT_MAX_ROWS))
+            except Exception:
+                max_rows = DEFAULT_MAX_ROWS
+            self.history = TrackHistory(max_rows=max_rows).start()
+        except Exception:
+            self.history = None
+
+    def _apply_control_server(self) -> None:
+        """Avvia/ferma l'API locale di controllo secondo le impostazioni."""
+        enabled = self._get_bool(KEY_CONTROL_SERVER_ENABLED, False)
+        port = self.settings.get_int(KEY_CONTROL_SERVER_PORT, DEFAULT_CONTROL_PORT)
+        token = self.settings.get_str(KEY_CONTROL_SERVER_TOKEN, '').strip()
+        if enabled and not token:
+            # Prima attivazione (anche da file di configurazione): mai un'API senza token
+            try:
+                from control_server import new_token
+                token = new_token()
+                self.settings.setValue(KEY_CONTROL_SERVER_TOKEN, token)
+            except Exception:
+                pass
+        if self.control is not None and (not enabled or self.control.port != port
+                                         or self.control.token != (token or None)):
+            self._stop_control_server()
+        if not enabled or self.control is not None:
+            return
+        try:
+            from control_server import ControlServer
+            server = ControlServer(self.control_command.emit, port=port, token=token or None)
+            if not server.start():
+                return
+            self.control = server
+            self._publish_snapshot()
+        except Exception:
+            self.control = None
+
+    def _stop_control_server(self) -> None:
+        try:
+            server = self.control
+            self.control = None
+            if server is not None:
+                server.stop()
+        except Exception:
+            pass
+
+    def _publish(self, event: str, data: dict) -> None:
+        """Inoltra un evento ai client dell'API locale (da qualsiasi thread)."""
+        server = getattr(self, 'control', None)
+        if server is not None:
+            try:
+                server.publish(event, data)
+            except Exception:
+                pass
+
+    def _publish_snapshot(self) -> None:
+        """Stato iniziale per /status e per i client che si collegano."""
+        try:
+            playing = bool(self.player and self.player.is_playing())
+            paused = bool(self.player and getattr(self.player, 'is_paused', lambda: False)())
+        except Exception:
+            playing = paused = False
+        self._publish('player', {'state': 'paused' if paused else ('playing' if playing else 'stopped')})
+        self._publish('channel', {'channel': self.settings.value(KEY_CHANNEL, 'J-POP'),
+                                  'format': self.settings.value(KEY_FORMAT, 'Vorbis')})
+        self._publish('volume', {'volume': int(self.volume_slider.value()), 'muted': bool(self.mute_button.isChecked())})
+        if self._current_title is not None:
+            self._publish('track', {'title': self._current_title, 'artist': self._current_artist,
+                                    'duration': self._current_duration_seconds, 'start_ts': self._current_start_epoch})
+        if self._backends is not None:
+            self._publish('backend', self._backends.snapshot())
+
+    def _on_control_command(self, name: str, value) -> None:
+        """Esegue sul thread GUI un comando già validato dall'API locale."""
+        try:
+            self.log.info("[API] command %s %s", name, '' if value is None else value)
+            if name == 'play':
+                self.play_stream()
+            elif name == 'stop':
+                self.stop_stream()
+            elif name == 'pause':
+                # Idempotente: mette in pausa solo se sta suonando (per riprendere c'è toggle)
+                # (_ui_paused copre il toggle appena accodato all'actor e non ancora eseguito)
+                if (self.player is not None and self.player.is_playing()
+                        and not getattr(self.player, 'is_paused', lambda: False)()
+                        and not getattr(self, '_ui_paused', False)):
+                    self.pause_resume()
+            elif name == 'toggle':
+                self._tray_toggle_play_pause()
+            elif name == 'volume':
+                self.volume_slider.setValue(int(value))
+            elif name == 'mute':
+                self.mute_button.setChecked(not self.mute_button.isChecked() if value is None else bool(value))
+            elif name == 'channel':
+                self._tray_change_channel(value)
+            elif name == 'format':
+                self._tray_change_format(value)
+        except Exception as e:
+            self.log.debug("[API] command %s failed: %s", name, e)
+
+    def handle_instance_command(self, name: str) -> None:
+        """Richiesta da un secondo avvio dell'app (show, play, stop, toggle)."""
+        try:
+            self.log.info("[UI] instance command: %s", name)
+            if name == 'show':
+                if self.isMinimized() or not self.isVisible():
+                    self.showNormal()
+                self.raise_()
+                self.activateWindow()
+                return
+            if not self._startup_done:
+                self._pending_instance_command = name
+                return
+            self._on_control_command(name, None)
+        except Exception:
+            pass
+
+    def _stop_history(self) -> None:
+        try:
+            hist = getattr(self, 'history', None)
+            self.history = None
+            if hist is not None:
+                hist.close()
+        except Exception:
+            pass
+
+    def _update_cover_label(self) -> None:
+        """Mostra la copertina del brano corrente se è già in cache (mai bloccante)."""
+        try:
+            pm = self.art.pixmap(self._current_art_url) if self.art is not None else None
+            if pm is not None and not pm.isNull():
+                self.cover_label.setPixmap(pm)
+            else:
+                self.cover_label.clear()
+        except Exception:
+            pass
+
+    def _on_art_ready(self, url: str) -> None:
+        if url != self._current_art_url:
+            return
+        self._update_cover_label()
+        # Notifica rimasta in attesa della copertina
+        try:
+            if self._pending_notice is not None and self._pending_notice[0] == url:
+                self._flush_pending_notice()
+        except Exception:
+            pass
+
+    def _notify_track(self, title: str, body: str, url: str) -> None:
+        """Notifica del nuovo brano: usa la copertina in cache; se è in download
+        attende al massimo un attimo prima di notificare senza immagine."""
+        try:
+            if url and self.art is not None and self.art.pixmap(url) is None and self.art.is_pending(url):
+                self._pending_notice = (url, title, body)
+                QTimer.singleShot(1500, self._flush_pending_notice)
+                return
+        except Exception:
+            pass
+        self._pending_notice = None
+        self._notify_tray(title, body, self._cover_icon(url))
+
+    def _flush_pending_notice(self) -> None:
+        notice = self._pending_notice
+        self._pending_notice = None
+        if notice is None:
+            return
+        url, title, body = notice
+        self._notify_tray(title, body, self._cover_icon(url))
+
+    def _cover_icon(self, url: Optional[str]) -> Optional[QIcon]:
+        try:
+            pm = self.art.pixmap(url) if (url and self.art is not None) else None
+            if pm is not None and not pm.isNull():
+                return QIcon(pm)
+        except Exception:
+            pass
+        return None
+
     # ------------------- WebSocket text handlers -------------------
     def _on_ws_error_text(self, text: str) -> None:
         try:
@@ -2124,24 +2890,18 @@ class ListenMoePlayer(QWidget):
 
     # ------------------- Tray helpers (static) -------------------
     def update_tray_texts(self) -> None:
-        try:
-            if not hasattr(self, 'tray_mgr') or self.tray_mgr is None:
-                return
-            header = self.label.text() if hasattr(self, 'label') else APP_TITLE
-            now = self.now_playing_label.text() if hasattr(self, 'now_playing_label') else ''
-            session_enabled = self._get_bool(KEY_SESSION_TIMER_ENABLED, True)
-            session = self.session_label.text() if session_enabled and hasattr(self, 'session_label') else ''
-            if now and session:
-                tooltip = f"{header}\n{now}\n{session}"
-            elif now:
-                tooltip = f"{header}\n{now}"
-            elif session:
-                tooltip = f"{header}\n{session}"
-            else:
-                tooltip = header
+        self.refresh.mark('tray_tooltip')
+
+    def _compute_tray_tooltip(self) -> str:
+        header = self.label.text() if hasattr(self, 'label') else APP_TITLE
+        now = self.now_playing_label.text() if hasattr(self, 'now_playing_label') else ''
+        session_enabled = self._get_bool(KEY_SESSION_TIMER_ENABLED, True)
+        session = self.session_label.text() if session_enabled and hasattr(self, 'session_label') else ''
+        return "\n".join(part for part in (header, now, session) if part)
+
+    def _apply_tray_tooltip(self, tooltip: str) -> None:
+        if hasattr(self, 'tray_mgr') and self.tray_mgr is not None:
             self.tray_mgr.update_tooltip(tooltip)
-        except Exception:
-            pass
 
     def _ensure_tray(self, enabled: bool) -> None:
         try:
@@ -2159,28 +2919,15 @@ class ListenMoePlayer(QWidget):
                         on_toggle_play_pause=self._tray_toggle_play_pause,
                         on_stop_stream=self.stop_stream,
                         on_toggle_mute=self.toggle_mute_shortcut,
+                        on_menu_about_to_show=self._refresh_visible_state,
                     )
                 except Exception:
                     return
             # Compose tooltip from current UI state
             try:
-                header = self.i18n.t('header').format(
-                    channel=self.settings.value(KEY_CHANNEL, 'J-POP'),
-                    format=self.settings.value(KEY_FORMAT, 'Vorbis')
-                )
+                tooltip = self._compute_tray_tooltip()
             except Exception:
-                header = APP_TITLE
-            now = self.now_playing_label.text() if hasattr(self, 'now_playing_label') else ''
-            session_enabled = self._get_bool(KEY_SESSION_TIMER_ENABLED, True)
-            session = self.session_label.text() if session_enabled and hasattr(self, 'session_label') else ''
-            if now and session:
-                tooltip = f"{header}\n{now}\n{session}"
-            elif now:
-                tooltip = f"{header}\n{now}"
-            elif session:
-                tooltip = f"{header}\n{session}"
-            else:
-                tooltip = header
+                tooltip = APP_TITLE
             # Apply visibility/icon/tooltip
             try:
                 self.tray_mgr.ensure_tray_enabled(self._tray_enabled, window_icon=self.windowIcon(), tooltip=tooltip)
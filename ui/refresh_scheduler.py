@@ -0,0 +1,102 @@
+from __future__ import annotations
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set
+from PyQt5.QtCore import QObject, QThread, QTimer, pyqtSignal, Qt
+
+# Scheduler unico per i refresh della UI.
+# Le varie sorgenti (timer, eventi del player, WS, impostazioni) segnano solo
+# delle sezioni come "sporche"; al frame successivo ogni sezione sporca
+# ricalcola il proprio valore e lo applica solo se è cambiato rispetto
+# all'ultimo applicato. Le sezioni che dipendono da un'altra vengono
+# ricalcolate nello stesso passaggio quando quella cambia.
+
+
+class _Section:
+    __slots__ = ("name", "compute", "apply", "depends_on", "has_value", "value")
+
+    def __init__(self, name: str, compute: Callable[[], Any], apply: Callable[[Any], None],
+                 depends_on: Sequence[str]) -> None:
+        self.name = name
+        self.compute = compute
+        self.apply = apply
+        self.depends_on = tuple(depends_on)
+        self.has_value = False
+        self.value: Any = None
+
+
+class RefreshScheduler(QObject):
+    _mark_requested = pyqtSignal(str)
+
+    def __init__(self, parent=None, frame_ms: int = 16) -> None:
+        super().__init__(parent)
+        self._sections: List[_Section] = []
+        self._by_name: Dict[str, _Section] = {}
+        self._dirty: Set[str] = set()
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(max(0, int(frame_ms)))
+        self._timer.timeout.connect(self.flush)
+        self._mark_requested.connect(self.mark, Qt.QueuedConnection)
+        # Statistiche: passaggi eseguiti, sezioni ricalcolate e applicate davvero
+        self.flushes = 0
+        self.computed = 0
+        self.applied = 0
+
+    def register(self, name: str, compute: Callable[[], Any], apply: Callable[[Any], None],
+                 depends_on: Sequence[str] = ()) -> None:
+        """Registra una sezione. Le dipendenze devono essere registrate prima."""
+        sec = _Section(name, compute, apply, depends_on)
+        self._sections.append(sec)
+        self._by_name[name] = sec
+
+    def mark(self, *names: str) -> None:
+        """Segna le sezioni come da aggiornare (sicuro da qualsiasi thread)."""
+        if QThread.currentThread() is not self.thread():
+            for n in names:
+                self._mark_requested.emit(n)
+            return
+        self._dirty.update(names)
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def mark_all(self) -> None:
+        self.mark(*self._by_name.keys())
+
+    def invalidate(self, *names: str) -> None:
+        """Dimentica l'ultimo valore applicato: al prossimo passaggio viene riapplicato comunque."""
+        for n in names or tuple(self._by_name.keys()):
+            sec = self._by_name.get(n)
+            if sec is not None:
+                sec.has_value = False
+        self.mark(*(names or tuple(self._by_name.keys())))
+
+    def value(self, name: str, default: Any = None) -> Any:
+        sec = self._by_name.get(name)
+        return sec.value if (sec is not None and sec.has_value) else default
+
+    def flush(self) -> None:
+        if self._timer.isActive():
+            self._timer.stop()
+        dirty = self._dirty
+        self._dirty = set()
+        if not dirty:
+            return
+        self.flushes += 1
+        changed: Set[str] = set()
+        for sec in self._sections:
+            if sec.name not in dirty and not any(d in changed for d in sec.depends_on):
+                continue
+            try:
+                val = sec.compute()
+            except Exception:
+                continue
+            self.computed += 1
+            if sec.has_value and val == sec.value:
+                continue
+            sec.value = val
+            sec.has_value = True
+            changed.add(sec.name)
+            try:
+                sec.apply(val)
+                self.applied += 1
+            except Exception:
+                pass
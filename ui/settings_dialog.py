@@ -2,11 +2,9 @@ from PyQt5.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QCheckBox,
     QPushButton, QLineEdit, QFileDialog, QSpinBox
 )
-from PyQt5.QtCore import Qt, QSettings, pyqtSignal
+from PyQt5.QtCore import Qt, pyqtSignal
 from i18n import I18n
 from constants import (
-    ORG_NAME,
-    APP_SETTINGS,
     KEY_LANG,
     KEY_CHANNEL,
     KEY_FORMAT,
@@ -16,21 +14,37 @@ from constants import (
     KEY_TRAY_HIDE_ON_MINIMIZE,
     KEY_LIBVLC_PATH,
     KEY_NETWORK_CACHING,
+    KEY_VLC_PYTHON_AUDIO,
     KEY_DARK_MODE,
     KEY_SLEEP_STOP_ON_END,
     KEY_DEV_CONSOLE_ENABLED,
     KEY_SESSION_TIMER_ENABLED,
     KEY_AUDIO_DEVICE_INDEX,
+    KEY_AUDIO_DEVICE_ID,
     KEY_DEV_CONSOLE_SHOW_DEV,
+    KEY_HISTORY_ENABLED,
+    KEY_COVER_ART_ENABLED,
+    KEY_LOG_FILE_ENABLED,
+    KEY_CONTROL_SERVER_ENABLED,
+    KEY_CONTROL_SERVER_PORT,
+    KEY_CONTROL_SERVER_TOKEN,
+    DEFAULT_CONTROL_PORT,
+    KEY_ICY_METADATA,
+    KEY_WS_ENABLED,
 )
+from settings_store import get_settings
+from logger import default_log_path
+from audio_devices import get_device_registry
+from control_server import new_token
 
 class SettingsDialog(QDialog):
     settings_changed = pyqtSignal()
+    _devices_changed = pyqtSignal(object)
     def __init__(self, parent=None):
         super().__init__(parent)
         # Rendi il dialogo non modale per permettere interazione con altre finestre (es. DevConsole)
         self.setModal(False)
-        self.settings = QSettings(ORG_NAME, APP_SETTINGS)
+        self.settings = get_settings()
         self.i18n = I18n(self.settings.value(KEY_LANG, 'it'))
         self.setWindowTitle(self.i18n.t('settings_title'))
         try:
@@ -64,6 +78,28 @@ class SettingsDialog(QDialog):
         self.chk_session_timer.setChecked(self.settings.value(KEY_SESSION_TIMER_ENABLED, 'true') == 'true')
         layout.addWidget(self.chk_session_timer)
 
+        # Cronologia brani
+        self.chk_history = QCheckBox(self.i18n.t('settings_history_enable'))
+        self.chk_history.setToolTip(self.i18n.t('settings_history_tip'))
+        self.chk_history.setChecked(self.settings.value(KEY_HISTORY_ENABLED, 'true') == 'true')
+        layout.addWidget(self.chk_history)
+
+        # Copertine album
+        self.chk_cover_art = QCheckBox(self.i18n.t('settings_cover_art_enable'))
+        self.chk_cover_art.setToolTip(self.i18n.t('settings_cover_art_tip'))
+        self.chk_cover_art.setChecked(self.settings.value(KEY_COVER_ART_ENABLED, 'true') == 'true')
+        layout.addWidget(self.chk_cover_art)
+
+        # Fonti dei metadati: ICY in-band (MP3) e WebSocket
+        self.chk_icy = QCheckBox(self.i18n.t('settings_icy_enable'))
+        self.chk_icy.setToolTip(self.i18n.t('settings_icy_tip'))
+        self.chk_icy.setChecked(self.settings.value(KEY_ICY_METADATA, 'false') == 'true')
+        layout.addWidget(self.chk_icy)
+        self.chk_ws = QCheckBox(self.i18n.t('settings_ws_enable'))
+        self.chk_ws.setToolTip(self.i18n.t('settings_ws_tip'))
+        self.chk_ws.setChecked(self.settings.value(KEY_WS_ENABLED, 'true') == 'true')
+        layout.addWidget(self.chk_ws)
+
         # Developer Console (optional)
         self.chk_dev_console = QCheckBox(self.i18n.t('settings_dev_console'))
         self.chk_dev_console.setChecked(self.settings.value(KEY_DEV_CONSOLE_ENABLED, 'false') == 'true')
@@ -92,6 +128,40 @@ class SettingsDialog(QDialog):
         # sync enabled state
         self.chk_dev_console.stateChanged.connect(lambda s: self.chk_dev_show_dev.setEnabled(self.chk_dev_console.isChecked()))
         layout.addWidget(self.chk_dev_show_dev)
+        self.chk_log_file = QCheckBox(self.i18n.t('settings_log_file'))
+        try:
+            self.chk_log_file.setToolTip(self.i18n.t('settings_log_file_tip').format(path=default_log_path()))
+        except Exception:
+            pass
+        self.chk_log_file.setChecked(self.settings.value(KEY_LOG_FILE_ENABLED, 'false') == 'true')
+        layout.addWidget(self.chk_log_file)
+        self.chk_control_server = QCheckBox(self.i18n.t('settings_control_server'))
+        try:
+            port = self.settings.get_int(KEY_CONTROL_SERVER_PORT, DEFAULT_CONTROL_PORT)
+            self.chk_control_server.setToolTip(self.i18n.t('settings_control_server_tip').format(url=f"http://127.0.0.1:{port}"))
+        except Exception:
+            pass
+        self.chk_control_server.setChecked(self.settings.value(KEY_CONTROL_SERVER_ENABLED, 'false') == 'true')
+        layout.addWidget(self.chk_control_server)
+        # Token dell'API: generato alla prima attivazione, da copiare negli script
+        token_row = QHBoxLayout()
+        token_row.setSpacing(8)
+        lab_token = QLabel(self.i18n.t('settings_control_token'))
+        lab_token.setMinimumWidth(140)
+        token_row.addWidget(lab_token)
+        self.txt_control_token = QLineEdit(self.settings.get_str(KEY_CONTROL_SERVER_TOKEN, ''))
+        self.txt_control_token.setReadOnly(True)
+        try:
+            self.txt_control_token.setToolTip(self.i18n.t('settings_control_token_tip'))
+        except Exception:
+            pass
+        token_row.addWidget(self.txt_control_token, 1)
+        self.btn_control_token = QPushButton(self.i18n.t('settings_control_token_new'))
+        self.btn_control_token.clicked.connect(lambda: self.txt_control_token.setText(new_token()))
+        token_row.addWidget(self.btn_control_token)
+        layout.addLayout(token_row)
+        self.chk_control_server.stateChanged.connect(lambda s: self._ensure_control_token())
+        self._ensure_control_token()
 
         # Language
         lang_row = QHBoxLayout()
@@ -158,8 +228,16 @@ class SettingsDialog(QDialog):
             pass
         audio_row.addWidget(self.cmb_audio_device, 1)
         self.btn_audio_refresh = QPushButton(self.i18n.t('settings_audio_refresh'))
+        # Elenco dalla cache del registro dispositivi; le scansioni avvengono in background
+        self._devices = get_device_registry()
         try:
-            self.btn_audio_refresh.clicked.connect(self._populate_audio_devices)
+            self._devices_changed.connect(self._fill_audio_devices)
+            # Il registro notifica dal suo thread: il segnale riporta l'elenco sul thread GUI
+            self._unsubscribe_devices = self._devices.subscribe(self._devices_changed.emit)
+            # Collegamenti/scollegamenti rilevati solo mentre l'elenco è visibile
+            self._release_polling = self._devices.hold_polling()
+            self.finished.connect(lambda _r: (self._unsubscribe_devices(), self._release_polling()))
+            self.btn_audio_refresh.clicked.connect(self._devices.refresh)
         except Exception:
             pass
         audio_row.addWidget(self.btn_audio_refresh)
@@ -205,6 +283,12 @@ class SettingsDialog(QDialog):
         nc_row.addWidget(self.spin_network_caching)
         layout.addLayout(nc_row)
 
+        # Uscita audio di VLC: libVLC oppure quella dell'app (callback PCM)
+        self.chk_vlc_python_audio = QCheckBox(self.i18n.t('settings_vlc_python_audio'))
+        self.chk_vlc_python_audio.setToolTip(self.i18n.t('settings_vlc_python_audio_tip'))
+        self.chk_vlc_python_audio.setChecked(self.settings.value(KEY_VLC_PYTHON_AUDIO, 'false') == 'true')
+        layout.addWidget(self.chk_vlc_python_audio)
+
         # Tray options
         self.chk_tray_enabled = QCheckBox(self.i18n.t('settings_tray_enable'))
         self.chk_tray_enabled.setChecked(self.settings.value(KEY_TRAY_ENABLED, 'true') == 'true')
@@ -275,30 +359,50 @@ class SettingsDialog(QDialog):
         except Exception:
             pass
 
+    def _ensure_control_token(self):
+        """Con l'API attiva il token non resta mai vuoto."""
+        try:
+            if self.chk_control_server.isChecked() and not self.txt_control_token.text().strip():
+                self.txt_control_token.setText(new_token())
+        except Exception:
+            pass
+
     def _save_settings(self):
         """Logica comune per salvare le impostazioni."""
         self.settings.setValue(KEY_AUTOPLAY, 'true' if self.chk_autoplay.isChecked() else 'false')
         self.settings.setValue(KEY_DARK_MODE, 'true' if self.chk_dark_mode.isChecked() else 'false')
         self.settings.setValue(KEY_SLEEP_STOP_ON_END, 'true' if self.chk_sleep_stop.isChecked() else 'false')
         self.settings.setValue(KEY_SESSION_TIMER_ENABLED, 'true' if self.chk_session_timer.isChecked() else 'false')
+        self.settings.setValue(KEY_HISTORY_ENABLED, 'true' if self.chk_history.isChecked() else 'false')
+        self.settings.setValue(KEY_COVER_ART_ENABLED, 'true' if self.chk_cover_art.isChecked() else 'false')
+        self.settings.setValue(KEY_ICY_METADATA, 'true' if self.chk_icy.isChecked() else 'false')
+        self.settings.setValue(KEY_WS_ENABLED, 'true' if self.chk_ws.isChecked() else 'false')
         self.settings.setValue(KEY_DEV_CONSOLE_ENABLED, 'true' if self.chk_dev_console.isChecked() else 'false')
         self.settings.setValue(KEY_DEV_CONSOLE_SHOW_DEV, 'true' if self.chk_dev_show_dev.isChecked() else 'false')
+        self.settings.setValue(KEY_LOG_FILE_ENABLED, 'true' if self.chk_log_file.isChecked() else 'false')
+        self.settings.setValue(KEY_CONTROL_SERVER_ENABLED, 'true' if self.chk_control_server.isChecked() else 'false')
+        self.settings.setValue(KEY_CONTROL_SERVER_TOKEN, self.txt_control_token.text().strip())
         self.settings.setValue(KEY_LANG, 'it' if self.cmb_lang.currentIndex() == 0 else 'en')
         self.settings.setValue(KEY_CHANNEL, self.cmb_channel.currentText())
         self.settings.setValue(KEY_FORMAT, self.cmb_format.currentText())
         path = self.txt_vlc_path.text().strip()
         self.settings.setValue(KEY_LIBVLC_PATH, path if path else '')
         self.settings.setValue(KEY_NETWORK_CACHING, int(self.spin_network_caching.value()))
+        self.settings.setValue(KEY_VLC_PYTHON_AUDIO, 'true' if self.chk_vlc_python_audio.isChecked() else 'false')
         self.settings.setValue(KEY_TRAY_ENABLED, 'true' if self.chk_tray_enabled.isChecked() else 'false')
         self.settings.setValue(KEY_TRAY_HIDE_ON_MINIMIZE, 'true' if self.chk_tray_hide_on_minimize.isChecked() else 'false')
         self.settings.setValue(KEY_TRAY_NOTIFICATIONS, 'true' if self.chk_tray_notifications.isChecked() else 'false')
         # Save audio device selection: None => use system default
         try:
-            idx_data = self.cmb_audio_device.currentData()
-            if idx_data is None:
+            dev_id = self.cmb_audio_device.currentData()
+            if not dev_id:
+                self.settings.setValue(KEY_AUDIO_DEVICE_ID, '')
                 self.settings.setValue(KEY_AUDIO_DEVICE_INDEX, '')
             else:
-                self.settings.setValue(KEY_AUDIO_DEVICE_INDEX, int(idx_data))
+                self.settings.setValue(KEY_AUDIO_DEVICE_ID, dev_id)
+                dev = self._devices.get(dev_id)
+                if dev is not None:
+                    self.settings.setValue(KEY_AUDIO_DEVICE_INDEX, int(dev.index))
         except Exception:
             pass
 
@@ -341,60 +445,37 @@ class SettingsDialog(QDialog):
             pass
 
     def _populate_audio_devices(self):
-        """Enumerate PortAudio devices via PyAudio and fill combo box.
-        Keeps first entry as 'System default'; lists output-capable devices with index.
+        """Fill the combo from the cached device list and request a background rescan."""
+        self._fill_audio_devices(self._devices.devices())
+        self._devices.refresh()
+
+    def _fill_audio_devices(self, devices) -> None:
+        """Keeps 'System default' as first entry; items carry the stable device id.
+        The selection follows the current choice (or the saved id) across rescans.
         """
         try:
-            import pyaudio
-        except Exception:
-            pyaudio = None
-        # Keep 'System default' as index 0
-        try:
-            # Clear all except first
-            for i in range(self.cmb_audio_device.count() - 1, 0, -1):
-                self.cmb_audio_device.removeItem(i)
-        except Exception:
-            pass
-        if pyaudio is None:
-            return
-        pa = None
-        try:
-            pa = pyaudio.PyAudio()
-            host_info = pa.get_host_api_info_by_index(0) if hasattr(pa, 'get_host_api_info_by_index') else None
-            device_count = host_info.get('deviceCount', 0) if isinstance(host_info, dict) else (
-                pa.get_device_count() if hasattr(pa, 'get_device_count') else 0
-            )
-            for i in range(device_count):
-                try:
-                    info = pa.get_device_info_by_index(i)
-                except Exception:
-                    info = None
-                if not isinstance(info, dict):
-                    continue
-                max_output = int(info.get('maxOutputChannels', 0))
-                name = str(info.get('name', f'Device {i}'))
-                # Include only devices that can output
-                if max_output > 0:
-                    # Show name and index in label
-                    label = f"{name} (#{i})"
-                    self.cmb_audio_device.addItem(label, userData=i)
-            # Restore persisted selection if available
-            persisted = self.settings.value(KEY_AUDIO_DEVICE_INDEX, '')
-            if persisted != '' and persisted is not None:
-                try:
-                    persisted = int(persisted)
-                    # Find index in combo where userData == persisted
-                    for combo_idx in range(self.cmb_audio_device.count()):
-                        if self.cmb_audio_device.itemData(combo_idx) == persisted:
-                            self.cmb_audio_device.setCurrentIndex(combo_idx)
-                            break
-                except Exception:
-                    pass
-        except Exception:
-            pass
-        finally:
+            selected = self.cmb_audio_device.currentData()
+            if selected is None and self.cmb_audio_device.count() <= 1:
+                selected = self.settings.value(KEY_AUDIO_DEVICE_ID, '') or None
+                if selected is None:
+                    # Impostazioni precedenti: solo l'indice PortAudio
+                    legacy = self.settings.value(KEY_AUDIO_DEVICE_INDEX, '')
+                    if legacy not in (None, ''):
+                        dev = self._devices.find_by_index(int(legacy))
+                        selected = dev.id if dev is not None else None
+            self.cmb_audio_device.blockSignals(True)
             try:
-                if pa is not None and hasattr(pa, 'terminate'):
-                    pa.terminate()
-            except Exception:
-                pass
\ No newline at end of file
+                for i in range(self.cmb_audio_device.count() - 1, 0, -1):
+                    self.cmb_audio_device.removeItem(i)
+                for dev in devices:
+                    self.cmb_audio_device.addItem(dev.label(), userData=dev.id)
+                idx = self.cmb_audio_device.findData(selected) if selected else 0
+                if idx < 0 and selected:
+                    # Dispositivo salvato non collegato: resta selezionabile, l'audio usa il predefinito
+                    self.cmb_audio_device.addItem(f"{selected} (?)", userData=selected)
+                    idx = self.cmb_audio_device.count() - 1
+                self.cmb_audio_device.setCurrentIndex(max(0, idx))
+            finally:
+                self.cmb_audio_device.blockSignals(False)
+        except Exception:
+            pass
\ No newline at end of file
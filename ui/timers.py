@@ -0,0 +1,91 @@
+from __future__ import annotations
+from typing import Optional
+import math
+import time
+from PyQt5.QtCore import QTimer
+
+# Timer della UI basati su scadenze monotone.
+# Il tempo misurato non dipende dal numero di tick ricevuti: i tick servono solo
+# a ridisegnare e possono essere rallentati o sospesi (finestra nascosta)
+# senza perdere precisione.
+
+
+class StopwatchTimer(QTimer):
+    """Cronometro monotono con tick UI sospendibili.
+
+    `start()`/`stop()`/`isActive()` riguardano il cronometro (in esecuzione o no);
+    `set_tick_interval()` cambia solo la frequenza dei tick (0 = nessun tick).
+    """
+
+    def __init__(self, parent=None, interval_ms: int = 1000) -> None:
+        super().__init__(parent)
+        self._tick_ms = int(interval_ms)
+        self._running = False
+        self._started_at: Optional[float] = None
+        self._accum = 0.0
+        self.setInterval(self._tick_ms)
+
+    def start(self, *args) -> None:
+        if not self._running:
+            self._running = True
+            self._started_at = time.monotonic()
+        self._apply_ticks()
+
+    def stop(self) -> None:
+        if self._running and self._started_at is not None:
+            self._accum += time.monotonic() - self._started_at
+        self._running = False
+        self._started_at = None
+        super().stop()
+
+    def isActive(self) -> bool:
+        return self._running
+
+    def elapsed(self) -> float:
+        if self._running and self._started_at is not None:
+            return self._accum + (time.monotonic() - self._started_at)
+        return self._accum
+
+    def reset(self, seconds: float = 0.0) -> None:
+        self._accum = max(0.0, float(seconds))
+        if self._running:
+            self._started_at = time.monotonic()
+
+    def set_tick_interval(self, interval_ms: int) -> None:
+        self._tick_ms = max(0, int(interval_ms))
+        self._apply_ticks()
+
+    def _apply_ticks(self) -> None:
+        if self._running and self._tick_ms > 0:
+            super().start(self._tick_ms)
+        else:
+            super().stop()
+
+
+class CountdownTimer(QTimer):
+    """Conto alla rovescia verso una scadenza monotona; il timeout è solo un risveglio."""
+
+    def __init__(self, parent=None, interval_ms: int = 1000) -> None:
+        super().__init__(parent)
+        self._deadline: Optional[float] = None
+        self.setSingleShot(True)
+        self.setInterval(int(interval_ms))
+
+    def set_remaining(self, seconds: float) -> None:
+        self._deadline = (time.monotonic() + max(0.0, float(seconds))) if seconds > 0 else None
+
+    def remaining(self) -> float:
+        if self._deadline is None:
+            return 0.0
+        return max(0.0, self._deadline - time.monotonic())
+
+    def remaining_seconds(self) -> int:
+        """Secondi rimanenti arrotondati per eccesso (0 solo a scadenza raggiunta)."""
+        return int(math.ceil(self.remaining() - 1e-6))
+
+    def wake_in(self, seconds: float) -> None:
+        """Programma il prossimo risveglio (non oltre la scadenza)."""
+        ms = int(max(0.0, seconds) * 1000)
+        if self._deadline is not None:
+            ms = min(ms, int(math.ceil(self.remaining() * 1000)))
+        super().start(max(1, ms))
@@ -3,6 +3,7 @@ from PyQt5.QtGui import QIcon, QFont, QPalette
 from PyQt5.QtCore import QObject
 from typing import Optional, Callable
 from constants import KEY_CHANNEL, KEY_FORMAT
+from logger import get_logger
 
 class TrayManager(QObject):
     """
@@ -15,10 +16,12 @@ class TrayManager(QObject):
                  on_change_format: Optional[Callable[[str], None]] = None,
                  on_toggle_play_pause: Optional[Callable] = None,
                  on_stop_stream: Optional[Callable] = None,
-                 on_toggle_mute: Optional[Callable] = None):
+                 on_toggle_mute: Optional[Callable] = None,
+                 on_menu_about_to_show: Optional[Callable] = None):
         super().__init__(parent)
         self._parent = parent
         self._i18n = i18n
+        self.log = get_logger('TrayManager')
         self._tray: Optional[QSystemTrayIcon] = None
         self._on_show_window = on_show_window
         self._on_quit = on_quit or (lambda: (QApplication.instance() and QApplication.instance().quit()))
@@ -28,10 +31,13 @@ class TrayManager(QObject):
         self._on_toggle_play_pause = on_toggle_play_pause
         self._on_stop_stream = on_stop_stream
         self._on_toggle_mute = on_toggle_mute
+        # Richiamato all'apertura del menu: permette di ricalcolare i testi informativi al volo
+        self._on_menu_about_to_show = on_menu_about_to_show
         # Azioni informative in cima al menu
         self._act_info_now: Optional[QAction] = None
         self._act_info_session: Optional[QAction] = None
         self._sep_info: Optional[QAction] = None
+        self._last_tooltip: Optional[str] = None
         # Azioni di controllo riproduzione
         self._act_play_pause: Optional[QAction] = None
         self._act_stop: Optional[QAction] = None
@@ -250,6 +256,11 @@ class TrayManager(QObject):
                         act_quit.triggered.connect(self._on_quit)
                     menu.addAction(act_quit)
                     
+                    if self._on_menu_about_to_show:
+                        try:
+                            menu.aboutToShow.connect(self._on_menu_about_to_show)
+                        except Exception:
+                            pass
                     self._tray.setContextMenu(menu)
                     if tooltip:
                         self.update_tooltip(tooltip)
@@ -280,6 +291,10 @@ class TrayManager(QObject):
     def update_tooltip(self, text: str) -> None:
         try:
             if self._tray is not None and text is not None:
+                # Niente da fare se tooltip e righe del menu sono già aggiornati
+                if text == self._last_tooltip and self._act_info_now is not None:
+                    return
+                self._last_tooltip = text
                 self._tray.setToolTip(text)
                 try:
                     menu = self._tray.contextMenu()
@@ -338,7 +353,7 @@ class TrayManager(QObject):
                     txt = 'Pause' if effective_playing else 'Play'
                 self._act_play_pause.setText(txt)
                 try:
-                    print(f"[TRAY] update_controls_state: playing={is_playing}, paused={is_paused}, ui_paused={ui_paused} -> effective_playing={effective_playing}, effective_paused={effective_paused} -> set Play/Pause text='{txt}'")
+                    self.log.debug("[TRAY] update_controls_state: playing=%s, paused=%s, ui_paused=%s -> effective_playing=%s, effective_paused=%s -> set Play/Pause text=%r", is_playing, is_paused, ui_paused, effective_playing, effective_paused, txt)
                 except Exception:
                     pass
         except Exception:
@@ -351,16 +366,19 @@ class TrayManager(QObject):
                     txtm = 'Unmute' if is_muted else 'Mute'
                 self._act_mute.setText(txtm)
                 try:
-                    print(f"[TRAY] update_controls_state: muted={is_muted} -> set Mute text='{txtm}'")
+                    self.log.debug("[TRAY] update_controls_state: muted=%s -> set Mute text=%r", is_muted, txtm)
                 except Exception:
                     pass
         except Exception:
             pass
 
-    def show_message(self, title: str, body: str) -> None:
+    def show_message(self, title: str, body: str, icon: Optional[QIcon] = None) -> None:
         try:
             if self._tray is not None:
-                self._tray.showMessage(title or '', body or '')
+                if icon is not None and not icon.isNull():
+                    self._tray.showMessage(title or '', body or '', icon, 10000)
+                else:
+                    self._tray.showMessage(title or '', body or '')
         except Exception:
             pass
 
@@ -6,13 +6,94 @@ from datetime import datetime, timezone
 
 WS_URL = "wss://listen.moe/gateway_v2"
 
+
+def parse_track_update(d: dict) -> dict:
+    """Estrae i campi utili dal payload `d` di un TRACK_UPDATE del gateway_v2.
+    Ritorna un dict con id, title, artist (primo artista), artists (tutti i nomi),
+    duration (secondi), start_ts (epoch), album_image e artist_image (nomi file
+    CDN della copertina/immagine artista, o None).
+    """
+    song = d.get("song")
+    if not isinstance(song, dict):
+        song = {}
+    title = song.get("title") or "Unknown"
+    artists = song.get("artists")
+    if not isinstance(artists, list):
+        artists = []
+    artist_names = []
+    for a in artists:
+        try:
+            name = a.get("name") if isinstance(a, dict) else None
+            if name:
+                artist_names.append(str(name))
+        except Exception:
+            pass
+    artist_name = ""
+    try:
+        artist_name = (artists[0].get("name") or "") if artists else ""
+    except Exception:
+        artist_name = ""
+    # Immagini: copertina del primo album che ne ha una, altrimenti immagine del primo artista
+    album_image = None
+    try:
+        for al in (song.get("albums") or []):
+            img = al.get("image") if isinstance(al, dict) else None
+            if isinstance(img, str) and img:
+                album_image = img
+                break
+    except Exception:
+        album_image = None
+    artist_image = None
+    try:
+        for a in artists:
+            img = a.get("image") if isinstance(a, dict) else None
+            if isinstance(img, str) and img:
+                artist_image = img
+                break
+    except Exception:
+        artist_image = None
+    song_id = song.get("id")
+    try:
+        song_id = int(song_id) if song_id is not None else None
+    except Exception:
+        song_id = None
+    # Durata (secondi) se presente nel payload
+    duration = song.get("duration")
+    try:
+        duration = int(duration) if duration is not None else None
+    except Exception:
+        duration = None
+    # startTime ISO8601 (UTC) -> epoch seconds
+    start_ts = None
+    try:
+        start_time_iso = d.get("startTime")
+        if isinstance(start_time_iso, str):
+            iso = start_time_iso.replace("Z", "+00:00")
+            dt = datetime.fromisoformat(iso)
+            if dt.tzinfo is None:
+                dt = dt.replace(tzinfo=timezone.utc)
+            start_ts = dt.timestamp()
+    except Exception:
+        start_ts = None
+    return {
+        "id": song_id,
+        "title": title,
+        "artist": artist_name,
+        "artists": artist_names,
+        "duration": duration,
+        "start_ts": start_ts,
+        "album_image": album_image,
+        "artist_image": artist_image,
+    }
+
 class NowPlayingWS:
     def __init__(self,
                  on_now_playing: Callable[[str, str, Optional[int], Optional[float]], None],
                  on_error_text: Callable[[str], None],
                  on_closed_text: Callable[[str], None],
                  channel_filter: Optional[Callable[[dict], bool]] = None,
-                 ws_url: Optional[str] = None):
+                 ws_url: Optional[str] = None,
+                 on_track: Optional[Callable[[dict], None]] = None):
         self.ws_app: Optional[WebSocketApp] = None
         self.ws_thread: Optional[threading.Thread] = None
         self.ws_heartbeat_interval_ms: Optional[int] = None
@@ -22,6 +103,8 @@ class NowPlayingWS:
         self.on_error_text = on_error_text
         self.on_closed_text = on_closed_text
         self.channel_filter = channel_filter
+        # Callback opzionale con tutti i campi del brano (vedi parse_track_update)
+        self.on_track = on_track
         self.ws_url = ws_url or WS_URL
 
     def start(self):
@@ -37,10 +120,12 @@ class NowPlayingWS:
                 data = json.loads(message)
             except Exception:
                 return
+            if not isinstance(data, dict):
+                return
             op = data.get("op")
             if op == 0:
-                d = data.get("d", {})
-                hb = d.get("heartbeat")
+                d = data.get("d") or {}
+                hb = d.get("heartbeat") if isinstance(d, dict) else None
                 if isinstance(hb, int):
                     self.ws_heartbeat_interval_ms = hb
                     self._schedule_heartbeat()
@@ -50,9 +135,9 @@ class NowPlayingWS:
                 except Exception:
                     pass
             elif op == 1:
-                d = data.get("d", {})
+                d = data.get("d")
                 t = data.get("t")
-                if t in ("TRACK_UPDATE", "TRACK_UPDATE_REQUEST"):
+                if t in ("TRACK_UPDATE", "TRACK_UPDATE_REQUEST") and isinstance(d, dict):
                     # Filtra per canale se richiesto
                     try:
                         if self.channel_filter is not None and not self.channel_filter(d):
@@ -60,28 +145,18 @@ class NowPlayingWS:
                     except Exception:
                         # In caso di errore nel filtro, non bloccare l'aggiornamento
                         pass
-                    song = d.get("song") or {}
-                    title = song.get("title") or "Unknown"
-                    artists = song.get("artists") or []
-                    artist_name = artists[0].get("name") if artists else ""
-                    # Durata (secondi) se presente nel payload
-                    duration = song.get("duration")
-                    try:
-                        duration = int(duration) if duration is not None else None
-                    except Exception:
-                        duration = None
-                    # startTime ISO8601 (UTC) -> epoch seconds
-                    start_ts = None
-                    try:
-                        start_time_iso = d.get("startTime")
-                        if isinstance(start_time_iso, str):
-                            iso = start_time_iso.replace("Z", "+00:00")
-                            dt = datetime.fromisoformat(iso)
-                            if dt.tzinfo is None:
-                                dt = dt.replace(tzinfo=timezone.utc)
-                            start_ts = dt.timestamp()
-                    except Exception:
-                        start_ts = None
+                    info = parse_track_update(d)
+                    # on_track prima di on_now_playing: permette di avviare subito
+                    # il prefetch della copertina per il nuovo brano
+                    if self.on_track is not None:
+                        try:
+                            self.on_track(info)
+                        except Exception:
+                            pass
+                    title = info["title"]
+                    artist_name = info["artist"]
+                    duration = info["duration"]
+                    start_ts = info["start_ts"]
                     self.on_now_playing(title, artist_name, duration, start_ts)
 
         def on_error(ws, error):
@@ -99,7 +174,8 @@ class NowPlayingWS:
             on_error=on_error,
             on_close=on_close,
         )
-        self.ws_thread = threading.Thread(target=self.ws_app.run_forever, kwargs={"ping_interval": None}, daemon=True)
+        self.ws_thread = threading.Thread(target=self.ws_app.run_forever, kwargs={"ping_interval": None},
+                                          name="NowPlayingWS", daemon=True)
         self.ws_thread.start()
 
     def _schedule_heartbeat(self):